@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Воспроизведение захваченных обновлений на тестовом экземпляре бота.
+
+Читает файлы захвата (CAPTURE_SAMPLE_RATE, bot/services/capture.py)
+и отправляет обновления на webhook-эндпоинт тестового экземпляра
+с исходными интервалами между обновлениями (с ускорением --speed).
+ID групп и каналов можно заменить ID чатов тестового экземпляра:
+--chat-map задаёт соответствие, --chat-id — чат для остальных.
+
+Результат — как у bench.webhook_replay: ответы по статусам и время
+подтверждения. Время обработки смотрите в метриках тестового экземпляра
+(antispam_stage_seconds, antispam_update_seconds).
+
+Использование:
+    python -m bench.capture_replay data/capture/*.ndjson.gz --chat-id -1001234567890
+    python -m bench.capture_replay capture.ndjson.gz --speed 5 --chat-map -1001111=-1002222
+
+Опции:
+    --url           Адрес эндпоинта (по умолчанию http://localhost:PANEL_PORT/WEBHOOK_PATH)
+    --secret        Секрет (по умолчанию WEBHOOK_SECRET)
+    --speed         Ускорение относительно исходного темпа (по умолчанию 1)
+    --concurrency   Максимум одновременных запросов (по умолчанию WEBHOOK_MAX_CONNECTIONS)
+    --chat-map      Соответствие ID чатов: ИСХОДНЫЙ=НОВЫЙ[,...]
+    --chat-id       ID чата для групп, не указанных в --chat-map
+    --limit         Максимум обновлений (по умолчанию все)
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from bench.webhook_replay import replay, report
+from core.config import PANEL_PORT, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_PATH, WEBHOOK_SECRET
+
+# Типы чатов, ID которых заменяются (ID личных чатов уже псевдонимизированы)
+_GROUP_TYPES = ('group', 'supergroup', 'channel')
+
+
+def load_capture(paths: List[str], limit: Optional[int] = None) -> List[Tuple[float, Dict[str, Any]]]:
+    """Читает файлы захвата.
+
+    Аргументы:
+        paths (List[str]): Файлы *.ndjson.gz.
+        limit (Optional[int]): Максимум обновлений.
+
+    Возвращаемое значение:
+        List[Tuple[float, Dict[str, Any]]]: (время получения, обновление) по возрастанию времени.
+    """
+    records = []
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records.append((record['ts'], record['update']))
+    records.sort(key=lambda record: record[0])
+    return records[:limit] if limit else records
+
+
+def remap_chats(value: Any, chat_map: Mapping[int, int], default: Optional[int]) -> Any:
+    """Заменяет ID групп и каналов в обновлении.
+
+    Аргументы:
+        value (Any): Обновление или его часть.
+        chat_map (Mapping[int, int]): Исходный ID -> новый ID.
+        default (Optional[int]): ID для групп, отсутствующих в chat_map; None — не заменять.
+
+    Возвращаемое значение:
+        Any: Копия с заменёнными ID.
+    """
+    if isinstance(value, list):
+        return [remap_chats(item, chat_map, default) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    result = {name: remap_chats(item, chat_map, default) for name, item in value.items()}
+    if value.get('type') in _GROUP_TYPES and 'id' in value:
+        result['id'] = chat_map.get(value['id'], value['id'] if default is None else default)
+    return result
+
+
+def shift_dates(value: Any, shift: int) -> Any:
+    """Сдвигает поля date и edit_date (время отправки сообщений).
+
+    Без сдвига этап delivery и время до удаления на тестовом экземпляре
+    отсчитывались бы от времени захвата.
+
+    Аргументы:
+        value (Any): Обновление или его часть.
+        shift (int): Сдвиг в секундах.
+
+    Возвращаемое значение:
+        Any: Копия со сдвинутыми датами.
+    """
+    if isinstance(value, list):
+        return [shift_dates(item, shift) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        name: item + shift if name in ('date', 'edit_date') and isinstance(item, int) and item
+        else shift_dates(item, shift)
+        for name, item in value.items()
+    }
+
+
+def _parse_chat_map(chat_map: str) -> Dict[int, int]:
+    """Разбирает --chat-map.
+
+    Аргументы:
+        chat_map (str): Строка вида "-1001=-1002,-1003=-1004".
+
+    Возвращаемое значение:
+        Dict[int, int]: Исходный ID -> новый ID.
+    """
+    result = {}
+    for item in filter(None, chat_map.split(',')):
+        source, _, target = item.partition('=')
+        result[int(source)] = int(target)
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Воспроизводит захват и печатает результат.
+
+    Аргументы:
+        args (argparse.Namespace): Аргументы командной строки.
+    """
+    records = load_capture(args.paths, args.limit)
+    if not records:
+        print('Нет обновлений')
+        return
+
+    chat_map = _parse_chat_map(args.chat_map)
+    first = records[0][0]
+    offsets = [(ts - first) / args.speed for ts, _ in records]
+    # Даты сообщений соответствуют моменту отправки при воспроизведении
+    replay_start = time.time()
+    updates = [
+        shift_dates(remap_chats(update, chat_map, args.chat_id), int(replay_start + offset - ts))
+        for (ts, update), offset in zip(records, offsets)
+    ]
+    print(f"updates={len(updates)} span={records[-1][0] - first:.1f}s speed=x{args.speed}")
+
+    started = time.monotonic()
+    statuses, durations = await replay(
+        args.url, args.secret, updates, 0, args.concurrency, offsets=offsets
+    )
+    report(statuses, durations, time.monotonic() - started)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Воспроизведение захваченных обновлений')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--url', default=f"http://localhost:{PANEL_PORT}{WEBHOOK_PATH}")
+    parser.add_argument('--secret', default=WEBHOOK_SECRET)
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--concurrency', type=int, default=WEBHOOK_MAX_CONNECTIONS)
+    parser.add_argument('--chat-map', default='')
+    parser.add_argument('--chat-id', type=int, default=None)
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error('не указан --secret и не задан WEBHOOK_SECRET')
+    if args.speed <= 0:
+        parser.error('--speed должен быть больше 0')
+    asyncio.run(main(args))
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Сравнение загрузки контекста модерации: последовательные запросы и один запрос.
+
+Измеряет время получения PK чата, настроек, записи об ограничениях
+и белого списка так, как это делает обработка сообщения при холодных
+кешах: отдельными запросами репозиториев и одним запросом
+ModerationContextRepository. Слушатель уведомлений не запускается,
+поэтому кеши настроек и реестр чатов не используются.
+
+Использование:
+    python -m bench.context_query --chat-id -1001234567890 --user-id 42
+    python -m bench.context_query --dsn postgresql://... --iterations 2000
+
+Опции:
+    --dsn           Строка подключения (по умолчанию DATABASE_URL)
+    --chat-id       Telegram ID наблюдаемого чата (по умолчанию первый активный)
+    --user-id       Telegram ID автора (по умолчанию 0)
+    --iterations    Количество измерений на вариант (по умолчанию 1000)
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from core.config import DATABASE_URL
+from core.db import close_pool, get_pool, init_pool
+from core.repository.chat import ChatRepository
+from core.repository.context import ModerationContextRepository
+from core.repository.muted import MutedRepository
+from core.repository.settings import SettingsRepository
+from core.repository.whitelist import WhitelistRepository
+
+# Прогрев перед измерением (подготовка запросов на соединении)
+_WARMUP = 50
+
+
+async def _sequential(chat_id: int, user_id: int) -> None:
+    """Загружает контекст отдельными запросами репозиториев."""
+    chat_pk = await ChatRepository.get_chat_pk(chat_id)
+    if chat_pk is None:
+        return
+    await SettingsRepository.get_all_chat_settings(chat_pk)
+    await MutedRepository.get_muted_user(chat_pk, user_id)
+    await WhitelistRepository.is_whitelisted(chat_pk, user_id)
+
+
+async def _single(chat_id: int, user_id: int) -> None:
+    """Загружает контекст одним запросом."""
+    await ModerationContextRepository.get_context(chat_id, user_id)
+
+
+async def _measure(
+    loader: Callable[[int, int], Awaitable[None]],
+    chat_id: int,
+    user_id: int,
+    iterations: int
+) -> List[float]:
+    """Выполняет загрузчик заданное число раз и возвращает длительности в мс.
+
+    Аргументы:
+        loader (Callable): Проверяемый вариант загрузки.
+        chat_id (int): Telegram ID чата.
+        user_id (int): Telegram ID автора.
+        iterations (int): Количество измерений.
+
+    Возвращаемое значение:
+        List[float]: Длительности вызовов в миллисекундах.
+    """
+    for _ in range(_WARMUP):
+        await loader(chat_id, user_id)
+
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await loader(chat_id, user_id)
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def _report(name: str, durations: List[float]) -> None:
+    """Печатает среднее, медиану и p95 длительностей.
+
+    Аргументы:
+        name (str): Название варианта.
+        durations (List[float]): Длительности в миллисекундах.
+    """
+    ordered = sorted(durations)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{name:<12} mean={statistics.mean(ordered):.3f}ms "
+        f"p50={statistics.median(ordered):.3f}ms p95={p95:.3f}ms"
+    )
+
+
+async def main(dsn: str, chat_id: Optional[int], user_id: int, iterations: int) -> None:
+    """Запускает сравнение.
+
+    Аргументы:
+        dsn (str): Строка подключения к PostgreSQL.
+        chat_id (Optional[int]): Telegram ID чата; если не указан, берётся первый активный.
+        user_id (int): Telegram ID автора.
+        iterations (int): Количество измерений на вариант.
+    """
+    # Одно соединение: измеряется задержка запросов, а не конкуренция за пул
+    await init_pool(dsn, min_size=1, max_size=1)
+    try:
+        if chat_id is None:
+            chat_id = await get_pool().fetchval(
+                'SELECT chat_id FROM chat WHERE is_active = TRUE ORDER BY id LIMIT 1'
+            )
+            if chat_id is None:
+                print("Нет активных чатов: укажите --chat-id")
+                return
+
+        sequential = await _measure(_sequential, chat_id, user_id, iterations)
+        single = await _measure(_single, chat_id, user_id, iterations)
+
+        print(f"chat_id={chat_id} user_id={user_id} iterations={iterations}")
+        _report('sequential', sequential)
+        _report('single', single)
+        print(f"speedup      x{statistics.mean(sequential) / statistics.mean(single):.2f}")
+    finally:
+        await close_pool()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Сравнение загрузки контекста модерации')
+    parser.add_argument('--dsn', default=DATABASE_URL)
+    parser.add_argument('--chat-id', type=int, default=None)
+    parser.add_argument('--user-id', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error('не указан --dsn и не задан DATABASE_URL')
+    asyncio.run(main(args.dsn, args.chat_id, args.user_id, args.iterations))
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""Нагрузочный тест обработки сообщений целиком.
+
+Генерирует синтетический поток обновлений Telegram (обычные сообщения,
+спам, длинные тексты, медиа с подписью и без, редактирования) от многих
+пользователей во многих чатах и передаёт его в Dispatcher.feed_update
+со всеми обработчиками и middleware бота. Вместо Telegram используется
+сессия, которая записывает вызовы API и имитирует их задержку;
+БД — локальная PostgreSQL, BERT — модель из настройки BERT_MODEL.
+
+Выводит пропускную способность, перцентили времени обработки обновления
+и этапов (по трассировке core/tracing.py), число запросов к БД и вызовов
+Telegram API. Для теста создаются наблюдаемые чаты с отрицательными ID
+от BENCH_CHAT_BASE; после теста они удаляются (если не указан --keep-chats).
+
+Использование:
+    python -m bench.pipeline
+    python -m bench.pipeline --updates 20000 --chats 50 --users 5000 --api-latency 80
+
+Опции:
+    --dsn           Строка подключения (по умолчанию DATABASE_URL)
+    --updates       Количество обновлений (по умолчанию 5000)
+    --chats         Количество чатов (по умолчанию 20)
+    --users         Количество пользователей (по умолчанию 2000)
+    --mix           Доли видов обновлений (по умолчанию ham=70,spam=15,long=5,media=5,edit=5)
+    --rate          Обновлений в секунду (по умолчанию 0 — без ограничения)
+    --concurrency   Максимум обновлений в обработке (по умолчанию 500)
+    --api-latency   Средняя задержка вызова Telegram API в мс (по умолчанию 50)
+    --external      Включить проверки CAS и LOLS (по умолчанию отключены в тестовых чатах)
+    --keep-chats    Не удалять тестовые чаты после теста
+    --seed          Зерно генератора (по умолчанию 1)
+"""
+
+import os
+
+# Трассировка нужна для перцентилей этапов; медленные обработки в slow_trace не пишутся.
+# Токен не используется: запросы к Telegram выполняет FakeSession.
+os.environ.setdefault('TRACING_ENABLED', 'true')
+os.environ.setdefault('TRACE_SLOW_THRESHOLD', '1e9')
+os.environ.setdefault('BOT_TOKEN', '123456:bench')
+os.environ.setdefault('TEST_BOT_TOKEN', '123456:bench')
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import re  # noqa: E402
+import time  # noqa: E402
+from collections import Counter, defaultdict  # noqa: E402
+from datetime import datetime  # noqa: E402
+from typing import Any, AsyncGenerator, Dict, List, Mapping, Optional, Tuple  # noqa: E402
+
+import asyncpg  # noqa: E402
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import GetChatAdministrators, GetMe, SendMessage, TelegramMethod  # noqa: E402
+from aiogram.types import Chat, Message, Update, User  # noqa: E402
+
+from core.config import DATABASE_URL  # noqa: E402
+from core.db import close_pool, get_pool, init_pool  # noqa: E402
+from core.tracing import Trace, current_trace  # noqa: E402
+
+# Telegram ID первого тестового чата; следующие — BENCH_CHAT_BASE - 1, - 2, ...
+BENCH_CHAT_BASE = -1009990000000
+
+# Первый Telegram ID тестовых пользователей
+_USER_BASE = 9_000_000_000
+
+_DEFAULT_MIX = 'ham=70,spam=15,long=5,media=5,edit=5'
+
+_HAM = (
+    'Подскажите, во сколько завтра консультация по матанализу?',
+    'Кто-нибудь нашёл методичку по лабораторной номер три?',
+    'Спасибо, всё получилось!',
+    'Пара перенесена в 0312, не перепутайте аудиторию',
+    'А зачёт будет автоматом у тех, кто сдал все РГР?',
+    'Скиньте, пожалуйста, расписание на следующую неделю',
+    'Я опоздаю минут на десять, начинайте без меня',
+    'Ссылка на конференцию та же, что и в прошлый раз',
+)
+_SPAM = (
+    'Ищу людей для удалённой работы, доход от 5000 в день, пиши в лс',
+    'Срочно нужны курьеры, оплата каждый день, подробности в личке',
+    'Бесплатные сигналы по крипте, прибыль 300% за неделю, переходи по ссылке в профиле',
+    'Продам аккаунты и базы, недорого, пишите @seller_bot',
+    'Заработок на телефоне без вложений, 2 часа в день, набираю команду',
+    'Раздаю 1000 рублей первым 50 подписчикам, условия в канале',
+)
+
+
+class FakeSession(BaseSession):
+    """Сессия Telegram API без сети: записывает вызовы и имитирует задержку."""
+
+    def __init__(self, latency: float, rng: random.Random) -> None:
+        """Создаёт сессию.
+
+        Аргументы:
+            latency (float): Средняя задержка вызова (секунды); фактическая — от 0.5 до 1.5 средней.
+            rng (random.Random): Генератор задержек.
+        """
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._rng = rng
+        self._message_id = 0
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[Any],
+        timeout: Optional[int] = None
+    ) -> Any:
+        """Записывает вызов и возвращает правдоподобный ответ."""
+        self.calls[type(method).__name__] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency * self._rng.uniform(0.5, 1.5))
+
+        if isinstance(method, SendMessage):
+            self._message_id += 1
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type='supergroup'),
+                text=method.text,
+            )
+        if isinstance(method, GetChatAdministrators):
+            return []
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name='bench', username='bench_bot')
+        return True
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True
+    ) -> AsyncGenerator[bytes, None]:
+        """Скачивание файлов не используется."""
+        yield b''
+
+    async def close(self) -> None:
+        """Закрывать нечего."""
+
+
+class QueryCounter:
+    """Счётчик запросов к БД по тексту запроса (query logger asyncpg)."""
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self.elapsed: Dict[str, float] = defaultdict(float)
+
+    async def attach(self, conn: asyncpg.Connection) -> None:
+        """Подключает счётчик к новому соединению пула (init пула).
+
+        Аргументы:
+            conn (asyncpg.Connection): Соединение.
+        """
+        conn.add_query_logger(self._log)
+
+    def _log(self, record: Any) -> None:
+        """Учитывает выполненный запрос.
+
+        Аргументы:
+            record (asyncpg.LoggedQuery): Запрос.
+        """
+        query = re.sub(r'\s+', ' ', record.query).strip()
+        # Сброс соединения при возврате в пул — не запрос обработки
+        if query.startswith('SELECT pg_advisory_unlock_all()'):
+            return
+        self.counts[query] += 1
+        self.elapsed[query] += record.elapsed
+
+    def reset(self) -> None:
+        """Обнуляет счётчики."""
+        self.counts.clear()
+        self.elapsed.clear()
+
+
+def _parse_mix(mix: str) -> Dict[str, float]:
+    """Разбирает доли видов обновлений.
+
+    Аргументы:
+        mix (str): Строка вида "ham=70,spam=15,...".
+
+    Возвращаемое значение:
+        Dict[str, float]: Вид -> доля.
+
+    Исключения:
+        ValueError: При неизвестном виде или некорректной доле.
+    """
+    weights = {}
+    for item in mix.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in ('ham', 'spam', 'long', 'media', 'edit'):
+            raise ValueError(f"Неизвестный вид обновления: {kind}")
+        weights[kind] = float(weight)
+    return weights
+
+
+def generate_updates(
+    count: int,
+    chats: int,
+    users: int,
+    mix: Mapping[str, float],
+    rng: random.Random
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Генерирует обновления.
+
+    Аргументы:
+        count (int): Количество обновлений.
+        chats (int): Количество чатов.
+        users (int): Количество пользователей.
+        mix (Mapping[str, float]): Доли видов обновлений.
+        rng (random.Random): Генератор.
+
+    Возвращаемое значение:
+        List[Tuple[str, Dict[str, Any]]]: (вид, обновление без date) в порядке отправки.
+    """
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    sent: List[Dict[str, Any]] = []
+    updates = []
+    for number in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == 'edit' and not sent:
+            kind = 'ham'
+
+        if kind == 'edit':
+            original = rng.choice(sent)
+            message = {**original, 'edit_date': 0}
+            text = original.get('text') or original.get('caption') or rng.choice(_HAM)
+            message['text' if 'text' in original else 'caption'] = text + ' (upd)'
+            updates.append((kind, {'update_id': number, 'edited_message': message}))
+            continue
+
+        chat_id = BENCH_CHAT_BASE - rng.randrange(chats)
+        user_id = _USER_BASE + rng.randrange(users)
+        message = {
+            'message_id': number + 1,
+            'chat': {'id': chat_id, 'type': 'supergroup', 'title': f'bench {chat_id}'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f'bench{user_id}'},
+        }
+        if kind == 'ham':
+            message['text'] = rng.choice(_HAM)
+        elif kind == 'spam':
+            message['text'] = rng.choice(_SPAM)
+        elif kind == 'long':
+            message['text'] = ' '.join(rng.choice(_HAM) for _ in range(60))
+        else:
+            message['photo'] = [{'file_id': f'p{number}', 'file_unique_id': f'u{number}', 'width': 640, 'height': 480}]
+            if rng.random() < 0.5:
+                message['caption'] = rng.choice(_HAM + _SPAM)
+        sent.append(message)
+        updates.append((kind, {'update_id': number, 'message': message}))
+    return updates
+
+
+async def _prepare_chats(chats: int, external: bool) -> List[int]:
+    """Создаёт тестовые чаты, включает проверку правок и отключает внешние проверки.
+
+    Без CHECK_EDITED_MESSAGES обновления вида edit завершались бы сразу
+    и не нагружали обработку.
+
+    Аргументы:
+        chats (int): Количество чатов.
+        external (bool): Оставить проверки CAS и LOLS включёнными.
+
+    Возвращаемое значение:
+        List[int]: PK созданных чатов.
+    """
+    from core.repository.chat import ChatRepository
+    from core.repository.settings import SettingsRepository
+
+    pks = []
+    for index in range(chats):
+        chat_id = BENCH_CHAT_BASE - index
+        pk = await ChatRepository.add_chat(chat_id, f'bench {chat_id}')
+        await SettingsRepository.update_chat_setting(pk, 'CHECK_EDITED_MESSAGES', True)
+        if not external:
+            await SettingsRepository.update_chat_setting(pk, 'CHECK_CAS', False)
+            await SettingsRepository.update_chat_setting(pk, 'CHECK_LOLS', False)
+        pks.append(pk)
+    return pks
+
+
+async def _start_services(bot: Bot) -> None:
+    """Регистрирует обработчики и запускает фоновые сервисы, как start_bot.
+
+    Аргументы:
+        bot (Bot): Экземпляр бота с FakeSession.
+    """
+    import bot.core as bot_core
+    from bot.handlers import commands, members, messages, callbacks  # noqa: F401
+    from bot.middlewares import UpdateLaneMiddleware
+    from bot.services.collector import CollectorService
+    from bot.services.outbox import OutboxService
+    from bot.services.side_effects import SideEffectService
+    from bot.services.trust import TrustService
+
+    bot_core.dp.update.outer_middleware(UpdateLaneMiddleware())
+    bot_core.bot = bot
+    await OutboxService.start()
+    await SideEffectService.start()
+    await CollectorService.start()
+    await TrustService.start()
+
+
+async def _stop_services() -> None:
+    """Дорабатывает фоновые очереди в порядке остановки бота."""
+    from bot.services.collector import CollectorService
+    from bot.services.digest import LogDigestService
+    from bot.services.outbox import OutboxService
+    from bot.services.side_effects import SideEffectService
+    from bot.services.trust import TrustService
+
+    await SideEffectService.stop()
+    await LogDigestService.stop()
+    await OutboxService.stop()
+    await CollectorService.stop()
+    await TrustService.stop()
+
+
+async def feed(
+    bot: Bot,
+    updates: List[Tuple[str, Dict[str, Any]]],
+    rate: float,
+    concurrency: int
+) -> Tuple[List[Tuple[str, float]], List[Trace]]:
+    """Передаёт обновления в диспетчер.
+
+    Каждое обновление обрабатывается в отдельной задаче, как при поллинге.
+
+    Аргументы:
+        bot (Bot): Экземпляр бота.
+        updates (List[Tuple[str, Dict[str, Any]]]): (вид, обновление).
+        rate (float): Обновлений в секунду; 0 — без ограничения.
+        concurrency (int): Максимум обновлений в обработке.
+
+    Возвращаемое значение:
+        Tuple[List[Tuple[str, float]], List[Trace]]: (вид, длительность в мс) и трассировки.
+    """
+    from bot.core import dp
+
+    durations: List[Tuple[str, float]] = []
+    traces: List[Trace] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def process(kind: str, data: Dict[str, Any]) -> None:
+        try:
+            update = Update.model_validate(data, context={'bot': bot})
+            started = time.perf_counter()
+            await dp.feed_update(bot, update)
+            durations.append((kind, (time.perf_counter() - started) * 1000))
+            # Трассировка, начатая обработчиком в контексте этой задачи
+            trace = current_trace()
+            if trace is not None:
+                traces.append(trace)
+        finally:
+            slots.release()
+
+    tasks = []
+    started = time.monotonic()
+    for number, (kind, data) in enumerate(updates):
+        if rate > 0:
+            delay = started + number / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+        message = data.get('message') or data.get('edited_message')
+        message['date'] = int(time.time())
+        if 'edit_date' in message:
+            message['edit_date'] = message['date']
+        tasks.append(asyncio.create_task(process(kind, data)))
+    await asyncio.gather(*tasks)
+    return durations, traces
+
+
+def _percentiles(values: List[float]) -> str:
+    """Форматирует p50, p95, p99 и максимум.
+
+    Аргументы:
+        values (List[float]): Значения в миллисекундах.
+
+    Возвращаемое значение:
+        str: Строка с перцентилями.
+    """
+    ordered = sorted(values)
+
+    def at(q: float) -> float:
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+    return f"p50={at(0.5):8.2f} p95={at(0.95):8.2f} p99={at(0.99):8.2f} max={ordered[-1]:8.2f} ms"
+
+
+def _report(
+    durations: List[Tuple[str, float]],
+    traces: List[Trace],
+    queries: QueryCounter,
+    calls: Counter,
+    elapsed: float,
+    drained: float
+) -> None:
+    """Печатает результаты.
+
+    Аргументы:
+        durations (List[Tuple[str, float]]): (вид, длительность обработки в мс).
+        traces (List[Trace]): Трассировки сообщений.
+        queries (QueryCounter): Запросы к БД.
+        calls (Counter): Вызовы Telegram API по методу.
+        elapsed (float): Время обработки всех обновлений (секунды).
+        drained (float): Время доработки фоновых очередей (секунды).
+    """
+    total = len(durations)
+    print(f"throughput {total / elapsed:.1f} upd/s ({total} updates in {elapsed:.2f}s, background drained in {drained:.2f}s)")
+    print(f"{'update':<10} {_percentiles([d for _, d in durations])}")
+    by_kind: Dict[str, List[float]] = defaultdict(list)
+    for kind, duration in durations:
+        by_kind[kind].append(duration)
+    for kind, values in sorted(by_kind.items()):
+        print(f"  {kind:<8} {_percentiles(values)} n={len(values)}")
+
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for trace in traces:
+        for stage, _, seconds in trace.spans:
+            if stage != 'delivery':
+                stages[stage].append(seconds * 1000)
+    print('stages')
+    for stage, values in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        print(f"  {stage:<8} {_percentiles(values)} n={len(values)}")
+
+    query_total = sum(queries.counts.values())
+    print(f"db queries {query_total} ({query_total / max(total, 1):.2f} per update)")
+    for query, count in queries.counts.most_common(10):
+        mean = queries.elapsed[query] / count * 1000
+        print(f"  {count:>7} {mean:7.2f}ms  {query[:100]}")
+
+    print('api calls ' + ' '.join(f"{method}={count}" for method, count in calls.most_common()))
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Запускает тест.
+
+    Аргументы:
+        args (argparse.Namespace): Аргументы командной строки.
+    """
+    from core.chat_registry import ChatRegistry
+    from core.notify import start_listener, stop_listener
+    from core.repository.chat import ChatRepository
+    from core.repository.settings import SettingsRepository
+    from migrations.runner import run_migrations
+
+    rng = random.Random(args.seed)
+    queries = QueryCounter()
+    await init_pool(args.dsn, init=queries.attach)
+    await start_listener(args.dsn)
+    session = FakeSession(args.api_latency / 1000, rng)
+    bot = Bot(token=os.environ['BOT_TOKEN'], session=session)
+    pks: List[int] = []
+    try:
+        await run_migrations(get_pool())
+        await SettingsRepository.init_default_global_settings()
+        pks = await _prepare_chats(args.chats, args.external)
+        await ChatRegistry.load()
+        await _start_services(bot)
+
+        updates = generate_updates(args.updates, args.chats, args.users, _parse_mix(args.mix), rng)
+        queries.reset()
+        session.calls.clear()
+
+        started = time.monotonic()
+        durations, traces = await feed(bot, updates, args.rate, args.concurrency)
+        elapsed = time.monotonic() - started
+        await _stop_services()
+        drained = time.monotonic() - started - elapsed
+
+        print(
+            f"updates={args.updates} chats={args.chats} users={args.users} "
+            f"mix={args.mix} api_latency={args.api_latency}ms"
+        )
+        _report(durations, traces, queries, session.calls, elapsed, drained)
+    finally:
+        if not args.keep_chats:
+            for pk in pks:
+                await ChatRepository.delete_chat(pk)
+        await stop_listener()
+        await close_pool()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Нагрузочный тест обработки сообщений')
+    parser.add_argument('--dsn', default=DATABASE_URL)
+    parser.add_argument('--updates', type=int, default=5000)
+    parser.add_argument('--chats', type=int, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--mix', default=_DEFAULT_MIX)
+    parser.add_argument('--rate', type=float, default=0)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--api-latency', type=float, default=50)
+    parser.add_argument('--external', action='store_true')
+    parser.add_argument('--keep-chats', action='store_true')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error('не указан --dsn и не задан DATABASE_URL')
+    asyncio.run(main(args))
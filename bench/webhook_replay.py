@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Отправка записанных обновлений Telegram на webhook-эндпоинт бота.
+
+Заменяет Telegram при проверке режима BOT_MODE=webhook: читает обновления
+из файла и отправляет их POST-запросами с заголовком
+X-Telegram-Bot-Api-Secret-Token, как это делает Telegram. Выводит число
+ответов по статусам и время подтверждения (до ответа эндпоинта, без учёта
+обработки обновления).
+
+Файл обновлений — JSON Lines (одно обновление на строку), JSON-массив
+обновлений или ответ getUpdates ({"ok": true, "result": [...]}).
+
+Использование:
+    python -m bench.webhook_replay updates.jsonl
+    python -m bench.webhook_replay updates.json --url http://localhost:8443/telegram/webhook --rate 200
+
+Опции:
+    --url           Адрес эндпоинта (по умолчанию http://localhost:PANEL_PORT/WEBHOOK_PATH)
+    --secret        Секрет (по умолчанию WEBHOOK_SECRET)
+    --rate          Запросов в секунду (по умолчанию 0 — без ограничения)
+    --concurrency   Максимум одновременных запросов (по умолчанию WEBHOOK_MAX_CONNECTIONS)
+    --repeat        Сколько раз отправить файл (по умолчанию 1)
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from bot.services.webhook import SECRET_HEADER
+from core.config import PANEL_PORT, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_PATH, WEBHOOK_SECRET
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    """Читает обновления из файла.
+
+    Аргументы:
+        path (str): Путь к файлу JSON Lines, JSON-массиву или ответу getUpdates.
+
+    Возвращаемое значение:
+        List[Dict[str, Any]]: Обновления в порядке записи.
+    """
+    with open(path, encoding='utf-8') as f:
+        content = f.read().strip()
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        # Несколько JSON-объектов — JSON Lines
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    if isinstance(data, list):
+        return data
+    return data['result'] if 'result' in data else [data]
+
+
+async def replay(
+    url: str,
+    secret: str,
+    updates: List[Dict[str, Any]],
+    rate: float,
+    concurrency: int,
+    offsets: Optional[List[float]] = None
+) -> Tuple[Counter, List[float]]:
+    """Отправляет обновления на эндпоинт.
+
+    update_id перенумеровываются по порядку отправки, чтобы повторная
+    отправка файла выглядела как новые обновления.
+
+    Аргументы:
+        url (str): Адрес эндпоинта.
+        secret (str): Секрет заголовка.
+        updates (List[Dict[str, Any]]): Обновления.
+        rate (float): Запросов в секунду; 0 — без ограничения.
+        concurrency (int): Максимум одновременных запросов.
+        offsets (Optional[List[float]]): Время отправки каждого обновления
+            от начала (секунды); если задано, rate не используется.
+
+    Возвращаемое значение:
+        Tuple[Counter, List[float]]: Число ответов по статусам и длительности запросов в мс.
+    """
+    statuses: Counter = Counter()
+    durations: List[float] = []
+    slots = asyncio.Semaphore(concurrency)
+    headers = {SECRET_HEADER: secret, 'Content-Type': 'application/json'}
+
+    async def send(session: aiohttp.ClientSession, body: bytes) -> None:
+        try:
+            started = time.perf_counter()
+            async with session.post(url, data=body, headers=headers) as response:
+                await response.read()
+                statuses[response.status] += 1
+            durations.append((time.perf_counter() - started) * 1000)
+        except aiohttp.ClientError as e:
+            statuses[type(e).__name__] += 1
+        finally:
+            slots.release()
+
+    tasks = []
+    base_id = int(time.time())
+    started = time.monotonic()
+    async with aiohttp.ClientSession() as session:
+        for number, update in enumerate(updates):
+            if offsets is not None:
+                delay = started + offsets[number] - time.monotonic()
+            else:
+                delay = started + number / rate - time.monotonic() if rate > 0 else 0
+            if delay > 0:
+                await asyncio.sleep(delay)
+            body = json.dumps({**update, 'update_id': base_id + number}).encode()
+            await slots.acquire()
+            tasks.append(asyncio.create_task(send(session, body)))
+        await asyncio.gather(*tasks)
+    return statuses, durations
+
+
+def report(statuses: Counter, durations: List[float], elapsed: float) -> None:
+    """Печатает статусы, пропускную способность и время подтверждения.
+
+    Аргументы:
+        statuses (Counter): Число ответов по статусам.
+        durations (List[float]): Длительности запросов в мс.
+        elapsed (float): Общее время отправки в секундах.
+    """
+    total = sum(statuses.values())
+    print(f"sent={total} elapsed={elapsed:.2f}s rate={total / elapsed:.1f}/s")
+    print('statuses ' + ' '.join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+    if durations:
+        ordered = sorted(durations)
+        p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+        p99 = ordered[max(int(len(ordered) * 0.99) - 1, 0)]
+        print(
+            f"ack      mean={statistics.mean(ordered):.3f}ms p50={statistics.median(ordered):.3f}ms "
+            f"p95={p95:.3f}ms p99={p99:.3f}ms max={ordered[-1]:.3f}ms"
+        )
+
+
+async def main(path: str, url: str, secret: str, rate: float, concurrency: int, repeat: int) -> None:
+    """Отправляет файл обновлений и печатает результат.
+
+    Аргументы:
+        path (str): Путь к файлу обновлений.
+        url (str): Адрес эндпоинта.
+        secret (str): Секрет заголовка.
+        rate (float): Запросов в секунду; 0 — без ограничения.
+        concurrency (int): Максимум одновременных запросов.
+        repeat (int): Сколько раз отправить файл.
+    """
+    updates = load_updates(path) * repeat
+    started = time.monotonic()
+    statuses, durations = await replay(url, secret, updates, rate, concurrency)
+    report(statuses, durations, time.monotonic() - started)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Отправка записанных обновлений на webhook-эндпоинт')
+    parser.add_argument('path')
+    parser.add_argument('--url', default=f"http://localhost:{PANEL_PORT}{WEBHOOK_PATH}")
+    parser.add_argument('--secret', default=WEBHOOK_SECRET)
+    parser.add_argument('--rate', type=float, default=0)
+    parser.add_argument('--concurrency', type=int, default=WEBHOOK_MAX_CONNECTIONS)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error('не указан --secret и не задан WEBHOOK_SECRET')
+    asyncio.run(main(args.path, args.url, args.secret, args.rate, args.concurrency, args.repeat))
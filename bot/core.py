@@ -1,5 +1,6 @@
 """Ядро бота: инициализация, константы и основные объекты."""
 
+import asyncio
 from typing import Optional
 
 from aiogram import Bot, Dispatcher
@@ -14,6 +15,8 @@ from core.config import (
     PROXY_URL,
     DATABASE_URL,
     NOTIFICATION_CHAT_ID,
+    BOT_MODE,
+    CAPTURE_SAMPLE_RATE,
 )
 from core.logging import logger
 from core.sentry import capture_exception
@@ -65,7 +68,7 @@ async def start_bot() -> None:
         3. Создать экземпляр бота.
         4. Обнаружить чаты, где бот админ.
         5. Зарегистрировать обработчики.
-        6. Запустить поллинг.
+        6. Запустить поллинг или приём обновлений через webhook (BOT_MODE).
     """
     global bot, bot_username
 
@@ -81,8 +84,30 @@ async def start_bot() -> None:
     await run_migrations(get_pool())
     await SettingsRepository.init_default_global_settings()
 
+    # Слушатель LISTEN/NOTIFY для инвалидации кешей
+    from core.notify import start_listener, stop_listener
+    await start_listener(DATABASE_URL)
+
+    # Реестр чатов и белых списков в памяти
+    from core.chat_registry import ChatRegistry
+    await ChatRegistry.load()
+
+    # Индекс медиа, подтверждённых как спам
+    from bot.services.media import MediaIndex
+    await MediaIndex.load()
+
     # Импорт обработчиков для их регистрации
-    from bot.handlers import commands, messages, callbacks  # noqa: F401
+    from bot.handlers import commands, members, messages, callbacks  # noqa: F401
+
+    # Выборочный захват обновлений для нагрузочных тестов (до очередей обработки)
+    from bot.middlewares import UpdateCaptureMiddleware, UpdateLaneMiddleware
+    from bot.services.capture import CaptureService
+    if CAPTURE_SAMPLE_RATE > 0:
+        await CaptureService.start()
+        dp.update.outer_middleware(UpdateCaptureMiddleware())
+
+    # Упорядоченная обработка обновлений по (chat_id, user_id) с общим лимитом
+    dp.update.outer_middleware(UpdateLaneMiddleware())
 
     # Создание экземпляра бота (с прокси, если задан)
     session = None
@@ -104,20 +129,80 @@ async def start_bot() -> None:
     # Автообнаружение чатов, где бот админ
     await discover_admin_chats(bot, exclude_chat_id=NOTIFICATION_CHAT_ID)
 
+    # Очередь исходящих запросов к Telegram
+    from bot.services.outbox import OutboxService
+    await OutboxService.start()
+
+    # Фоновая запись вердиктов и отправка уведомлений
+    from bot.services.side_effects import SideEffectService
+    await SideEffectService.start()
+
+    # Загрузка и периодическое обновление кеша администраторов
+    from bot.services.admin_cache import AdminCache
+    await AdminCache.start_refresher(bot)
+
     # Запуск планировщика авто-бэкапов
     from bot.services.backup import BackupService
     await BackupService.start_scheduler()
 
+    # Пакетная запись собранных сообщений
+    from bot.services.collector import CollectorService
+    await CollectorService.start()
+
+    # Запись счётчиков активности пользователей
+    from bot.services.trust import TrustService
+    await TrustService.start()
+
+    # Теневая оценка модели-кандидата (если задан SHADOW_MODEL)
+    from bot.services.shadow import ShadowService
+    await ShadowService.start()
+
     # Закрытие ресурсов при остановке
     from bot.services.external_apis import close_shared_session
+    from bot.services.digest import LogDigestService
+    from bot.services.webhook import WebhookService
+    if BOT_MODE == 'webhook':
+        # Принятые обновления обрабатываются до остановки остальных сервисов
+        dp.shutdown.register(WebhookService.stop)
+    dp.shutdown.register(ShadowService.stop)
+    dp.shutdown.register(SideEffectService.stop)
+    dp.shutdown.register(LogDigestService.stop)
+    dp.shutdown.register(OutboxService.stop)
+    dp.shutdown.register(AdminCache.stop_refresher)
     dp.shutdown.register(BackupService.stop_scheduler)
+    dp.shutdown.register(CollectorService.stop)
+    dp.shutdown.register(TrustService.stop)
+    dp.shutdown.register(CaptureService.stop)
     dp.shutdown.register(close_shared_session)
+    dp.shutdown.register(stop_listener)
     dp.shutdown.register(close_pool)
 
-    # Запуск поллинга
+    if BOT_MODE == 'webhook':
+        await _run_webhook(bot)
+        return
+
+    # Запуск поллинга (webhook, оставшийся от режима webhook, удаляется)
+    await bot.delete_webhook()
     await dp.start_polling(bot, polling_timeout=30, handle_signals=False)
 
 
+async def _run_webhook(bot: Bot) -> None:
+    """Принимает обновления через webhook до отмены задачи.
+
+    Аргументы:
+        bot (Bot): Экземпляр бота.
+    """
+    from bot.services.webhook import WebhookService
+
+    await dp.emit_startup(bot=bot)
+    try:
+        await WebhookService.start(bot, dp)
+        await asyncio.Event().wait()
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+
 __all__ = [
     'dp',
     'bot',
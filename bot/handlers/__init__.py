@@ -1,5 +1,7 @@
 """Обработчики событий Telegram-бота."""
 
-from bot.handlers import commands, messages, callbacks
+# members регистрируется раньше messages: обработчик new_chat_members
+# должен срабатывать до общего обработчика сообщений.
+from bot.handlers import commands, members, messages, callbacks
 
-__all__ = ['commands', 'messages', 'callbacks']
+__all__ = ['commands', 'members', 'messages', 'callbacks']
@@ -6,6 +6,7 @@
 - mute_forever:{chat_id}:{user_id}
 - unmute_user:{chat_id}:{user_id}
 - not_spam:{chat_id}:{user_id}
+- media_spam:{chat_id}:{message_id}
 - unwhitelist:{chat_id}:{user_id}
 """
 
@@ -17,9 +18,12 @@ from aiogram.enums import ParseMode
 from aiogram.exceptions import TelegramBadRequest
 
 from bot.core import dp, get_bot
-from bot.keyboards import remove_button_from_keyboard
+from bot.keyboards import get_digest_entry_label, remove_button_from_keyboard
+from bot.services.album import AlbumService
+from bot.services.media import MediaIndex
 from bot.services.notifications import NotificationService
-from core.repository.chat import ChatRepository
+from bot.services.reputation import ReputationService
+from core.chat_registry import ChatRegistry
 from core.repository.muted import MutedRepository
 from core.repository.whitelist import WhitelistRepository
 from core.utils import add_hours_get_timestamp
@@ -43,7 +47,7 @@ async def process_mute_user_callback(callback: types.CallbackQuery) -> None:
         user_id = int(parts[2])
         bot = get_bot()
 
-        chat_pk = await ChatRepository.get_chat_pk(chat_id)
+        chat_pk = await ChatRegistry.get_chat_pk(chat_id)
         if chat_pk is None:
             await callback.answer("Чат не найден!")
             return
@@ -69,6 +73,7 @@ async def process_mute_user_callback(callback: types.CallbackQuery) -> None:
             until_timestamp,
             relapse_number
         )
+        ReputationService.invalidate_muted(chat_pk, user_id)
 
         mute_permissions = types.ChatPermissions(can_send_messages=False)
         await bot.restrict_chat_member(
@@ -81,9 +86,10 @@ async def process_mute_user_callback(callback: types.CallbackQuery) -> None:
         until_str = datetime.fromtimestamp(until_timestamp).strftime("%d.%m.%Y %H:%M:%S")
 
         original_text = getattr(callback.message, "html_text", callback.message.text)
-        new_text = original_text + f'\n<b>Ограничен до:</b> {until_str}'
+        entry = get_digest_entry_label(callback.message.reply_markup, callback.data)
+        new_text = original_text + f'\n<b>{entry}Ограничен до:</b> {until_str}'
 
-        new_markup = remove_button_from_keyboard(callback.message.reply_markup, "mute_user")
+        new_markup = remove_button_from_keyboard(callback.message.reply_markup, callback.data)
         await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=new_markup)
 
         await callback.answer("Пользователь ограничен!")
@@ -117,7 +123,7 @@ async def process_mute_forever_callback(callback: types.CallbackQuery) -> None:
         user_id = int(parts[2])
         bot = get_bot()
 
-        chat_pk = await ChatRepository.get_chat_pk(chat_id)
+        chat_pk = await ChatRegistry.get_chat_pk(chat_id)
         if chat_pk is None:
             await callback.answer("Чат не найден!")
             return
@@ -142,6 +148,7 @@ async def process_mute_forever_callback(callback: types.CallbackQuery) -> None:
             await MutedRepository.create_muted_user(
                 chat_pk, user_id, username, current_timestamp, until_timestamp, 999
             )
+        ReputationService.invalidate_muted(chat_pk, user_id)
 
         mute_permissions = types.ChatPermissions(can_send_messages=False)
         await bot.restrict_chat_member(
@@ -154,12 +161,15 @@ async def process_mute_forever_callback(callback: types.CallbackQuery) -> None:
         until_str = datetime.fromtimestamp(until_timestamp).strftime("%d.%m.%Y %H:%M:%S")
 
         original_text = getattr(callback.message, "html_text", callback.message.text)
-        new_text = original_text + f'\n<b>Ограничен навсегда (до {until_str})</b>'
-
-        # Удаляем кнопки mute_user и mute_forever из клавиатуры
-        new_markup = remove_button_from_keyboard(callback.message.reply_markup, "mute_user")
-        if new_markup:
-            new_markup = remove_button_from_keyboard(new_markup, "mute_forever")
+        entry = get_digest_entry_label(callback.message.reply_markup, callback.data)
+        new_text = original_text + f'\n<b>{entry}Ограничен навсегда (до {until_str})</b>'
+
+        # Удаляем кнопки mute_user и mute_forever этого пользователя из клавиатуры
+        new_markup = remove_button_from_keyboard(
+            callback.message.reply_markup,
+            f"mute_user:{chat_id}:{user_id}",
+            f"mute_forever:{chat_id}:{user_id}",
+        )
         await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=new_markup)
 
         await callback.answer("Пользователь ограничен навсегда!")
@@ -203,9 +213,10 @@ async def process_unmute_user_callback(callback: types.CallbackQuery) -> None:
             permissions=full_permissions
         )
 
-        chat_pk = await ChatRepository.get_chat_pk(chat_id)
+        chat_pk = await ChatRegistry.get_chat_pk(chat_id)
         if chat_pk:
             await MutedRepository.clear_muted_till(chat_pk, user_id)
+            ReputationService.invalidate_muted(chat_pk, user_id)
 
         original_text = getattr(callback.message, "html_text", callback.message.text)
         new_text = original_text + "\n<b>Ограничение снято вручную</b>"
@@ -235,12 +246,19 @@ async def process_delete_message_callback(callback: types.CallbackQuery) -> None
     bot = get_bot()
 
     try:
-        await bot.delete_message(chat_id=chat_id, message_id=msg_id)
+        # Сообщения альбома удаляются вместе (отсутствующие пропускаются Telegram);
+        # опоздавшие сообщения альбома удаляются при поступлении
+        message_ids = AlbumService.mark_deleted(chat_id, msg_id)
+        if len(message_ids) > 1:
+            await bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+        else:
+            await bot.delete_message(chat_id=chat_id, message_id=msg_id)
 
         original_text = getattr(callback.message, "html_text", callback.message.text)
-        new_text = original_text + '\n\n<i>Сообщение удалено вручную</i>'
+        entry = get_digest_entry_label(callback.message.reply_markup, callback.data)
+        new_text = original_text + f'\n\n<i>{entry}Сообщение удалено вручную</i>'
 
-        new_markup = remove_button_from_keyboard(callback.message.reply_markup, "delete_message")
+        new_markup = remove_button_from_keyboard(callback.message.reply_markup, callback.data)
         await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=new_markup)
 
         await callback.answer("Сообщение удалено!")
@@ -251,9 +269,10 @@ async def process_delete_message_callback(callback: types.CallbackQuery) -> None
             logger.warning(f"Сообщение {msg_id} в чате {chat_id} уже удалено")
 
             original_text = getattr(callback.message, "html_text", callback.message.text)
-            new_text = original_text + '\n\n<i>Сообщение уже удалено</i>'
+            entry = get_digest_entry_label(callback.message.reply_markup, callback.data)
+            new_text = original_text + f'\n\n<i>{entry}Сообщение уже удалено</i>'
 
-            new_markup = remove_button_from_keyboard(callback.message.reply_markup, "delete_message")
+            new_markup = remove_button_from_keyboard(callback.message.reply_markup, callback.data)
             await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=new_markup)
 
             await callback.answer("Сообщение уже удалено!")
@@ -266,6 +285,48 @@ async def process_delete_message_callback(callback: types.CallbackQuery) -> None
         await callback.answer("Не удалось удалить сообщение!")
 
 
+@dp.callback_query(lambda c: c.data.startswith("media_spam"))
+async def process_media_spam_callback(callback: types.CallbackQuery) -> None:
+    """Обрабатывает нажатие на кнопку «Медиа — спам».
+
+    Добавляет медиа сообщения (и остальных сообщений альбома) в индекс
+    спама чата. Сообщение не удаляется: для этого есть отдельная кнопка.
+
+    Аргументы:
+        callback (CallbackQuery): Callback-запрос от inline-кнопки.
+    """
+    parts = callback.data.split(":")
+    if len(parts) != 3:
+        await callback.answer("Неверные данные!")
+        return
+
+    try:
+        chat_id = int(parts[1])
+        msg_id = int(parts[2])
+        bot = get_bot()
+
+        added = 0
+        for message_id in AlbumService.members(chat_id, msg_id):
+            if await MediaIndex.confirm(bot, chat_id, message_id):
+                added += 1
+
+        original_text = getattr(callback.message, "html_text", callback.message.text)
+        entry = get_digest_entry_label(callback.message.reply_markup, callback.data)
+        if added:
+            new_text = original_text + f'\n\n<i>{entry}Медиа добавлено в базу спама чата</i>'
+        else:
+            new_text = original_text + f'\n\n<i>{entry}Медиа уже в базе спама или больше не доступно</i>'
+
+        new_markup = remove_button_from_keyboard(callback.message.reply_markup, callback.data)
+        await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=new_markup)
+        await callback.answer("Медиа добавлено в базу спама!" if added else "Медиа не добавлено")
+        logger.info(f"Медиа сообщения {msg_id} из чата {chat_id} подтверждено как спам ({added} добавлено)")
+
+    except Exception as e:
+        logger.error(f"Ошибка добавления медиа сообщения в индекс: {e}")
+        await callback.answer("Ошибка при добавлении медиа в базу спама!")
+
+
 @dp.callback_query(lambda c: c.data.startswith("not_spam"))
 async def process_not_spam_callback(callback: types.CallbackQuery) -> None:
     """Обрабатывает отметку сообщения как «не спам».
@@ -286,7 +347,7 @@ async def process_not_spam_callback(callback: types.CallbackQuery) -> None:
         user_id = int(parts[2])
         bot = get_bot()
 
-        chat_pk = await ChatRepository.get_chat_pk(chat_id)
+        chat_pk = await ChatRegistry.get_chat_pk(chat_id)
         if chat_pk is None:
             await callback.answer("Чат не найден!")
             return
@@ -298,7 +359,7 @@ async def process_not_spam_callback(callback: types.CallbackQuery) -> None:
             if match:
                 username = match.group(1)
 
-        if not await WhitelistRepository.is_whitelisted(chat_pk, user_id):
+        if not await ChatRegistry.is_whitelisted(chat_pk, user_id):
             await WhitelistRepository.add_to_whitelist(
                 chat_pk=chat_pk,
                 user_id=user_id,
@@ -330,10 +391,22 @@ async def process_not_spam_callback(callback: types.CallbackQuery) -> None:
                 chat_title=chat_title,
             )
 
-        original_text = getattr(callback.message, "html_text", callback.message.text)
-        new_text = original_text + "\n\n<i>Отмечено как не спам. Пользователь добавлен в белый список.</i>"
+        # Медиа пользователя, добавленные в индекс спама или совпавшие с ним, удаляются из индекса
+        await MediaIndex.forget_user(chat_id, user_id)
 
-        await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=None)
+        original_text = getattr(callback.message, "html_text", callback.message.text)
+        entry = get_digest_entry_label(callback.message.reply_markup, callback.data)
+        new_text = original_text + f"\n\n<i>{entry}Отмечено как не спам. Пользователь добавлен в белый список.</i>"
+
+        # Удаляем кнопки ограничения и «Не спам» этого пользователя; кнопки
+        # других записей дайджеста, удаления сообщения и «Медиа — спам» остаются
+        new_markup = remove_button_from_keyboard(
+            callback.message.reply_markup,
+            f"mute_user:{chat_id}:{user_id}",
+            f"mute_forever:{chat_id}:{user_id}",
+            f"not_spam:{chat_id}:{user_id}",
+        )
+        await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=new_markup)
         await callback.answer("Отмечено как не спам. Пользователь добавлен в белый список.")
 
     except ValueError:
@@ -359,7 +432,7 @@ async def process_unwhitelist_callback(callback: types.CallbackQuery) -> None:
         chat_id = int(parts[1])
         user_id = int(parts[2])
 
-        chat_pk = await ChatRepository.get_chat_pk(chat_id)
+        chat_pk = await ChatRegistry.get_chat_pk(chat_id)
         if chat_pk is None:
             await callback.answer("Чат не найден!")
             return
@@ -370,7 +443,7 @@ async def process_unwhitelist_callback(callback: types.CallbackQuery) -> None:
         original_text = getattr(callback.message, "html_text", callback.message.text)
         new_text = original_text + "\n\n<i>Пользователь удалён из белого списка.</i>"
 
-        new_markup = remove_button_from_keyboard(callback.message.reply_markup, "unwhitelist")
+        new_markup = remove_button_from_keyboard(callback.message.reply_markup, callback.data)
         await callback.message.edit_text(new_text, parse_mode=ParseMode.HTML, reply_markup=new_markup)
         await callback.answer("Пользователь удалён из белого списка!")
 
@@ -5,6 +5,7 @@
 из групп, где бот присутствует. В не-приватных чатах — тихий игнор.
 """
 
+import asyncio
 import secrets
 import string
 
@@ -85,13 +86,11 @@ async def handle_get_password_command(message: types.Message) -> None:
         return
 
     # Проверяем, является ли пользователь админом хотя бы в одном чате
-    admin_chats = []
-    for chat in active_chats:
-        is_admin = await ModerationService.check_if_admin(
-            bot, chat['chat_id'], author_id
-        )
-        if is_admin:
-            admin_chats.append(chat)
+    admin_flags = await asyncio.gather(*(
+        ModerationService.check_if_admin(bot, chat['chat_id'], author_id)
+        for chat in active_chats
+    ))
+    admin_chats = [chat for chat, is_admin in zip(active_chats, admin_flags) if is_admin]
 
     if not admin_chats:
         await message.answer(
@@ -0,0 +1,75 @@
+"""Обработчики изменений состава участников наблюдаемых чатов.
+
+При вступлении запускается фоновая проверка репутации пользователя
+(ReputationService), которая заполняет кеши до первого сообщения.
+Изменения статуса участников поддерживают актуальность кеша
+администраторов (AdminCache). Обработчики ничего не отправляют
+в наблюдаемые чаты.
+"""
+
+from aiogram import F
+from aiogram.types import ChatMemberUpdated, Message
+
+from bot.core import dp, get_bot
+from bot.services.admin_cache import AdminCache
+from bot.services.reputation import ReputationService
+
+# Статусы участника, означающие присутствие в чате
+_PRESENT_STATUSES = frozenset({'member', 'restricted', 'administrator', 'creator'})
+
+
+@dp.chat_member()
+async def handle_chat_member(event: ChatMemberUpdated) -> None:
+    """Обрабатывает изменение статуса участника чата.
+
+    Любое изменение статуса обновляет кеш администраторов. Проверка
+    репутации запускается только при вступлении: переход из left/kicked
+    в присутствующий статус. Для restricted учитывается флаг is_member.
+
+    Аргументы:
+        event (ChatMemberUpdated): Событие изменения статуса участника.
+    """
+    old = event.old_chat_member
+    new = event.new_chat_member
+
+    AdminCache.apply_member_update(event.chat.id, new.user.id, new.status)
+
+    was_present = old.status in _PRESENT_STATUSES and getattr(old, 'is_member', True)
+    is_present = new.status in _PRESENT_STATUSES and getattr(new, 'is_member', True)
+    if was_present or not is_present:
+        return
+
+    user = new.user
+    ReputationService.schedule_join_check(
+        get_bot(), event.chat.id, user.id, user.username, is_bot=user.is_bot
+    )
+
+
+@dp.my_chat_member()
+async def handle_my_chat_member(event: ChatMemberUpdated) -> None:
+    """Обрабатывает изменение статуса самого бота в чате.
+
+    После повышения или понижения бота список администраторов чата
+    перезагружается при следующей проверке.
+
+    Аргументы:
+        event (ChatMemberUpdated): Событие изменения статуса бота.
+    """
+    AdminCache.invalidate(event.chat.id)
+
+
+@dp.message(F.new_chat_members)
+async def handle_new_chat_members(message: Message) -> None:
+    """Обрабатывает сервисное сообщение о вступлении участников.
+
+    Резервный источник событий о вступлении: приходит, даже если
+    обновления chat_member не доставляются.
+
+    Аргументы:
+        message (Message): Сервисное сообщение new_chat_members.
+    """
+    bot = get_bot()
+    for user in message.new_chat_members:
+        ReputationService.schedule_join_check(
+            bot, message.chat.id, user.id, user.username, is_bot=user.is_bot
+        )
@@ -4,6 +4,8 @@
 В наблюдаемых чатах бот не отправляет никаких сообщений — только модерация.
 """
 
+from typing import List, Optional
+
 from aiogram.types import Message
 
 from bot.core import dp, get_bot
@@ -11,7 +13,7 @@ from bot.services.moderation import ModerationService
 
 
 @dp.message()
-async def handle_message(message: Message) -> None:
+async def handle_message(message: Message, album: Optional[List[Message]] = None) -> None:
     """Главный обработчик сообщений для проверки на спам.
 
     Обрабатывает сообщения во всех наблюдаемых чатах.
@@ -19,9 +21,10 @@ async def handle_message(message: Message) -> None:
 
     Аргументы:
         message (Message): Входящее сообщение Telegram.
+        album (Optional[List[Message]]): Сообщения альбома, собранные UpdateLaneMiddleware.
     """
     bot = get_bot()
-    await ModerationService.handle_message(message, bot)
+    await ModerationService.handle_message(message, bot, album=album)
 
 
 @dp.edited_message()
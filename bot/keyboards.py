@@ -12,7 +12,8 @@ def create_spam_notification_keyboard(
     include_delete: bool = True,
     include_mute: bool = True,
     include_not_spam: bool = True,
-    include_mute_forever: bool = True
+    include_mute_forever: bool = True,
+    include_media_spam: bool = False
 ) -> Optional[InlineKeyboardMarkup]:
     """Создает клавиатуру для уведомления о спаме.
 
@@ -24,6 +25,8 @@ def create_spam_notification_keyboard(
         include_mute (bool): Включить кнопку ограничения.
         include_not_spam (bool): Включить кнопку "Не спам".
         include_mute_forever (bool): Включить кнопку "Ограничить навсегда".
+        include_media_spam (bool): Включить кнопку "Медиа — спам" (добавляет
+            медиа сообщения в индекс спама чата).
 
     Возвращаемое значение:
         Optional[InlineKeyboardMarkup]: Клавиатура или None.
@@ -54,6 +57,14 @@ def create_spam_notification_keyboard(
             )
         ])
 
+    if include_media_spam:
+        buttons.append([
+            InlineKeyboardButton(
+                text="Медиа — спам",
+                callback_data=f"media_spam:{chat_id}:{message_id}"
+            )
+        ])
+
     if include_not_spam:
         buttons.append([
             InlineKeyboardButton(
@@ -101,22 +112,93 @@ def create_unwhitelist_keyboard(user_id: int, chat_id: int) -> InlineKeyboardMar
     ]])
 
 
+# Короткие подписи кнопок в клавиатуре дайджеста по префиксу callback_data
+_DIGEST_BUTTON_LABELS = {
+    'delete_message': 'удалить',
+    'mute_user': 'мьют',
+    'mute_forever': 'навсегда',
+    'not_spam': 'не спам',
+    'media_spam': 'медиа-спам',
+}
+
+
+def create_digest_keyboard_row(
+    number: int,
+    keyboard: Optional[InlineKeyboardMarkup]
+) -> List[InlineKeyboardButton]:
+    """Создает строку компактных кнопок записи дайджеста.
+
+    Кнопки исходной клавиатуры записи переносятся в одну строку с короткими
+    подписями и номером записи; callback_data не меняется, поэтому нажатия
+    обрабатываются теми же обработчиками.
+
+    Аргументы:
+        number (int): Номер записи в дайджесте.
+        keyboard (Optional[InlineKeyboardMarkup]): Клавиатура записи.
+
+    Возвращаемое значение:
+        List[InlineKeyboardButton]: Кнопки строки (пустой список без клавиатуры).
+    """
+    if keyboard is None:
+        return []
+
+    row = []
+    for source_row in keyboard.inline_keyboard:
+        for button in source_row:
+            prefix = button.callback_data.split(':', 1)[0]
+            label = _DIGEST_BUTTON_LABELS.get(prefix, button.text)
+            row.append(InlineKeyboardButton(
+                text=f"#{number} {label}",
+                callback_data=button.callback_data
+            ))
+    return row
+
+
+def get_digest_entry_label(
+    keyboard: Optional[InlineKeyboardMarkup],
+    callback_data: str
+) -> str:
+    """Возвращает номер записи дайджеста для нажатой кнопки.
+
+    Аргументы:
+        keyboard (Optional[InlineKeyboardMarkup]): Клавиатура сообщения.
+        callback_data (str): callback_data нажатой кнопки.
+
+    Возвращаемое значение:
+        str: Префикс вида «#3: » или пустая строка, если сообщение не дайджест.
+    """
+    if keyboard is None:
+        return ''
+    for row in keyboard.inline_keyboard:
+        for button in row:
+            if button.callback_data == callback_data and button.text.startswith('#'):
+                return button.text.split(' ', 1)[0] + ': '
+    return ''
+
+
 def remove_button_from_keyboard(
-    keyboard: InlineKeyboardMarkup,
-    callback_prefix: str
+    keyboard: Optional[InlineKeyboardMarkup],
+    *callback_data: str
 ) -> Optional[InlineKeyboardMarkup]:
-    """Удаляет кнопку с указанным префиксом из клавиатуры.
+    """Удаляет из клавиатуры кнопки с указанной callback_data.
+
+    Сравнение точное: в дайджесте с несколькими записями удаляются только
+    кнопки нажатой записи.
 
     Аргументы:
-        keyboard (InlineKeyboardMarkup): Исходная клавиатура.
-        callback_prefix (str): Префикс callback_data для удаления.
+        keyboard (Optional[InlineKeyboardMarkup]): Исходная клавиатура.
+        *callback_data (str): callback_data удаляемых кнопок.
 
     Возвращаемое значение:
-        Optional[InlineKeyboardMarkup]: Новая клавиатура без указанной кнопки или None.
+        Optional[InlineKeyboardMarkup]: Новая клавиатура без указанных кнопок или None.
     """
+    if keyboard is None:
+        return None
+
+    removed = set(callback_data)
     new_buttons = []
     for row in keyboard.inline_keyboard:
-        new_row = [btn for btn in row if not btn.callback_data.startswith(callback_prefix)]
+        new_row = [btn for btn in row if btn.callback_data not in removed]
         if new_row:
             new_buttons.append(new_row)
 
@@ -0,0 +1,9 @@
+"""Middleware диспетчера aiogram."""
+
+from bot.middlewares.capture import UpdateCaptureMiddleware
+from bot.middlewares.lanes import UpdateLaneMiddleware
+
+__all__ = [
+    'UpdateCaptureMiddleware',
+    'UpdateLaneMiddleware',
+]
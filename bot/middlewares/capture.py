@@ -0,0 +1,39 @@
+"""Захват входящих обновлений (CAPTURE_SAMPLE_RATE).
+
+Регистрируется первым outer-middleware обновлений, чтобы время получения
+обновления не зависело от ожидания в UpdateLaneMiddleware.
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services.capture import CaptureService
+from core.logging import logger
+
+
+class UpdateCaptureMiddleware(BaseMiddleware):
+    """Outer-middleware обновлений: передаёт обновление CaptureService."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Записывает обновление (выборочно) и передаёт его дальше.
+
+        Аргументы:
+            handler (Callable): Следующий обработчик в цепочке.
+            event (TelegramObject): Обновление.
+            data (Dict[str, Any]): Контекстные данные обработчика.
+
+        Возвращаемое значение:
+            Any: Результат обработчика.
+        """
+        try:
+            CaptureService.capture(event)
+        except Exception as e:
+            logger.error(f"Ошибка захвата обновления: {e}")
+        return await handler(event, data)
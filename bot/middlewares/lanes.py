@@ -0,0 +1,188 @@
+"""Упорядоченная и ограниченная обработка обновлений.
+
+При поллинге aiogram обрабатывает каждое обновление в отдельной задаче
+без ограничений. Во время флуда тысячи задач одновременно конкурируют
+за пул соединений и модель, а два сообщения одного пользователя могут
+обработаться не по порядку.
+
+UpdateLaneMiddleware распределяет обновления по очередям (lane) по ключу
+(chat_id, user_id): обновления одной очереди обрабатываются строго
+по одному в порядке поступления, разные очереди — параллельно, но не более
+UPDATE_CONCURRENCY одновременно. Если ожидающих обновлений больше
+UPDATE_BACKLOG_LIMIT, новые обновления отбрасываются.
+
+Новые сообщения альбома собираются (AlbumService.collect) до очередей
+и до занятия слота: первое сообщение ожидает остальные, не занимая слот,
+а остальные присоединяются к альбому сразу, даже если все слоты заняты.
+Собранный альбом обрабатывается первым сообщением вне очередей (с общим
+лимитом) и передаётся обработчику в data['album'].
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services.album import AlbumService
+from core.config import ALBUM_WINDOW, UPDATE_BACKLOG_LIMIT, UPDATE_CONCURRENCY
+from core.logging import logger
+from core.metrics import counter, gauge, histogram
+
+_backlog = gauge(
+    'antispam_update_backlog',
+    'Обновления, ожидающие своей очереди или свободного слота',
+)
+_in_flight = gauge(
+    'antispam_update_in_flight',
+    'Обновления, обрабатываемые в данный момент',
+)
+_lanes_active = gauge(
+    'antispam_update_lanes',
+    'Очереди (chat_id, user_id) с необработанными обновлениями',
+)
+_lane_depth = histogram(
+    'antispam_update_lane_depth',
+    'Глубина очереди (chat_id, user_id) при поступлении обновления',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+_wait_seconds = histogram(
+    'antispam_update_wait_seconds',
+    'Время ожидания обновления до начала обработки',
+)
+_dropped_total = counter(
+    'antispam_updates_dropped_total',
+    'Обновления, отброшенные из-за переполнения очереди',
+)
+
+
+class _Lane:
+    """Очередь обновлений одного ключа."""
+
+    __slots__ = ('lock', 'depth')
+
+    def __init__(self) -> None:
+        # asyncio.Lock пропускает ожидающих в порядке очереди (FIFO)
+        self.lock = asyncio.Lock()
+        self.depth = 0
+
+
+class UpdateLaneMiddleware(BaseMiddleware):
+    """Outer-middleware обновлений: очереди по (chat_id, user_id) и общий лимит."""
+
+    def __init__(
+        self,
+        concurrency: int = UPDATE_CONCURRENCY,
+        backlog_limit: int = UPDATE_BACKLOG_LIMIT
+    ) -> None:
+        """Создаёт middleware.
+
+        Аргументы:
+            concurrency (int): Максимум одновременно обрабатываемых обновлений.
+            backlog_limit (int): Максимум ожидающих обновлений.
+        """
+        self._slots = asyncio.Semaphore(concurrency)
+        self._backlog_limit = backlog_limit
+        self._lanes: Dict[Hashable, _Lane] = {}
+        self._pending = 0
+
+    @staticmethod
+    def _lane_key(event: TelegramObject, data: Dict[str, Any]) -> Optional[Hashable]:
+        """Определяет ключ очереди обновления.
+
+        Использует чат и пользователя, определённые UserContextMiddleware aiogram.
+
+        Аргументы:
+            event (TelegramObject): Обновление.
+            data (Dict[str, Any]): Контекстные данные обработчика.
+
+        Возвращаемое значение:
+            Optional[Hashable]: (chat_id, user_id) или None, если обновление
+                без пользователя или это новое сообщение альбома.
+        """
+        user = data.get('event_from_user')
+        if user is None:
+            return None
+        message = getattr(event, 'message', None)
+        if message is not None and message.media_group_id and ALBUM_WINDOW > 0:
+            return None
+        chat = data.get('event_chat')
+        return (chat.id if chat is not None else None, user.id)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Ставит обновление в очередь и обрабатывает его в свою очередь.
+
+        Алгоритм работы:
+            1. Для нового сообщения альбома — собрать альбом; если сообщение
+               присоединилось к альбому другого сообщения — завершить.
+            2. Если ожидающих обновлений слишком много — отбросить обновление.
+            3. Дождаться завершения предыдущих обновлений той же очереди.
+            4. Дождаться свободного слота из общего лимита.
+            5. Обработать обновление.
+
+        Аргументы:
+            handler (Callable): Следующий обработчик в цепочке.
+            event (TelegramObject): Обновление.
+            data (Dict[str, Any]): Контекстные данные обработчика.
+
+        Возвращаемое значение:
+            Any: Результат обработчика или None, если обновление отброшено.
+        """
+        message = getattr(event, 'message', None)
+        if message is not None and message.media_group_id and ALBUM_WINDOW > 0:
+            album = await AlbumService.collect(message)
+            if album is None:
+                return None
+            data['album'] = album
+
+        if self._pending >= self._backlog_limit:
+            _dropped_total.inc()
+            logger.warning(f"Очередь обновлений переполнена ({self._pending}), обновление отброшено")
+            return None
+
+        key = self._lane_key(event, data)
+        lane: Optional[_Lane] = None
+        if key is not None:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = _Lane()
+                _lanes_active.set(len(self._lanes))
+            lane.depth += 1
+            _lane_depth.observe(lane.depth)
+
+        self._pending += 1
+        _backlog.set(self._pending)
+        enqueued = time.monotonic()
+        started = False
+        try:
+            if lane is not None:
+                await lane.lock.acquire()
+            try:
+                async with self._slots:
+                    self._pending -= 1
+                    _backlog.set(self._pending)
+                    started = True
+                    _wait_seconds.observe(time.monotonic() - enqueued)
+                    _in_flight.inc()
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        _in_flight.dec()
+            finally:
+                if lane is not None:
+                    lane.lock.release()
+        finally:
+            if not started:
+                self._pending -= 1
+                _backlog.set(self._pending)
+            if lane is not None:
+                lane.depth -= 1
+                if lane.depth == 0:
+                    del self._lanes[key]
+                    _lanes_active.set(len(self._lanes))
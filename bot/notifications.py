@@ -3,9 +3,13 @@
 Отправка уведомлений выполняется через NotificationService в bot.services.notifications.
 """
 
+import html
 from datetime import datetime
 from typing import Optional
 
+# Максимум символов текста сообщения в записи дайджеста
+_DIGEST_TEXT_LIMIT = 300
+
 
 def format_spam_notification(
     timestamp: float,
@@ -13,12 +17,13 @@ def format_spam_notification(
     author_name: Optional[str],
     message_text: str,
     has_reply_markup: Optional[bool],
-    bert_score: float,
+    bert_score: Optional[float],
     relapse_number: int,
     auto_deleted: bool = False,
     muted_until: Optional[str] = None,
     chat_title: Optional[str] = None,
-    chat_id: Optional[int] = None
+    chat_id: Optional[int] = None,
+    reason: Optional[str] = None
 ) -> str:
     """Форматирует текст уведомления о спаме.
 
@@ -28,12 +33,13 @@ def format_spam_notification(
         author_name (Optional[str]): Username автора.
         message_text (str): Текст сообщения.
         has_reply_markup (Optional[bool]): Наличие inline-клавиатуры.
-        bert_score (float): Оценка BERT.
+        bert_score (Optional[float]): Оценка BERT или None если не запускался.
         relapse_number (int): Номер нарушения.
         auto_deleted (bool): Удалено ли автоматически.
         muted_until (Optional[str]): До какого времени ограничен.
         chat_title (Optional[str]): Название чата.
         chat_id (Optional[int]): ID чата.
+        reason (Optional[str]): Причина решения без анализа (например, флуд).
 
     Возвращаемое значение:
         str: HTML-форматированный текст уведомления.
@@ -57,10 +63,16 @@ def format_spam_notification(
     text += (
         f"<b>Текст сообщения:</b>\n<blockquote>{message_text}</blockquote>\n"
         f"<b>Имеет inline-клавиатуру:</b> {kb_status}\n"
-        f"<b>Вердикт RuBert:</b> <code>{bert_score:.7f}</code>\n"
-        f"<b>Количество нарушений:</b> {relapse_number}"
     )
 
+    if reason:
+        text += f"<b>Причина:</b> {reason}\n"
+
+    if bert_score is not None:
+        text += f"<b>Вердикт RuBert:</b> <code>{bert_score:.7f}</code>\n"
+
+    text += f"<b>Количество нарушений:</b> {relapse_number}"
+
     if auto_deleted:
         text += "\n<i>Сообщение удалено автоматически</i>"
 
@@ -215,3 +227,67 @@ def format_log_notification(
     text += f"<b>Количество нарушений:</b> {relapse_number if relapse_number is not None else 0}"
 
     return text
+
+
+def format_log_digest_entry(
+    timestamp: float,
+    author_id: int,
+    author_name: Optional[str],
+    message_text: str,
+    has_reply_markup: Optional[bool],
+    bert_score: Optional[float],
+    relapse_number: Optional[int],
+    is_whitelisted: bool = False,
+    content_type: Optional[str] = None,
+    chat_title: Optional[str] = None,
+    chat_id: Optional[int] = None,
+    message_id: Optional[int] = None
+) -> str:
+    """Форматирует краткую запись логируемого сообщения для дайджеста.
+
+    Текст сообщения обрезается до _DIGEST_TEXT_LIMIT символов и экранируется,
+    чтобы одна запись не могла сломать разметку всего дайджеста.
+    Для супергрупп добавляется ссылка на исходное сообщение.
+
+    Аргументы:
+        timestamp (float): Unix timestamp.
+        author_id (int): Telegram ID автора.
+        author_name (Optional[str]): Username автора.
+        message_text (str): Текст сообщения или заглушка для нетекстовых.
+        has_reply_markup (Optional[bool]): Наличие inline-клавиатуры.
+        bert_score (Optional[float]): Оценка BERT или None если не запускался.
+        relapse_number (Optional[int]): Номер нарушения или None.
+        is_whitelisted (bool): В белом ли списке пользователь.
+        content_type (Optional[str]): Тип контента для нетекстовых сообщений.
+        chat_title (Optional[str]): Название чата.
+        chat_id (Optional[int]): ID чата.
+        message_id (Optional[int]): ID сообщения в чате.
+
+    Возвращаемое значение:
+        str: HTML-форматированный текст записи (без номера).
+    """
+    ts_str = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
+    bert_str = f"{bert_score:.4f}" if bert_score is not None else "N/A"
+
+    header = [ts_str, html.escape(str(chat_title or chat_id or ''))]
+    if author_name:
+        header.append(f"<code>{author_id}</code> @{html.escape(author_name)}")
+    else:
+        header.append(f"<code>{author_id}</code>")
+    header.append(f"BERT {bert_str}")
+    if relapse_number:
+        header.append(f"нарушений: {relapse_number}")
+    if has_reply_markup:
+        header.append("inline-клавиатура")
+    if is_whitelisted:
+        header.append("вайтлистед")
+    if content_type:
+        header.append(html.escape(content_type))
+
+    if chat_id is not None and message_id is not None and str(chat_id).startswith('-100'):
+        header.append(f'<a href="https://t.me/c/{str(chat_id)[4:]}/{message_id}">открыть</a>')
+
+    if len(message_text) > _DIGEST_TEXT_LIMIT:
+        message_text = message_text[:_DIGEST_TEXT_LIMIT] + '…'
+
+    return " · ".join(header) + f"\n<blockquote>{html.escape(message_text)}</blockquote>"
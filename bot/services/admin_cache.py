@@ -0,0 +1,201 @@
+"""Кеш администраторов наблюдаемых чатов.
+
+Список администраторов каждого чата загружается одним запросом
+get_chat_administrators и хранится в памяти. Кеш обновляется
+по событиям chat_member / my_chat_member и периодически перезагружается
+фоновой задачей, поэтому проверка автора сообщения — локальный поиск
+в множестве без обращения к Telegram API.
+"""
+
+import asyncio
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from aiogram import Bot
+
+from core.config import ADMIN_CACHE_REFRESH_INTERVAL
+from core.logging import logger
+from core.metrics import counter
+
+# Статусы участника, дающие права администратора
+ADMIN_STATUSES = frozenset({'administrator', 'creator'})
+
+_loads_total = counter(
+    'antispam_admin_cache_loads_total',
+    'Загрузки списка администраторов чата по результату',
+    ('outcome',),
+)
+_lookups_total = counter(
+    'antispam_admin_cache_lookups_total',
+    'Проверки статуса администратора по источнику ответа',
+    ('source',),
+)
+
+
+class AdminCache:
+    """In-memory кеш администраторов: chat_id -> множество user_id."""
+
+    _admins: Dict[int, FrozenSet[int]] = {}
+    _locks: Dict[int, asyncio.Lock] = {}
+    _refresh_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def load(bot: Bot, chat_id: int, force: bool = True) -> Optional[FrozenSet[int]]:
+        """Загружает список администраторов чата и сохраняет его в кеш.
+
+        Одновременные загрузки одного чата выполняются по очереди.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): ID чата.
+            force (bool): Перезагрузить, даже если список уже в кеше.
+
+        Возвращаемое значение:
+            Optional[FrozenSet[int]]: Множество ID администраторов или None при ошибке.
+        """
+        lock = AdminCache._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            if not force and chat_id in AdminCache._admins:
+                return AdminCache._admins[chat_id]
+            try:
+                members = await bot.get_chat_administrators(chat_id)
+            except Exception as e:
+                _loads_total.inc(outcome='error')
+                logger.warning(f"Не удалось загрузить администраторов чата {chat_id}: {e}")
+                return AdminCache._admins.get(chat_id)
+
+            admins = frozenset(member.user.id for member in members)
+            AdminCache._admins[chat_id] = admins
+            _loads_total.inc(outcome='ok')
+            logger.debug(f"Загружено администраторов чата {chat_id}: {len(admins)}")
+            return admins
+
+    @staticmethod
+    async def is_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
+        """Проверяет, является ли пользователь администратором чата.
+
+        Если список администраторов чата ещё не загружен, загружает его.
+        Если загрузить список не удалось, выполняет разовый запрос
+        get_chat_member для конкретного пользователя.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): ID чата.
+            user_id (int): ID пользователя.
+
+        Возвращаемое значение:
+            bool: True если пользователь админ.
+        """
+        admins = AdminCache._admins.get(chat_id)
+        if admins is not None:
+            _lookups_total.inc(source='cache')
+            return user_id in admins
+
+        admins = await AdminCache.load(bot, chat_id, force=False)
+        if admins is not None:
+            _lookups_total.inc(source='load')
+            return user_id in admins
+
+        _lookups_total.inc(source='api')
+        try:
+            member = await bot.get_chat_member(chat_id, user_id)
+            return member.status in ADMIN_STATUSES
+        except Exception as e:
+            logger.warning(f"Не удалось проверить статус админа {user_id} в чате {chat_id}: {e}")
+            return False
+
+    @staticmethod
+    def apply_member_update(chat_id: int, user_id: int, status: str) -> None:
+        """Обновляет кеш по событию изменения статуса участника.
+
+        Изменяет только уже загруженные чаты: для остальных список
+        будет загружен целиком при первой проверке.
+
+        Аргументы:
+            chat_id (int): ID чата.
+            user_id (int): ID пользователя.
+            status (str): Новый статус участника.
+        """
+        admins = AdminCache._admins.get(chat_id)
+        if admins is None:
+            return
+
+        if status in ADMIN_STATUSES and user_id not in admins:
+            AdminCache._admins[chat_id] = admins | {user_id}
+            logger.info(f"Пользователь {user_id} стал администратором чата {chat_id}")
+        elif status not in ADMIN_STATUSES and user_id in admins:
+            AdminCache._admins[chat_id] = admins - {user_id}
+            logger.info(f"Пользователь {user_id} больше не администратор чата {chat_id}")
+
+    @staticmethod
+    def invalidate(chat_id: int) -> None:
+        """Удаляет список администраторов чата из кеша.
+
+        Аргументы:
+            chat_id (int): ID чата.
+        """
+        AdminCache._admins.pop(chat_id, None)
+
+    @staticmethod
+    async def refresh_all(bot: Bot, chat_ids: Iterable[int]) -> None:
+        """Параллельно перезагружает списки администраторов указанных чатов.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_ids (Iterable[int]): ID чатов.
+        """
+        await asyncio.gather(*(AdminCache.load(bot, chat_id) for chat_id in chat_ids))
+
+    @staticmethod
+    async def start_refresher(bot: Bot) -> None:
+        """Запускает фоновую задачу периодического обновления кеша.
+
+        Первая итерация сразу загружает администраторов всех активных чатов.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+        """
+        if AdminCache._refresh_task is not None:
+            logger.info('Обновление кеша администраторов уже запущено')
+            return
+
+        AdminCache._refresh_task = asyncio.create_task(AdminCache._refresh_loop(bot))
+        logger.info(f'Обновление кеша администраторов запущено (интервал {ADMIN_CACHE_REFRESH_INTERVAL}с)')
+
+    @staticmethod
+    async def _refresh_loop(bot: Bot) -> None:
+        """Цикл обновления: перезагрузка администраторов активных чатов каждые N секунд.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+        """
+        from core.repository.chat import ChatRepository
+
+        while True:
+            try:
+                active_chats = await ChatRepository.get_active_chats()
+                active_ids = {chat['chat_id'] for chat in active_chats}
+
+                # Чаты, переставшие быть активными, удаляются из кеша
+                for chat_id in set(AdminCache._admins) - active_ids:
+                    AdminCache.invalidate(chat_id)
+
+                await AdminCache.refresh_all(bot, active_ids)
+                await asyncio.sleep(ADMIN_CACHE_REFRESH_INTERVAL)
+
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                logger.error(f'Ошибка в цикле обновления кеша администраторов: {e}')
+                await asyncio.sleep(60)
+
+    @staticmethod
+    async def stop_refresher() -> None:
+        """Останавливает фоновую задачу обновления кеша."""
+        if AdminCache._refresh_task is not None:
+            AdminCache._refresh_task.cancel()
+            try:
+                await AdminCache._refresh_task
+            except asyncio.CancelledError:
+                pass
+            AdminCache._refresh_task = None
+            logger.info('Обновление кеша администраторов остановлено')
@@ -0,0 +1,199 @@
+"""Объединение альбомов (media group) перед модерацией.
+
+Альбом из нескольких фото или видео приходит отдельными сообщениями с общим
+media_group_id, и без объединения каждое из них проходило бы проверку
+администратора, загрузку контекста, анализ и логирование отдельно.
+
+Первое сообщение альбома ожидает остальные ALBUM_WINDOW секунд (или до
+_ALBUM_MAX сообщений) и обрабатывается за весь альбом: анализируется подпись,
+а при спаме удаляются все сообщения альбома одним запросом deleteMessages.
+Остальные сообщения только присоединяются к альбому. Сбор выполняет
+UpdateLaneMiddleware до очередей и до занятия слота общего лимита, поэтому
+ожидание первого сообщения не занимает слот, а остальные не опаздывают
+из-за нехватки слотов.
+
+Сообщения, пришедшие после окна (в пределах _LATE_TTL секунд), тоже
+присоединяются к уже обработанному альбому: попадают в его состав для
+ручного удаления кнопкой уведомления, а если альбом удалён как спам —
+удаляются сразу. Состав обработанных альбомов хранится в памяти.
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.types import Message
+
+from bot.services.outbox import OutboxService
+from core.cache import TTLCache
+from core.config import ALBUM_WINDOW
+from core.logging import logger
+from core.metrics import counter, histogram
+
+# Максимум сообщений в альбоме Telegram
+_ALBUM_MAX = 10
+
+# Сколько помнить состав обработанных альбомов (секунды)
+_MEMBERS_TTL = 86400
+
+# Максимум альбомов в памяти
+_MEMBERS_SIZE = 20000
+
+# Сколько после окна сбора присоединять опоздавшие сообщения к альбому (секунды)
+_LATE_TTL = 60
+
+_album_size = histogram(
+    'antispam_album_messages',
+    'Сообщений в альбоме, обработанном как одно сообщение',
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10),
+)
+_late_total = counter(
+    'antispam_album_late_messages_total',
+    'Сообщения альбома, пришедшие после окна сбора, по действию',
+    ('action',),
+)
+
+
+class _Album:
+    """Сообщения собираемого альбома."""
+
+    __slots__ = ('messages', 'complete')
+
+    def __init__(self, message: Message) -> None:
+        self.messages: List[Message] = [message]
+        self.complete = asyncio.Event()
+
+
+class _Group:
+    """Обработанный альбом: состав и решение об удалении."""
+
+    __slots__ = ('message_ids', 'deleted')
+
+    def __init__(self, message_ids: List[int]) -> None:
+        self.message_ids = message_ids
+        self.deleted = False
+
+
+class AlbumService:
+    """Сбор сообщений альбома для обработки одним сообщением."""
+
+    # (chat_id, media_group_id) -> собираемый альбом
+    _pending: Dict[Tuple[int, str], _Album] = {}
+    # (chat_id, media_group_id) -> обработанный альбом (для опоздавших сообщений)
+    _groups: TTLCache = TTLCache(_MEMBERS_SIZE, _LATE_TTL)
+    # (chat_id, message_id) -> обработанный альбом, в который входит сообщение
+    _members: TTLCache = TTLCache(_MEMBERS_SIZE, _MEMBERS_TTL)
+
+    @staticmethod
+    async def collect(message: Message) -> Optional[List[Message]]:
+        """Добавляет сообщение в альбом.
+
+        Алгоритм работы:
+            1. Если альбом уже собирается — добавить сообщение и вернуть None.
+            2. Если альбом уже обработан (сообщение опоздало) — добавить
+               сообщение в его состав, удалить, если альбом удалён, и вернуть None.
+            3. Иначе начать сбор и ждать ALBUM_WINDOW секунд или полного альбома.
+            4. Запомнить состав альбома и вернуть его сообщения.
+
+        Аргументы:
+            message (Message): Сообщение с media_group_id.
+
+        Возвращаемое значение:
+            Optional[List[Message]]: Сообщения альбома по порядку, если сообщение
+                первое в альбоме; None, если альбом обрабатывает другое сообщение.
+        """
+        key = (message.chat.id, message.media_group_id)
+        album = AlbumService._pending.get(key)
+        if album is not None:
+            album.messages.append(message)
+            if len(album.messages) >= _ALBUM_MAX:
+                album.complete.set()
+            return None
+
+        group: Optional[_Group] = AlbumService._groups.get(key)
+        if group is not None:
+            await AlbumService._join_late(message, group)
+            return None
+
+        album = AlbumService._pending[key] = _Album(message)
+        try:
+            await asyncio.wait_for(album.complete.wait(), ALBUM_WINDOW)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            del AlbumService._pending[key]
+
+        messages = sorted(album.messages, key=lambda item: item.message_id)
+        group = _Group([item.message_id for item in messages])
+        AlbumService._groups.set(key, group)
+        for message_id in group.message_ids:
+            AlbumService._members.set((message.chat.id, message_id), group)
+        _album_size.observe(len(messages))
+        return messages
+
+    @staticmethod
+    async def _join_late(message: Message, group: _Group) -> None:
+        """Присоединяет опоздавшее сообщение к обработанному альбому.
+
+        Аргументы:
+            message (Message): Сообщение, пришедшее после окна сбора.
+            group (_Group): Обработанный альбом.
+        """
+        group.message_ids.append(message.message_id)
+        AlbumService._members.set((message.chat.id, message.message_id), group)
+        if not group.deleted:
+            _late_total.inc(action='joined')
+            return
+
+        _late_total.inc(action='deleted')
+        try:
+            await OutboxService.call(
+                message.delete, description=f"удаление опоздавшего сообщения альбома {message.message_id}"
+            )
+        except Exception as e:
+            logger.error(f"Ошибка удаления опоздавшего сообщения альбома {message.message_id}: {e}")
+
+    @staticmethod
+    def mark_deleted(chat_id: int, message_id: int) -> List[int]:
+        """Отмечает альбом удалённым и возвращает его текущий состав.
+
+        Сообщения альбома, пришедшие позже, удаляются при поступлении
+        (в пределах _LATE_TTL после окна сбора).
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID любого сообщения альбома.
+
+        Возвращаемое значение:
+            List[int]: ID сообщений альбома или [message_id], если альбом неизвестен.
+        """
+        group: Optional[_Group] = AlbumService._members.get((chat_id, message_id))
+        if group is None:
+            return [message_id]
+        group.deleted = True
+        return list(group.message_ids)
+
+    @staticmethod
+    def representative(messages: List[Message]) -> Message:
+        """Выбирает сообщение, по которому обрабатывается альбом.
+
+        Аргументы:
+            messages (List[Message]): Сообщения альбома.
+
+        Возвращаемое значение:
+            Message: Первое сообщение с подписью или первое сообщение альбома.
+        """
+        return next((item for item in messages if item.caption), messages[0])
+
+    @staticmethod
+    def members(chat_id: int, message_id: int) -> List[int]:
+        """Возвращает ID всех сообщений альбома, в который входит сообщение.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID сообщения.
+
+        Возвращаемое значение:
+            List[int]: ID сообщений альбома или [message_id], если альбом неизвестен.
+        """
+        group: Optional[_Group] = AlbumService._members.get((chat_id, message_id))
+        return list(group.message_ids) if group is not None else [message_id]
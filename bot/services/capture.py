@@ -0,0 +1,259 @@
+"""Захват входящих обновлений для воспроизведения в нагрузочных тестах.
+
+При CAPTURE_SAMPLE_RATE > 0 доля CAPTURE_SAMPLE_RATE входящих обновлений
+записывается в сжатые файлы NDJSON в CAPTURE_DIR: одна строка на обновление
+вида {"ts": время получения (unix), "update": обновление}. По "ts" инструмент
+воспроизведения (bench/capture_replay.py) повторяет интервалы между
+обновлениями.
+
+Данные псевдонимизируются до записи: ID пользователей (и личных чатов)
+заменяются ключевым хешем HMAC-SHA256 с CAPTURE_HASH_KEY — один пользователь
+получает один и тот же псевдоним во всех файлах, но восстановить ID без ключа
+нельзя. Имена, телефоны, подписи авторов и имена отправителей пересланных
+сообщений удаляются в любом месте обновления (в том числе в контактах
+и forward_origin). При CAPTURE_TEXT=hash тексты и подписи заменяются
+хешем той же длины (одинаковые тексты дают одинаковый хеш), разметка текста
+удаляется.
+
+Строки накапливаются в памяти и записываются в фоне раз в секунду. Файл
+пишется под именем *.ndjson.gz.part и переименовывается при ротации
+(CAPTURE_ROTATE_SECONDS или CAPTURE_ROTATE_MB сжатых данных) и остановке.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, BinaryIO, List, Optional
+
+from aiogram.types import Update
+
+from core.config import (
+    CAPTURE_DIR,
+    CAPTURE_HASH_KEY,
+    CAPTURE_ROTATE_MB,
+    CAPTURE_ROTATE_SECONDS,
+    CAPTURE_SAMPLE_RATE,
+    CAPTURE_TEXT,
+)
+from core.logging import logger
+from core.metrics import counter
+
+# Интервал записи накопленных строк (секунды)
+_FLUSH_INTERVAL = 1.0
+
+# Максимум строк в памяти; сверх лимита обновления не записываются
+_BUFFER_LIMIT = 10000
+
+# Поля с персональными данными, которые не записываются, где бы они ни встретились
+# (first_name заменяется на 'User': поле обязательно для User и Contact)
+_PERSONAL_FIELDS = frozenset((
+    'first_name', 'last_name', 'username', 'phone_number', 'bio', 'vcard', 'email',
+    'forward_sender_name', 'sender_user_name', 'author_signature', 'forward_signature',
+))
+
+_updates_total = counter(
+    'antispam_capture_updates_total',
+    'Обновления, отобранные для захвата, по результату',
+    ('outcome',),
+)
+
+
+def pseudonymize_id(value: int, key: bytes) -> int:
+    """Возвращает псевдоним Telegram ID.
+
+    Аргументы:
+        value (int): ID пользователя.
+        key (bytes): Ключ HMAC.
+
+    Возвращаемое значение:
+        int: Положительный псевдоним (до 2^40), одинаковый для одного ID и ключа.
+    """
+    digest = hmac.new(key, str(value).encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:5], 'big') or 1
+
+
+def hash_text(text: str, key: bytes) -> str:
+    """Заменяет текст хешем той же длины.
+
+    Хеш разбит на слова по 8 символов, чтобы токенизация оставалась
+    похожей на обычный текст.
+
+    Аргументы:
+        text (str): Текст.
+        key (bytes): Ключ HMAC.
+
+    Возвращаемое значение:
+        str: Строка той же длины.
+    """
+    digest = hmac.new(key, text.encode(), hashlib.sha256).hexdigest()
+    words = ' '.join(digest[i:i + 8] for i in range(0, len(digest), 8)) + ' '
+    return (words * (len(text) // len(words) + 1))[:len(text)]
+
+
+def pseudonymize(value: Any, key: bytes, hash_texts: bool) -> Any:
+    """Псевдонимизирует обновление (JSON-представление) рекурсивно.
+
+    Аргументы:
+        value (Any): Обновление или его часть.
+        key (bytes): Ключ HMAC.
+        hash_texts (bool): Заменять тексты и подписи хешем.
+
+    Возвращаемое значение:
+        Any: Копия без ID пользователей, персональных полей и (при hash_texts) текстов.
+    """
+    if isinstance(value, list):
+        return [pseudonymize(item, key, hash_texts) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    # Пользователь или личный чат (ID личного чата совпадает с ID пользователя)
+    personal = 'is_bot' in value or value.get('type') == 'private'
+    result = {}
+    for name, item in value.items():
+        if (personal and name == 'id') or name == 'user_id':
+            result[name] = pseudonymize_id(item, key)
+        elif name in _PERSONAL_FIELDS:
+            if name == 'first_name':
+                result[name] = 'User'
+        elif hash_texts and name in ('text', 'caption') and isinstance(item, str):
+            result[name] = hash_text(item, key)
+        elif hash_texts and name in ('entities', 'caption_entities'):
+            continue
+        else:
+            result[name] = pseudonymize(item, key, hash_texts)
+    return result
+
+
+class CaptureService:
+    """Выборочная запись входящих обновлений в сжатые файлы NDJSON."""
+
+    _lines: List[str] = []
+    _flush_task: Optional[asyncio.Task] = None
+    _stopping: bool = False
+    _raw: Optional[BinaryIO] = None
+    _file: Optional[gzip.GzipFile] = None
+    _path: Optional[str] = None
+    _opened: float = 0.0
+
+    @staticmethod
+    def capture(update: Update) -> None:
+        """Записывает обновление с вероятностью CAPTURE_SAMPLE_RATE.
+
+        Не обращается к диску: строка записывается в фоне.
+
+        Аргументы:
+            update (Update): Входящее обновление.
+        """
+        if CaptureService._flush_task is None or random.random() >= CAPTURE_SAMPLE_RATE:
+            return
+        if len(CaptureService._lines) >= _BUFFER_LIMIT:
+            _updates_total.inc(outcome='dropped')
+            return
+
+        data = update.model_dump(mode='json', by_alias=True, exclude_none=True)
+        record = {
+            'ts': round(time.time(), 3),
+            'update': pseudonymize(data, CAPTURE_HASH_KEY.encode(), CAPTURE_TEXT == 'hash'),
+        }
+        CaptureService._lines.append(json.dumps(record, ensure_ascii=False))
+
+    @staticmethod
+    def _write(lines: List[str]) -> None:
+        """Записывает строки в текущий файл, при необходимости открывая новый.
+
+        Выполняется в пуле потоков.
+
+        Аргументы:
+            lines (List[str]): Строки NDJSON.
+        """
+        if CaptureService._file is not None and (
+            time.monotonic() - CaptureService._opened >= CAPTURE_ROTATE_SECONDS
+            or CaptureService._raw.tell() >= CAPTURE_ROTATE_MB * 1024 * 1024
+        ):
+            CaptureService._close()
+
+        if CaptureService._file is None:
+            name = f"capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.ndjson.gz"
+            CaptureService._path = os.path.join(CAPTURE_DIR, name)
+            CaptureService._raw = open(CaptureService._path + '.part', 'wb')
+            CaptureService._file = gzip.GzipFile(fileobj=CaptureService._raw, mode='wb')
+            CaptureService._opened = time.monotonic()
+
+        CaptureService._file.write(('\n'.join(lines) + '\n').encode())
+
+    @staticmethod
+    def _close() -> None:
+        """Закрывает текущий файл и снимает с него суффикс .part."""
+        if CaptureService._file is None:
+            return
+        CaptureService._file.close()
+        CaptureService._raw.close()
+        os.replace(CaptureService._path + '.part', CaptureService._path)
+        logger.info(f"Файл захвата обновлений записан: {CaptureService._path}")
+        CaptureService._file = CaptureService._raw = CaptureService._path = None
+
+    @staticmethod
+    async def flush() -> int:
+        """Записывает накопленные строки.
+
+        Возвращаемое значение:
+            int: Количество записанных строк.
+        """
+        lines, CaptureService._lines = CaptureService._lines, []
+        if not lines:
+            return 0
+        try:
+            await asyncio.to_thread(CaptureService._write, lines)
+        except Exception as e:
+            _updates_total.inc(len(lines), outcome='dropped')
+            logger.error(f"Ошибка записи захваченных обновлений ({len(lines)} шт.): {e}")
+            return 0
+        _updates_total.inc(len(lines), outcome='written')
+        return len(lines)
+
+    @staticmethod
+    async def start() -> None:
+        """Запускает фоновую запись.
+
+        Исключения:
+            ValueError: Если не задан CAPTURE_HASH_KEY или CAPTURE_TEXT некорректен.
+        """
+        if CaptureService._flush_task is not None:
+            logger.info('Захват обновлений уже запущен')
+            return
+        if not CAPTURE_HASH_KEY:
+            raise ValueError("CAPTURE_HASH_KEY не задан!")
+        if CAPTURE_TEXT not in ('keep', 'hash'):
+            raise ValueError(f"Некорректное значение CAPTURE_TEXT: {CAPTURE_TEXT}")
+
+        os.makedirs(CAPTURE_DIR, exist_ok=True)
+        CaptureService._stopping = False
+        CaptureService._flush_task = asyncio.create_task(CaptureService._flush_loop())
+        logger.info(f'Захват обновлений запущен (доля {CAPTURE_SAMPLE_RATE}, тексты: {CAPTURE_TEXT})')
+
+    @staticmethod
+    async def _flush_loop() -> None:
+        """Цикл записи накопленных строк раз в _FLUSH_INTERVAL секунд."""
+        while not CaptureService._stopping:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            await CaptureService.flush()
+
+    @staticmethod
+    async def stop() -> None:
+        """Записывает остаток и закрывает файл."""
+        task = CaptureService._flush_task
+        if task is None:
+            return
+
+        CaptureService._stopping = True
+        await task
+        CaptureService._flush_task = None
+        await CaptureService.flush()
+        await asyncio.to_thread(CaptureService._close)
+        logger.info('Захват обновлений остановлен')
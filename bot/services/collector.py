@@ -0,0 +1,237 @@
+"""Буфер отложенной записи собранных сообщений.
+
+При включённой настройке COLLECT_ALL_MESSAGES каждое сообщение
+сохраняется в таблицу collected_message. Вместо отдельного INSERT
+на каждое сообщение строки накапливаются в памяти и записываются
+одной командой COPY, когда набирается COLLECT_FLUSH_SIZE строк
+или проходит COLLECT_FLUSH_INTERVAL секунд.
+
+Размер буфера ограничен COLLECT_BUFFER_LIMIT: при переполнении
+(например, пока БД недоступна) новые сообщения отбрасываются
+и учитываются в метриках. Если пачка не записывается через COPY
+_MAX_COPY_ATTEMPTS раз подряд, она записывается по одной строке:
+строки, которые отвергает БД, отбрасываются, и одна такая строка
+не останавливает запись остальных. При остановке бота буфер записывается.
+"""
+
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+
+import asyncpg
+
+from core.config import COLLECT_BUFFER_LIMIT, COLLECT_FLUSH_INTERVAL, COLLECT_FLUSH_SIZE
+from core.logging import logger
+from core.metrics import counter, gauge
+from core.repository.collected import CollectedRepository
+
+# (chat_id, user_id, username, message_text, timestamp)
+CollectedRow = Tuple[int, int, Optional[str], str, float]
+
+# Неудачные COPY подряд, после которых пачка записывается по одной строке
+_MAX_COPY_ATTEMPTS = 3
+
+_buffered = gauge(
+    'antispam_collected_buffer_rows',
+    'Собранные сообщения, ожидающие записи в БД',
+)
+_rows_total = counter(
+    'antispam_collected_rows_total',
+    'Собранные сообщения по результату: записаны или отброшены',
+    ('outcome',),
+)
+_flushes_total = counter(
+    'antispam_collected_flushes_total',
+    'Записи буфера собранных сообщений по результату',
+    ('outcome',),
+)
+
+
+class CollectorService:
+    """Буфер собранных сообщений с пакетной записью через COPY."""
+
+    _rows: Deque[CollectedRow] = deque()
+    _wakeup: Optional[asyncio.Event] = None
+    _flush_lock: Optional[asyncio.Lock] = None
+    _flush_task: Optional[asyncio.Task] = None
+    _stopping: bool = False
+    # Неудачные COPY подряд
+    _failures: int = 0
+
+    @staticmethod
+    def add(chat_id: int, user_id: int, username: Optional[str], message_text: str) -> bool:
+        """Добавляет сообщение в буфер. Не обращается к БД.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            user_id (int): Telegram ID пользователя.
+            username (Optional[str]): Username.
+            message_text (str): Текст сообщения.
+
+        Возвращаемое значение:
+            bool: False, если буфер переполнен и сообщение отброшено.
+        """
+        rows = CollectorService._rows
+        if len(rows) >= COLLECT_BUFFER_LIMIT:
+            _rows_total.inc(outcome='dropped')
+            return False
+
+        rows.append((chat_id, user_id, username, message_text, datetime.now().timestamp()))
+        _buffered.set(len(rows))
+
+        if len(rows) >= COLLECT_FLUSH_SIZE and CollectorService._wakeup is not None:
+            CollectorService._wakeup.set()
+        return True
+
+    @staticmethod
+    async def flush() -> int:
+        """Записывает содержимое буфера в БД.
+
+        Строки записываются пачками по COLLECT_FLUSH_SIZE. Если запись
+        не удалась, незаписанные строки возвращаются в начало буфера
+        (в пределах COLLECT_BUFFER_LIMIT) для следующей попытки; после
+        _MAX_COPY_ATTEMPTS неудач подряд пачка записывается по одной строке
+        (см. _write_rows).
+
+        Возвращаемое значение:
+            int: Количество записанных строк.
+        """
+        if CollectorService._flush_lock is None:
+            CollectorService._flush_lock = asyncio.Lock()
+
+        async with CollectorService._flush_lock:
+            rows = CollectorService._rows
+            written = 0
+            while rows:
+                batch = [rows.popleft() for _ in range(min(len(rows), COLLECT_FLUSH_SIZE))]
+                try:
+                    await CollectedRepository.add_collected_messages(batch)
+                except Exception as e:
+                    _flushes_total.inc(outcome='error')
+                    CollectorService._failures += 1
+                    if CollectorService._failures < _MAX_COPY_ATTEMPTS:
+                        logger.error(f"Ошибка записи собранных сообщений ({len(batch)} шт.): {e}")
+                        CollectorService._requeue(batch)
+                        break
+
+                    logger.error(
+                        f"Ошибка записи собранных сообщений ({len(batch)} шт.) "
+                        f"{CollectorService._failures} раз подряд, запись по одной строке: {e}"
+                    )
+                    CollectorService._failures = 0
+                    rows_written, remaining = await CollectorService._write_rows(batch)
+                    written += rows_written
+                    if remaining:
+                        CollectorService._requeue(remaining)
+                        break
+                    continue
+                CollectorService._failures = 0
+                _flushes_total.inc(outcome='ok')
+                _rows_total.inc(len(batch), outcome='written')
+                written += len(batch)
+
+            _buffered.set(len(rows))
+            return written
+
+    @staticmethod
+    async def _write_rows(batch: List[CollectedRow]) -> Tuple[int, List[CollectedRow]]:
+        """Записывает пачку по одной строке, отбрасывая строки, которые отвергает БД.
+
+        Ошибка, не относящаяся к данным строки (например, потеря соединения),
+        прерывает запись: оставшиеся строки возвращаются вызывающему.
+
+        Аргументы:
+            batch (List[CollectedRow]): Строки в исходном порядке.
+
+        Возвращаемое значение:
+            Tuple[int, List[CollectedRow]]: (записано строк, незаписанные строки).
+        """
+        written = 0
+        for index, row in enumerate(batch):
+            chat_id, user_id, username, message_text, timestamp = row
+            try:
+                await CollectedRepository.add_collected_message(
+                    chat_id, user_id, username, message_text, timestamp=timestamp
+                )
+            except asyncpg.PostgresError as e:
+                _rows_total.inc(outcome='dropped')
+                logger.warning(
+                    f"Собранное сообщение пользователя {user_id} из чата {chat_id} отброшено: {e}"
+                )
+                continue
+            except Exception as e:
+                logger.error(f"Ошибка записи собранного сообщения: {e}")
+                return written, batch[index:]
+            _rows_total.inc(outcome='written')
+            written += 1
+        return written, []
+
+    @staticmethod
+    def _requeue(batch: list) -> None:
+        """Возвращает незаписанную пачку в начало буфера.
+
+        Строки, не поместившиеся в лимит буфера, отбрасываются.
+
+        Аргументы:
+            batch (list): Незаписанные строки в исходном порядке.
+        """
+        rows = CollectorService._rows
+        room = max(COLLECT_BUFFER_LIMIT - len(rows), 0)
+        kept = batch[:room]
+        if len(batch) > room:
+            _rows_total.inc(len(batch) - room, outcome='dropped')
+        rows.extendleft(reversed(kept))
+
+    @staticmethod
+    async def start() -> None:
+        """Запускает фоновую задачу записи буфера."""
+        if CollectorService._flush_task is not None:
+            logger.info('Запись собранных сообщений уже запущена')
+            return
+
+        CollectorService._stopping = False
+        CollectorService._wakeup = asyncio.Event()
+        CollectorService._flush_task = asyncio.create_task(CollectorService._flush_loop())
+        logger.info(
+            f'Запись собранных сообщений запущена '
+            f'(пачка {COLLECT_FLUSH_SIZE}, интервал {COLLECT_FLUSH_INTERVAL}с)'
+        )
+
+    @staticmethod
+    async def _flush_loop() -> None:
+        """Цикл записи: по заполнению пачки или по истечении интервала."""
+        wakeup = CollectorService._wakeup
+        while not CollectorService._stopping:
+            try:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=COLLECT_FLUSH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                await CollectorService.flush()
+
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                logger.error(f'Ошибка в цикле записи собранных сообщений: {e}')
+                await asyncio.sleep(COLLECT_FLUSH_INTERVAL)
+
+    @staticmethod
+    async def stop() -> None:
+        """Останавливает фоновую задачу и записывает остаток буфера.
+
+        Задача не отменяется, а завершается после текущей записи,
+        чтобы не потерять пачку, отправляемую в БД.
+        """
+        if CollectorService._flush_task is not None:
+            CollectorService._stopping = True
+            CollectorService._wakeup.set()
+            await CollectorService._flush_task
+            CollectorService._flush_task = None
+            CollectorService._wakeup = None
+
+        written = await CollectorService.flush()
+        if CollectorService._rows:
+            logger.warning(f'Не записано собранных сообщений при остановке: {len(CollectorService._rows)}')
+        logger.info(f'Запись собранных сообщений остановлена (записано при остановке: {written})')
@@ -0,0 +1,143 @@
+"""Дайджест сообщений лог-топика.
+
+При включённой настройке LOG_TO_TOPIC каждое сообщение наблюдаемых чатов
+логируется в топик чата управления. Вместо отдельного сообщения на каждую
+запись записи накапливаются по (чат управления, топик) и отправляются одним
+сообщением-дайджестом, когда проходит LOG_DIGEST_WINDOW секунд с первой
+записи, набирается LOG_DIGEST_MAX_ENTRIES записей или текст приближается
+к лимиту Telegram.
+
+Кнопки записей сохраняются в компактной клавиатуре дайджеста: одна строка
+на запись с номером записи в подписи и прежней callback_data.
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.keyboards import create_digest_keyboard_row
+from bot.services.outbox import OutboxService, PRIORITY_LOG
+from core.config import LOG_DIGEST_MAX_ENTRIES, LOG_DIGEST_WINDOW
+from core.logging import logger
+from core.metrics import counter, histogram
+
+# Максимальная длина текста дайджеста. Меньше лимита Telegram (4096),
+# чтобы оставить место для отметок о действиях, дописываемых обработчиками кнопок
+_MAX_LENGTH = 3500
+
+_entries_total = counter(
+    'antispam_log_digest_entries_total',
+    'Записи лог-топика, добавленные в дайджесты',
+)
+_digest_size = histogram(
+    'antispam_log_digest_entries',
+    'Количество записей в отправленном дайджесте',
+    buckets=(1, 2, 5, 10, 20, 50),
+)
+
+
+class _Digest:
+    """Накапливаемый дайджест одного топика."""
+
+    __slots__ = ('bot', 'entries', 'rows', 'length', 'timer')
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self.entries: List[str] = []
+        self.rows: List[List[InlineKeyboardButton]] = []
+        self.length = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class LogDigestService:
+    """Накопление записей лог-топика и отправка дайджестов."""
+
+    # (chat_id, thread_id) -> дайджест
+    _digests: Dict[Tuple[int, int], _Digest] = {}
+
+    @staticmethod
+    def add(
+        bot: Bot,
+        chat_id: int,
+        thread_id: int,
+        entry: str,
+        keyboard: Optional[InlineKeyboardMarkup] = None
+    ) -> None:
+        """Добавляет запись в дайджест топика. Не обращается к Telegram.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): ID чата управления.
+            thread_id (int): ID топика.
+            entry (str): HTML-текст записи без номера.
+            keyboard (Optional[InlineKeyboardMarkup]): Клавиатура записи.
+        """
+        key = (chat_id, thread_id)
+        digest = LogDigestService._digests.get(key)
+
+        # Запись не помещается в текущий дайджест — отправить его
+        if digest is not None and digest.length + len(entry) + 16 > _MAX_LENGTH:
+            LogDigestService.flush(key)
+            digest = None
+
+        if digest is None:
+            digest = LogDigestService._digests[key] = _Digest(bot)
+            digest.timer = asyncio.get_running_loop().call_later(
+                LOG_DIGEST_WINDOW, LogDigestService.flush, key
+            )
+
+        number = len(digest.entries) + 1
+        text = f"<b>#{number}</b> {entry}"
+        digest.entries.append(text)
+        digest.length += len(text) + 2
+        row = create_digest_keyboard_row(number, keyboard)
+        if row:
+            digest.rows.append(row)
+        _entries_total.inc()
+
+        if len(digest.entries) >= LOG_DIGEST_MAX_ENTRIES:
+            LogDigestService.flush(key)
+
+    @staticmethod
+    def flush(key: Tuple[int, int]) -> None:
+        """Ставит дайджест топика в очередь отправки.
+
+        Аргументы:
+            key (Tuple[int, int]): (ID чата управления, ID топика).
+        """
+        digest = LogDigestService._digests.pop(key, None)
+        if digest is None or not digest.entries:
+            return
+        if digest.timer is not None:
+            digest.timer.cancel()
+
+        chat_id, thread_id = key
+        text = "\n\n".join(digest.entries)
+        keyboard = InlineKeyboardMarkup(inline_keyboard=digest.rows) if digest.rows else None
+        bot = digest.bot
+        _digest_size.observe(len(digest.entries))
+
+        OutboxService.send(
+            lambda: bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                parse_mode='HTML',
+                reply_markup=keyboard,
+                message_thread_id=thread_id,
+                disable_web_page_preview=True
+            ),
+            chat_id=chat_id,
+            priority=PRIORITY_LOG,
+            description=f"дайджест лог-топика {thread_id} ({len(digest.entries)} записей)",
+        )
+
+    @staticmethod
+    async def stop() -> None:
+        """Отправляет все накопленные дайджесты."""
+        keys = list(LogDigestService._digests)
+        for key in keys:
+            LogDigestService.flush(key)
+        if keys:
+            logger.info(f'Отправлены накопленные дайджесты лог-топика: {len(keys)}')
@@ -0,0 +1,139 @@
+"""Кеш результатов анализа для отредактированных сообщений.
+
+При CHECK_EDITED_MESSAGES каждое редактирование приходит как edited_message,
+в том числе когда изменилось только форматирование или текст не изменился.
+Для каждого проанализированного сообщения (чат, message_id) хранятся
+нормализованный текст (без учёта регистра и лишних пробелов), его хеш,
+наличие inline-клавиатуры и результат анализа. При редактировании:
+    unchanged — текст и клавиатура не изменились: сообщение не обрабатывается;
+    reused    — изменено не больше EDIT_REUSE_MAX_CHARS символов (или
+                изменилась только клавиатура): используется прежний
+                результат анализа, решение о спаме принимается заново;
+    miss      — остальные случаи: полный анализ.
+
+Правки сравниваются с последним проанализированным текстом, а не
+с предыдущей правкой, поэтому серия мелких правок не накапливается
+без анализа. Записи удаляются через EDIT_CACHE_TTL секунд.
+"""
+
+from difflib import SequenceMatcher
+from typing import Any, Dict, Optional, Tuple
+
+from core.cache import TTLCache
+from core.config import EDIT_CACHE_SIZE, EDIT_CACHE_TTL, EDIT_REUSE_MAX_CHARS
+from core.metrics import counter
+
+# Исходы проверки
+UNCHANGED = 'unchanged'
+REUSED = 'reused'
+MISS = 'miss'
+
+# Тексты длиннее сравниваются только по хешу (сравнение посимвольно квадратичное)
+_DIFF_MAX_LENGTH = 1000
+
+_lookups_total = counter(
+    'antispam_edit_cache_total',
+    'Проверки отредактированных сообщений по кешу анализа, по исходу',
+    ('outcome',),
+)
+
+
+def _normalize(text: str) -> str:
+    """Приводит текст к нижнему регистру и схлопывает пробелы."""
+    return ' '.join(text.lower().split())
+
+
+def changed_chars(old: str, new: str, limit: int) -> int:
+    """Считает изменённые символы между текстами.
+
+    Аргументы:
+        old (str): Прежний текст.
+        new (str): Новый текст.
+        limit (int): Порог; если разница длин больше, посимвольное сравнение не выполняется.
+
+    Возвращаемое значение:
+        int: Количество изменённых символов (больше limit, если разница длин больше limit).
+    """
+    if abs(len(old) - len(new)) > limit:
+        return limit + 1
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    return sum(
+        max(old_end - old_start, new_end - new_start)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes()
+        if tag != 'equal'
+    )
+
+
+class EditCache:
+    """Результаты анализа сообщений для повторного использования при редактировании."""
+
+    # (chat_id, message_id) -> (хеш текста, текст или None, клавиатура, анализ)
+    _cache: TTLCache = TTLCache(EDIT_CACHE_SIZE, EDIT_CACHE_TTL)
+
+    @staticmethod
+    def store(
+        chat_id: int,
+        message_id: int,
+        text: str,
+        has_reply_markup: bool,
+        analysis: Dict[str, Any]
+    ) -> None:
+        """Сохраняет результат анализа сообщения.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID сообщения.
+            text (str): Проанализированный текст.
+            has_reply_markup (bool): Наличие inline-клавиатуры.
+            analysis (Dict[str, Any]): Результат ModerationService.analyze_message.
+        """
+        normalized = _normalize(text)
+        EditCache._cache.set(
+            (chat_id, message_id),
+            (
+                hash(normalized),
+                normalized if len(normalized) <= _DIFF_MAX_LENGTH else None,
+                has_reply_markup,
+                analysis,
+            ),
+        )
+
+    @staticmethod
+    def lookup(
+        chat_id: int,
+        message_id: int,
+        text: str,
+        has_reply_markup: bool
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Проверяет отредактированное сообщение по кешу.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID сообщения.
+            text (str): Новый текст.
+            has_reply_markup (bool): Наличие inline-клавиатуры.
+
+        Возвращаемое значение:
+            Tuple[str, Optional[Dict[str, Any]]]: (UNCHANGED, None), (REUSED, прежний анализ)
+                или (MISS, None).
+        """
+        cached = EditCache._cache.get((chat_id, message_id))
+        if cached is None:
+            _lookups_total.inc(outcome=MISS)
+            return MISS, None
+
+        text_hash, cached_text, cached_markup, analysis = cached
+        normalized = _normalize(text)
+        if hash(normalized) == text_hash:
+            outcome = UNCHANGED if has_reply_markup == cached_markup else REUSED
+        elif (
+            EDIT_REUSE_MAX_CHARS > 0
+            and cached_text is not None
+            and changed_chars(cached_text, normalized, EDIT_REUSE_MAX_CHARS) <= EDIT_REUSE_MAX_CHARS
+        ):
+            outcome = REUSED
+        else:
+            outcome = MISS
+
+        _lookups_total.inc(outcome=outcome)
+        return outcome, analysis if outcome == REUSED else None
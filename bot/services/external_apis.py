@@ -3,17 +3,24 @@
 Поддерживаемые API:
 - CAS (Combot Anti-Spam): https://cas.chat
 - LOLS (List of Lame Spammers): https://lols.bot
+
+Запросы выполняются через ResilientHttpClient: при деградации сервиса
+circuit breaker быстро отказывает, не задерживая обработку сообщений.
+Успешные ответы кешируются на REPUTATION_CACHE_TTL секунд.
 """
 
-from typing import Optional
+import asyncio
 
 import aiohttp
 
+from bot.services.http_client import CircuitOpenError, get_http_client
+from core.cache import TTLCache
+from core.config import REPUTATION_CACHE_SIZE, REPUTATION_CACHE_TTL
 from core.logging import logger
 
-DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10)
-
-_shared_session: Optional[aiohttp.ClientSession] = None
+# Результаты успешных проверок: user_id -> bool
+_cas_cache: TTLCache = TTLCache(REPUTATION_CACHE_SIZE, REPUTATION_CACHE_TTL)
+_lols_cache: TTLCache = TTLCache(REPUTATION_CACHE_SIZE, REPUTATION_CACHE_TTL)
 
 
 async def get_shared_session() -> aiohttp.ClientSession:
@@ -22,10 +29,7 @@ async def get_shared_session() -> aiohttp.ClientSession:
     Возвращаемое значение:
         session (aiohttp.ClientSession): Общая HTTP-сессия.
     """
-    global _shared_session
-    if _shared_session is None or _shared_session.closed:
-        _shared_session = aiohttp.ClientSession(timeout=DEFAULT_TIMEOUT)
-    return _shared_session
+    return await get_http_client().get_session()
 
 
 async def close_shared_session() -> None:
@@ -33,10 +37,7 @@ async def close_shared_session() -> None:
 
     Вызывать при остановке бота.
     """
-    global _shared_session
-    if _shared_session and not _shared_session.closed:
-        await _shared_session.close()
-        _shared_session = None
+    await get_http_client().close()
 
 
 async def check_cas(user_id: int) -> bool:
@@ -51,17 +52,25 @@ async def check_cas(user_id: int) -> bool:
     Возвращаемое значение:
         bool: True если пользователь в базе спамеров.
     """
+    cached = _cas_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     url = f"https://api.cas.chat/check?user_id={user_id}"
     logger.debug(f"CAS проверка пользователя {user_id}")
 
     try:
-        session = await get_shared_session()
-        async with session.get(url) as response:
-            response.raise_for_status()
-            data = await response.json()
-            result = bool(data.get('ok', 0))
-            logger.debug(f"CAS результат для {user_id}: {result}")
-            return result
+        data = await get_http_client().get_json('cas', url)
+        result = bool(data.get('ok', 0))
+        logger.debug(f"CAS результат для {user_id}: {result}")
+        _cas_cache.set(user_id, result)
+        return result
+    except CircuitOpenError:
+        logger.debug(f"CAS пропущен для {user_id}: сервис временно недоступен")
+        return False
+    except asyncio.TimeoutError:
+        logger.warning(f"CAS таймаут для {user_id}")
+        return False
     except aiohttp.ClientError as e:
         logger.error(f"CAS ошибка для {user_id}: {e}")
         return False
@@ -82,17 +91,25 @@ async def check_lols(account_id: int) -> bool:
     Возвращаемое значение:
         bool: True если пользователь заблокирован.
     """
+    cached = _lols_cache.get(account_id)
+    if cached is not None:
+        return cached
+
     url = f"https://api.lols.bot/account?id={account_id}"
     logger.debug(f"LOLS проверка аккаунта {account_id}")
 
     try:
-        session = await get_shared_session()
-        async with session.get(url) as response:
-            response.raise_for_status()
-            data = await response.json()
-            result = bool(data.get('banned', 0))
-            logger.debug(f"LOLS результат для {account_id}: {result}")
-            return result
+        data = await get_http_client().get_json('lols', url)
+        result = bool(data.get('banned', 0))
+        logger.debug(f"LOLS результат для {account_id}: {result}")
+        _lols_cache.set(account_id, result)
+        return result
+    except CircuitOpenError:
+        logger.debug(f"LOLS пропущен для {account_id}: сервис временно недоступен")
+        return False
+    except asyncio.TimeoutError:
+        logger.warning(f"LOLS таймаут для {account_id}")
+        return False
     except aiohttp.ClientError as e:
         logger.error(f"LOLS ошибка для {account_id}: {e}")
         return False
@@ -110,8 +127,6 @@ async def check_all_spam_databases(user_id: int) -> dict:
     Возвращаемое значение:
         dict: Словарь с результатами проверки (cas, lols, any_banned).
     """
-    import asyncio
-
     cas_task = check_cas(user_id)
     lols_task = check_lols(user_id)
 
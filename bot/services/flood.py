@@ -0,0 +1,209 @@
+"""Обнаружение флуда и повторяющихся сообщений до запуска анализа.
+
+Для каждой пары (чат, пользователь) хранится кольцевой буфер фиксированного
+размера FLOOD_RING_SIZE с временами и хешами последних сообщений.
+По нему за O(размер буфера) определяется:
+    flood     — больше FLOOD_MAX_MESSAGES сообщений за FLOOD_WINDOW_SECONDS;
+    duplicate — больше FLOOD_MAX_DUPLICATES одинаковых сообщений
+                за FLOOD_DUPLICATE_SECONDS.
+Пороги задаются per-chat настройками и ограничены размером буфера.
+Сообщения без текста (стикеры, фото и т. п.) учитываются по file_unique_id
+вложения. Все сообщения сверх порога признаются флудом, но ограничение
+и уведомление выполняются один раз за окно (FloodDetector.first_in_window).
+Буферы пользователей, не писавших FLOOD_IDLE_SECONDS, удаляются.
+"""
+
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from core.config import FLOOD_IDLE_SECONDS, FLOOD_RING_SIZE
+from core.metrics import counter, gauge
+
+# Причины срабатывания
+FLOOD = 'flood'
+DUPLICATE = 'duplicate'
+
+# Причины для уведомлений
+FLOOD_REASONS = {
+    FLOOD: 'флуд',
+    DUPLICATE: 'повторяющиеся сообщения',
+}
+
+# Как часто удаляются неактивные буферы (секунды)
+_SWEEP_INTERVAL = 60
+
+_detections_total = counter(
+    'antispam_flood_detections_total',
+    'Сообщения, признанные флудом или повтором, по причине',
+    ('reason',),
+)
+_windows = gauge(
+    'antispam_flood_windows',
+    'Кольцевые буферы пользователей в памяти',
+)
+
+
+class _Ring:
+    """Кольцевой буфер времён и хешей последних сообщений."""
+
+    __slots__ = ('times', 'hashes', 'position', 'last_seen', 'reported_until')
+
+    def __init__(self, size: int) -> None:
+        self.times: List[float] = [float('-inf')] * size
+        self.hashes: List[int] = [0] * size
+        self.position = 0
+        self.last_seen = 0.0
+        # До какого времени нарушение уже учтено, по причине
+        self.reported_until: Dict[str, float] = {}
+
+    def push(self, timestamp: float, text_hash: int) -> None:
+        """Записывает сообщение на место самого старого.
+
+        Аргументы:
+            timestamp (float): Время сообщения.
+            text_hash (int): Хеш текста.
+        """
+        self.times[self.position] = timestamp
+        self.hashes[self.position] = text_hash
+        self.position = (self.position + 1) % len(self.times)
+        self.last_seen = timestamp
+
+    def count_since(self, since: float, text_hash: Optional[int] = None) -> int:
+        """Считает сообщения не старше since (и с указанным хешем).
+
+        Аргументы:
+            since (float): Нижняя граница времени.
+            text_hash (Optional[int]): Хеш текста; None — любые сообщения.
+
+        Возвращаемое значение:
+            int: Количество сообщений.
+        """
+        count = 0
+        for timestamp, stored_hash in zip(self.times, self.hashes):
+            if timestamp >= since and (text_hash is None or stored_hash == text_hash):
+                count += 1
+        return count
+
+
+def _text_hash(text: str) -> int:
+    """Хеш текста без учёта регистра и пробелов по краям и между словами.
+
+    Аргументы:
+        text (str): Текст сообщения.
+
+    Возвращаемое значение:
+        int: Хеш.
+    """
+    return hash(' '.join(text.lower().split()))
+
+
+class FloodDetector:
+    """Скользящие окна сообщений пользователей в чатах."""
+
+    _rings: Dict[Tuple[int, int], _Ring] = {}
+    _last_sweep: float = 0.0
+
+    @staticmethod
+    def check(
+        chat_id: int,
+        user_id: int,
+        text: str,
+        settings: Mapping[str, Any],
+        now: Optional[float] = None
+    ) -> Optional[str]:
+        """Учитывает сообщение и проверяет, не является ли оно флудом.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            user_id (int): Telegram ID пользователя.
+            text (str): Текст сообщения.
+            settings (Mapping[str, Any]): Настройки чата.
+            now (Optional[float]): Время сообщения (по умолчанию time.monotonic()).
+
+        Возвращаемое значение:
+            Optional[str]: FLOOD, DUPLICATE или None.
+        """
+        if not settings.get('FLOOD_ENABLED', False):
+            return None
+
+        now = time.monotonic() if now is None else now
+        FloodDetector._sweep(now)
+
+        key = (chat_id, user_id)
+        ring = FloodDetector._rings.get(key)
+        if ring is None:
+            ring = FloodDetector._rings[key] = _Ring(FLOOD_RING_SIZE)
+            _windows.set(len(FloodDetector._rings))
+
+        text_hash = _text_hash(text)
+        ring.push(now, text_hash)
+
+        max_messages = min(settings.get('FLOOD_MAX_MESSAGES', 10), FLOOD_RING_SIZE - 1)
+        if max_messages > 0:
+            since = now - settings.get('FLOOD_WINDOW_SECONDS', 10)
+            if ring.count_since(since) > max_messages:
+                _detections_total.inc(reason=FLOOD)
+                return FLOOD
+
+        max_duplicates = min(settings.get('FLOOD_MAX_DUPLICATES', 3), FLOOD_RING_SIZE - 1)
+        if max_duplicates > 0:
+            since = now - settings.get('FLOOD_DUPLICATE_SECONDS', 120)
+            if ring.count_since(since, text_hash) > max_duplicates:
+                _detections_total.inc(reason=DUPLICATE)
+                return DUPLICATE
+
+        return None
+
+    @staticmethod
+    def first_in_window(
+        chat_id: int,
+        user_id: int,
+        reason: str,
+        settings: Mapping[str, Any],
+        now: Optional[float] = None
+    ) -> bool:
+        """Проверяет, первое ли это срабатывание в окне причины.
+
+        Первое срабатывание ограничивает пользователя и увеличивает номер
+        нарушения, остальные сообщения того же окна только удаляются.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            user_id (int): Telegram ID пользователя.
+            reason (str): FLOOD или DUPLICATE (результат check).
+            settings (Mapping[str, Any]): Настройки чата.
+            now (Optional[float]): Время сообщения (по умолчанию time.monotonic()).
+
+        Возвращаемое значение:
+            bool: True, если нарушение в этом окне ещё не учитывалось.
+        """
+        ring = FloodDetector._rings.get((chat_id, user_id))
+        if ring is None:
+            return True
+
+        now = time.monotonic() if now is None else now
+        if now < ring.reported_until.get(reason, float('-inf')):
+            return False
+
+        if reason == FLOOD:
+            window = settings.get('FLOOD_WINDOW_SECONDS', 10)
+        else:
+            window = settings.get('FLOOD_DUPLICATE_SECONDS', 120)
+        ring.reported_until[reason] = now + window
+        return True
+
+    @staticmethod
+    def _sweep(now: float) -> None:
+        """Удаляет буферы пользователей, неактивных дольше FLOOD_IDLE_SECONDS.
+
+        Аргументы:
+            now (float): Текущее время.
+        """
+        if now - FloodDetector._last_sweep < _SWEEP_INTERVAL:
+            return
+        FloodDetector._last_sweep = now
+
+        idle_since = now - FLOOD_IDLE_SECONDS
+        for key in [k for k, ring in FloodDetector._rings.items() if ring.last_seen < idle_since]:
+            del FloodDetector._rings[key]
+        _windows.set(len(FloodDetector._rings))
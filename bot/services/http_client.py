@@ -0,0 +1,387 @@
+"""Отказоустойчивый HTTP-клиент для внешних API.
+
+Содержит:
+- общий aiohttp-коннектор с лимитом соединений на хост, keep-alive и DNS-кешем
+- адаптивный таймаут по наблюдаемому p95 задержки каждого сервиса
+- circuit breaker, который быстро отказывает, пока сервис недоступен
+- опциональные хеджированные запросы для срезания хвоста задержек
+
+Состояние breaker и задержки экспортируются через core.metrics.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import aiohttp
+
+from core.config import (
+    EXTERNAL_API_LIMIT_PER_HOST,
+    EXTERNAL_API_DNS_TTL,
+    EXTERNAL_API_KEEPALIVE,
+    EXTERNAL_API_MIN_TIMEOUT,
+    EXTERNAL_API_MAX_TIMEOUT,
+    EXTERNAL_API_BREAKER_THRESHOLD,
+    EXTERNAL_API_BREAKER_COOLDOWN,
+    EXTERNAL_API_HEDGING,
+)
+from core.logging import logger
+from core.metrics import counter, gauge, histogram
+
+# Минимальное число замеров, после которого p95 считается достоверным
+_MIN_SAMPLES = 20
+
+# Множитель p95 для адаптивного таймаута
+_TIMEOUT_P95_MULTIPLIER = 3.0
+
+_BREAKER_STATE_CODES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+_requests_total = counter(
+    'antispam_http_requests_total',
+    'Запросы к внешним API по результату',
+    ('service', 'outcome'),
+)
+_request_seconds = histogram(
+    'antispam_http_request_seconds',
+    'Задержка успешных запросов к внешним API',
+    ('service',),
+)
+_hedged_total = counter(
+    'antispam_http_hedged_total',
+    'Количество отправленных хедж-запросов',
+    ('service',),
+)
+_timeout_seconds = gauge(
+    'antispam_http_timeout_seconds',
+    'Текущий адаптивный таймаут запроса',
+    ('service',),
+)
+_breaker_state = gauge(
+    'antispam_http_breaker_state',
+    'Состояние circuit breaker: 0 — closed, 1 — half_open, 2 — open',
+    ('service',),
+)
+_breaker_transitions = counter(
+    'antispam_http_breaker_transitions_total',
+    'Переходы circuit breaker между состояниями',
+    ('service', 'state'),
+)
+
+
+class CircuitOpenError(Exception):
+    """Запрос отклонён: circuit breaker сервиса разомкнут."""
+
+
+class CircuitBreaker:
+    """Circuit breaker с состояниями closed, open и half_open.
+
+    После failure_threshold подряд неудачных запросов breaker размыкается
+    и отклоняет запросы в течение cooldown секунд. Затем пропускает один
+    пробный запрос: успех замыкает breaker, неудача снова размыкает.
+
+    Аргументы:
+        name (str): Имя сервиса для логов и метрик.
+        failure_threshold (int): Число подряд неудач до размыкания.
+        cooldown (float): Время в разомкнутом состоянии (секунды).
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        _breaker_state.set(_BREAKER_STATE_CODES[self.state], service=name)
+
+    def _transition(self, state: str) -> None:
+        """Переводит breaker в новое состояние и обновляет метрики.
+
+        Аргументы:
+            state (str): Новое состояние.
+        """
+        if state == self.state:
+            return
+        logger.info(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        _breaker_state.set(_BREAKER_STATE_CODES[state], service=self.name)
+        _breaker_transitions.inc(service=self.name, state=state)
+
+    def allow(self) -> bool:
+        """Проверяет, можно ли выполнить запрос.
+
+        Возвращаемое значение:
+            bool: True если запрос разрешён.
+        """
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._transition(self.HALF_OPEN)
+
+        # half_open: пропускаем только один пробный запрос
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """Регистрирует успешный запрос."""
+        self._failures = 0
+        self._probe_in_flight = False
+        self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Регистрирует неудачный запрос."""
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            self._opened_at = time.monotonic()
+            self._transition(self.OPEN)
+            return
+
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    def release_probe(self) -> None:
+        """Освобождает слот пробного запроса, если он был отменён."""
+        self._probe_in_flight = False
+
+
+class LatencyWindow:
+    """Скользящее окно задержек для оценки p95.
+
+    Аргументы:
+        size (int): Количество последних замеров в окне.
+    """
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        """Добавляет замер задержки.
+
+        Аргументы:
+            seconds (float): Задержка в секундах.
+        """
+        self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        """Возвращает p95 задержки или None, если замеров недостаточно.
+
+        Возвращаемое значение:
+            Optional[float]: p95 в секундах.
+        """
+        if len(self._samples) < _MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def timeout(self) -> float:
+        """Вычисляет адаптивный таймаут запроса.
+
+        Пока замеров недостаточно, используется максимальный таймаут.
+
+        Возвращаемое значение:
+            float: Таймаут в секундах.
+        """
+        p95 = self.p95()
+        if p95 is None:
+            return EXTERNAL_API_MAX_TIMEOUT
+        return min(EXTERNAL_API_MAX_TIMEOUT, max(EXTERNAL_API_MIN_TIMEOUT, p95 * _TIMEOUT_P95_MULTIPLIER))
+
+
+class _ServiceState:
+    """Состояние отдельного внешнего сервиса: breaker и окно задержек."""
+
+    def __init__(self, name: str) -> None:
+        self.breaker = CircuitBreaker(name, EXTERNAL_API_BREAKER_THRESHOLD, EXTERNAL_API_BREAKER_COOLDOWN)
+        self.latency = LatencyWindow()
+
+
+class ResilientHttpClient:
+    """HTTP-клиент с circuit breaker, адаптивными таймаутами и хеджированием.
+
+    Каждый внешний сервис (CAS, LOLS) идентифицируется именем и имеет
+    собственные breaker и окно задержек, но все используют общий пул
+    соединений.
+    """
+
+    def __init__(self) -> None:
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._services: Dict[str, _ServiceState] = {}
+
+    def _service(self, name: str) -> _ServiceState:
+        """Возвращает состояние сервиса, создавая при первом обращении.
+
+        Аргументы:
+            name (str): Имя сервиса.
+
+        Возвращаемое значение:
+            _ServiceState: Состояние сервиса.
+        """
+        state = self._services.get(name)
+        if state is None:
+            state = _ServiceState(name)
+            self._services[name] = state
+        return state
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Возвращает circuit breaker сервиса.
+
+        Аргументы:
+            name (str): Имя сервиса.
+
+        Возвращаемое значение:
+            CircuitBreaker: Breaker сервиса.
+        """
+        return self._service(name).breaker
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую aiohttp-сессию, создавая при первом вызове.
+
+        Возвращаемое значение:
+            session (aiohttp.ClientSession): Общая HTTP-сессия.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=EXTERNAL_API_LIMIT_PER_HOST,
+                use_dns_cache=True,
+                ttl_dns_cache=EXTERNAL_API_DNS_TTL,
+                keepalive_timeout=EXTERNAL_API_KEEPALIVE,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=EXTERNAL_API_MAX_TIMEOUT),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Закрывает общую сессию."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _fetch_json(self, url: str, timeout: float) -> Any:
+        """Выполняет GET-запрос и возвращает JSON.
+
+        Аргументы:
+            url (str): Адрес запроса.
+            timeout (float): Таймаут в секундах.
+
+        Возвращаемое значение:
+            Any: Разобранный JSON-ответ.
+        """
+        session = await self.get_session()
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def _hedged_fetch_json(self, service: str, url: str, timeout: float, delay: float) -> Any:
+        """Выполняет запрос с хеджированием.
+
+        Если основной запрос не завершился за delay секунд, отправляется
+        дублирующий. Возвращается первый успешный ответ, второй отменяется.
+
+        Аргументы:
+            service (str): Имя сервиса.
+            url (str): Адрес запроса.
+            timeout (float): Общий таймаут в секундах.
+            delay (float): Задержка перед хедж-запросом.
+
+        Возвращаемое значение:
+            Any: Разобранный JSON-ответ.
+        """
+        primary = asyncio.create_task(self._fetch_json(url, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        _hedged_total.inc(service=service)
+        hedge = asyncio.create_task(self._fetch_json(url, max(timeout - delay, EXTERNAL_API_MIN_TIMEOUT)))
+        pending = {primary, hedge}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_json(self, service: str, url: str) -> Any:
+        """Выполняет GET-запрос к внешнему сервису через breaker.
+
+        Аргументы:
+            service (str): Имя сервиса (cas, lols).
+            url (str): Адрес запроса.
+
+        Возвращаемое значение:
+            Any: Разобранный JSON-ответ.
+
+        Исключения:
+            CircuitOpenError: Если breaker сервиса разомкнут.
+            asyncio.TimeoutError: Если сервис не ответил за адаптивный таймаут.
+            aiohttp.ClientError: При сетевой ошибке или HTTP-статусе ошибки.
+        """
+        state = self._service(service)
+        if not state.breaker.allow():
+            _requests_total.inc(service=service, outcome='rejected')
+            raise CircuitOpenError(f"Сервис {service} временно недоступен (circuit open)")
+
+        timeout = state.latency.timeout()
+        _timeout_seconds.set(timeout, service=service)
+        hedge_delay = state.latency.p95() if EXTERNAL_API_HEDGING else None
+
+        start = time.monotonic()
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                data = await self._hedged_fetch_json(service, url, timeout, hedge_delay)
+            else:
+                data = await self._fetch_json(url, timeout)
+        except asyncio.CancelledError:
+            state.breaker.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            state.breaker.record_failure()
+            _requests_total.inc(service=service, outcome='timeout')
+            raise
+        except Exception:
+            state.breaker.record_failure()
+            _requests_total.inc(service=service, outcome='error')
+            raise
+
+        elapsed = time.monotonic() - start
+        state.latency.add(elapsed)
+        state.breaker.record_success()
+        _request_seconds.observe(elapsed, service=service)
+        _requests_total.inc(service=service, outcome='ok')
+        return data
+
+
+_client: Optional[ResilientHttpClient] = None
+
+
+def get_http_client() -> ResilientHttpClient:
+    """Возвращает общий экземпляр HTTP-клиента.
+
+    Возвращаемое значение:
+        client (ResilientHttpClient): HTTP-клиент для внешних API.
+    """
+    global _client
+    if _client is None:
+        _client = ResilientHttpClient()
+    return _client
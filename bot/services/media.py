@@ -0,0 +1,440 @@
+"""Индекс медиа, подтверждённых как спам.
+
+Сообщения без текста (фото, стикеры, анимации) не анализируются моделью,
+поэтому спам-изображения определяются по отпечаткам медиа, уже признанных
+спамом:
+    exact      — совпадение file_unique_id (стикер, анимация или фото
+                 переслано или отправлено повторно), поиск за O(1);
+    perceptual — для фото: перцептивный хеш (dHash, 64 бита) миниатюры
+                 на расстоянии Хэмминга не больше MEDIA_HASH_RADIUS
+                 (фото загружено заново, пережато или обрезано по краям);
+                 поиск в BK-дереве.
+
+Индекс у каждого чата свой: медиа, признанное спамом в одном чате,
+не влияет на модерацию других чатов.
+
+Медиа попадает в индекс только по кнопке «Медиа — спам» в уведомлении
+(удаление сообщения, в том числе автоматическое, медиа в индекс не добавляет).
+Для этого медиа недавних сообщений хранятся в памяти MEDIA_RECENT_TTL секунд.
+Кнопка «Не спам» удаляет из индекса чата медиа, добавленные или совпавшие
+по недавним сообщениям пользователя.
+
+Отпечатки хранятся в таблице media_fingerprint, индекс строится при запуске.
+Перцептивный хеш требует Pillow; без него работает только точный индекс.
+"""
+
+import asyncio
+import io
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.types import Message
+
+from core.cache import TTLCache
+from core.config import MEDIA_HASH_RADIUS, MEDIA_RECENT_SIZE, MEDIA_RECENT_TTL
+from core.logging import logger
+from core.metrics import counter, gauge
+from core.repository.media import MediaFingerprintRepository
+
+# Виды совпадений
+EXACT = 'exact'
+PERCEPTUAL = 'perceptual'
+
+# Причины для уведомлений
+MEDIA_REASONS = {
+    EXACT: 'медиа из базы спама',
+    PERCEPTUAL: 'фото, похожее на фото из базы спама',
+}
+
+_matches_total = counter(
+    'antispam_media_matches_total',
+    'Медиа, совпавшие с отпечатками спама, по виду совпадения',
+    ('kind',),
+)
+_fingerprints = gauge(
+    'antispam_media_fingerprints',
+    'Отпечатки медиа в индексе',
+)
+
+
+class Media(NamedTuple):
+    """Медиа сообщения, по которому строится отпечаток."""
+
+    kind: str
+    file_unique_id: str
+    # file_id миниатюры для перцептивного хеша (только для фото)
+    thumbnail_file_id: Optional[str]
+
+
+def hamming(a: int, b: int) -> int:
+    """Возвращает расстояние Хэмминга между 64-битными хешами."""
+    return (a ^ b).bit_count()
+
+
+def dhash(image: bytes) -> int:
+    """Вычисляет разностный хеш изображения (dHash).
+
+    Изображение уменьшается до 9x8 в оттенках серого; каждый бит — сравнение
+    яркости соседних по горизонтали пикселей. Хеш устойчив к пережатию,
+    масштабированию и небольшим изменениям цвета.
+
+    Аргументы:
+        image (bytes): Содержимое файла изображения.
+
+    Возвращаемое значение:
+        int: Беззнаковый 64-битный хеш.
+
+    Исключения:
+        ImportError: Если Pillow не установлен.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image)) as source:
+        pixels = source.convert('L').resize((9, 8), Image.Resampling.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            value = (value << 1) | (left > pixels[row * 9 + col + 1])
+    return value
+
+
+def _to_signed(value: int) -> int:
+    """Переводит беззнаковый 64-битный хеш в BIGINT."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    """Переводит BIGINT в беззнаковый 64-битный хеш."""
+    return value + (1 << 64) if value < 0 else value
+
+
+class BKTree:
+    """BK-дерево 64-битных хешей по расстоянию Хэмминга.
+
+    Узел — [хеш, {расстояние до потомка: потомок}]. Поиск в радиусе r
+    посещает только потомков на расстоянии [d - r, d + r] от узла
+    (неравенство треугольника).
+    """
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self) -> None:
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int) -> bool:
+        """Добавляет хеш.
+
+        Аргументы:
+            value (int): Хеш.
+
+        Возвращаемое значение:
+            bool: False если такой хеш уже есть.
+        """
+        if self._root is None:
+            self._root = [value, {}]
+            self._size = 1
+            return True
+
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                return False
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [value, {}]
+                self._size += 1
+                return True
+            node = child
+
+    def nearest(self, value: int, radius: int) -> Optional[Tuple[int, int]]:
+        """Ищет ближайший хеш в радиусе.
+
+        Аргументы:
+            value (int): Хеш.
+            radius (int): Максимальное расстояние Хэмминга.
+
+        Возвращаемое значение:
+            Optional[Tuple[int, int]]: (хеш, расстояние) или None.
+        """
+        best = None
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius and (best is None or distance < best[1]):
+                best = (node[0], distance)
+                if distance == 0:
+                    break
+            for edge, child in node[1].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return best
+
+
+class MediaIndex:
+    """Индексы отпечатков медиа, подтверждённых как спам, по чатам."""
+
+    # chat_id -> file_unique_id -> перцептивный хеш (None для стикеров и анимаций)
+    _fingerprints: Dict[int, Dict[str, Optional[int]]] = {}
+    # chat_id -> перцептивный хеш -> file_unique_id фото с этим хешем
+    _by_hash: Dict[int, Dict[int, str]] = {}
+    # chat_id -> BK-дерево перцептивных хешей чата
+    _trees: Dict[int, BKTree] = {}
+    # (chat_id, message_id) -> (медиа, автор, хеш или None)
+    _recent: TTLCache = TTLCache(MEDIA_RECENT_SIZE, MEDIA_RECENT_TTL)
+    # (chat_id, user_id) -> file_unique_id записей индекса, добавленных
+    # или совпавших по недавним сообщениям пользователя
+    _attributed: TTLCache = TTLCache(MEDIA_RECENT_SIZE, MEDIA_RECENT_TTL)
+    _pillow: Optional[bool] = None
+
+    @staticmethod
+    def extract(message: Message) -> Optional[Media]:
+        """Возвращает медиа сообщения, если оно индексируется.
+
+        Аргументы:
+            message (Message): Сообщение Telegram.
+
+        Возвращаемое значение:
+            Optional[Media]: Фото, стикер или анимация; None для остальных сообщений.
+        """
+        if message.photo:
+            # Наибольший размер — для точного совпадения, наименьший — для хеша
+            return Media('photo', message.photo[-1].file_unique_id, message.photo[0].file_id)
+        if message.sticker:
+            return Media('sticker', message.sticker.file_unique_id, None)
+        if message.animation:
+            return Media('animation', message.animation.file_unique_id, None)
+        return None
+
+    @staticmethod
+    async def load() -> None:
+        """Строит индекс по таблице media_fingerprint."""
+        rows = await MediaFingerprintRepository.get_all()
+        fingerprints: Dict[int, Dict[str, Optional[int]]] = {}
+        for row in rows:
+            fingerprints.setdefault(row['chat_id'], {})[row['file_unique_id']] = (
+                None if row['phash'] is None else _to_unsigned(row['phash'])
+            )
+        MediaIndex._fingerprints = fingerprints
+        MediaIndex._trees = {}
+        MediaIndex._by_hash = {}
+        for chat_id in fingerprints:
+            MediaIndex._rebuild_tree(chat_id)
+        logger.info(
+            f"Индекс медиа загружен: {len(rows)} отпечатков в {len(fingerprints)} чатах, "
+            f"{sum(len(tree) for tree in MediaIndex._trees.values())} перцептивных хешей"
+        )
+
+    @staticmethod
+    def _rebuild_tree(chat_id: int) -> None:
+        """Перестраивает BK-дерево чата по отпечаткам (удаление из BK-дерева не поддерживается).
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+        """
+        tree = BKTree()
+        by_hash = {}
+        for file_unique_id, phash in MediaIndex._fingerprints.get(chat_id, {}).items():
+            if phash is not None:
+                tree.add(phash)
+                by_hash.setdefault(phash, file_unique_id)
+        MediaIndex._trees[chat_id] = tree
+        MediaIndex._by_hash[chat_id] = by_hash
+        MediaIndex._update_gauge()
+
+    @staticmethod
+    def _update_gauge() -> None:
+        """Обновляет метрику числа отпечатков во всех чатах."""
+        _fingerprints.set(sum(len(chat) for chat in MediaIndex._fingerprints.values()))
+
+    @staticmethod
+    def _pillow_available() -> bool:
+        """Проверяет (один раз), установлен ли Pillow."""
+        if MediaIndex._pillow is None:
+            try:
+                import PIL  # noqa: F401
+                MediaIndex._pillow = True
+            except ImportError:
+                logger.warning('Pillow не установлен — поиск похожих фото отключён')
+                MediaIndex._pillow = False
+        return MediaIndex._pillow
+
+    @staticmethod
+    async def _hash(bot: Bot, media: Media) -> Optional[int]:
+        """Скачивает миниатюру фото и вычисляет перцептивный хеш.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            media (Media): Медиа сообщения.
+
+        Возвращаемое значение:
+            Optional[int]: Хеш или None, если он не вычисляется для медиа или произошла ошибка.
+        """
+        if media.thumbnail_file_id is None or not MediaIndex._pillow_available():
+            return None
+        try:
+            image = await bot.download(media.thumbnail_file_id)
+            return await asyncio.to_thread(dhash, image.getvalue())
+        except Exception as e:
+            logger.warning(f"Не удалось вычислить хеш фото {media.file_unique_id}: {e}")
+            return None
+
+    @staticmethod
+    def _attribute(chat_id: int, user_id: int, file_unique_id: str) -> None:
+        """Связывает запись индекса с недавними сообщениями пользователя."""
+        key = (chat_id, user_id)
+        attributed: Set[str] = MediaIndex._attributed.get(key) or set()
+        attributed.add(file_unique_id)
+        MediaIndex._attributed.set(key, attributed)
+
+    @staticmethod
+    def remember(chat_id: int, message_id: int, user_id: int, media: Media) -> None:
+        """Запоминает медиа сообщения на MEDIA_RECENT_TTL для подтверждения (см. confirm).
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID сообщения.
+            user_id (int): Telegram ID автора.
+            media (Media): Медиа сообщения.
+        """
+        MediaIndex._recent.set((chat_id, message_id), (media, user_id, None))
+
+    @staticmethod
+    async def match(
+        bot: Bot,
+        chat_id: int,
+        message_id: int,
+        user_id: int,
+        media: Media,
+        similar: bool
+    ) -> Optional[str]:
+        """Проверяет медиа сообщения по индексу чата и запоминает его для подтверждения.
+
+        Алгоритм работы:
+            1. Запомнить медиа сообщения на MEDIA_RECENT_TTL.
+            2. Проверить file_unique_id в точном индексе чата.
+            3. Для фото (если similar и в индексе чата есть хеши) скачать
+               миниатюру, вычислить dHash и найти ближайший хеш в BK-дереве чата.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID сообщения.
+            user_id (int): Telegram ID автора.
+            media (Media): Медиа сообщения.
+            similar (bool): Искать похожие фото по перцептивному хешу.
+
+        Возвращаемое значение:
+            Optional[str]: EXACT, PERCEPTUAL или None если совпадений нет.
+        """
+        MediaIndex.remember(chat_id, message_id, user_id, media)
+
+        if media.file_unique_id in MediaIndex._fingerprints.get(chat_id, ()):
+            _matches_total.inc(kind=EXACT)
+            MediaIndex._attribute(chat_id, user_id, media.file_unique_id)
+            return EXACT
+
+        tree = MediaIndex._trees.get(chat_id)
+        if not similar or media.kind != 'photo' or tree is None or not len(tree):
+            return None
+
+        phash = await MediaIndex._hash(bot, media)
+        if phash is None:
+            return None
+        MediaIndex._recent.set((chat_id, message_id), (media, user_id, phash))
+
+        found = tree.nearest(phash, MEDIA_HASH_RADIUS)
+        if found is None:
+            return None
+        matched, distance = found
+        matched_id = MediaIndex._by_hash[chat_id][matched]
+        _matches_total.inc(kind=PERCEPTUAL)
+        MediaIndex._attribute(chat_id, user_id, matched_id)
+        logger.info(
+            f"Фото {media.file_unique_id} похоже на спам {matched_id} "
+            f"в чате {chat_id} (расстояние {distance})"
+        )
+        return PERCEPTUAL
+
+    @staticmethod
+    async def confirm(bot: Bot, chat_id: int, message_id: int) -> bool:
+        """Добавляет медиа недавнего сообщения в индекс чата как спам.
+
+        Вызывается только по кнопке «Медиа — спам».
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID сообщения.
+
+        Возвращаемое значение:
+            bool: True если медиа добавлено; False если сообщение без медиа,
+                уже не помнится или медиа уже в индексе.
+        """
+        recent = MediaIndex._recent.pop((chat_id, message_id))
+        if recent is None:
+            return False
+        media, user_id, phash = recent
+        MediaIndex._attribute(chat_id, user_id, media.file_unique_id)
+        fingerprints = MediaIndex._fingerprints.setdefault(chat_id, {})
+        if media.file_unique_id in fingerprints:
+            return False
+
+        if phash is None:
+            phash = await MediaIndex._hash(bot, media)
+        await MediaFingerprintRepository.add(
+            chat_id,
+            media.file_unique_id,
+            media.kind,
+            None if phash is None else _to_signed(phash),
+            time.time(),
+        )
+
+        fingerprints[media.file_unique_id] = phash
+        tree = MediaIndex._trees.setdefault(chat_id, BKTree())
+        if phash is not None and tree.add(phash):
+            MediaIndex._by_hash.setdefault(chat_id, {})[phash] = media.file_unique_id
+        MediaIndex._update_gauge()
+        logger.info(f"Медиа {media.kind} {media.file_unique_id} из чата {chat_id} добавлено в индекс спама")
+        return True
+
+    @staticmethod
+    async def forget_user(chat_id: int, user_id: int) -> int:
+        """Удаляет из индекса чата медиа, добавленные или совпавшие по недавним сообщениям пользователя.
+
+        Вызывается при отметке «Не спам».
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            user_id (int): Telegram ID пользователя.
+
+        Возвращаемое значение:
+            int: Количество удалённых отпечатков.
+        """
+        attributed: Optional[Set[str]] = MediaIndex._attributed.pop((chat_id, user_id))
+        if not attributed:
+            return 0
+
+        fingerprints = MediaIndex._fingerprints.get(chat_id, {})
+        removed: List[str] = [
+            file_unique_id for file_unique_id in attributed
+            if file_unique_id in fingerprints
+        ]
+        if not removed:
+            return 0
+        await MediaFingerprintRepository.remove(chat_id, removed)
+        for file_unique_id in removed:
+            del fingerprints[file_unique_id]
+        MediaIndex._rebuild_tree(chat_id)
+        logger.info(
+            f"Из индекса медиа чата {chat_id} удалено {len(removed)} отпечатков "
+            f"(не спам, пользователь {user_id})"
+        )
+        return len(removed)
@@ -1,23 +1,41 @@
 """Сервис модерации: анализ сообщений, принятие решений, выполнение действий."""
 
+import asyncio
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from aiogram import Bot
 from aiogram.types import Message, ChatPermissions
 
-from core.repository.chat import ChatRepository
+from core.chat_registry import ChatRegistry
+from core.repository.context import ModerationContext, ModerationContextRepository
 from core.repository.settings import SettingsRepository
 from core.repository.spam import SpamRepository
-from core.repository.muted import MutedRepository
-from core.repository.whitelist import WhitelistRepository
-from core.repository.collected import CollectedRepository
+from bot.services.admin_cache import AdminCache
+from bot.services.album import AlbumService
+from bot.services.collector import CollectorService
+from bot.services.edits import UNCHANGED as EDIT_UNCHANGED, EditCache
+from bot.services.flood import FLOOD_REASONS, FloodDetector
+from bot.services.media import EXACT, MEDIA_REASONS, MediaIndex
 from bot.services.notifications import NotificationService
+from bot.services.outbox import OutboxService
+from bot.services.reputation import ReputationService
+from bot.services.shadow import ShadowService
+from bot.services.side_effects import SideEffectService
+from bot.services.trust import TrustService
 from bot.keyboards import create_spam_notification_keyboard
-from bot.notifications import format_log_notification
 from core.utils import add_hours_get_timestamp
 from core.logging import logger, truncate_for_log
-from core.config import TESTING, SYSTEM_USER_IDS
+from core.config import ALBUM_WINDOW, TESTING, SYSTEM_USER_IDS
+from core.metrics import histogram
+from core.tracing import current_trace, span, start_trace
+
+_removal_seconds = histogram(
+    'antispam_time_to_removal_seconds',
+    'Время до удаления спам-сообщения: от начала обработки (received) и от отправки (sent)',
+    ('since',),
+)
 
 
 class ModerationService:
@@ -27,6 +45,9 @@ class ModerationService:
     async def check_if_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
         """Проверяет, является ли пользователь админом в чате.
 
+        Использует кеш администраторов (AdminCache): обращение к Telegram API
+        выполняется только при первой проверке в чате.
+
         Аргументы:
             bot (Bot): Экземпляр бота.
             chat_id (int): ID чата.
@@ -35,23 +56,51 @@ class ModerationService:
         Возвращаемое значение:
             bool: True если пользователь админ.
         """
-        try:
-            member = await bot.get_chat_member(chat_id, user_id)
-            return member.status in ('administrator', 'creator')
-        except Exception as e:
-            logger.warning(f"Не удалось проверить статус админа {user_id} в чате {chat_id}: {e}")
-            return False
+        return await AdminCache.is_admin(bot, chat_id, user_id)
+
+    @staticmethod
+    async def _load_context(chat_id: int, author_id: int) -> Optional[ModerationContext]:
+        """Загружает контекст обработки сообщения.
+
+        Если реестр чатов и кеш настроек активны, контекст собирается
+        из памяти процесса. Иначе всё загружается одним запросом
+        (ModerationContextRepository), а запись об ограничениях
+        сохраняется в кеш ReputationService.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            author_id (int): Telegram ID автора сообщения.
+
+        Возвращаемое значение:
+            Optional[ModerationContext]: Контекст или None, если чат не наблюдается.
+        """
+        if ChatRegistry.is_enabled() and SettingsRepository.is_cache_enabled():
+            chat_pk = await ChatRegistry.get_chat_pk(chat_id)
+            if chat_pk is None:
+                return None
+            settings = await SettingsRepository.get_all_chat_settings(chat_pk)
+            muted = await ReputationService.get_muted(chat_pk, author_id)
+            is_whitelisted = await ChatRegistry.is_whitelisted(chat_pk, author_id)
+            return ModerationContext(chat_pk, settings, muted, is_whitelisted)
+
+        context = await ModerationContextRepository.get_context(chat_id, author_id)
+        if context is not None:
+            ReputationService.prime_muted(context.chat_pk, author_id, context.muted)
+        return context
 
     @staticmethod
-    def _get_content_type(message: Message) -> Optional[str]:
+    def _get_content_type(message: Message, album_size: int = 1) -> Optional[str]:
         """Определяет тип контента нетекстового сообщения.
 
         Аргументы:
             message (Message): Сообщение Telegram.
+            album_size (int): Количество сообщений альбома.
 
         Возвращаемое значение:
             Optional[str]: Название типа контента или None.
         """
+        if album_size > 1:
+            return f'Альбом ({album_size})'
         if message.sticker:
             return 'Стикер'
         if message.photo:
@@ -78,24 +127,69 @@ class ModerationService:
             return 'Опрос'
         return None
 
+    @staticmethod
+    def _sent_at(message: Message) -> Optional[float]:
+        """Возвращает время, с которого сообщение видно в чате в текущем виде.
+
+        Для отредактированного сообщения message.date — время исходной
+        отправки, поэтому используется время правки (edit_date).
+
+        Аргументы:
+            message (Message): Сообщение Telegram.
+
+        Возвращаемое значение:
+            Optional[float]: Unix timestamp или None, если время неизвестно.
+        """
+        sent = message.edit_date or message.date
+        return sent.timestamp() if sent is not None else None
+
+    @staticmethod
+    def _flood_key(message: Message) -> str:
+        """Возвращает ключ сообщения для поиска повторов (FloodDetector).
+
+        Аргументы:
+            message (Message): Сообщение Telegram.
+
+        Возвращаемое значение:
+            str: Текст или подпись; для сообщений без текста — file_unique_id
+                вложения (одинаковые стикеры и фото — повторы) или тип контента.
+        """
+        if message.text or message.caption:
+            return message.text or message.caption
+        attachment = (
+            (message.photo[-1] if message.photo else None)
+            or message.sticker or message.animation or message.video
+            or message.voice or message.video_note or message.audio or message.document
+        )
+        if attachment is not None:
+            return f'[{attachment.file_unique_id}]'
+        return f'[{ModerationService._get_content_type(message) or ""}]'
+
     @staticmethod
     async def analyze_message(
         message_text: str,
         author_id: int,
-        settings: Dict[str, Any]
+        settings: Dict[str, Any],
+        chat_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """Анализирует сообщение на спам.
 
+        BERT и внешние проверки выполняются через планировщики
+        (bot/services/scheduler.py), которые делят слоты анализа между
+        чатами пропорционально настройке INFERENCE_SHARE.
+
         Аргументы:
             message_text (str): Текст сообщения.
             author_id (int): ID автора.
             settings (Dict[str, Any]): Настройки чата.
+            chat_id (Optional[int]): Telegram ID чата (ключ справедливой очереди).
 
         Возвращаемое значение:
             Dict[str, Any]: Результат анализа с ключами:
                 bert_prediction, cas, lols, chatgpt, ausure.
         """
-        from bot.services.spam_detection import predict_spam
+        from bot.services.scheduler import get_scheduler
+        from bot.services.spam_detection import predict_spam_async
         from bot.services.text_analysis import normalize_text, preprocess_text
         from pathlib import Path
         from core.config import MODELS_DIR
@@ -106,41 +200,60 @@ class ModerationService:
 
         logger.debug(f"Текст до обработки: {truncate_for_log(message_text)}")
 
-        # Нормализация текста
-        if settings.get('NORMALIZE_TEXT', True):
-            message_text = normalize_text(message_text)
-            logger.debug(f"Текст после нормализации: {truncate_for_log(message_text)}")
+        with span('normalize'):
+            # Нормализация текста
+            if settings.get('NORMALIZE_TEXT', True):
+                message_text = normalize_text(message_text)
+                logger.debug(f"Текст после нормализации: {truncate_for_log(message_text)}")
 
-        # Предобработка текста
-        if settings.get('PREPROCESS_TEXT', False):
-            message_text = preprocess_text(message_text)
-            logger.debug(f"Текст после предобработки: {truncate_for_log(message_text)}")
+            # Предобработка текста
+            if settings.get('PREPROCESS_TEXT', False):
+                message_text = preprocess_text(message_text)
+                logger.debug(f"Текст после предобработки: {truncate_for_log(message_text)}")
 
         # Путь к BERT модели из настроек
         model_name = settings.get('BERT_MODEL', 'finetuned_rubert_tiny2')
         model_path = str(Path(MODELS_DIR) / model_name)
 
-        # BERT предсказание
-        bert_result = predict_spam(message_text, model_path)
+        share = float(settings.get('INFERENCE_SHARE', 1.0))
+
+        # BERT предсказание в пуле потоков (этап включает ожидание слота)
+        with span('bert'):
+            async with get_scheduler('bert').slot(chat_id, share):
+                bert_started = time.perf_counter()
+                bert_result = await predict_spam_async(message_text, model_path)
+                bert_seconds = time.perf_counter() - bert_started
         bert_score = bert_result[1][1] if bert_result else 0.0
 
-        # CAS проверка
-        cas_result = None
-        if settings.get('CHECK_CAS', False):
-            from bot.services.external_apis import check_cas
-            cas_result = await check_cas(author_id)
+        # Выборка для теневой оценки модели-кандидата (без ожидания)
+        if chat_id is not None:
+            ShadowService.submit(message_text, chat_id, model_name, bert_score, bert_seconds, bert_threshold)
+
+        # CAS и LOLS проверки выполняются параллельно
+        from bot.services.external_apis import check_cas, check_lols
 
-        # LOLS проверка
-        lols_result = None
-        if settings.get('CHECK_LOLS', False):
-            from bot.services.external_apis import check_lols
-            lols_result = await check_lols(author_id)
+        async def _skipped() -> None:
+            return None
+
+        check_cas_enabled = settings.get('CHECK_CAS', False)
+        check_lols_enabled = settings.get('CHECK_LOLS', False)
+        check_chatgpt_enabled = settings.get('ENABLE_CHATGPT', False)
 
-        # ChatGPT проверка
         chatgpt_result = None
-        if settings.get('ENABLE_CHATGPT', False):
-            from bot.services.spam_detection import check_spam_chatgpt
-            chatgpt_result = await check_spam_chatgpt(message_text)
+        if check_cas_enabled or check_lols_enabled or check_chatgpt_enabled:
+            with span('external'):
+                async with get_scheduler('external').slot(chat_id, share):
+                    cas_result, lols_result = await asyncio.gather(
+                        check_cas(author_id) if check_cas_enabled else _skipped(),
+                        check_lols(author_id) if check_lols_enabled else _skipped(),
+                    )
+
+                    # ChatGPT проверка
+                    if check_chatgpt_enabled:
+                        from bot.services.spam_detection import check_spam_chatgpt
+                        chatgpt_result = await check_spam_chatgpt(message_text)
+        else:
+            cas_result = lols_result = None
 
         # Определение уверенности
         ausure = bert_score >= bert_sure_threshold
@@ -185,25 +298,70 @@ class ModerationService:
         return None
 
     @staticmethod
-    async def handle_message(message: Message, bot: Bot, is_edited: bool = False) -> None:
+    async def handle_message(
+        message: Message,
+        bot: Bot,
+        is_edited: bool = False,
+        album: Optional[List[Message]] = None
+    ) -> None:
         """Обрабатывает входящее сообщение: проверка на спам и модерация.
 
         Алгоритм работы:
+            0. Обработать альбом (media_group_id) одним сообщением; альбом
+               собирает UpdateLaneMiddleware, без него — этот метод.
             1. Проверить, что чат наблюдаемый.
             2. Загрузить per-chat настройки.
             3. Если это отредактированное сообщение и проверка редактирований отключена — выйти.
             4. Проверить, является ли автор админом.
             5. Проверить белый список.
-            6. Анализ на спам.
-            7. Если спам — удалить/замьютить, отправить уведомление.
+            6. Проверка медиа по индексу спама и анализ на спам.
+            7. Если спам — удалить/замьютить, затем в фоне сохранить вердикт
+               и отправить уведомление.
 
         Аргументы:
             message (Message): Входящее сообщение.
             bot (Bot): Экземпляр бота.
             is_edited (bool): True, если сообщение было отредактировано.
+            album (Optional[List[Message]]): Сообщения альбома, собранные
+                UpdateLaneMiddleware, или None.
+        """
+        received = time.monotonic()
+
+        # Альбом обрабатывается один раз — первым сообщением, по подписи
+        if album is None and message.media_group_id and not is_edited and ALBUM_WINDOW > 0:
+            album = await AlbumService.collect(message)
+            if album is None:
+                return
+        if album is not None:
+            message = AlbumService.representative(album)
+
+        trace = start_trace(message.chat.id, message.message_id, ModerationService._sent_at(message))
+        try:
+            await ModerationService._process_message(message, bot, is_edited, received, album)
+        finally:
+            if trace is not None:
+                trace.finish()
+
+    @staticmethod
+    async def _process_message(
+        message: Message,
+        bot: Bot,
+        is_edited: bool,
+        received: float,
+        album: Optional[List[Message]] = None
+    ) -> None:
+        """Обработка сообщения (см. handle_message).
+
+        Аргументы:
+            message (Message): Входящее сообщение (для альбома — сообщение с подписью).
+            bot (Bot): Экземпляр бота.
+            is_edited (bool): True, если сообщение было отредактировано.
+            received (float): Время начала обработки (time.monotonic()).
+            album (Optional[List[Message]]): Все сообщения альбома или None.
         """
         chat_id = message.chat.id
         author = message.from_user
+        album_size = len(album) if album else 1
 
         if author is None:
             return
@@ -211,13 +369,14 @@ class ModerationService:
         author_id = author.id
         author_name = author.username
 
-        # Проверяем, что чат наблюдаемый
-        chat_pk = await ChatRepository.get_chat_pk(chat_id)
-        if chat_pk is None:
+        # Проверяем, что чат наблюдаемый, и загружаем настройки,
+        # ограничения автора и белый список
+        with span('context'):
+            context = await ModerationService._load_context(chat_id, author_id)
+        if context is None:
             return
-
-        # Загружаем per-chat настройки
-        settings = await SettingsRepository.get_all_chat_settings(chat_pk)
+        chat_pk = context.chat_pk
+        settings = context.settings
 
         # Проверка отредактированных сообщений
         if is_edited and not settings.get('CHECK_EDITED_MESSAGES', False):
@@ -231,21 +390,14 @@ class ModerationService:
         collect_all = settings.get('COLLECT_ALL_MESSAGES', False)
         collect_text = message.text or message.caption
         if collect_all and collect_text:
-            try:
-                await CollectedRepository.add_collected_message(
-                    chat_id=chat_id,
-                    user_id=author_id,
-                    username=author_name,
-                    message_text=collect_text
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при сохранении сообщения: {e}")
+            CollectorService.add(chat_id, author_id, author_name, collect_text)
 
         logger.info(f"Обработка сообщения от {author_id} в чате {chat_id}")
 
         try:
             # Пропускаем сообщения от администраторов
-            is_admin = await ModerationService.check_if_admin(bot, chat_id, author_id)
+            with span('admin'):
+                is_admin = await ModerationService.check_if_admin(bot, chat_id, author_id)
 
             if TESTING:
                 is_admin = False
@@ -259,8 +411,8 @@ class ModerationService:
                 logger.debug(f"Сообщение от системного пользователя {author_id} пропускается")
                 return
 
-            # Получаем запись об ограничениях для логирования и клавиатуры
-            muted = await MutedRepository.get_muted_user(chat_pk, author_id)
+            # Запись об ограничениях для логирования и клавиатуры
+            muted = context.muted
             already_forever_muted = bool(
                 muted and muted.get('muted_till_timestamp') is not None
                 and muted['muted_till_timestamp'] >= 4102455600.0
@@ -268,8 +420,7 @@ class ModerationService:
             current_relapse = muted['relapse_number'] if muted else 0
 
             # Проверяем белый список
-            is_whitelisted = await WhitelistRepository.is_whitelisted(chat_pk, author_id)
-            if is_whitelisted:
+            if context.is_whitelisted:
                 logger.debug(f"Пользователь {author_id} в белом списке чата {chat_id}")
 
                 message_text = message.text or message.caption
@@ -279,7 +430,7 @@ class ModerationService:
                 if message_text:
                     try:
                         analysis = await ModerationService.analyze_message(
-                            message_text, author_id, settings
+                            message_text, author_id, settings, chat_id
                         )
                         bert_score = analysis['bert_score']
                     except Exception as e:
@@ -292,10 +443,20 @@ class ModerationService:
                 if log_to_topic and log_topic_id > 0:
                     log_has_reply_markup = bool(message.reply_markup)
                     content_type = (
-                        ModerationService._get_content_type(message)
+                        ModerationService._get_content_type(message, album_size)
                         if not message_text else None
                     )
-                    log_text = format_log_notification(
+                    log_keyboard = create_spam_notification_keyboard(
+                        message_id=message.message_id,
+                        user_id=author_id,
+                        chat_id=chat_id,
+                        include_delete=True,
+                        include_mute=True,
+                        include_not_spam=False,
+                        include_mute_forever=not already_forever_muted,
+                    )
+                    await NotificationService.send_log_notification(
+                        bot, log_topic_id, log_keyboard,
                         timestamp=datetime.now().timestamp(),
                         author_id=author_id,
                         author_name=author_name,
@@ -307,32 +468,69 @@ class ModerationService:
                         content_type=content_type,
                         chat_title=message.chat.title or str(chat_id),
                         chat_id=chat_id,
-                    )
-                    log_keyboard = create_spam_notification_keyboard(
                         message_id=message.message_id,
-                        user_id=author_id,
-                        chat_id=chat_id,
-                        include_delete=True,
-                        include_mute=True,
-                        include_not_spam=False,
-                        include_mute_forever=not already_forever_muted,
-                    )
-                    await NotificationService.send_spam_notification(
-                        bot, log_text, keyboard=log_keyboard, thread_id=log_topic_id
                     )
 
                 return
 
+            # Фото, стикеры и анимации проверяются по индексу медиа, признанных спамом
+            media = MediaIndex.extract(message)
+            media_match = None
+            if media is not None and settings.get('CHECK_MEDIA', False):
+                with span('media'):
+                    media_match = await MediaIndex.match(
+                        bot, chat_id, message.message_id, author_id, media,
+                        settings.get('CHECK_MEDIA_SIMILAR', False)
+                    )
+            elif media is not None:
+                MediaIndex.remember(chat_id, message.message_id, author_id, media)
+
+            # Медиа остальных сообщений альбома запоминаются для подтверждения
+            for item in album or ():
+                item_media = MediaIndex.extract(item) if item is not message else None
+                if item_media is not None:
+                    MediaIndex.remember(chat_id, item.message_id, author_id, item_media)
+
+            # Кнопка «Медиа — спам» — единственный способ добавить медиа в индекс чата
+            confirmable_media = media_match != EXACT and any(
+                MediaIndex.extract(item) is not None for item in album or (message,)
+            )
+
+            # Медиа из индекса спама, флуд и повторяющиеся сообщения определяются без анализа.
+            # Флуд проверяется и для сообщений без текста (стикеры, фото)
+            flood_reason = None
+            if media_match is not None:
+                rule_reason = MEDIA_REASONS[media_match]
+            else:
+                if not is_edited:
+                    flood_reason = FloodDetector.check(
+                        chat_id, author_id, ModerationService._flood_key(message), settings
+                    )
+                rule_reason = FLOOD_REASONS.get(flood_reason)
+
             # Получаем текст сообщения
             message_text = message.text or message.caption
-            if not message_text:
+            if not message_text and rule_reason is None:
                 logger.debug(f"Сообщение от {author_id} без текста — игнорируется")
+                if not is_edited:
+                    TrustService.record(chat_pk, author_id)
 
                 # Логирование нетекстовых сообщений
                 if log_to_topic and log_topic_id > 0:
-                    content_type = ModerationService._get_content_type(message)
+                    content_type = ModerationService._get_content_type(message, album_size)
                     log_has_reply_markup = bool(message.reply_markup)
-                    log_text = format_log_notification(
+                    log_keyboard = create_spam_notification_keyboard(
+                        message_id=message.message_id,
+                        user_id=author_id,
+                        chat_id=chat_id,
+                        include_delete=True,
+                        include_mute=True,
+                        include_not_spam=True,
+                        include_mute_forever=not already_forever_muted,
+                        include_media_spam=confirmable_media,
+                    )
+                    await NotificationService.send_log_notification(
+                        bot, log_topic_id, log_keyboard,
                         timestamp=datetime.now().timestamp(),
                         author_id=author_id,
                         author_name=author_name,
@@ -344,22 +542,13 @@ class ModerationService:
                         content_type=content_type,
                         chat_title=message.chat.title or str(chat_id),
                         chat_id=chat_id,
-                    )
-                    log_keyboard = create_spam_notification_keyboard(
                         message_id=message.message_id,
-                        user_id=author_id,
-                        chat_id=chat_id,
-                        include_delete=True,
-                        include_mute=True,
-                        include_not_spam=True,
-                        include_mute_forever=not already_forever_muted,
-                    )
-                    await NotificationService.send_spam_notification(
-                        bot, log_text, keyboard=log_keyboard, thread_id=log_topic_id
                     )
 
                 return
 
+            if not message_text:
+                message_text = f'[{ModerationService._get_content_type(message, album_size)}]'
             logger.info(f"Текст сообщения от {author_id}: {truncate_for_log(message_text)}")
 
             # Проверяем наличие inline клавиатуры
@@ -372,18 +561,36 @@ class ModerationService:
                 or message.forward_from_chat is not None
             )
 
-            # Анализируем сообщение.
-            # Обёрнуто в try/except: при ошибке BERT лог всё равно отправляется
-            # с bert_score=None, а обработка прерывается — нельзя принять
-            # решение о спаме без анализа.
-            try:
-                analysis = await ModerationService.analyze_message(
-                    message_text, author_id, settings
+            # Правка без изменения текста не обрабатывается, а небольшая правка
+            # не анализируется заново
+            cached_analysis = None
+            if is_edited and rule_reason is None:
+                edit_outcome, cached_analysis = EditCache.lookup(
+                    chat_id, message.message_id, message_text, bool(message.reply_markup)
                 )
-            except Exception as e:
-                logger.error(f"Ошибка анализа сообщения от {author_id} в чате {chat_id}: {e}")
+                if edit_outcome == EDIT_UNCHANGED:
+                    logger.debug(f"Текст отредактированного сообщения {message.message_id} не изменился")
+                    return
+
+            # Давние участники без нарушений анализируются выборочно или не анализируются
+            if rule_reason is None and cached_analysis is None and not await TrustService.should_analyze(
+                chat_pk, author_id, settings, muted, bool(message.reply_markup)
+            ):
+                logger.debug(f"Анализ сообщения доверенного пользователя {author_id} пропущен")
+                if not is_edited:
+                    TrustService.record(chat_pk, author_id)
                 if log_to_topic and log_topic_id > 0:
-                    log_text = format_log_notification(
+                    log_keyboard = create_spam_notification_keyboard(
+                        message_id=message.message_id,
+                        user_id=author_id,
+                        chat_id=chat_id,
+                        include_delete=True,
+                        include_mute=True,
+                        include_not_spam=False,
+                        include_mute_forever=not already_forever_muted,
+                    )
+                    await NotificationService.send_log_notification(
+                        bot, log_topic_id, log_keyboard,
                         timestamp=datetime.now().timestamp(),
                         author_id=author_id,
                         author_name=author_name,
@@ -394,31 +601,77 @@ class ModerationService:
                         is_whitelisted=False,
                         chat_title=message.chat.title or str(chat_id),
                         chat_id=chat_id,
-                    )
-                    log_keyboard = create_spam_notification_keyboard(
                         message_id=message.message_id,
-                        user_id=author_id,
-                        chat_id=chat_id,
-                        include_delete=True,
-                        include_mute=True,
-                        include_not_spam=True,
-                        include_mute_forever=not already_forever_muted,
-                    )
-                    await NotificationService.send_spam_notification(
-                        bot, log_text, keyboard=log_keyboard, thread_id=log_topic_id
                     )
                 return
 
+            if rule_reason is not None:
+                logger.info(f"Сообщение от {author_id} в чате {chat_id} признано спамом без анализа ({rule_reason})")
+                analysis = {
+                    'bert_prediction': None,
+                    'bert_score': None,
+                    'cas': None,
+                    'lols': None,
+                    'chatgpt': None,
+                    'ausure': True,
+                }
+            elif cached_analysis is not None:
+                logger.debug(f"Для правки сообщения {message.message_id} используется прежний анализ")
+                analysis = cached_analysis
+            else:
+                # Анализируем сообщение.
+                # Обёрнуто в try/except: при ошибке BERT лог всё равно отправляется
+                # с bert_score=None, а обработка прерывается — нельзя принять
+                # решение о спаме без анализа.
+                try:
+                    analysis = await ModerationService.analyze_message(
+                        message_text, author_id, settings, chat_id
+                    )
+                except Exception as e:
+                    logger.error(f"Ошибка анализа сообщения от {author_id} в чате {chat_id}: {e}")
+                    if log_to_topic and log_topic_id > 0:
+                        log_keyboard = create_spam_notification_keyboard(
+                            message_id=message.message_id,
+                            user_id=author_id,
+                            chat_id=chat_id,
+                            include_delete=True,
+                            include_mute=True,
+                            include_not_spam=True,
+                            include_mute_forever=not already_forever_muted,
+                        )
+                        await NotificationService.send_log_notification(
+                            bot, log_topic_id, log_keyboard,
+                            timestamp=datetime.now().timestamp(),
+                            author_id=author_id,
+                            author_name=author_name,
+                            message_text=message_text,
+                            has_reply_markup=has_reply_markup,
+                            bert_score=None,
+                            relapse_number=current_relapse,
+                            is_whitelisted=False,
+                            chat_title=message.chat.title or str(chat_id),
+                            chat_id=chat_id,
+                            message_id=message.message_id,
+                        )
+                    return
+                if settings.get('CHECK_EDITED_MESSAGES', False):
+                    EditCache.store(
+                        chat_id, message.message_id, message_text, bool(message.reply_markup), analysis
+                    )
+
             # Определяем статус спама
-            bert_threshold = settings.get('BERT_THRESHOLD', 0.945)
-            is_spam = ModerationService._determine_spam(
-                analysis, bert_threshold, has_reply_markup or False, is_forwarded
-            )
+            if rule_reason is not None:
+                is_spam = True
+            else:
+                bert_threshold = settings.get('BERT_THRESHOLD', 0.945)
+                is_spam = ModerationService._determine_spam(
+                    analysis, bert_threshold, has_reply_markup or False, is_forwarded
+                )
 
             # Проверка на email для категории NOT SURE
             not_sure = False
             check_email_not_sure = settings.get('CHECK_EMAIL_NOT_SURE', True)
-            if check_email_not_sure:
+            if check_email_not_sure and rule_reason is None:
                 from bot.services.text_analysis import contains_email
                 if contains_email(message_text):
                     if is_spam is None:
@@ -429,20 +682,13 @@ class ModerationService:
                         # Модель распознала как спам — помечаем NOT SURE для ручной проверки
                         not_sure = True
 
+            # Правки не считаются новыми сообщениями: иначе уровень доверия
+            # можно было бы поднять редактированием
+            if not is_edited:
+                TrustService.record(chat_pk, author_id, is_spam is True)
+
             # Логирование всех текстовых сообщений в топик
             if log_to_topic and log_topic_id > 0:
-                log_text = format_log_notification(
-                    timestamp=datetime.now().timestamp(),
-                    author_id=author_id,
-                    author_name=author_name,
-                    message_text=message_text,
-                    has_reply_markup=has_reply_markup,
-                    bert_score=analysis['bert_score'],
-                    relapse_number=current_relapse,
-                    is_whitelisted=False,
-                    chat_title=message.chat.title or str(chat_id),
-                    chat_id=chat_id,
-                )
                 if is_spam is True:
                     log_keyboard = None
                 else:
@@ -455,8 +701,19 @@ class ModerationService:
                         include_not_spam=True,
                         include_mute_forever=not already_forever_muted,
                     )
-                await NotificationService.send_spam_notification(
-                    bot, log_text, keyboard=log_keyboard, thread_id=log_topic_id
+                await NotificationService.send_log_notification(
+                    bot, log_topic_id, log_keyboard,
+                    timestamp=datetime.now().timestamp(),
+                    author_id=author_id,
+                    author_name=author_name,
+                    message_text=message_text,
+                    has_reply_markup=has_reply_markup,
+                    bert_score=analysis['bert_score'],
+                    relapse_number=current_relapse,
+                    is_whitelisted=False,
+                    chat_title=message.chat.title or str(chat_id),
+                    chat_id=chat_id,
+                    message_id=message.message_id,
                 )
 
             if not is_spam:
@@ -468,133 +725,268 @@ class ModerationService:
                 f"(ausure={analysis['ausure']}, not_sure={not_sure}) в чате {chat_id}"
             )
 
-            # Сохраняем в БД
+            # Флуд: ограничение, запись нарушения и уведомление — один раз за окно,
+            # остальные сообщения окна только удаляются
+            if flood_reason is not None and not FloodDetector.first_in_window(
+                chat_id, author_id, flood_reason, settings
+            ):
+                logger.info(f"Нарушение ({rule_reason}) от {author_id} в этом окне уже учтено")
+                if settings.get('ENABLE_DELETING', True):
+                    await ModerationService._enforce(
+                        bot, message, author_id,
+                        delete=True, mute_until=None, received=received, album=album,
+                    )
+                return
+
             current_timestamp = datetime.now().timestamp()
             bert_score = analysis['bert_score']
 
-            await SpamRepository.add_spam_message(
-                chat_id=chat_id,
-                message_id=message.message_id,
-                timestamp=current_timestamp,
-                author_id=author_id,
-                author_username=author_name,
-                message_text=message_text,
-                has_reply_markup=has_reply_markup,
-                cas=analysis['cas'],
-                lols=analysis['lols'],
-                chatgpt_prediction=analysis['chatgpt'],
-                bert_prediction=bert_score
-            )
-
             # Настройки автоматических действий
             enable_deleting = settings.get('ENABLE_DELETING', True)
             enable_automuting = settings.get('ENABLE_AUTOMUTING', False)
             ausure = analysis['ausure'] and not not_sure
 
-            # Авто-удаление
-            auto_deleted = False
-            if enable_deleting and is_spam is True and ausure:
-                try:
-                    await message.delete()
-                    auto_deleted = True
-                    logger.info(f"Сообщение от {author_id} автоматически удалено")
-                except Exception as e:
-                    logger.error(f"Ошибка при автоматическом удалении: {e}")
-
-            # Обработка записи о нарушениях (muted получен ранее)
-            if not muted:
-                relapse = 1
-                until = add_hours_get_timestamp(24) if (enable_automuting and ausure) else None
-                await MutedRepository.create_muted_user(
-                    chat_pk, author_id, author_name, current_timestamp, until, relapse
-                )
+            # Сроки ограничения: 24 часа, неделя, навсегда; без авто-мьютинга
+            # в БД сохраняется прежний срок. Срок ограничения в Telegram
+            # выбирается по номеру нарушения из контекста, а запись в БД
+            # выполняется в фоне уже после выхода из очереди пользователя
+            # (UpdateLaneMiddleware). Если предыдущий вердикт ещё не записан,
+            # номер в контексте отстаёт, и срок ограничения может отличаться
+            # от сохранённого muted_till_timestamp; в уведомлении показываются
+            # номер нарушения и срок из БД.
+            automute = enable_automuting and ausure
+            first_until = add_hours_get_timestamp(24) if automute else None
+            second_until = add_hours_get_timestamp(168) if automute else None
+            repeat_until = add_hours_get_timestamp(999) if automute else None
+            next_relapse = current_relapse + 1
+            if next_relapse == 1:
+                mute_until = first_until
+            elif next_relapse == 2:
+                mute_until = second_until
             else:
-                relapse = muted['relapse_number'] + 1
-                hours = 168 if relapse == 2 else 999
-                until = (
-                    add_hours_get_timestamp(hours)
-                    if (enable_automuting and ausure)
-                    else muted.get('muted_till_timestamp')
-                )
-                await MutedRepository.update_muted_user(
-                    chat_pk, author_id, current_timestamp, until, relapse
-                )
-
-            # Формируем уведомление
-            muted_until_str = None
-            if until and ausure and enable_automuting:
-                muted_until_str = datetime.fromtimestamp(until).strftime("%d.%m.%Y %H:%M:%S")
-
-            from bot.notifications import format_spam_notification
-            notification_text = format_spam_notification(
-                timestamp=current_timestamp,
-                author_id=author_id,
-                author_name=author_name,
-                message_text=message_text,
-                has_reply_markup=has_reply_markup,
-                bert_score=bert_score,
-                relapse_number=relapse,
-                auto_deleted=auto_deleted,
-                muted_until=muted_until_str,
-                chat_title=message.chat.title or str(chat_id),
-                chat_id=chat_id,
+                mute_until = repeat_until
+
+            # Удаление и ограничение — сразу после вердикта, до записи в БД
+            # и уведомлений
+            auto_deleted, mute_success = await ModerationService._enforce(
+                bot, message, author_id,
+                delete=enable_deleting and is_spam is True and ausure,
+                mute_until=mute_until if enable_automuting and enable_deleting and ausure else None,
+                received=received,
+                album=album,
             )
 
-            # Авто-мьютинг
-            mute_success = False
-            if enable_automuting and enable_deleting and ausure:
+            # Запись в БД выполняется в фоне, но входит в трассировку сообщения
+            trace = current_trace()
+            if trace is not None:
+                trace.hold()
+
+            async def record_verdict() -> None:
+                """Сохраняет вердикт и ставит уведомления отдельным действием (в фоне).
+
+                При повторе выполняется только запись, идемпотентная по
+                (chat_id, message_id); уведомления ставятся после успешной записи.
+                """
+                nonlocal trace
+                # Сохраняем спам-сообщение и увеличиваем счётчик нарушений одним запросом
                 try:
-                    await bot.restrict_chat_member(
-                        chat_id=chat_id,
-                        user_id=author_id,
-                        permissions=ChatPermissions(can_send_messages=False),
-                        until_date=until
-                    )
-                    logger.info(f"Пользователь {author_id} ограничен до {muted_until_str}")
-                    mute_success = True
-                except Exception as e:
-                    logger.error(f"Ошибка при ограничении {author_id}: {e}")
+                    with span('db', trace):
+                        relapse, until = await SpamRepository.record_spam_verdict(
+                            chat_id=chat_id,
+                            chat_pk=chat_pk,
+                            message_id=message.message_id,
+                            timestamp=current_timestamp,
+                            author_id=author_id,
+                            author_username=author_name,
+                            message_text=message_text,
+                            has_reply_markup=has_reply_markup,
+                            cas=analysis['cas'],
+                            lols=analysis['lols'],
+                            chatgpt_prediction=analysis['chatgpt'],
+                            bert_prediction=bert_score,
+                            first_until=first_until,
+                            second_until=second_until,
+                            repeat_until=repeat_until,
+                        )
+                finally:
+                    # Трассировка завершается после первой попытки записи
+                    if trace is not None:
+                        trace.release()
+                        trace = None
+                ReputationService.invalidate_spam_count(author_id)
+                ReputationService.invalidate_muted(chat_pk, author_id)
+
+                await SideEffectService.submit(
+                    lambda: notify(relapse, until),
+                    description=f"уведомление о спаме от {author_id} в чате {chat_id}",
+                )
 
-            # Отправляем уведомления
-            notification_thread = NotificationService.get_spam_thread(ausure, not_sure)
+            async def notify(relapse: int, until: Optional[float]) -> None:
+                """Отправляет уведомления о сохранённом вердикте (в фоне).
+
+                Аргументы:
+                    relapse (int): Номер нарушения из БД.
+                    until (Optional[float]): Срок ограничения из БД.
+                """
+                # Формируем уведомление
+                muted_until_str = None
+                if until and ausure and enable_automuting:
+                    muted_until_str = datetime.fromtimestamp(until).strftime("%d.%m.%Y %H:%M:%S")
+
+                from bot.notifications import format_spam_notification
+                notification_text = format_spam_notification(
+                    timestamp=current_timestamp,
+                    author_id=author_id,
+                    author_name=author_name,
+                    message_text=message_text,
+                    has_reply_markup=has_reply_markup,
+                    bert_score=bert_score,
+                    relapse_number=relapse,
+                    auto_deleted=auto_deleted,
+                    muted_until=muted_until_str,
+                    chat_title=message.chat.title or str(chat_id),
+                    chat_id=chat_id,
+                    reason=rule_reason,
+                )
 
-            if enable_automuting and enable_deleting and ausure and mute_success:
-                # Кнопка «Ограничить навсегда» даже при авто-мьютинге
-                if not already_forever_muted:
-                    forever_keyboard = create_spam_notification_keyboard(
+                # Отправляем уведомления
+                notification_thread = NotificationService.get_spam_thread(ausure, not_sure)
+
+                if enable_automuting and enable_deleting and ausure and mute_success:
+                    # Кнопка «Ограничить навсегда» даже при авто-мьютинге
+                    if not already_forever_muted:
+                        forever_keyboard = create_spam_notification_keyboard(
+                            message_id=message.message_id,
+                            user_id=author_id,
+                            chat_id=chat_id,
+                            include_delete=False,
+                            include_mute=False,
+                            include_not_spam=True,
+                            include_mute_forever=True,
+                            include_media_spam=confirmable_media,
+                        )
+                    elif confirmable_media:
+                        forever_keyboard = create_spam_notification_keyboard(
+                            message_id=message.message_id,
+                            user_id=author_id,
+                            chat_id=chat_id,
+                            include_delete=False,
+                            include_mute=False,
+                            include_not_spam=False,
+                            include_mute_forever=False,
+                            include_media_spam=True,
+                        )
+                    else:
+                        forever_keyboard = None
+                    await NotificationService.send_spam_notification(
+                        bot, notification_text, keyboard=forever_keyboard, thread_id=notification_thread
+                    )
+                    await NotificationService.send_mute_notification(
+                        bot, author_id, author_name, muted_until_str, relapse, chat_id
+                    )
+                else:
+                    keyboard = create_spam_notification_keyboard(
                         message_id=message.message_id,
                         user_id=author_id,
                         chat_id=chat_id,
-                        include_delete=False,
-                        include_mute=False,
+                        include_delete=not auto_deleted,
+                        include_mute=True,
                         include_not_spam=True,
-                        include_mute_forever=True,
+                        include_mute_forever=not already_forever_muted,
+                        include_media_spam=confirmable_media,
                     )
-                else:
-                    forever_keyboard = None
-                await NotificationService.send_spam_notification(
-                    bot, notification_text, keyboard=forever_keyboard, thread_id=notification_thread
-                )
-                await NotificationService.send_mute_notification(
-                    bot, author_id, author_name, muted_until_str, relapse, chat_id
-                )
-            else:
-                keyboard = create_spam_notification_keyboard(
-                    message_id=message.message_id,
-                    user_id=author_id,
-                    chat_id=chat_id,
-                    include_delete=not auto_deleted,
-                    include_mute=True,
-                    include_not_spam=True,
-                    include_mute_forever=not already_forever_muted,
-                )
-                await NotificationService.send_spam_notification(
-                    bot, notification_text, keyboard=keyboard, thread_id=notification_thread
-                )
+                    await NotificationService.send_spam_notification(
+                        bot, notification_text, keyboard=keyboard, thread_id=notification_thread
+                    )
+
+            await SideEffectService.submit(
+                record_verdict, description=f"запись спама от {author_id} в чате {chat_id}"
+            )
 
         except Exception as e:
             logger.error(f"Ошибка при обработке сообщения в чате {chat_id}: {e}")
 
+    @staticmethod
+    async def _enforce(
+        bot: Bot,
+        message: Message,
+        author_id: int,
+        delete: bool,
+        mute_until: Optional[float],
+        received: float,
+        album: Optional[List[Message]] = None
+    ) -> Tuple[bool, bool]:
+        """Удаляет спам-сообщение и ограничивает автора одновременно.
+
+        Сообщения альбома удаляются одним запросом deleteMessages.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            message (Message): Спам-сообщение.
+            author_id (int): Telegram ID автора.
+            delete (bool): Удалять ли сообщение.
+            mute_until (Optional[float]): Срок ограничения; None — не ограничивать.
+            received (float): Время начала обработки (time.monotonic()).
+            album (Optional[List[Message]]): Все сообщения альбома или None.
+
+        Возвращаемое значение:
+            Tuple[bool, bool]: (сообщение удалено, автор ограничен).
+        """
+        chat_id = message.chat.id
+
+        async def remove() -> bool:
+            if not delete:
+                return False
+            try:
+                with span('delete'):
+                    # Состав берётся на момент удаления: в него входят и опоздавшие
+                    # сообщения, а пришедшие позже удаляются при поступлении
+                    message_ids = (
+                        AlbumService.mark_deleted(chat_id, message.message_id)
+                        if album else [message.message_id]
+                    )
+                    if len(message_ids) > 1:
+                        await OutboxService.call(
+                            lambda: bot.delete_messages(chat_id=chat_id, message_ids=message_ids),
+                            description=f"удаление альбома {message.message_id} ({len(message_ids)} сообщений)"
+                        )
+                    else:
+                        await OutboxService.call(
+                            message.delete, description=f"удаление сообщения {message.message_id}"
+                        )
+            except Exception as e:
+                logger.error(f"Ошибка при автоматическом удалении: {e}")
+                return False
+            _removal_seconds.observe(time.monotonic() - received, since='received')
+            sent_at = ModerationService._sent_at(message)
+            if sent_at is not None:
+                _removal_seconds.observe(max(time.time() - sent_at, 0.0), since='sent')
+            logger.info(f"Сообщение от {author_id} автоматически удалено")
+            return True
+
+        async def restrict() -> bool:
+            if mute_until is None:
+                return False
+            try:
+                with span('restrict'):
+                    await OutboxService.call(
+                        lambda: bot.restrict_chat_member(
+                            chat_id=chat_id,
+                            user_id=author_id,
+                            permissions=ChatPermissions(can_send_messages=False),
+                            until_date=mute_until
+                        ),
+                        description=f"ограничение {author_id}",
+                    )
+            except Exception as e:
+                logger.error(f"Ошибка при ограничении {author_id}: {e}")
+                return False
+            logger.info(f"Пользователь {author_id} ограничен до {datetime.fromtimestamp(mute_until)}")
+            return True
+
+        deleted, muted = await asyncio.gather(remove(), restrict())
+        return deleted, muted
+
     @staticmethod
     def _determine_spam(
         analysis: Dict[str, Any],
@@ -1,10 +1,12 @@
 """Сервис уведомлений в чат управления.
 
 Отправляет уведомления о спаме и ограничениях в NOTIFICATION_CHAT_ID
-с inline-кнопками для ручных действий.
+с inline-кнопками для ручных действий. Уведомления ставятся в очередь
+OutboxService и отправляются с учётом лимитов Telegram, не задерживая
+обработку сообщений.
 """
 
-from typing import Optional
+from typing import Any, Optional
 
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup
@@ -17,7 +19,9 @@ from core.config import (
     NOTIFICATION_CHAT_MUTED_THREAD,
     NOTIFICATION_CHAT_WHITELIST_THREAD,
 )
+from core.config import LOG_DIGEST_WINDOW
 from core.logging import logger
+from bot.services.outbox import OutboxService, PRIORITY_LOG, PRIORITY_NOTIFICATION
 
 
 class NotificationService:
@@ -45,41 +49,79 @@ class NotificationService:
         bot: Bot,
         text: str,
         keyboard: Optional[InlineKeyboardMarkup] = None,
-        thread_id: Optional[int] = None
+        thread_id: Optional[int] = None,
+        priority: int = PRIORITY_NOTIFICATION
     ) -> bool:
-        """Отправляет уведомление о спаме в чат управления.
+        """Ставит уведомление о спаме в очередь отправки в чат управления.
 
         Аргументы:
             bot (Bot): Экземпляр бота.
             text (str): Текст уведомления.
             keyboard (Optional[InlineKeyboardMarkup]): Inline-клавиатура.
             thread_id (Optional[int]): ID треда.
+            priority (int): Приоритет в очереди (PRIORITY_LOG для лог-топика).
 
         Возвращаемое значение:
-            bool: True если отправлено успешно.
+            bool: True если уведомление поставлено в очередь.
         """
         if not NOTIFICATION_CHAT_ID:
             logger.error("NOTIFICATION_CHAT_ID не задан")
             return False
 
-        for attempt in range(3):
-            try:
-                await bot.send_message(
-                    chat_id=NOTIFICATION_CHAT_ID,
-                    text=text,
-                    parse_mode='HTML',
-                    reply_markup=keyboard,
-                    message_thread_id=thread_id
-                )
-                return True
-            except Exception as e:
-                logger.warning(f"Попытка {attempt + 1} отправки уведомления не удалась: {e}")
-                if attempt < 2:
-                    import asyncio
-                    await asyncio.sleep(1)
-
-        logger.error("Не удалось отправить уведомление после 3 попыток")
-        return False
+        return OutboxService.send(
+            lambda: bot.send_message(
+                chat_id=NOTIFICATION_CHAT_ID,
+                text=text,
+                parse_mode='HTML',
+                reply_markup=keyboard,
+                message_thread_id=thread_id
+            ),
+            chat_id=NOTIFICATION_CHAT_ID,
+            priority=priority,
+            description=f"уведомление в тред {thread_id}",
+        )
+
+    @staticmethod
+    async def send_log_notification(
+        bot: Bot,
+        thread_id: int,
+        keyboard: Optional[InlineKeyboardMarkup] = None,
+        **fields: Any
+    ) -> bool:
+        """Логирует сообщение в лог-топик чата управления.
+
+        При LOG_DIGEST_WINDOW > 0 запись добавляется в дайджест топика,
+        иначе отправляется отдельным сообщением.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            thread_id (int): ID лог-топика.
+            keyboard (Optional[InlineKeyboardMarkup]): Клавиатура записи.
+            **fields: Аргументы format_log_notification и message_id.
+
+        Возвращаемое значение:
+            bool: True если запись принята к отправке.
+        """
+        if not NOTIFICATION_CHAT_ID:
+            logger.error("NOTIFICATION_CHAT_ID не задан")
+            return False
+
+        if LOG_DIGEST_WINDOW > 0:
+            from bot.notifications import format_log_digest_entry
+            from bot.services.digest import LogDigestService
+
+            LogDigestService.add(
+                bot, NOTIFICATION_CHAT_ID, thread_id, format_log_digest_entry(**fields), keyboard
+            )
+            return True
+
+        from bot.notifications import format_log_notification
+
+        fields.pop('message_id', None)
+        return await NotificationService.send_spam_notification(
+            bot, format_log_notification(**fields), keyboard=keyboard,
+            thread_id=thread_id, priority=PRIORITY_LOG
+        )
 
     @staticmethod
     async def send_mute_notification(
@@ -88,7 +130,8 @@ class NotificationService:
         username: Optional[str],
         muted_until: Optional[str],
         relapse: int,
-        chat_id: Optional[int] = None
+        chat_id: Optional[int] = None,
+        reason: Optional[str] = None
     ) -> bool:
         """Отправляет уведомление об ограничении пользователя.
 
@@ -99,9 +142,10 @@ class NotificationService:
             muted_until (Optional[str]): До какого времени ограничен.
             relapse (int): Номер нарушения.
             chat_id (Optional[int]): ID чата, где ограничен пользователь.
+            reason (Optional[str]): Причина ограничения.
 
         Возвращаемое значение:
-            bool: True если отправлено успешно.
+            bool: True если уведомление поставлено в очередь.
         """
         if not NOTIFICATION_CHAT_ID:
             return False
@@ -116,21 +160,22 @@ class NotificationService:
         )
         if muted_until:
             text += f"Ограничен до: {muted_until}\n"
+        if reason:
+            text += f"Причина: {reason}\n"
 
         keyboard = create_unmute_keyboard(user_id, chat_id) if chat_id else None
 
-        try:
-            await bot.send_message(
+        return OutboxService.send(
+            lambda: bot.send_message(
                 chat_id=NOTIFICATION_CHAT_ID,
                 text=text,
                 parse_mode='HTML',
                 reply_markup=keyboard,
                 message_thread_id=NOTIFICATION_CHAT_MUTED_THREAD
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка отправки уведомления об ограничении: {e}")
-            return False
+            ),
+            chat_id=NOTIFICATION_CHAT_ID,
+            description=f"уведомление об ограничении {user_id}",
+        )
 
     @staticmethod
     async def send_whitelist_notification(
@@ -156,7 +201,7 @@ class NotificationService:
             chat_title (Optional[str]): Название чата.
 
         Возвращаемое значение:
-            bool: True если отправлено успешно.
+            bool: True если уведомление поставлено в очередь.
         """
         if not NOTIFICATION_CHAT_ID:
             return False
@@ -177,15 +222,14 @@ class NotificationService:
         )
         keyboard = create_unwhitelist_keyboard(user_id, chat_id)
 
-        try:
-            await bot.send_message(
+        return OutboxService.send(
+            lambda: bot.send_message(
                 chat_id=NOTIFICATION_CHAT_ID,
                 text=text,
                 parse_mode='HTML',
                 reply_markup=keyboard,
                 message_thread_id=NOTIFICATION_CHAT_WHITELIST_THREAD
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка отправки вайтлист-уведомления: {e}")
-            return False
+            ),
+            chat_id=NOTIFICATION_CHAT_ID,
+            description=f"вайтлист-уведомление {user_id}",
+        )
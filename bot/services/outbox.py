@@ -0,0 +1,494 @@
+"""Очередь исходящих запросов к Telegram с ограничением частоты.
+
+Удаления, ограничения и уведомления проходят через общую очередь
+вместо прямых вызовов из обработчика сообщений. Частота ограничивается
+двумя уровнями token bucket:
+    общий    — OUTBOX_GLOBAL_RATE запросов в секунду на весь бот;
+    по чату  — OUTBOX_CHAT_RATE сообщений в минуту в один чат
+               (всплеск до OUTBOX_CHAT_BURST), только для отправки сообщений.
+
+Из готовых к отправке запросов первым выполняется запрос с высшим
+приоритетом: действия (удаление, ограничение), затем уведомления,
+затем сообщения лог-топика. При переполнении очереди (OUTBOX_QUEUE_LIMIT)
+отбрасываются только сообщения лог-топика.
+
+При TelegramRetryAfter чат (для действий — вся очередь) приостанавливается
+на указанное Telegram время, но не меньше экспоненциальной паузы;
+сетевые и серверные ошибки повторяются с той же паузой до OUTBOX_MAX_RETRIES
+раз. При остановке бота очередь отправляется в течение OUTBOX_DRAIN_TIMEOUT.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from core.config import (
+    OUTBOX_BACKOFF_MAX,
+    OUTBOX_CHAT_BURST,
+    OUTBOX_CHAT_RATE,
+    OUTBOX_CONCURRENCY,
+    OUTBOX_DRAIN_TIMEOUT,
+    OUTBOX_GLOBAL_RATE,
+    OUTBOX_MAX_RETRIES,
+    OUTBOX_QUEUE_LIMIT,
+)
+from core.logging import logger
+from core.metrics import counter, gauge, histogram
+
+# Приоритеты (меньше — раньше)
+PRIORITY_ACTION = 0
+PRIORITY_NOTIFICATION = 1
+PRIORITY_LOG = 2
+
+_PRIORITY_NAMES = {
+    PRIORITY_ACTION: 'action',
+    PRIORITY_NOTIFICATION: 'notification',
+    PRIORITY_LOG: 'log',
+}
+
+# Начальная пауза перед повтором (секунды), удваивается с каждой попыткой
+_BACKOFF_BASE = 1.0
+
+_queue_depth = gauge(
+    'antispam_outbox_queue_depth',
+    'Запросы к Telegram, ожидающие отправки, по приоритету',
+    ('priority',),
+)
+_requests_total = counter(
+    'antispam_outbox_requests_total',
+    'Запросы к Telegram по приоритету и результату',
+    ('priority', 'outcome'),
+)
+_retries_total = counter(
+    'antispam_outbox_retries_total',
+    'Повторы запросов к Telegram по причине',
+    ('reason',),
+)
+_wait_seconds = histogram(
+    'antispam_outbox_wait_seconds',
+    'Время от постановки запроса в очередь до его выполнения',
+    ('priority',),
+)
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Создаёт заполненный bucket.
+
+        Аргументы:
+            rate (float): Скорость пополнения (токенов в секунду).
+            capacity (float): Максимум токенов.
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        """Пополняет токены за прошедшее время.
+
+        Аргументы:
+            now (float): Текущее время (time.monotonic()).
+        """
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Возвращает время до появления токена.
+
+        Аргументы:
+            now (float): Текущее время (time.monotonic()).
+
+        Возвращаемое значение:
+            float: Секунды ожидания; 0 — токен доступен.
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Забирает токен. Вызывается только после delay() == 0.
+
+        Аргументы:
+            now (float): Текущее время (time.monotonic()).
+        """
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def block(self, until: float) -> None:
+        """Запрещает выдачу токенов до указанного времени.
+
+        Аргументы:
+            until (float): Время окончания паузы (time.monotonic()).
+        """
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class _Request:
+    """Запрос в очереди."""
+
+    __slots__ = ('factory', 'chat_id', 'priority', 'description', 'future', 'attempts', 'enqueued')
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        chat_id: Optional[int],
+        priority: int,
+        description: str,
+        future: Optional[asyncio.Future]
+    ) -> None:
+        self.factory = factory
+        self.chat_id = chat_id
+        self.priority = priority
+        self.description = description
+        self.future = future
+        self.attempts = 0
+        self.enqueued = time.monotonic()
+
+
+class OutboxService:
+    """Приоритетная очередь исходящих запросов с ограничением частоты."""
+
+    # chat_id (None — действия без лимита по чату) -> куча (priority, seq, request)
+    _queues: Dict[Optional[int], List[Tuple[int, int, _Request]]] = {}
+    _buckets: Dict[int, TokenBucket] = {}
+    _global_bucket: TokenBucket = TokenBucket(OUTBOX_GLOBAL_RATE, OUTBOX_GLOBAL_RATE)
+    _seq = itertools.count()
+    _size: int = 0
+    _in_flight: Set[asyncio.Task] = set()
+    _slots: Optional[asyncio.Semaphore] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _dispatch_task: Optional[asyncio.Task] = None
+    _stopping: bool = False
+
+    @staticmethod
+    def send(
+        factory: Callable[[], Awaitable[Any]],
+        chat_id: Optional[int] = None,
+        priority: int = PRIORITY_NOTIFICATION,
+        description: str = ''
+    ) -> bool:
+        """Ставит запрос в очередь, не дожидаясь выполнения.
+
+        Ошибки выполнения логируются.
+
+        Аргументы:
+            factory (Callable[[], Awaitable[Any]]): Функция, создающая корутину запроса.
+            chat_id (Optional[int]): Чат-получатель сообщения; None — без лимита по чату.
+            priority (int): Приоритет (PRIORITY_*).
+            description (str): Описание для логов.
+
+        Возвращаемое значение:
+            bool: False, если очередь переполнена и запрос отброшен.
+        """
+        return OutboxService._enqueue(_Request(factory, chat_id, priority, description, None))
+
+    @staticmethod
+    async def call(
+        factory: Callable[[], Awaitable[Any]],
+        chat_id: Optional[int] = None,
+        priority: int = PRIORITY_ACTION,
+        description: str = ''
+    ) -> Any:
+        """Ставит запрос в очередь и ожидает результат.
+
+        Аргументы:
+            factory (Callable[[], Awaitable[Any]]): Функция, создающая корутину запроса.
+            chat_id (Optional[int]): Чат-получатель сообщения; None — без лимита по чату.
+            priority (int): Приоритет (PRIORITY_*).
+            description (str): Описание для логов.
+
+        Возвращаемое значение:
+            Any: Результат запроса.
+
+        Исключения:
+            Exception: Ошибка запроса после всех повторов.
+        """
+        if OutboxService._dispatch_task is None:
+            return await factory()
+
+        future = asyncio.get_running_loop().create_future()
+        OutboxService._enqueue(_Request(factory, chat_id, priority, description, future))
+        return await future
+
+    @staticmethod
+    def _enqueue(request: _Request) -> bool:
+        """Добавляет запрос в очередь чата.
+
+        Если очередь не запущена, запрос выполняется сразу.
+
+        Аргументы:
+            request (_Request): Запрос.
+
+        Возвращаемое значение:
+            bool: False, если запрос отброшен.
+        """
+        if OutboxService._dispatch_task is None:
+            asyncio.ensure_future(OutboxService._run_direct(request))
+            return True
+
+        priority_name = _PRIORITY_NAMES[request.priority]
+        if request.priority == PRIORITY_LOG and OutboxService._size >= OUTBOX_QUEUE_LIMIT:
+            _requests_total.inc(priority=priority_name, outcome='dropped')
+            return False
+
+        queue = OutboxService._queues.setdefault(request.chat_id, [])
+        heapq.heappush(queue, (request.priority, next(OutboxService._seq), request))
+        OutboxService._size += 1
+        _queue_depth.inc(priority=priority_name)
+        OutboxService._wakeup.set()
+        return True
+
+    @staticmethod
+    async def _run_direct(request: _Request) -> None:
+        """Выполняет запрос без очереди (очередь не запущена или остановлена).
+
+        Аргументы:
+            request (_Request): Запрос.
+        """
+        try:
+            await request.factory()
+        except Exception as e:
+            logger.error(f"Ошибка запроса к Telegram ({request.description}): {e}")
+
+    @staticmethod
+    def _bucket(chat_id: int) -> TokenBucket:
+        """Возвращает token bucket чата, создавая при первом обращении.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+
+        Возвращаемое значение:
+            TokenBucket: Bucket чата.
+        """
+        bucket = OutboxService._buckets.get(chat_id)
+        if bucket is None:
+            bucket = OutboxService._buckets[chat_id] = TokenBucket(OUTBOX_CHAT_RATE / 60, OUTBOX_CHAT_BURST)
+        return bucket
+
+    @staticmethod
+    def _next(now: float) -> Tuple[Optional[_Request], Optional[float]]:
+        """Выбирает следующий запрос, который можно выполнить сейчас.
+
+        Аргументы:
+            now (float): Текущее время (time.monotonic()).
+
+        Возвращаемое значение:
+            Tuple[Optional[_Request], Optional[float]]: (запрос, None) или
+            (None, секунды до появления готового запроса; None — очередь пуста).
+
+        Алгоритм работы:
+            1. Для каждого чата с запросами проверить его bucket.
+            2. Среди готовых чатов выбрать запрос с наименьшим (приоритет, номер).
+            3. Проверить общий bucket и забрать токены.
+        """
+        best = None
+        best_key = None
+        wait: Optional[float] = None
+
+        for chat_id, queue in OutboxService._queues.items():
+            if not queue:
+                continue
+            if chat_id is None:
+                delay = 0.0
+            else:
+                delay = OutboxService._bucket(chat_id).delay(now)
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            if best is None or queue[0][:2] < best[:2]:
+                best = queue[0]
+                best_key = chat_id
+
+        if best is None:
+            return None, wait
+
+        global_delay = OutboxService._global_bucket.delay(now)
+        if global_delay > 0:
+            return None, global_delay
+
+        heapq.heappop(OutboxService._queues[best_key])
+        OutboxService._size -= 1
+        OutboxService._global_bucket.take(now)
+        if best_key is not None:
+            OutboxService._bucket(best_key).take(now)
+        return best[2], None
+
+    @staticmethod
+    async def start() -> None:
+        """Запускает обработку очереди."""
+        if OutboxService._dispatch_task is not None:
+            logger.info('Очередь запросов к Telegram уже запущена')
+            return
+
+        OutboxService._stopping = False
+        OutboxService._wakeup = asyncio.Event()
+        OutboxService._slots = asyncio.Semaphore(OUTBOX_CONCURRENCY)
+        OutboxService._dispatch_task = asyncio.create_task(OutboxService._dispatch_loop())
+        logger.info(
+            f'Очередь запросов к Telegram запущена '
+            f'({OUTBOX_GLOBAL_RATE:g}/с всего, {OUTBOX_CHAT_RATE:g}/мин на чат)'
+        )
+
+    @staticmethod
+    async def _dispatch_loop() -> None:
+        """Цикл выдачи запросов с учётом лимитов и приоритетов.
+
+        Завершается после остановки, когда очередь и выполняемые запросы пусты.
+        """
+        wakeup = OutboxService._wakeup
+        slots = OutboxService._slots
+        while True:
+            wakeup.clear()
+            request, wait = OutboxService._next(time.monotonic())
+
+            if request is None:
+                if OutboxService._stopping and OutboxService._size == 0 and not OutboxService._in_flight:
+                    return
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _queue_depth.dec(priority=_PRIORITY_NAMES[request.priority])
+            await slots.acquire()
+            task = asyncio.create_task(OutboxService._execute(request))
+            OutboxService._in_flight.add(task)
+
+    @staticmethod
+    async def _execute(request: _Request) -> None:
+        """Выполняет запрос; при временной ошибке возвращает его в очередь.
+
+        Аргументы:
+            request (_Request): Запрос.
+        """
+        priority_name = _PRIORITY_NAMES[request.priority]
+        try:
+            _wait_seconds.observe(time.monotonic() - request.enqueued, priority=priority_name)
+            try:
+                result = await request.factory()
+            except asyncio.CancelledError:
+                # Остановка по истечении OUTBOX_DRAIN_TIMEOUT
+                if request.future is not None and not request.future.done():
+                    request.future.cancel()
+                raise
+            except TelegramRetryAfter as e:
+                OutboxService._retry(request, 'retry_after', e, e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                OutboxService._retry(request, 'error', e)
+            except Exception as e:
+                OutboxService._fail(request, e)
+            else:
+                _requests_total.inc(priority=priority_name, outcome='ok')
+                if request.future is not None and not request.future.done():
+                    request.future.set_result(result)
+        finally:
+            OutboxService._in_flight.discard(asyncio.current_task())
+            OutboxService._slots.release()
+            OutboxService._wakeup.set()
+
+    @staticmethod
+    def _retry(request: _Request, reason: str, error: Exception, retry_after: float = 0.0) -> None:
+        """Возвращает запрос в очередь с паузой или завершает его ошибкой.
+
+        Пауза равна max(retry_after, 2^попытка секунд) и применяется ко всему
+        чату-получателю (для действий — ко всей очереди).
+
+        Аргументы:
+            request (_Request): Запрос.
+            reason (str): Причина повтора (метка метрики).
+            error (Exception): Ошибка запроса.
+            retry_after (float): Пауза, запрошенная Telegram (секунды).
+        """
+        request.attempts += 1
+        if request.attempts > OUTBOX_MAX_RETRIES:
+            OutboxService._fail(request, error)
+            return
+
+        backoff = min(_BACKOFF_BASE * 2 ** (request.attempts - 1), OUTBOX_BACKOFF_MAX)
+        pause = max(retry_after, backoff)
+        until = time.monotonic() + pause
+        if request.chat_id is None:
+            OutboxService._global_bucket.block(until)
+        else:
+            OutboxService._bucket(request.chat_id).block(until)
+
+        _retries_total.inc(reason=reason)
+        logger.warning(
+            f"Повтор запроса к Telegram ({request.description}) через {pause:.1f}с, "
+            f"попытка {request.attempts}: {error}"
+        )
+
+        queue = OutboxService._queues.setdefault(request.chat_id, [])
+        heapq.heappush(queue, (request.priority, next(OutboxService._seq), request))
+        OutboxService._size += 1
+        _queue_depth.inc(priority=_PRIORITY_NAMES[request.priority])
+
+    @staticmethod
+    def _fail(request: _Request, error: Exception) -> None:
+        """Завершает запрос ошибкой.
+
+        Аргументы:
+            request (_Request): Запрос.
+            error (Exception): Ошибка запроса.
+        """
+        _requests_total.inc(priority=_PRIORITY_NAMES[request.priority], outcome='error')
+        if request.future is not None:
+            if not request.future.done():
+                request.future.set_exception(error)
+        else:
+            logger.error(f"Ошибка запроса к Telegram ({request.description}): {error}")
+
+    @staticmethod
+    async def stop() -> None:
+        """Отправляет оставшиеся запросы и останавливает очередь.
+
+        Запросы, не отправленные за OUTBOX_DRAIN_TIMEOUT секунд, отбрасываются.
+        """
+        task = OutboxService._dispatch_task
+        if task is None:
+            return
+
+        OutboxService._stopping = True
+        OutboxService._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=OUTBOX_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            task.cancel()
+            for in_flight in list(OutboxService._in_flight):
+                in_flight.cancel()
+            await asyncio.gather(task, *OutboxService._in_flight, return_exceptions=True)
+
+        dropped = OutboxService._size
+        for queue in OutboxService._queues.values():
+            for priority, _, request in queue:
+                _requests_total.inc(priority=_PRIORITY_NAMES[priority], outcome='dropped')
+                if request.future is not None and not request.future.done():
+                    request.future.cancel()
+        OutboxService._queues.clear()
+        OutboxService._size = 0
+        for priority_name in _PRIORITY_NAMES.values():
+            _queue_depth.set(0, priority=priority_name)
+
+        OutboxService._dispatch_task = None
+        OutboxService._wakeup = None
+        OutboxService._slots = None
+        if dropped:
+            logger.warning(f'Не отправлено запросов к Telegram при остановке: {dropped}')
+        logger.info('Очередь запросов к Telegram остановлена')
@@ -0,0 +1,324 @@
+"""Сервис репутации пользователей.
+
+При вступлении пользователя в наблюдаемый чат в фоне выполняются все
+проверки, нужные для модерации его первого сообщения: CAS, LOLS, белый
+список, запись об ограничениях и межчатовая репутация (число спам-сообщений
+во всех чатах). Результаты кешируются, поэтому к моменту первого сообщения
+обработчик получает их без обращения к сети и БД.
+
+Известные спамеры могут быть ограничены сразу при вступлении
+(per-chat настройка RESTRICT_ON_JOIN).
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from aiogram import Bot
+from aiogram.types import ChatPermissions
+
+from core.cache import TTLCache
+from core.chat_registry import ChatRegistry
+from core.config import REPUTATION_CACHE_SIZE, REPUTATION_CACHE_TTL, SYSTEM_USER_IDS
+from core.logging import logger
+from core.metrics import counter
+from core.repository.muted import MutedRepository
+from core.repository.settings import SettingsRepository
+from core.repository.spam import SpamRepository
+
+# Время, в течение которого повторное событие о вступлении игнорируется (секунды).
+# Telegram присылает и chat_member, и сервисное сообщение new_chat_members.
+_JOIN_DEDUP_TTL = 60
+
+# Ограничение «навсегда» — 01.01.2100
+_FOREVER_TIMESTAMP = 4102455600.0
+
+_joins_total = counter(
+    'antispam_reputation_joins_total',
+    'Вступления пользователей в наблюдаемые чаты по результату проверки',
+    ('outcome',),
+)
+
+
+class ReputationService:
+    """Сервис фоновых проверок репутации и кеша per-user данных."""
+
+    # (chat_pk, user_id) -> (запись muted_user или None,)
+    _muted_cache: TTLCache = TTLCache(REPUTATION_CACHE_SIZE, REPUTATION_CACHE_TTL)
+    # user_id -> число спам-сообщений во всех чатах
+    _spam_count_cache: TTLCache = TTLCache(REPUTATION_CACHE_SIZE, REPUTATION_CACHE_TTL)
+    # (chat_id, user_id) -> True, недавно обработанные вступления
+    _recent_joins: TTLCache = TTLCache(REPUTATION_CACHE_SIZE, _JOIN_DEDUP_TTL)
+    # Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+    _tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    async def get_muted(chat_pk: int, user_id: int) -> Optional[dict]:
+        """Возвращает запись об ограничениях пользователя с кешированием.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+
+        Возвращаемое значение:
+            Optional[dict]: Запись muted_user или None.
+        """
+        key = (chat_pk, user_id)
+        cached = ReputationService._muted_cache.get(key)
+        if cached is not None:
+            return cached[0]
+        muted = await MutedRepository.get_muted_user(chat_pk, user_id)
+        ReputationService._muted_cache.set(key, (muted,))
+        return muted
+
+    @staticmethod
+    def prime_muted(chat_pk: int, user_id: int, muted: Optional[dict]) -> None:
+        """Сохраняет в кеш запись об ограничениях, загруженную другим запросом.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+            muted (Optional[dict]): Запись muted_user или None.
+        """
+        ReputationService._muted_cache.set((chat_pk, user_id), (muted,))
+
+    @staticmethod
+    async def is_whitelisted(chat_pk: int, user_id: int) -> bool:
+        """Проверяет белый список чата по реестру чатов.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+
+        Возвращаемое значение:
+            bool: True если пользователь в белом списке.
+        """
+        return await ChatRegistry.is_whitelisted(chat_pk, user_id)
+
+    @staticmethod
+    async def get_spam_count(user_id: int) -> int:
+        """Возвращает число спам-сообщений пользователя во всех чатах с кешированием.
+
+        Аргументы:
+            user_id (int): Telegram ID пользователя.
+
+        Возвращаемое значение:
+            int: Количество спам-сообщений.
+        """
+        cached = ReputationService._spam_count_cache.get(user_id)
+        if cached is not None:
+            return cached
+        count = await SpamRepository.get_author_spam_count(user_id)
+        ReputationService._spam_count_cache.set(user_id, count)
+        return count
+
+    @staticmethod
+    def invalidate_muted(chat_pk: int, user_id: int) -> None:
+        """Сбрасывает кеш ограничений пользователя после изменения в БД.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+        """
+        ReputationService._muted_cache.pop((chat_pk, user_id))
+
+    @staticmethod
+    def invalidate_spam_count(user_id: int) -> None:
+        """Сбрасывает кеш межчатовой репутации после нового спам-сообщения.
+
+        Аргументы:
+            user_id (int): Telegram ID пользователя.
+        """
+        ReputationService._spam_count_cache.pop(user_id)
+
+    @staticmethod
+    async def warm(chat_pk: int, user_id: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Параллельно выполняет все проверки пользователя и заполняет кеши.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+            settings (Dict[str, Any]): Настройки чата.
+
+        Возвращаемое значение:
+            Dict[str, Any]: Результаты с ключами cas, lols, whitelisted, muted, spam_count.
+        """
+        from bot.services.external_apis import check_cas, check_lols
+
+        async def _skipped() -> None:
+            return None
+
+        cas, lols, whitelisted, muted, spam_count = await asyncio.gather(
+            check_cas(user_id) if settings.get('CHECK_CAS', False) else _skipped(),
+            check_lols(user_id) if settings.get('CHECK_LOLS', False) else _skipped(),
+            ReputationService.is_whitelisted(chat_pk, user_id),
+            ReputationService.get_muted(chat_pk, user_id),
+            ReputationService.get_spam_count(user_id),
+        )
+        return {
+            'cas': cas,
+            'lols': lols,
+            'whitelisted': whitelisted,
+            'muted': muted,
+            'spam_count': spam_count,
+        }
+
+    @staticmethod
+    def is_known_spammer(reputation: Dict[str, Any], settings: Dict[str, Any]) -> bool:
+        """Определяет, является ли пользователь известным спамером.
+
+        Аргументы:
+            reputation (Dict[str, Any]): Результат warm().
+            settings (Dict[str, Any]): Настройки чата.
+
+        Возвращаемое значение:
+            bool: True если пользователь в CAS/LOLS или превысил порог спам-сообщений.
+        """
+        if reputation.get('whitelisted'):
+            return False
+        if reputation.get('cas') or reputation.get('lols'):
+            return True
+        threshold = settings.get('REPUTATION_SPAM_THRESHOLD', 0)
+        return bool(threshold) and reputation.get('spam_count', 0) >= threshold
+
+    @staticmethod
+    def schedule_join_check(
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        username: Optional[str],
+        is_bot: bool = False
+    ) -> None:
+        """Запускает фоновую проверку вступившего пользователя.
+
+        Повторные события о том же вступлении в течение _JOIN_DEDUP_TTL
+        секунд игнорируются.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): Telegram ID чата.
+            user_id (int): Telegram ID пользователя.
+            username (Optional[str]): Username.
+            is_bot (bool): Является ли пользователь ботом.
+        """
+        if is_bot or user_id in SYSTEM_USER_IDS:
+            return
+
+        key = (chat_id, user_id)
+        if key in ReputationService._recent_joins:
+            return
+        ReputationService._recent_joins.set(key, True)
+
+        task = asyncio.create_task(
+            ReputationService._process_join(bot, chat_id, user_id, username)
+        )
+        ReputationService._tasks.add(task)
+        task.add_done_callback(ReputationService._tasks.discard)
+
+    @staticmethod
+    async def _process_join(bot: Bot, chat_id: int, user_id: int, username: Optional[str]) -> None:
+        """Проверяет вступившего пользователя и при необходимости ограничивает его.
+
+        Алгоритм работы:
+            1. Проверить, что чат наблюдаемый, и загрузить его настройки.
+            2. Выполнить все проверки и заполнить кеши.
+            3. Если пользователь — известный спамер и включён RESTRICT_ON_JOIN,
+               ограничить его навсегда.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): Telegram ID чата.
+            user_id (int): Telegram ID пользователя.
+            username (Optional[str]): Username.
+        """
+        try:
+            chat_pk = await ChatRegistry.get_chat_pk(chat_id)
+            if chat_pk is None:
+                return
+
+            settings = await SettingsRepository.get_all_chat_settings(chat_pk)
+            reputation = await ReputationService.warm(chat_pk, user_id, settings)
+
+            if not ReputationService.is_known_spammer(reputation, settings):
+                _joins_total.inc(outcome='clean')
+                return
+
+            logger.info(
+                f"Известный спамер {user_id} вступил в чат {chat_id} "
+                f"(cas={reputation['cas']}, lols={reputation['lols']}, "
+                f"spam_count={reputation['spam_count']})"
+            )
+
+            if not settings.get('RESTRICT_ON_JOIN', False):
+                _joins_total.inc(outcome='spammer')
+                return
+
+            await ReputationService._restrict_on_join(
+                bot, chat_id, chat_pk, user_id, username, reputation
+            )
+            _joins_total.inc(outcome='restricted')
+        except Exception as e:
+            _joins_total.inc(outcome='error')
+            logger.error(f"Ошибка проверки вступившего пользователя {user_id} в чате {chat_id}: {e}")
+
+    @staticmethod
+    async def _restrict_on_join(
+        bot: Bot,
+        chat_id: int,
+        chat_pk: int,
+        user_id: int,
+        username: Optional[str],
+        reputation: Dict[str, Any]
+    ) -> None:
+        """Ограничивает известного спамера навсегда и уведомляет чат управления.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            chat_id (int): Telegram ID чата.
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+            username (Optional[str]): Username.
+            reputation (Dict[str, Any]): Результат warm().
+        """
+        muted = reputation['muted']
+        if muted and (muted.get('muted_till_timestamp') or 0) >= _FOREVER_TIMESTAMP:
+            return
+
+        from bot.services.outbox import OutboxService
+        await OutboxService.call(
+            lambda: bot.restrict_chat_member(
+                chat_id=chat_id,
+                user_id=user_id,
+                permissions=ChatPermissions(can_send_messages=False),
+                until_date=_FOREVER_TIMESTAMP
+            ),
+            description=f"ограничение {user_id} при вступлении",
+        )
+
+        current_timestamp = datetime.now().timestamp()
+        if muted:
+            await MutedRepository.update_muted_user(
+                chat_pk, user_id, current_timestamp, _FOREVER_TIMESTAMP, 999
+            )
+        else:
+            await MutedRepository.create_muted_user(
+                chat_pk, user_id, username, current_timestamp, _FOREVER_TIMESTAMP, 999
+            )
+        ReputationService.invalidate_muted(chat_pk, user_id)
+
+        reasons = []
+        if reputation['cas']:
+            reasons.append('CAS')
+        if reputation['lols']:
+            reasons.append('LOLS')
+        if not reasons:
+            reasons.append(f"{reputation['spam_count']} спам-сообщений во всех чатах")
+
+        until_str = datetime.fromtimestamp(_FOREVER_TIMESTAMP).strftime("%d.%m.%Y %H:%M:%S")
+        logger.info(f"Пользователь {user_id} ограничен при вступлении в чат {chat_id}")
+
+        from bot.services.notifications import NotificationService
+        await NotificationService.send_mute_notification(
+            bot, user_id, username, until_str, 999, chat_id,
+            reason=f"вступление в чат, {', '.join(reasons)}"
+        )
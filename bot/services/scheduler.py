@@ -0,0 +1,171 @@
+"""Справедливое распределение ресурсов анализа между чатами.
+
+Один чат во время рейда может занять все слоты анализа (BERT и внешние
+проверки) и задержать модерацию во всех остальных чатах. FairScheduler
+выдаёт слоты по алгоритму взвешенной справедливой очереди (start-time
+fair queuing): каждому запросу присваивается виртуальное время окончания
+start + 1 / share, и свободный слот получает запрос с наименьшим значением.
+
+Доля чата (share) задаётся per-chat настройкой INFERENCE_SHARE. Планировщик
+не резервирует ёмкость: пока другие чаты молчат, один чат может занять
+все слоты, а при появлении конкурентов их запросы обслуживаются
+пропорционально долям.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List, Tuple
+
+from core.config import EXTERNAL_CHECK_CONCURRENCY, INFERENCE_WORKERS
+from core.metrics import gauge, histogram
+
+_wait_seconds = histogram(
+    'antispam_inference_wait_seconds',
+    'Ожидание слота анализа по этапу и чату',
+    ('stage', 'chat_id'),
+)
+_queue_depth = gauge(
+    'antispam_inference_queue_depth',
+    'Запросы, ожидающие слота анализа, по этапу',
+    ('stage',),
+)
+_busy_slots = gauge(
+    'antispam_inference_busy_slots',
+    'Занятые слоты анализа по этапу',
+    ('stage',),
+)
+
+# Минимальная доля: нулевая или отрицательная настройка не должна останавливать чат
+_MIN_SHARE = 0.01
+
+
+class FairScheduler:
+    """Взвешенная справедливая очередь с фиксированным числом слотов."""
+
+    def __init__(self, stage: str, capacity: int) -> None:
+        """Создаёт планировщик.
+
+        Аргументы:
+            stage (str): Название этапа анализа (метка метрик).
+            capacity (int): Количество одновременно выдаваемых слотов.
+        """
+        self.stage = stage
+        self._capacity = max(capacity, 1)
+        self._busy = 0
+        # (finish, seq, start, key, future)
+        self._heap: List[Tuple[float, int, float, Hashable, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[Hashable, float] = {}
+
+    def _tag(self, key: Hashable, share: float) -> Tuple[float, float]:
+        """Вычисляет виртуальные времена начала и окончания запроса.
+
+        Аргументы:
+            key (Hashable): Ключ потока (чат).
+            share (float): Доля потока.
+
+        Возвращаемое значение:
+            Tuple[float, float]: (start, finish).
+        """
+        start = max(self._virtual_time, self._last_finish.get(key, 0.0))
+        finish = start + 1.0 / max(share, _MIN_SHARE)
+        self._last_finish[key] = finish
+        return start, finish
+
+    @property
+    def waiting(self) -> int:
+        """Количество запросов, ожидающих слот."""
+        return len(self._heap)
+
+    async def acquire(self, key: Hashable, share: float = 1.0) -> None:
+        """Ожидает слот для запроса потока key.
+
+        Аргументы:
+            key (Hashable): Ключ потока (чат).
+            share (float): Доля потока.
+        """
+        enqueued = time.monotonic()
+        start, finish = self._tag(key, share)
+
+        if self._busy < self._capacity and not self._heap:
+            self._busy += 1
+            self._virtual_time = start
+            _busy_slots.set(self._busy, stage=self.stage)
+            _wait_seconds.observe(0.0, stage=self.stage, chat_id=key)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (finish, next(self._seq), start, key, future))
+        _queue_depth.set(len(self._heap), stage=self.stage)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот мог быть передан одновременно с отменой — вернуть его
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+        _wait_seconds.observe(time.monotonic() - enqueued, stage=self.stage, chat_id=key)
+
+    def release(self) -> None:
+        """Освобождает слот и передаёт его следующему запросу очереди."""
+        while self._heap:
+            _, _, start, _, future = heapq.heappop(self._heap)
+            if future.done():
+                # Запрос отменён, пока ожидал в очереди
+                continue
+            self._virtual_time = start
+            future.set_result(None)
+            _queue_depth.set(len(self._heap), stage=self.stage)
+            return
+
+        self._busy -= 1
+        _queue_depth.set(0, stage=self.stage)
+        _busy_slots.set(self._busy, stage=self.stage)
+        if self._busy == 0:
+            # Система простаивает: накопленные виртуальные времена больше не нужны
+            self._last_finish.clear()
+            self._virtual_time = 0.0
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable, share: float = 1.0) -> AsyncIterator[None]:
+        """Контекстный менеджер: занимает слот на время блока.
+
+        Аргументы:
+            key (Hashable): Ключ потока (чат).
+            share (float): Доля потока.
+        """
+        await self.acquire(key, share)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_schedulers: Dict[str, FairScheduler] = {}
+
+# Количество слотов по этапам анализа
+_CAPACITIES = {
+    'bert': INFERENCE_WORKERS,
+    'external': EXTERNAL_CHECK_CONCURRENCY,
+}
+
+
+def get_scheduler(stage: str) -> FairScheduler:
+    """Возвращает планировщик этапа анализа, создавая при первом вызове.
+
+    Аргументы:
+        stage (str): Этап: 'bert' или 'external'.
+
+    Возвращаемое значение:
+        FairScheduler: Планировщик этапа.
+    """
+    scheduler = _schedulers.get(stage)
+    if scheduler is None:
+        scheduler = _schedulers[stage] = FairScheduler(stage, _CAPACITIES[stage])
+    return scheduler
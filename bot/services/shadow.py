@@ -0,0 +1,185 @@
+"""Теневая оценка модели-кандидата на реальном трафике.
+
+Доля SHADOW_SAMPLE_RATE проанализированных сообщений после основного
+BERT-анализа ставится в очередь, которую SHADOW_WORKERS фоновых задач
+оценивают моделью-кандидатом SHADOW_MODEL. Оценки и время инференса обеих
+моделей сохраняются в таблицу shadow_eval; сводка (доля совпавших решений
+и разница во времени) показывается на странице /shadow панели.
+
+Оценка не влияет на модерацию и не должна её замедлять:
+    - модель-кандидат загружается отдельно от основной (create_classifier)
+      и работает в собственном пуле из SHADOW_WORKERS потоков; ONNX-сессия
+      кандидата использует один поток, чтобы не занимать ядра основной модели;
+    - очередь ограничена SHADOW_QUEUE_LIMIT, при переполнении сообщение
+      не оценивается;
+    - пока есть сообщения, ожидающие слота основного BERT-анализа,
+      новые сообщения в очередь не ставятся.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from core.config import (
+    MODELS_DIR,
+    SHADOW_MODEL,
+    SHADOW_QUEUE_LIMIT,
+    SHADOW_SAMPLE_RATE,
+    SHADOW_WORKERS,
+)
+from core.logging import logger
+from core.metrics import counter, gauge
+
+_samples_total = counter(
+    'antispam_shadow_samples_total',
+    'Сообщения теневой оценки по исходу (queued, dropped, scored, failed)',
+    ('outcome',),
+)
+_queue_depth = gauge(
+    'antispam_shadow_queue_depth',
+    'Сообщения, ожидающие оценки моделью-кандидатом',
+)
+
+# (текст, чат, основная модель, оценка основной модели, время основной модели, порог)
+_Sample = Tuple[str, int, str, float, float, float]
+
+
+class ShadowService:
+    """Фоновая оценка выборки сообщений моделью-кандидатом."""
+
+    _queue: Optional[asyncio.Queue] = None
+    _workers: List[asyncio.Task] = []
+    _executor: Optional[ThreadPoolExecutor] = None
+    _classifier = None
+    _classifier_lock = threading.Lock()
+
+    @staticmethod
+    def submit(
+        text: str,
+        chat_id: int,
+        primary_model: str,
+        primary_score: float,
+        primary_seconds: float,
+        threshold: float
+    ) -> None:
+        """Ставит сообщение в очередь оценки с вероятностью SHADOW_SAMPLE_RATE.
+
+        Не ждёт и не выбрасывает исключений: при нагрузке сообщение пропускается.
+
+        Аргументы:
+            text (str): Текст, переданный основной модели.
+            chat_id (int): Telegram ID чата.
+            primary_model (str): Основная модель чата (BERT_MODEL).
+            primary_score (float): Вероятность спама по основной модели.
+            primary_seconds (float): Время инференса основной модели.
+            threshold (float): Порог BERT чата.
+        """
+        queue = ShadowService._queue
+        if queue is None or random.random() >= SHADOW_SAMPLE_RATE:
+            return
+
+        from bot.services.scheduler import get_scheduler
+
+        if get_scheduler('bert').waiting > 0 or queue.qsize() >= SHADOW_QUEUE_LIMIT:
+            _samples_total.inc(outcome='dropped')
+            return
+
+        queue.put_nowait((text, chat_id, primary_model, primary_score, primary_seconds, threshold))
+        _samples_total.inc(outcome='queued')
+        _queue_depth.set(queue.qsize())
+
+    @staticmethod
+    def _score(text: str) -> Tuple[float, float]:
+        """Оценивает текст моделью-кандидатом (выполняется в пуле потоков).
+
+        Аргументы:
+            text (str): Текст сообщения.
+
+        Возвращаемое значение:
+            Tuple[float, float]: (вероятность спама, время инференса в секундах).
+        """
+        from bot.services.spam_detection import classify, create_classifier
+
+        with ShadowService._classifier_lock:
+            if ShadowService._classifier is None:
+                ShadowService._classifier = create_classifier(
+                    str(Path(MODELS_DIR) / SHADOW_MODEL), threads=1
+                )
+
+        started = time.perf_counter()
+        _, _, prob_spam = classify(ShadowService._classifier, text)
+        return prob_spam, time.perf_counter() - started
+
+    @staticmethod
+    async def _worker(queue: asyncio.Queue) -> None:
+        """Оценивает сообщения из очереди до получения None.
+
+        Аргументы:
+            queue (asyncio.Queue): Очередь теневой оценки.
+        """
+        from core.repository import ShadowEvalRepository
+
+        loop = asyncio.get_running_loop()
+        while True:
+            sample: Optional[_Sample] = await queue.get()
+            try:
+                if sample is None:
+                    return
+                _queue_depth.set(queue.qsize())
+                text, chat_id, primary_model, primary_score, primary_seconds, threshold = sample
+                shadow_score, shadow_seconds = await loop.run_in_executor(
+                    ShadowService._executor, ShadowService._score, text
+                )
+                await ShadowEvalRepository.add_result(
+                    time.time(), chat_id, primary_model, SHADOW_MODEL, threshold,
+                    primary_score, shadow_score, primary_seconds, shadow_seconds
+                )
+                _samples_total.inc(outcome='scored')
+            except Exception as e:
+                _samples_total.inc(outcome='failed')
+                logger.error(f"Ошибка теневой оценки модели {SHADOW_MODEL}: {e}")
+            finally:
+                queue.task_done()
+
+    @staticmethod
+    async def start() -> None:
+        """Запускает фоновую оценку, если задан SHADOW_MODEL.
+
+        Модель-кандидат загружается при первой оценке.
+        """
+        if ShadowService._queue is not None or not SHADOW_MODEL:
+            return
+
+        workers = max(SHADOW_WORKERS, 1)
+        ShadowService._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shadow')
+        queue = ShadowService._queue = asyncio.Queue()
+        ShadowService._workers = [
+            asyncio.create_task(ShadowService._worker(queue))
+            for _ in range(workers)
+        ]
+        logger.info(f"Теневая оценка модели {SHADOW_MODEL} запущена (доля {SHADOW_SAMPLE_RATE})")
+
+    @staticmethod
+    async def stop() -> None:
+        """Останавливает оценку; сообщения, оставшиеся в очереди, не оцениваются."""
+        queue = ShadowService._queue
+        if queue is None:
+            return
+
+        ShadowService._queue = None
+        while not queue.empty():
+            queue.get_nowait()
+            queue.task_done()
+
+        workers, ShadowService._workers = ShadowService._workers, []
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+        ShadowService._executor.shutdown(wait=False)
+        ShadowService._executor = None
+        _queue_depth.set(0)
+        logger.info('Теневая оценка модели остановлена')
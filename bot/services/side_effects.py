@@ -0,0 +1,146 @@
+"""Фоновое выполнение побочных действий модерации.
+
+После вердикта «спам» в обработчике сообщения выполняются только удаление
+и ограничение. Сохранение вердикта в БД, сброс кешей, формирование
+и постановка уведомлений в очередь выполняются здесь, в фоновых
+задачах, и не задерживают удаление спама.
+
+Задача, завершившаяся ошибкой, повторяется с экспоненциальной паузой
+до SIDE_EFFECT_MAX_RETRIES раз. Очередь ограничена SIDE_EFFECT_QUEUE_LIMIT;
+при переполнении задача выполняется сразу в вызывающей корутине, чтобы
+не потерять вердикт. При остановке бота очередь выполняется до конца.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from core.config import SIDE_EFFECT_MAX_RETRIES, SIDE_EFFECT_QUEUE_LIMIT, SIDE_EFFECT_WORKERS
+from core.logging import logger
+from core.metrics import counter, gauge, histogram
+
+# Начальная пауза перед повтором (секунды), удваивается с каждой попыткой
+_BACKOFF_BASE = 0.5
+
+_queue_depth = gauge(
+    'antispam_side_effects_queue_depth',
+    'Побочные действия модерации, ожидающие выполнения',
+)
+_effects_total = counter(
+    'antispam_side_effects_total',
+    'Побочные действия модерации по результату',
+    ('outcome',),
+)
+_lag_seconds = histogram(
+    'antispam_side_effects_lag_seconds',
+    'Время от постановки побочного действия в очередь до его завершения',
+)
+
+# (фабрика корутины, описание, время постановки)
+_Effect = Tuple[Callable[[], Awaitable[None]], str, float]
+
+
+class SideEffectService:
+    """Очередь побочных действий модерации с повторами."""
+
+    _queue: Optional[asyncio.Queue] = None
+    _workers: List[asyncio.Task] = []
+
+    @staticmethod
+    async def submit(factory: Callable[[], Awaitable[None]], description: str) -> None:
+        """Ставит побочное действие в очередь.
+
+        Если очередь не запущена или переполнена, действие выполняется сразу.
+
+        Аргументы:
+            factory (Callable[[], Awaitable[None]]): Функция, создающая корутину действия.
+            description (str): Описание для логов.
+        """
+        effect = (factory, description, time.monotonic())
+        queue = SideEffectService._queue
+        if queue is None or queue.qsize() >= SIDE_EFFECT_QUEUE_LIMIT:
+            _effects_total.inc(outcome='inline')
+            await SideEffectService._run(effect)
+            return
+
+        queue.put_nowait(effect)
+        _queue_depth.set(queue.qsize())
+
+    @staticmethod
+    async def _run(effect: _Effect) -> None:
+        """Выполняет побочное действие с повторами.
+
+        Аргументы:
+            effect (_Effect): Действие.
+        """
+        factory, description, enqueued = effect
+        for attempt in range(SIDE_EFFECT_MAX_RETRIES + 1):
+            try:
+                await factory()
+            except Exception as e:
+                if attempt == SIDE_EFFECT_MAX_RETRIES:
+                    _effects_total.inc(outcome='error')
+                    logger.error(f"Побочное действие не выполнено ({description}): {e}")
+                    return
+                delay = _BACKOFF_BASE * 2 ** attempt
+                _effects_total.inc(outcome='retry')
+                logger.warning(
+                    f"Ошибка побочного действия ({description}), повтор через {delay:.1f}с: {e}"
+                )
+                await asyncio.sleep(delay)
+            else:
+                _effects_total.inc(outcome='ok')
+                _lag_seconds.observe(time.monotonic() - enqueued)
+                return
+
+    @staticmethod
+    async def _worker(queue: asyncio.Queue) -> None:
+        """Выполняет действия из очереди до получения None.
+
+        Аргументы:
+            queue (asyncio.Queue): Очередь действий.
+        """
+        while True:
+            effect = await queue.get()
+            try:
+                if effect is None:
+                    return
+                _queue_depth.set(queue.qsize())
+                await SideEffectService._run(effect)
+            except Exception as e:
+                logger.error(f'Ошибка в обработчике побочных действий: {e}')
+            finally:
+                queue.task_done()
+
+    @staticmethod
+    async def start() -> None:
+        """Запускает обработчики очереди."""
+        if SideEffectService._queue is not None:
+            logger.info('Обработка побочных действий уже запущена')
+            return
+
+        queue = SideEffectService._queue = asyncio.Queue()
+        SideEffectService._workers = [
+            asyncio.create_task(SideEffectService._worker(queue))
+            for _ in range(max(SIDE_EFFECT_WORKERS, 1))
+        ]
+        logger.info(f'Обработка побочных действий запущена (обработчиков: {len(SideEffectService._workers)})')
+
+    @staticmethod
+    async def stop() -> None:
+        """Выполняет оставшиеся действия и останавливает обработчики.
+
+        Новые действия после остановки выполняются сразу в вызывающей корутине.
+        """
+        queue = SideEffectService._queue
+        if queue is None:
+            return
+
+        # Новые действия выполняются сразу, очередь дорабатывается до маркеров остановки
+        SideEffectService._queue = None
+        workers, SideEffectService._workers = SideEffectService._workers, []
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+        _queue_depth.set(0)
+        logger.info('Обработка побочных действий остановлена')
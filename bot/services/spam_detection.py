@@ -3,20 +3,40 @@
 Содержит:
 - BERT-классификатор (ленивая загрузка)
 - sklearn-ансамбль (серая зона BERT)
-- ChatGPT-проверка (опционально)
+- ChatGPT-проверка (опционально): асинхронная, пакетная, с кешем вердиктов
 """
 
+import asyncio
+import hashlib
+import json
 import os
 import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import numpy as np
 from dotenv import load_dotenv
 from scipy.sparse import hstack
 
-from core.config import MODELS_DIR
+from core.cache import TTLCache
+from core.config import (
+    INFERENCE_WORKERS,
+    MODELS_DIR,
+    OPENAI_BASE_URL,
+    OPENAI_MODEL,
+    OPENAI_TIMEOUT,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_TOKENS_PER_MINUTE,
+    OPENAI_BATCH_SIZE,
+    OPENAI_BATCH_WINDOW,
+    OPENAI_CACHE_TTL,
+)
 from core.logging import logger
+from core.metrics import counter, histogram
+from core.ratelimit import TokenBucket
 
 os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
 
@@ -24,6 +44,8 @@ load_dotenv()
 
 _classifier = None
 _classifier_model_name: str | None = None
+_classifier_lock = threading.Lock()
+_inference_executor: ThreadPoolExecutor | None = None
 _openai_client = None
 
 
@@ -47,6 +69,23 @@ def _get_classifier(model_path: str):
     Исключения:
         RuntimeError: Если не удалось загрузить ML-модели.
     """
+    if _classifier is not None and _classifier_model_name == model_path:
+        return _classifier
+
+    # Модель может запрашиваться одновременно из нескольких потоков анализа
+    with _classifier_lock:
+        return _load_classifier(model_path)
+
+
+def _load_classifier(model_path: str):
+    """Загружает BERT классификатор, если он ещё не загружен. Вызывается под _classifier_lock.
+
+    Аргументы:
+        model_path (str): Абсолютный путь к директории модели.
+
+    Возвращаемое значение:
+        classifier: Объект классификатора для predict_spam.
+    """
     global _classifier, _classifier_model_name
 
     if _classifier is not None and _classifier_model_name == model_path:
@@ -54,7 +93,28 @@ def _get_classifier(model_path: str):
 
     _classifier = None
     _classifier_model_name = model_path
+    _classifier = create_classifier(model_path)
+    return _classifier
+
+
+def create_classifier(model_path: str, threads: Optional[int] = None):
+    """Создаёт BERT классификатор без кеширования.
+
+    Используется для основной модели (через _get_classifier) и для модели
+    теневой оценки, которая не должна вытеснять основную.
 
+    Аргументы:
+        model_path (str): Абсолютный путь к директории модели.
+        threads (Optional[int]): Число потоков ONNX-сессии (intra_op; inter_op
+            при этом 1). None — по умолчанию onnxruntime, все ядра. На
+            transformers pipeline не влияет.
+
+    Возвращаемое значение:
+        classifier: Словарь ONNX-сессии и токенизатора или transformers pipeline.
+
+    Исключения:
+        RuntimeError: Если не удалось загрузить ML-модели.
+    """
     model_dir = Path(model_path)
     onnx_files = list(model_dir.glob('*.onnx'))
     has_onnx = bool(onnx_files)
@@ -70,9 +130,16 @@ def _get_classifier(model_path: str):
                 onnx_files[0]
             )
 
+            options = None
+            if threads is not None:
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = threads
+                options.inter_op_num_threads = 1
+
             logger.info(f"Загрузка ONNX BERT модели: {onnx_file}")
             session = ort.InferenceSession(
                 str(onnx_file),
+                sess_options=options,
                 providers=['CPUExecutionProvider'],
             )
 
@@ -81,44 +148,95 @@ def _get_classifier(model_path: str):
             tokenizer.enable_truncation(max_length=512)
             tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
 
-            _classifier = {
+            return {
                 'session': session,
                 'tokenizer': tokenizer,
             }
-        else:
-            from transformers import pipeline
-
-            logger.info(f"Загрузка BERT модели: {model_path}")
-            _classifier = pipeline(
-                "text-classification",
-                model=model_path,
-                tokenizer=model_path,
-                device=-1,
-                dtype="float32",
-            )
+
+        from transformers import pipeline
+
+        logger.info(f"Загрузка BERT модели: {model_path}")
+        return pipeline(
+            "text-classification",
+            model=model_path,
+            tokenizer=model_path,
+            device=-1,
+            dtype="float32",
+        )
     except ImportError as e:
         logger.error(f"Ошибка импорта ML-зависимостей: {e}")
         raise RuntimeError(f"Не удалось загрузить ML модели: {e}") from e
     except Exception as e:
         logger.error(f"Ошибка загрузки BERT модели {model_path}: {e}")
         raise RuntimeError(f"Не удалось загрузить BERT модель: {e}") from e
-    return _classifier
 
 
 def _get_openai_client():
-    """Ленивая инициализация OpenAI клиента.
+    """Ленивая инициализация асинхронного OpenAI клиента.
+
+    Если задан OPENAI_BASE_URL (например, локальный OpenAI-совместимый
+    сервер), запросы направляются туда; ключ API в этом случае необязателен.
 
     Возвращаемое значение:
-        client (OpenAI): Экземпляр клиента OpenAI.
+        client (AsyncOpenAI): Экземпляр асинхронного клиента OpenAI.
     """
     global _openai_client
     if _openai_client is None:
-        from openai import OpenAI
-        _openai_client = OpenAI()
-        logger.info("OpenAI клиент инициализирован")
+        from openai import AsyncOpenAI
+        api_key = os.getenv('OPENAI_API_KEY') or ('local' if OPENAI_BASE_URL else None)
+        _openai_client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=OPENAI_BASE_URL,
+            timeout=OPENAI_TIMEOUT,
+        )
+        logger.info(f"OpenAI клиент инициализирован ({OPENAI_BASE_URL or 'api.openai.com'})")
     return _openai_client
 
 
+def classify(classifier, message: str) -> Tuple[int, float, float]:
+    """Запускает классификатор на сообщении.
+
+    Аргументы:
+        classifier: Классификатор из create_classifier.
+        message (str): Текст сообщения.
+
+    Возвращаемое значение:
+        Tuple[int, float, float]: (класс модели, prob_ham, prob_spam).
+    """
+    if isinstance(classifier, dict):
+        # ONNX путь: прямой запуск через onnxruntime
+        session = classifier['session']
+        tokenizer = classifier['tokenizer']
+
+        encoded = tokenizer.encode(message)
+
+        outputs = session.run(
+            None,
+            {
+                'input_ids': np.array([encoded.ids], dtype=np.int64),
+                'attention_mask': np.array([encoded.attention_mask], dtype=np.int64),
+                'token_type_ids': np.array([encoded.type_ids], dtype=np.int64),
+            }
+        )
+
+        logits = outputs[0][0]
+        # softmax для получения вероятностей
+        exp_logits = np.exp(logits - np.max(logits))
+        probabilities = exp_logits / exp_logits.sum()
+
+        return int(np.argmax(probabilities)), float(probabilities[0]), float(probabilities[1])
+
+    # PyTorch путь: через transformers pipeline
+    result = classifier(message)
+
+    prediction = int(result[0]['label'][-1])
+    score = result[0]['score']
+
+    if prediction == 1:
+        return prediction, 1 - score, score
+    return prediction, score, 1 - score
+
+
 def predict_spam(message: str, model_path: str, threshold: float = 0.5) -> Tuple[int, List[float]]:
     """Классифицирует сообщение с помощью BERT модели.
 
@@ -134,44 +252,7 @@ def predict_spam(message: str, model_path: str, threshold: float = 0.5) -> Tuple
     classifier = _get_classifier(model_path)
 
     try:
-        if isinstance(classifier, dict):
-            # ONNX путь: прямой запуск через onnxruntime
-            session = classifier['session']
-            tokenizer = classifier['tokenizer']
-
-            encoded = tokenizer.encode(message)
-
-            outputs = session.run(
-                None,
-                {
-                    'input_ids': np.array([encoded.ids], dtype=np.int64),
-                    'attention_mask': np.array([encoded.attention_mask], dtype=np.int64),
-                    'token_type_ids': np.array([encoded.type_ids], dtype=np.int64),
-                }
-            )
-
-            logits = outputs[0][0]
-            # softmax для получения вероятностей
-            exp_logits = np.exp(logits - np.max(logits))
-            probabilities = exp_logits / exp_logits.sum()
-
-            prediction = int(np.argmax(probabilities))
-            prob_spam = float(probabilities[1])
-            prob_ham = float(probabilities[0])
-        else:
-            # PyTorch путь: через transformers pipeline
-            result = classifier(message)
-
-            prediction = int(result[0]['label'][-1])
-            score = result[0]['score']
-
-            if prediction == 1:
-                prob_spam = score
-                prob_ham = 1 - score
-            else:
-                prob_ham = score
-                prob_spam = 1 - score
-
+        prediction, prob_ham, prob_spam = classify(classifier, message)
         probabilities = [prob_ham, prob_spam]
 
         if prob_spam < threshold:
@@ -185,6 +266,25 @@ def predict_spam(message: str, model_path: str, threshold: float = 0.5) -> Tuple
         return 0, [0.5, 0.5]
 
 
+async def predict_spam_async(message: str, model_path: str) -> Tuple[int, List[float]]:
+    """Выполняет predict_spam в пуле потоков, не блокируя event loop.
+
+    Аргументы:
+        message (str): Текст сообщения.
+        model_path (str): Абсолютный путь к директории модели.
+
+    Возвращаемое значение:
+        Tuple[int, List[float]]: (prediction, [prob_ham, prob_spam]).
+    """
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = ThreadPoolExecutor(
+            max_workers=max(INFERENCE_WORKERS, 1), thread_name_prefix='bert'
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_executor, predict_spam, message, model_path)
+
+
 def predict_with_sklearn_model(
     text: str,
     vectorizer: Any,
@@ -308,16 +408,8 @@ def ensemble_confirm_spam(text: str, min_models: int = 2) -> bool:
         return False
 
 
-async def check_spam_chatgpt(text: str) -> int:
-    """Проверяет текст на спам с помощью ChatGPT.
-
-    Аргументы:
-        text (str): Текст для проверки.
-
-    Возвращаемое значение:
-        int: 1 — спам, 0 — не спам, 500 — ошибка.
-    """
-    system_prompt = """Вы - система определения спама в Telegram-чатах.
+# Критерии спама, общие для одиночного и пакетного промпта
+_CHATGPT_CRITERIA = """Вы - система определения спама в Telegram-чатах.
 Анализируйте сообщения и определяйте, являются ли они спамом.
 
 Характеристики спам-сообщений:
@@ -328,22 +420,253 @@ async def check_spam_chatgpt(text: str) -> int:
 5. Обещания "легкого заработка", "свободного графика" без сути
 6. Избыточное использование эмодзи для привлечения внимания
 7. Отсутствие контекста или связи с темой чата
+"""
 
+_CHATGPT_SINGLE_PROMPT = _CHATGPT_CRITERIA + """
 Отвечайте ТОЛЬКО '1' (спам) или '0' (не спам). Без комментариев."""
 
-    try:
-        client = _get_openai_client()
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ]
-        )
-        result = completion.choices[0].message.content.strip()
-        logger.info(f"ChatGPT результат: {result}")
-        return 1 if '1' in result else 0
+_CHATGPT_BATCH_PROMPT = _CHATGPT_CRITERIA + """
+На вход подаётся JSON-массив сообщений. Отвечайте ТОЛЬКО JSON-массивом
+той же длины и в том же порядке, где 1 — спам, 0 — не спам.
+Например: [0, 1, 0]. Без комментариев."""
+
+# Код результата ChatGPT-проверки при ошибке
+CHATGPT_ERROR = 500
+
+_llm_requests_total = counter(
+    'antispam_llm_requests_total',
+    'Запросы к LLM по результату',
+    ('outcome',),
+)
+_llm_cache_hits_total = counter(
+    'antispam_llm_cache_hits_total',
+    'Вердикты LLM, полученные из кеша',
+)
+_llm_batch_size = histogram(
+    'antispam_llm_batch_size',
+    'Количество текстов в одном запросе к LLM',
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+_llm_request_seconds = histogram(
+    'antispam_llm_request_seconds',
+    'Задержка запроса к LLM',
+)
+
+_chatgpt_cache: TTLCache = TTLCache(max_size=10000, ttl=OPENAI_CACHE_TTL)
+
+
+def _chatgpt_cache_key(text: str) -> str:
+    """Возвращает ключ кеша вердикта: SHA-256 нормализованного текста.
 
-    except Exception as e:
-        logger.error(f"Ошибка ChatGPT: {e}")
-        return 500
+    Аргументы:
+        text (str): Текст сообщения.
+
+    Возвращаемое значение:
+        str: Hex-дайджест нормализованного текста.
+    """
+    from bot.services.text_analysis import normalize_text
+    return hashlib.sha256(normalize_text(text).lower().encode('utf-8')).hexdigest()
+
+
+def _estimate_tokens(texts: List[str]) -> int:
+    """Грубо оценивает число токенов запроса для бюджета.
+
+    Аргументы:
+        texts (List[str]): Тексты пакета.
+
+    Возвращаемое значение:
+        int: Оценка числа токенов (промпт и ответ).
+    """
+    prompt_chars = len(_CHATGPT_BATCH_PROMPT) + sum(len(t) for t in texts)
+    return prompt_chars // 3 + 8 * len(texts) + 16
+
+
+def _parse_batch_verdicts(content: str, expected: int) -> List[int]:
+    """Разбирает ответ пакетного запроса в список вердиктов.
+
+    Аргументы:
+        content (str): Текст ответа модели.
+        expected (int): Ожидаемое число вердиктов.
+
+    Возвращаемое значение:
+        List[int]: Вердикты 0/1.
+
+    Исключения:
+        ValueError: Если ответ не является массивом нужной длины.
+    """
+    start = content.find('[')
+    end = content.rfind(']')
+    if start == -1 or end == -1:
+        raise ValueError(f"Ответ без JSON-массива: {content[:100]}")
+    values = json.loads(content[start:end + 1])
+    if not isinstance(values, list) or len(values) != expected:
+        raise ValueError(f"Ожидалось {expected} вердиктов, получено: {content[:100]}")
+    return [1 if str(v).strip() == '1' else 0 for v in values]
+
+
+class ChatGPTBatcher:
+    """Пакетный асинхронный классификатор спама через OpenAI-совместимый API.
+
+    Тексты, поступившие в течение OPENAI_BATCH_WINDOW секунд, объединяются
+    в один запрос (не более OPENAI_BATCH_SIZE). Одновременные запросы
+    ограничены OPENAI_MAX_CONCURRENCY, расход токенов — бюджетом
+    OPENAI_TOKENS_PER_MINUTE. Одинаковые тексты в полёте не дублируются.
+    """
+
+    def __init__(self) -> None:
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(max(1, OPENAI_MAX_CONCURRENCY))
+        self._budget: Optional[TokenBucket] = None
+        if OPENAI_TOKENS_PER_MINUTE > 0:
+            self._budget = TokenBucket(
+                rate=OPENAI_TOKENS_PER_MINUTE / 60.0,
+                capacity=OPENAI_TOKENS_PER_MINUTE,
+            )
+
+    async def classify(self, key: str, text: str) -> int:
+        """Ставит текст в очередь и ожидает вердикт.
+
+        Аргументы:
+            key (str): Ключ кеша текста.
+            text (str): Текст сообщения.
+
+        Возвращаемое значение:
+            int: 1 — спам, 0 — не спам, CHATGPT_ERROR — ошибка.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._pending.append((key, text, future))
+            if len(self._pending) >= OPENAI_BATCH_SIZE:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.create_task(self._flush_later())
+        return await asyncio.shield(future)
+
+    async def _flush_later(self) -> None:
+        """Отправляет накопленный пакет по истечении окна."""
+        await asyncio.sleep(OPENAI_BATCH_WINDOW)
+        self._timer = None
+        self._flush()
+
+    def _flush(self) -> None:
+        """Разбивает очередь на пакеты и запускает их обработку."""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+
+        batch_size = max(1, OPENAI_BATCH_SIZE)
+        while self._pending:
+            batch, self._pending = self._pending[:batch_size], self._pending[batch_size:]
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, str, asyncio.Future]]) -> None:
+        """Классифицирует пакет и раздаёт вердикты ожидающим.
+
+        Аргументы:
+            batch (List[Tuple[str, str, asyncio.Future]]): Пакет (ключ, текст, future).
+        """
+        texts = [text for _, text, _ in batch]
+        try:
+            verdicts = await self._request(texts)
+        except Exception as e:
+            logger.error(f"Ошибка ChatGPT: {e}")
+            _llm_requests_total.inc(outcome='error')
+            verdicts = [CHATGPT_ERROR] * len(batch)
+
+        for (key, _, future), verdict in zip(batch, verdicts):
+            self._inflight.pop(key, None)
+            if verdict in (0, 1):
+                _chatgpt_cache.set(key, verdict)
+            if not future.done():
+                future.set_result(verdict)
+
+    async def _request(self, texts: List[str]) -> List[int]:
+        """Выполняет один запрос к API для пакета текстов.
+
+        Аргументы:
+            texts (List[str]): Тексты пакета.
+
+        Возвращаемое значение:
+            List[int]: Вердикты в порядке текстов.
+        """
+        if self._budget is not None:
+            if not await self._budget.acquire(_estimate_tokens(texts), timeout=OPENAI_TIMEOUT):
+                logger.warning(f"ChatGPT: бюджет токенов исчерпан, пропущено текстов: {len(texts)}")
+                _llm_requests_total.inc(outcome='budget')
+                return [CHATGPT_ERROR] * len(texts)
+
+        async with self._semaphore:
+            client = _get_openai_client()
+            _llm_batch_size.observe(len(texts))
+            start = time.monotonic()
+
+            if len(texts) == 1:
+                completion = await client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": _CHATGPT_SINGLE_PROMPT},
+                        {"role": "user", "content": texts[0]}
+                    ]
+                )
+                result = completion.choices[0].message.content.strip()
+                logger.info(f"ChatGPT результат: {result}")
+                verdicts = [1 if '1' in result else 0]
+            else:
+                completion = await client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": _CHATGPT_BATCH_PROMPT},
+                        {"role": "user", "content": json.dumps(texts, ensure_ascii=False)}
+                    ]
+                )
+                result = completion.choices[0].message.content.strip()
+                logger.info(f"ChatGPT результат пакета из {len(texts)}: {result}")
+                verdicts = _parse_batch_verdicts(result, len(texts))
+
+            _llm_request_seconds.observe(time.monotonic() - start)
+            _llm_requests_total.inc(outcome='ok')
+            return verdicts
+
+
+_chatgpt_batcher: Optional[ChatGPTBatcher] = None
+
+
+def _get_chatgpt_batcher() -> ChatGPTBatcher:
+    """Возвращает общий экземпляр пакетного классификатора.
+
+    Возвращаемое значение:
+        batcher (ChatGPTBatcher): Пакетный классификатор.
+    """
+    global _chatgpt_batcher
+    if _chatgpt_batcher is None:
+        _chatgpt_batcher = ChatGPTBatcher()
+    return _chatgpt_batcher
+
+
+async def check_spam_chatgpt(text: str) -> int:
+    """Проверяет текст на спам с помощью ChatGPT.
+
+    Вердикт кешируется по хешу нормализованного текста. Запросы
+    объединяются в пакеты и не блокируют event loop.
+
+    Аргументы:
+        text (str): Текст для проверки.
+
+    Возвращаемое значение:
+        int: 1 — спам, 0 — не спам, 500 — ошибка.
+    """
+    key = _chatgpt_cache_key(text)
+    cached = _chatgpt_cache.get(key)
+    if cached is not None:
+        _llm_cache_hits_total.inc()
+        logger.debug(f"ChatGPT результат из кеша: {cached}")
+        return cached
+
+    return await _get_chatgpt_batcher().classify(key, text)
@@ -0,0 +1,322 @@
+"""Уровни доверия участников чатов.
+
+Для каждой пары (чат, пользователь) ведутся счётчики: число сообщений,
+время первого сообщения, число спам-вердиктов и последний вердикт.
+Счётчики хранятся в памяти (ограниченный LRU-кеш), а изменения
+накапливаются и записываются в таблицу user_activity пачкой раз
+в TRUST_FLUSH_INTERVAL секунд. Значения приблизительные: изменения,
+записываемые в момент загрузки записи из БД, могут не учитываться,
+а после _MAX_FLUSH_ATTEMPTS неудачных записей подряд буфер отбрасывается.
+
+Уровни (при включённой настройке TRUST_ENABLED):
+    new      — новички и все, кто хоть раз был спамером или ограничен:
+               каждое сообщение анализируется;
+    trusted  — не меньше TRUST_MIN_MESSAGES сообщений за не менее
+               TRUST_MIN_DAYS дней: анализируется доля TRUST_SAMPLE_RATE;
+    veteran  — не меньше TRUST_SKIP_MESSAGES сообщений за тот же срок:
+               анализ пропускается.
+Сообщения с inline-клавиатурой анализируются всегда.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import asyncpg
+
+from core.cache import TTLCache
+from core.config import TRUST_CACHE_SIZE, TRUST_FLUSH_INTERVAL
+from core.logging import logger
+from core.metrics import counter
+from core.repository.activity import ActivityRepository
+
+# Время жизни записи в кеше (секунды); изменения вносятся и в кеш, и в буфер
+_CACHE_TTL = 3600
+
+_SECONDS_PER_DAY = 86400
+
+# Неудачные записи подряд, после которых накопленные изменения отбрасываются
+_MAX_FLUSH_ATTEMPTS = 6
+
+_decisions_total = counter(
+    'antispam_trust_decisions_total',
+    'Решения об анализе сообщения по уровню доверия автора',
+    ('tier', 'decision'),
+)
+_dropped_total = counter(
+    'antispam_trust_dropped_deltas_total',
+    'Изменения счётчиков активности, отброшенные после ошибки записи',
+    ('reason',),
+)
+
+
+class Activity:
+    """Счётчики активности пользователя в чате."""
+
+    __slots__ = ('messages_seen', 'spam_count', 'first_seen', 'last_verdict')
+
+    def __init__(
+        self,
+        messages_seen: int = 0,
+        spam_count: int = 0,
+        first_seen: Optional[float] = None,
+        last_verdict: Optional[bool] = None
+    ) -> None:
+        self.messages_seen = messages_seen
+        self.spam_count = spam_count
+        self.first_seen = first_seen
+        self.last_verdict = last_verdict
+
+
+class TrustService:
+    """Счётчики активности и решения об анализе по уровню доверия."""
+
+    # (chat_pk, user_id) -> Activity
+    _cache: TTLCache = TTLCache(TRUST_CACHE_SIZE, _CACHE_TTL)
+    # (chat_pk, user_id) -> [messages, spam, first_seen, last_seen, last_verdict]
+    _pending: Dict[Tuple[int, int], list] = {}
+    # Неудачные записи подряд
+    _failures: int = 0
+    _flush_task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _stopping: bool = False
+
+    @staticmethod
+    async def get_activity(chat_pk: int, user_id: int) -> Activity:
+        """Возвращает счётчики активности, загружая их из БД при промахе кеша.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+
+        Возвращаемое значение:
+            Activity: Счётчики (нулевые для нового пользователя).
+        """
+        key = (chat_pk, user_id)
+        activity = TrustService._cache.get(key)
+        if activity is not None:
+            return activity
+
+        row = await ActivityRepository.get_activity(chat_pk, user_id)
+        if row is not None:
+            activity = Activity(
+                row['messages_seen'], row['spam_count'], row['first_seen'], row['last_verdict']
+            )
+        else:
+            activity = Activity()
+
+        # Ещё не записанные изменения
+        pending = TrustService._pending.get(key)
+        if pending is not None:
+            activity.messages_seen += pending[0]
+            activity.spam_count += pending[1]
+            if activity.first_seen is None or pending[2] < activity.first_seen:
+                activity.first_seen = pending[2]
+            if pending[4] is not None:
+                activity.last_verdict = pending[4]
+
+        TrustService._cache.set(key, activity)
+        return activity
+
+    @staticmethod
+    def record(chat_pk: int, user_id: int, is_spam: Optional[bool] = None) -> None:
+        """Учитывает сообщение пользователя. Не обращается к БД.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+            is_spam (Optional[bool]): Вердикт анализа; None — сообщение не анализировалось.
+        """
+        key = (chat_pk, user_id)
+        now = time.time()
+        spam = 1 if is_spam else 0
+
+        pending = TrustService._pending.get(key)
+        if pending is None:
+            TrustService._pending[key] = [1, spam, now, now, is_spam]
+        else:
+            pending[0] += 1
+            pending[1] += spam
+            pending[3] = now
+            if is_spam is not None:
+                pending[4] = is_spam
+
+        activity = TrustService._cache.get(key)
+        if activity is not None:
+            activity.messages_seen += 1
+            activity.spam_count += spam
+            if activity.first_seen is None:
+                activity.first_seen = now
+            if is_spam is not None:
+                activity.last_verdict = is_spam
+
+    @staticmethod
+    def tier(activity: Activity, settings: Mapping[str, Any], now: Optional[float] = None) -> str:
+        """Определяет уровень доверия по счётчикам.
+
+        Аргументы:
+            activity (Activity): Счётчики пользователя.
+            settings (Mapping[str, Any]): Настройки чата.
+            now (Optional[float]): Текущее время (по умолчанию time.time()).
+
+        Возвращаемое значение:
+            str: 'new', 'trusted' или 'veteran'.
+        """
+        if activity.spam_count > 0 or activity.last_verdict or activity.first_seen is None:
+            return 'new'
+
+        now = time.time() if now is None else now
+        age_days = (now - activity.first_seen) / _SECONDS_PER_DAY
+        if age_days < settings.get('TRUST_MIN_DAYS', 7):
+            return 'new'
+
+        skip_messages = settings.get('TRUST_SKIP_MESSAGES', 0)
+        if skip_messages > 0 and activity.messages_seen >= skip_messages:
+            return 'veteran'
+        if activity.messages_seen >= settings.get('TRUST_MIN_MESSAGES', 50):
+            return 'trusted'
+        return 'new'
+
+    @staticmethod
+    async def should_analyze(
+        chat_pk: int,
+        user_id: int,
+        settings: Mapping[str, Any],
+        muted: Optional[dict],
+        has_reply_markup: bool
+    ) -> bool:
+        """Решает, нужно ли анализировать сообщение пользователя.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+            settings (Mapping[str, Any]): Настройки чата.
+            muted (Optional[dict]): Запись об ограничениях пользователя.
+            has_reply_markup (bool): Есть ли у сообщения inline-клавиатура.
+
+        Возвращаемое значение:
+            bool: True если сообщение нужно анализировать.
+        """
+        if not settings.get('TRUST_ENABLED', False):
+            return True
+
+        if muted or has_reply_markup:
+            _decisions_total.inc(tier='new', decision='analyze')
+            return True
+
+        activity = await TrustService.get_activity(chat_pk, user_id)
+        tier = TrustService.tier(activity, settings)
+
+        if tier == 'veteran':
+            analyze = False
+        elif tier == 'trusted':
+            analyze = random.random() < settings.get('TRUST_SAMPLE_RATE', 0.1)
+        else:
+            analyze = True
+
+        _decisions_total.inc(tier=tier, decision='analyze' if analyze else 'skip')
+        return analyze
+
+    @staticmethod
+    async def flush() -> None:
+        """Записывает накопленные изменения счётчиков в БД.
+
+        При ошибке изменения возвращаются в буфер для следующей попытки;
+        после _MAX_FLUSH_ATTEMPTS неудачных попыток подряд, а также при
+        нарушении внешнего ключа (чат удалён во время записи) они
+        отбрасываются, чтобы одна ошибка не останавливала запись навсегда.
+        """
+        if not TrustService._pending:
+            return
+
+        pending, TrustService._pending = TrustService._pending, {}
+        deltas: List[tuple] = [
+            (chat_pk, user_id, *values) for (chat_pk, user_id), values in pending.items()
+        ]
+        try:
+            await ActivityRepository.apply_deltas(deltas)
+        except asyncpg.ForeignKeyViolationError as e:
+            TrustService._failures = 0
+            _dropped_total.inc(len(deltas), reason='foreign_key')
+            logger.warning(
+                f"Изменения активности отброшены: чат удалён во время записи ({len(deltas)} шт.): {e}"
+            )
+            return
+        except Exception as e:
+            TrustService._failures += 1
+            if TrustService._failures >= _MAX_FLUSH_ATTEMPTS:
+                TrustService._failures = 0
+                _dropped_total.inc(len(deltas), reason='attempts')
+                logger.error(
+                    f"Ошибка записи активности пользователей, изменения отброшены "
+                    f"после {_MAX_FLUSH_ATTEMPTS} попыток ({len(deltas)} шт.): {e}"
+                )
+                return
+            logger.error(f"Ошибка записи активности пользователей ({len(deltas)} шт.): {e}")
+            TrustService._merge_back(pending)
+            return
+        TrustService._failures = 0
+
+    @staticmethod
+    def _merge_back(pending: Dict[Tuple[int, int], list]) -> None:
+        """Возвращает незаписанные изменения в буфер.
+
+        Аргументы:
+            pending (Dict): Незаписанные изменения.
+        """
+        for key, values in pending.items():
+            current = TrustService._pending.get(key)
+            if current is None:
+                TrustService._pending[key] = values
+                continue
+            current[0] += values[0]
+            current[1] += values[1]
+            current[2] = min(current[2], values[2])
+            current[3] = max(current[3], values[3])
+            if current[4] is None:
+                current[4] = values[4]
+
+    @staticmethod
+    async def start() -> None:
+        """Запускает фоновую задачу записи счётчиков."""
+        if TrustService._flush_task is not None:
+            logger.info('Запись активности пользователей уже запущена')
+            return
+
+        TrustService._stopping = False
+        TrustService._wakeup = asyncio.Event()
+        TrustService._flush_task = asyncio.create_task(TrustService._flush_loop())
+        logger.info(f'Запись активности пользователей запущена (интервал {TRUST_FLUSH_INTERVAL}с)')
+
+    @staticmethod
+    async def _flush_loop() -> None:
+        """Цикл записи счётчиков каждые TRUST_FLUSH_INTERVAL секунд."""
+        wakeup = TrustService._wakeup
+        while not TrustService._stopping:
+            try:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=TRUST_FLUSH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                await TrustService.flush()
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                logger.error(f'Ошибка в цикле записи активности пользователей: {e}')
+
+    @staticmethod
+    async def stop() -> None:
+        """Останавливает фоновую задачу и записывает накопленные изменения.
+
+        Задача не отменяется, а завершается после текущей записи.
+        """
+        if TrustService._flush_task is not None:
+            TrustService._stopping = True
+            TrustService._wakeup.set()
+            await TrustService._flush_task
+            TrustService._flush_task = None
+            TrustService._wakeup = None
+
+        await TrustService.flush()
+        logger.info('Запись активности пользователей остановлена')
@@ -0,0 +1,270 @@
+"""Приём обновлений Telegram через webhook.
+
+В режиме BOT_MODE=webhook Telegram отправляет обновления POST-запросами
+на WEBHOOK_URL. Эндпоинт работает в веб-панели (совместный запуск) или
+в отдельном aiohttp-сервере на WEBHOOK_PORT. Запрос проверяется по заголовку
+X-Telegram-Bot-Api-Secret-Token и подтверждается сразу после постановки
+обновления в очередь; обработку выполняют WEBHOOK_WORKERS фоновых задач
+через Dispatcher.feed_update (то же, что при поллинге, включая
+UpdateLaneMiddleware).
+
+Очередь ограничена WEBHOOK_QUEUE_LIMIT. Если она заполнена, эндпоинт
+отвечает 503, и Telegram повторяет доставку позже — обновления не теряются,
+а нагрузка не растёт бесконечно.
+
+Бот в режиме webhook должен работать одним процессом: очереди пользователей
+(UpdateLaneMiddleware), сбор альбомов, окна флуда, счётчики доверия, индекс
+медиа и кеш правок хранятся в памяти процесса, а Telegram не умеет
+направлять обновления одного чата в одну реплику. Несколько реплик за
+балансировщиком не поддерживаются: при запуске берётся advisory-блокировка
+PostgreSQL, и второй процесс с тем же БД не запускает webhook.
+(В режиме polling то же обеспечивает Telegram: параллельный getUpdates
+завершается ошибкой 409.)
+"""
+
+import asyncio
+import hmac
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from core.config import (
+    WEBHOOK_HOST,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_QUEUE_LIMIT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WEBHOOK_WORKERS,
+)
+from core.db import get_pool
+from core.logging import logger
+from core.metrics import counter, gauge, histogram
+
+# Заголовок с секретом, который Telegram передаёт с каждым обновлением
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+# Постоянный ключ advisory-блокировки единственного webhook-процесса
+_INSTANCE_ADVISORY_KEY = 0x57454248  # "WEBH" в hex
+
+_requests_total = counter(
+    'antispam_webhook_requests_total',
+    'Запросы к webhook-эндпоинту по HTTP-статусу ответа',
+    ('status',),
+)
+_queue_depth = gauge(
+    'antispam_webhook_queue_depth',
+    'Принятые через webhook обновления, ожидающие обработки',
+)
+_wait_seconds = histogram(
+    'antispam_webhook_wait_seconds',
+    'Время от приёма обновления до начала его обработки',
+)
+
+# (обновление, время приёма)
+_Accepted = Tuple[Dict[str, Any], float]
+
+
+class WebhookService:
+    """Очередь обновлений, принятых через webhook, и её обработчики."""
+
+    _bot: Optional[Bot] = None
+    _dispatcher: Optional[Dispatcher] = None
+    _queue: Optional[asyncio.Queue] = None
+    _workers: List[asyncio.Task] = []
+    _runner: Optional[Any] = None
+    # Соединение, удерживающее advisory-блокировку экземпляра
+    _lock_connection: Optional[Any] = None
+
+    @staticmethod
+    def handle(secret: Optional[str], body: bytes) -> int:
+        """Принимает тело запроса Telegram и ставит обновление в очередь.
+
+        Не ожидает обработки обновления.
+
+        Аргументы:
+            secret (Optional[str]): Значение заголовка X-Telegram-Bot-Api-Secret-Token.
+            body (bytes): Тело запроса.
+
+        Возвращаемое значение:
+            int: HTTP-статус ответа: 200 — принято, 400 — некорректное тело,
+                401 — неверный секрет, 404 — webhook не запущен,
+                503 — очередь заполнена.
+        """
+        status = WebhookService._accept(secret, body)
+        _requests_total.inc(status=status)
+        return status
+
+    @staticmethod
+    def _accept(secret: Optional[str], body: bytes) -> int:
+        """Проверяет запрос и ставит обновление в очередь (см. handle)."""
+        queue = WebhookService._queue
+        if queue is None:
+            return 404
+
+        if not hmac.compare_digest((secret or '').encode(), WEBHOOK_SECRET.encode()):
+            return 401
+
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return 400
+        if not isinstance(update, dict):
+            return 400
+
+        if queue.qsize() >= WEBHOOK_QUEUE_LIMIT:
+            logger.warning(f"Очередь webhook заполнена ({queue.qsize()}), обновление отклонено")
+            return 503
+
+        queue.put_nowait((update, time.monotonic()))
+        _queue_depth.set(queue.qsize())
+        return 200
+
+    @staticmethod
+    async def _worker(queue: asyncio.Queue) -> None:
+        """Передаёт обновления из очереди диспетчеру до получения None.
+
+        Аргументы:
+            queue (asyncio.Queue): Очередь принятых обновлений.
+        """
+        while True:
+            accepted: Optional[_Accepted] = await queue.get()
+            try:
+                if accepted is None:
+                    return
+                _queue_depth.set(queue.qsize())
+                data, received = accepted
+                _wait_seconds.observe(time.monotonic() - received)
+                bot = WebhookService._bot
+                update = Update.model_validate(data, context={'bot': bot})
+                await WebhookService._dispatcher.feed_update(bot, update)
+            except Exception as e:
+                logger.error(f"Ошибка обработки обновления webhook: {e}")
+            finally:
+                queue.task_done()
+
+    @staticmethod
+    async def start(bot: Bot, dispatcher: Dispatcher) -> None:
+        """Запускает обработчики, отдельный сервер (если задан порт) и регистрирует webhook.
+
+        Аргументы:
+            bot (Bot): Экземпляр бота.
+            dispatcher (Dispatcher): Диспетчер обновлений.
+
+        Исключения:
+            ValueError: Если не заданы WEBHOOK_URL или WEBHOOK_SECRET.
+            RuntimeError: Если webhook уже запущен другим процессом.
+        """
+        if WebhookService._queue is not None:
+            logger.info('Webhook уже запущен')
+            return
+        if not WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL не задан!")
+        if not WEBHOOK_SECRET:
+            raise ValueError("WEBHOOK_SECRET не задан!")
+
+        await WebhookService._lock_instance()
+
+        WebhookService._bot = bot
+        WebhookService._dispatcher = dispatcher
+        queue = WebhookService._queue = asyncio.Queue()
+        WebhookService._workers = [
+            asyncio.create_task(WebhookService._worker(queue))
+            for _ in range(max(WEBHOOK_WORKERS, 1))
+        ]
+
+        if WEBHOOK_PORT:
+            await WebhookService._start_server()
+        else:
+            logger.info(f"Webhook-эндпоинт доступен в панели: {WEBHOOK_PATH}")
+
+        await bot.set_webhook(
+            url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        logger.info(f"Webhook зарегистрирован (обработчиков: {len(WebhookService._workers)})")
+
+    @staticmethod
+    async def _lock_instance() -> None:
+        """Берёт advisory-блокировку единственного webhook-процесса.
+
+        Блокировка сессионная: она удерживается выделенным соединением пула
+        до остановки (stop) и снимается PostgreSQL при завершении процесса.
+
+        Исключения:
+            RuntimeError: Если блокировку держит другой процесс.
+        """
+        pool = get_pool()
+        conn = await pool.acquire()
+        try:
+            locked = await conn.fetchval('SELECT pg_try_advisory_lock($1)', _INSTANCE_ADVISORY_KEY)
+        except Exception:
+            await pool.release(conn)
+            raise
+        if not locked:
+            await pool.release(conn)
+            raise RuntimeError(
+                "Webhook уже запущен другим процессом с той же БД: "
+                "несколько реплик бота в режиме webhook не поддерживаются"
+            )
+        WebhookService._lock_connection = conn
+
+    @staticmethod
+    async def _unlock_instance() -> None:
+        """Снимает advisory-блокировку webhook-процесса и возвращает соединение в пул."""
+        conn, WebhookService._lock_connection = WebhookService._lock_connection, None
+        if conn is None:
+            return
+        try:
+            await conn.execute('SELECT pg_advisory_unlock($1)', _INSTANCE_ADVISORY_KEY)
+            await get_pool().release(conn)
+        except Exception as e:
+            logger.warning(f"Не удалось снять блокировку webhook-процесса: {e}")
+
+    @staticmethod
+    async def _start_server() -> None:
+        """Запускает отдельный aiohttp-сервер с webhook-эндпоинтом."""
+        from aiohttp import web
+
+        async def endpoint(request: web.Request) -> web.Response:
+            status = WebhookService.handle(request.headers.get(SECRET_HEADER), await request.read())
+            return web.Response(status=status)
+
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, endpoint)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        WebhookService._runner = runner
+        logger.info(f"Webhook-сервер запущен: {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    @staticmethod
+    async def stop() -> None:
+        """Прекращает приём и обрабатывает уже принятые обновления.
+
+        Webhook в Telegram не удаляется: обновления, пришедшие во время
+        перезапуска, будут доставлены повторно.
+        """
+        queue = WebhookService._queue
+        if queue is None:
+            return
+
+        # Новые запросы получают 404 и будут повторены Telegram
+        WebhookService._queue = None
+        if WebhookService._runner is not None:
+            await WebhookService._runner.cleanup()
+            WebhookService._runner = None
+
+        workers, WebhookService._workers = WebhookService._workers, []
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+        await WebhookService._unlock_instance()
+        _queue_depth.set(0)
+        logger.info('Приём обновлений через webhook остановлен')
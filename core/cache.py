@@ -0,0 +1,102 @@
+"""Ограниченный in-memory кеш с TTL.
+
+Используется для кеширования результатов внешних проверок и
+горячих данных на пути обработки сообщения.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """LRU-кеш с ограничением размера и временем жизни записей.
+
+    При превышении max_size вытесняется наименее недавно использованная
+    запись. Просроченные записи удаляются при обращении.
+
+    Аргументы:
+        max_size (int): Максимальное количество записей.
+        ttl (float): Время жизни записи в секундах.
+        clock (Callable[[], float]): Источник времени (для тестов).
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._clock = clock
+        self._data: 'OrderedDict[K, Tuple[float, V]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: K, default: Any = None) -> Any:
+        """Возвращает значение по ключу, если оно не просрочено.
+
+        Аргументы:
+            key (K): Ключ.
+            default (Any): Значение, если ключа нет или он просрочен.
+
+        Возвращаемое значение:
+            Any: Значение из кеша или default.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < self._clock():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """Сохраняет значение.
+
+        Аргументы:
+            key (K): Ключ.
+            value (V): Значение.
+            ttl (Optional[float]): Индивидуальное время жизни записи.
+        """
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K, default: Any = None) -> Any:
+        """Удаляет запись и возвращает её значение.
+
+        Аргументы:
+            key (K): Ключ.
+            default (Any): Значение, если ключа нет.
+
+        Возвращаемое значение:
+            Any: Удалённое значение или default.
+        """
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        """Очищает кеш."""
+        self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Удаляет все просроченные записи.
+
+        Возвращаемое значение:
+            int: Количество удалённых записей.
+        """
+        now = self._clock()
+        expired = [key for key, (expires_at, _) in self._data.items() if expires_at < now]
+        for key in expired:
+            del self._data[key]
+        return len(expired)
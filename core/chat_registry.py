@@ -0,0 +1,243 @@
+"""In-memory реестр наблюдаемых чатов и белых списков.
+
+Таблицы chat и whitelist_user маленькие и меняются редко, поэтому
+загружаются в память при старте: Telegram chat_id -> (pk, title, is_active)
+и PK чата -> множество user_id из белого списка. Обработка сообщения
+обращается к ним без запросов к БД.
+
+Репозитории ChatRepository и WhitelistRepository после каждой записи
+отправляют NOTIFY в канал REGISTRY_CHANNEL с JSON-описанием изменения
+и применяют его локально, поэтому реестр обновляется на месте во всех
+процессах. Пока слушатель уведомлений не подключён, реестр не используется
+и данные читаются из БД.
+"""
+
+import asyncio
+import json
+from typing import Dict, NamedTuple, Optional, Set
+
+from core import notify
+from core.logging import logger
+
+# Повторные попытки загрузки, если данные изменились во время чтения
+_LOAD_ATTEMPTS = 3
+
+
+class ChatInfo(NamedTuple):
+    """Запись реестра о чате."""
+
+    pk: int
+    chat_id: int
+    title: Optional[str]
+    is_active: bool
+
+
+def chat_payload(pk: int, chat_id: int, title: Optional[str], is_active: bool) -> str:
+    """Формирует уведомление об изменении чата.
+
+    Аргументы:
+        pk (int): PK чата.
+        chat_id (int): Telegram ID чата.
+        title (Optional[str]): Название чата.
+        is_active (bool): Активен ли чат.
+
+    Возвращаемое значение:
+        str: JSON-полезная нагрузка.
+    """
+    return json.dumps(
+        {'op': 'chat', 'pk': pk, 'chat_id': chat_id, 'title': title, 'is_active': is_active},
+        ensure_ascii=False,
+    )
+
+
+def chat_deleted_payload(pk: int) -> str:
+    """Формирует уведомление об удалении чата.
+
+    Аргументы:
+        pk (int): PK чата.
+
+    Возвращаемое значение:
+        str: JSON-полезная нагрузка.
+    """
+    return json.dumps({'op': 'chat_deleted', 'pk': pk})
+
+
+def whitelist_payload(chat_pk: int, user_id: int, added: bool) -> str:
+    """Формирует уведомление об изменении белого списка.
+
+    Аргументы:
+        chat_pk (int): PK чата.
+        user_id (int): Telegram ID пользователя.
+        added (bool): True — добавлен, False — удалён.
+
+    Возвращаемое значение:
+        str: JSON-полезная нагрузка.
+    """
+    op = 'whitelist_add' if added else 'whitelist_remove'
+    return json.dumps({'op': op, 'chat_pk': chat_pk, 'user_id': user_id})
+
+
+class ChatRegistry:
+    """Реестр чатов и белых списков в памяти процесса."""
+
+    _chats: Dict[int, ChatInfo] = {}
+    _whitelists: Dict[int, Set[int]] = {}
+    _loaded: bool = False
+    # Реестр используется в этом процессе (load() вызывался хотя бы раз)
+    _wanted: bool = False
+    _generation: int = 0
+    _reload_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Проверяет, можно ли отвечать из реестра.
+
+        Возвращаемое значение:
+            bool: True если реестр загружен и уведомления доставляются.
+        """
+        return ChatRegistry._loaded and notify.is_listening(notify.REGISTRY_CHANNEL)
+
+    @staticmethod
+    async def load() -> None:
+        """Загружает все чаты и белые списки из БД.
+
+        Если во время чтения пришло уведомление об изменении,
+        загрузка повторяется.
+        """
+        from core.repository.chat import ChatRepository
+        from core.repository.whitelist import WhitelistRepository
+
+        ChatRegistry._wanted = True
+
+        for _ in range(_LOAD_ATTEMPTS):
+            generation = ChatRegistry._generation
+            chats = await ChatRepository.get_all_chats()
+            entries = await WhitelistRepository.get_all_entries()
+            if generation != ChatRegistry._generation:
+                continue
+
+            ChatRegistry._chats = {
+                row['chat_id']: ChatInfo(row['id'], row['chat_id'], row['title'], row['is_active'])
+                for row in chats
+            }
+            whitelists: Dict[int, Set[int]] = {}
+            for row in entries:
+                whitelists.setdefault(row['chat_id'], set()).add(row['user_id'])
+            ChatRegistry._whitelists = whitelists
+            ChatRegistry._loaded = True
+            logger.info(
+                f"Реестр чатов загружен: чатов {len(chats)}, записей белого списка {len(entries)}"
+            )
+            return
+
+        logger.warning("Реестр чатов не загружен: данные менялись во время чтения")
+
+    @staticmethod
+    async def get_chat_pk(chat_id: int) -> Optional[int]:
+        """Возвращает PK активного чата по Telegram ID.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+
+        Возвращаемое значение:
+            Optional[int]: PK чата или None, если чат не наблюдается.
+        """
+        if not ChatRegistry.is_enabled():
+            from core.repository.chat import ChatRepository
+            return await ChatRepository.get_chat_pk(chat_id)
+
+        info = ChatRegistry._chats.get(chat_id)
+        return info.pk if info is not None and info.is_active else None
+
+    @staticmethod
+    def get_chat(chat_id: int) -> Optional[ChatInfo]:
+        """Возвращает запись реестра о чате без обращения к БД.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+
+        Возвращаемое значение:
+            Optional[ChatInfo]: Запись или None, если чат неизвестен или реестр не активен.
+        """
+        if not ChatRegistry.is_enabled():
+            return None
+        return ChatRegistry._chats.get(chat_id)
+
+    @staticmethod
+    async def is_whitelisted(chat_pk: int, user_id: int) -> bool:
+        """Проверяет белый список чата.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+
+        Возвращаемое значение:
+            bool: True если пользователь в белом списке.
+        """
+        if not ChatRegistry.is_enabled():
+            from core.repository.whitelist import WhitelistRepository
+            return await WhitelistRepository.is_whitelisted(chat_pk, user_id)
+
+        whitelist = ChatRegistry._whitelists.get(chat_pk)
+        return whitelist is not None and user_id in whitelist
+
+    @staticmethod
+    def apply(payload: str) -> None:
+        """Применяет уведомление об изменении к реестру.
+
+        Операции идемпотентны: уведомление, отправленное этим же
+        процессом, применяется повторно без последствий.
+
+        Аргументы:
+            payload (str): JSON-полезная нагрузка или RESET_PAYLOAD.
+        """
+        ChatRegistry._generation += 1
+
+        if payload == notify.RESET_PAYLOAD:
+            ChatRegistry._schedule_reload()
+            return
+
+        if not ChatRegistry._loaded:
+            return
+
+        data = json.loads(payload)
+        op = data.get('op')
+
+        if op == 'chat':
+            # Telegram chat_id уникален; запись заменяется целиком
+            ChatRegistry._chats[data['chat_id']] = ChatInfo(
+                data['pk'], data['chat_id'], data['title'], data['is_active']
+            )
+        elif op == 'chat_deleted':
+            for chat_id, info in list(ChatRegistry._chats.items()):
+                if info.pk == data['pk']:
+                    del ChatRegistry._chats[chat_id]
+            ChatRegistry._whitelists.pop(data['pk'], None)
+        elif op == 'whitelist_add':
+            ChatRegistry._whitelists.setdefault(data['chat_pk'], set()).add(data['user_id'])
+        elif op == 'whitelist_remove':
+            ChatRegistry._whitelists.get(data['chat_pk'], set()).discard(data['user_id'])
+        else:
+            logger.warning(f"Неизвестное уведомление реестра чатов: {payload}")
+
+    @staticmethod
+    def _schedule_reload() -> None:
+        """Помечает реестр устаревшим и запускает фоновую перезагрузку."""
+        if not ChatRegistry._wanted:
+            return
+        ChatRegistry._loaded = False
+
+        if ChatRegistry._reload_task is not None and not ChatRegistry._reload_task.done():
+            return
+        ChatRegistry._reload_task = asyncio.create_task(ChatRegistry._reload())
+
+    @staticmethod
+    async def _reload() -> None:
+        """Перезагружает реестр, логируя ошибки."""
+        try:
+            await ChatRegistry.load()
+        except Exception as e:
+            logger.error(f"Ошибка перезагрузки реестра чатов: {e}")
+
+
+notify.subscribe(notify.REGISTRY_CHANNEL, ChatRegistry.apply)
@@ -51,6 +51,187 @@ PROXY_URL: Optional[str] = os.getenv('PROXY_URL')
 # DSN для Sentry (опционально, для мониторинга ошибок)
 SENTRY_DSN: Optional[str] = os.getenv('SENTRY_DSN')
 
+# Bearer-токен для доступа к /metrics (без токена эндпоинт отключён)
+METRICS_TOKEN: Optional[str] = os.getenv('METRICS_TOKEN')
+
+
+# ВНЕШНИЕ API (CAS, LOLS)
+# Максимум одновременных соединений к одному хосту
+EXTERNAL_API_LIMIT_PER_HOST = int(os.getenv('EXTERNAL_API_LIMIT_PER_HOST', '20'))
+
+# Время кеширования DNS-записей (секунды)
+EXTERNAL_API_DNS_TTL = int(os.getenv('EXTERNAL_API_DNS_TTL', '300'))
+
+# Время удержания keep-alive соединения (секунды)
+EXTERNAL_API_KEEPALIVE = float(os.getenv('EXTERNAL_API_KEEPALIVE', '60'))
+
+# Границы адаптивного таймаута запроса (секунды)
+EXTERNAL_API_MIN_TIMEOUT = float(os.getenv('EXTERNAL_API_MIN_TIMEOUT', '0.5'))
+EXTERNAL_API_MAX_TIMEOUT = float(os.getenv('EXTERNAL_API_MAX_TIMEOUT', '10'))
+
+# Число подряд неудачных запросов до размыкания circuit breaker
+EXTERNAL_API_BREAKER_THRESHOLD = int(os.getenv('EXTERNAL_API_BREAKER_THRESHOLD', '5'))
+
+# Время в разомкнутом состоянии до пробного запроса (секунды)
+EXTERNAL_API_BREAKER_COOLDOWN = float(os.getenv('EXTERNAL_API_BREAKER_COOLDOWN', '30'))
+
+# Хеджированные запросы: дублировать запрос, если ответа нет дольше p95
+EXTERNAL_API_HEDGING = os.getenv('EXTERNAL_API_HEDGING', 'false').lower() in ('true', '1', 'yes')
+
+
+# РЕПУТАЦИЯ ПОЛЬЗОВАТЕЛЕЙ
+# Время жизни кешированных проверок пользователя (CAS, LOLS, ограничения, межчатовая репутация), секунды
+REPUTATION_CACHE_TTL = int(os.getenv('REPUTATION_CACHE_TTL', '600'))
+
+# Максимум пользователей в каждом кеше
+REPUTATION_CACHE_SIZE = int(os.getenv('REPUTATION_CACHE_SIZE', '50000'))
+
+
+# ПЛАНИРОВАНИЕ АНАЛИЗА
+# Потоки BERT-инференса (одновременно анализируемые сообщения)
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '2'))
+
+# Максимум одновременных внешних проверок (CAS, LOLS, ChatGPT)
+EXTERNAL_CHECK_CONCURRENCY = int(os.getenv('EXTERNAL_CHECK_CONCURRENCY', '16'))
+
+
+# ФЛУД
+# Размер кольцевого буфера последних сообщений пользователя (верхняя граница порогов)
+FLOOD_RING_SIZE = int(os.getenv('FLOOD_RING_SIZE', '32'))
+
+# Время неактивности, после которого буфер пользователя удаляется (секунды)
+FLOOD_IDLE_SECONDS = int(os.getenv('FLOOD_IDLE_SECONDS', '600'))
+
+
+# МЕДИА-ОТПЕЧАТКИ
+# Максимальное расстояние Хэмминга между перцептивными хешами похожих фото (0-64)
+MEDIA_HASH_RADIUS = int(os.getenv('MEDIA_HASH_RADIUS', '8'))
+
+# Сколько помнить медиа из недавних сообщений для подтверждения администратором (секунды)
+MEDIA_RECENT_TTL = int(os.getenv('MEDIA_RECENT_TTL', '86400'))
+
+# Максимум недавних медиа в памяти
+MEDIA_RECENT_SIZE = int(os.getenv('MEDIA_RECENT_SIZE', '50000'))
+
+
+# ОТРЕДАКТИРОВАННЫЕ СООБЩЕНИЯ
+# Сколько хранить результат анализа сообщения для проверки его правок (секунды)
+EDIT_CACHE_TTL = int(os.getenv('EDIT_CACHE_TTL', '3600'))
+
+# Максимум сообщений с сохранённым результатом анализа
+EDIT_CACHE_SIZE = int(os.getenv('EDIT_CACHE_SIZE', '50000'))
+
+# Правка до стольких символов не анализируется заново (0 — анализировать любую правку)
+EDIT_REUSE_MAX_CHARS = int(os.getenv('EDIT_REUSE_MAX_CHARS', '3'))
+
+
+# ТЕНЕВАЯ ОЦЕНКА МОДЕЛИ
+# Модель-кандидат относительно MODELS_DIR (например, compressed/finetuned_rubert_tiny2_raw_onnx); пусто — отключено
+SHADOW_MODEL = os.getenv('SHADOW_MODEL', '')
+
+# Доля проанализированных сообщений, которые оцениваются моделью-кандидатом (0-1)
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+
+# Максимум сообщений в очереди оценки; при переполнении новые сообщения не оцениваются
+SHADOW_QUEUE_LIMIT = int(os.getenv('SHADOW_QUEUE_LIMIT', '100'))
+
+# Потоки инференса модели-кандидата
+SHADOW_WORKERS = int(os.getenv('SHADOW_WORKERS', '1'))
+
+
+# УРОВНИ ДОВЕРИЯ
+# Максимум пар (чат, пользователь) со счётчиками активности в памяти
+TRUST_CACHE_SIZE = int(os.getenv('TRUST_CACHE_SIZE', '100000'))
+
+# Интервал записи счётчиков активности в БД (секунды)
+TRUST_FLUSH_INTERVAL = float(os.getenv('TRUST_FLUSH_INTERVAL', '10'))
+
+
+# СБОР СООБЩЕНИЙ (COLLECT_ALL_MESSAGES)
+# Количество накопленных сообщений, при котором буфер записывается в БД
+COLLECT_FLUSH_SIZE = int(os.getenv('COLLECT_FLUSH_SIZE', '500'))
+
+# Максимальный интервал между записями буфера (секунды)
+COLLECT_FLUSH_INTERVAL = float(os.getenv('COLLECT_FLUSH_INTERVAL', '1'))
+
+# Максимум сообщений в буфере; при переполнении новые сообщения отбрасываются
+COLLECT_BUFFER_LIMIT = int(os.getenv('COLLECT_BUFFER_LIMIT', '20000'))
+
+
+# ИСХОДЯЩИЕ ЗАПРОСЫ К TELEGRAM
+# Общий лимит запросов бота в секунду
+OUTBOX_GLOBAL_RATE = float(os.getenv('OUTBOX_GLOBAL_RATE', '25'))
+
+# Лимит сообщений в один чат в минуту и допустимый всплеск
+OUTBOX_CHAT_RATE = float(os.getenv('OUTBOX_CHAT_RATE', '20'))
+OUTBOX_CHAT_BURST = int(os.getenv('OUTBOX_CHAT_BURST', '5'))
+
+# Максимум одновременно выполняемых запросов
+OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', '8'))
+
+# Максимум запросов в очереди; сверх лимита отбрасываются сообщения лог-топика
+OUTBOX_QUEUE_LIMIT = int(os.getenv('OUTBOX_QUEUE_LIMIT', '1000'))
+
+# Максимум повторов запроса и верхняя граница паузы между повторами (секунды)
+OUTBOX_MAX_RETRIES = int(os.getenv('OUTBOX_MAX_RETRIES', '5'))
+OUTBOX_BACKOFF_MAX = float(os.getenv('OUTBOX_BACKOFF_MAX', '60'))
+
+# Время на отправку оставшихся запросов при остановке (секунды)
+OUTBOX_DRAIN_TIMEOUT = float(os.getenv('OUTBOX_DRAIN_TIMEOUT', '15'))
+
+
+# ПОБОЧНЫЕ ДЕЙСТВИЯ МОДЕРАЦИИ
+# Количество фоновых обработчиков (запись вердиктов, уведомления)
+SIDE_EFFECT_WORKERS = int(os.getenv('SIDE_EFFECT_WORKERS', '4'))
+
+# Максимум действий в очереди; при переполнении действие выполняется в обработчике сообщения
+SIDE_EFFECT_QUEUE_LIMIT = int(os.getenv('SIDE_EFFECT_QUEUE_LIMIT', '10000'))
+
+# Максимум повторов действия при ошибке
+SIDE_EFFECT_MAX_RETRIES = int(os.getenv('SIDE_EFFECT_MAX_RETRIES', '3'))
+
+
+# ТРАССИРОВКА ОБРАБОТКИ СООБЩЕНИЙ
+# Измерять этапы обработки каждого сообщения (true/false)
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() in ('true', '1', 'yes')
+
+# Обработка дольше порога записывается в таблицу slow_trace (секунды)
+TRACE_SLOW_THRESHOLD = float(os.getenv('TRACE_SLOW_THRESHOLD', '2'))
+
+
+# ДАЙДЖЕСТ ЛОГ-ТОПИКА (LOG_TO_TOPIC)
+# Окно накопления записей в один дайджест (секунды); 0 — отправлять каждую запись отдельно
+LOG_DIGEST_WINDOW = float(os.getenv('LOG_DIGEST_WINDOW', '5'))
+
+# Максимум записей в дайджесте (не больше 25 из-за лимита кнопок Telegram)
+LOG_DIGEST_MAX_ENTRIES = min(int(os.getenv('LOG_DIGEST_MAX_ENTRIES', '10')), 25)
+
+
+# LLM-ПРОВЕРКА (OpenAI-совместимый API)
+# Базовый URL API (например, локальный OpenAI-совместимый сервер)
+OPENAI_BASE_URL: Optional[str] = os.getenv('OPENAI_BASE_URL')
+
+# Модель для проверки на спам
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+
+# Таймаут запроса к API (секунды)
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '15'))
+
+# Максимум одновременных запросов к API
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '4'))
+
+# Бюджет токенов в минуту (0 — без ограничения)
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '60000'))
+
+# Максимум текстов в одном пакетном запросе
+OPENAI_BATCH_SIZE = int(os.getenv('OPENAI_BATCH_SIZE', '8'))
+
+# Окно накопления пакета (секунды)
+OPENAI_BATCH_WINDOW = float(os.getenv('OPENAI_BATCH_WINDOW', '0.2'))
+
+# Время жизни кешированного вердикта (секунды)
+OPENAI_CACHE_TTL = int(os.getenv('OPENAI_CACHE_TTL', '86400'))
+
 
 # TELEGRAM НАСТРОЙКИ
 # Режим тестирования
@@ -74,10 +255,65 @@ NOTIFICATION_CHAT_WHITELIST_THREAD = int(os.getenv('NOTIFICATION_CHAT_WHITELIST_
 # ID треда для отправки резервных копий базы данных
 NOTIFICATION_CHAT_BACKUP_THREAD = int(os.getenv('NOTIFICATION_CHAT_BACKUP_THREAD', '5'))
 
+# Интервал полной перезагрузки кеша администраторов чатов (секунды)
+ADMIN_CACHE_REFRESH_INTERVAL = int(os.getenv('ADMIN_CACHE_REFRESH_INTERVAL', '900'))
+
+# Максимум одновременно обрабатываемых обновлений
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '32'))
+
+# Максимум обновлений, ожидающих обработки; сверх лимита обновления отбрасываются
+UPDATE_BACKLOG_LIMIT = int(os.getenv('UPDATE_BACKLOG_LIMIT', '2000'))
+
+# Окно сбора сообщений альбома перед обработкой (секунды); 0 — обрабатывать каждое сообщение отдельно
+ALBUM_WINDOW = float(os.getenv('ALBUM_WINDOW', '0.5'))
+
 # Системные пользователи Telegram (анонимный админ, бот канала)
 SYSTEM_USER_IDS = [777000, 1087968824]
 
 
+# ПРИЁМ ОБНОВЛЕНИЙ (WEBHOOK)
+# Способ получения обновлений: polling или webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+
+# Публичный URL, на который Telegram отправляет обновления (для setWebhook)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+
+# Путь эндпоинта (в панели или отдельном сервере)
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+
+# Секрет заголовка X-Telegram-Bot-Api-Secret-Token (A-Z, a-z, 0-9, _ и -)
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+
+# Адрес и порт отдельного сервера; порт 0 — эндпоинт в панели
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '0'))
+
+# Максимум соединений Telegram к эндпоинту (setWebhook max_connections, 1–100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Количество обработчиков и максимум принятых необработанных обновлений
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '64'))
+WEBHOOK_QUEUE_LIMIT = int(os.getenv('WEBHOOK_QUEUE_LIMIT', '1000'))
+
+
+# ЗАХВАТ ОБНОВЛЕНИЙ ДЛЯ НАГРУЗОЧНЫХ ТЕСТОВ
+# Доля записываемых обновлений (0 — захват отключён, 1 — все)
+CAPTURE_SAMPLE_RATE = float(os.getenv('CAPTURE_SAMPLE_RATE', '0'))
+
+# Директория файлов захвата (абсолютный путь)
+CAPTURE_DIR = str(BASE_DIR / os.getenv('CAPTURE_DIR', 'data/capture'))
+
+# Ключ HMAC для псевдонимизации ID пользователей (обязателен при захвате)
+CAPTURE_HASH_KEY = os.getenv('CAPTURE_HASH_KEY', '')
+
+# Тексты сообщений: keep — сохранять, hash — заменять хешем той же длины
+CAPTURE_TEXT = os.getenv('CAPTURE_TEXT', 'hash').lower()
+
+# Ротация файла: по времени (секунды) и по размеру сжатых данных (МБ)
+CAPTURE_ROTATE_SECONDS = int(os.getenv('CAPTURE_ROTATE_SECONDS', '3600'))
+CAPTURE_ROTATE_MB = int(os.getenv('CAPTURE_ROTATE_MB', '64'))
+
+
 # ВЕБ-ПАНЕЛЬ
 # Порт панели управления
 PANEL_PORT = int(os.getenv('PANEL_PORT', '12523'))
@@ -155,6 +391,29 @@ DEFAULT_SETTINGS = {
     'ENABLE_AUTOMUTING': False,
     'CHECK_EDITED_MESSAGES': True,
     'COLLECT_ALL_MESSAGES': False,
+    'RESTRICT_ON_JOIN': False,
+    'REPUTATION_SPAM_THRESHOLD': 3,
+
+    # Планирование анализа
+    'INFERENCE_SHARE': 1.0,
+
+    # Флуд
+    'FLOOD_ENABLED': False,
+    'FLOOD_MAX_MESSAGES': 10,
+    'FLOOD_WINDOW_SECONDS': 10,
+    'FLOOD_MAX_DUPLICATES': 3,
+    'FLOOD_DUPLICATE_SECONDS': 120,
+
+    # Медиа
+    'CHECK_MEDIA': False,
+    'CHECK_MEDIA_SIMILAR': False,
+
+    # Уровни доверия
+    'TRUST_ENABLED': False,
+    'TRUST_MIN_MESSAGES': 50,
+    'TRUST_MIN_DAYS': 7,
+    'TRUST_SAMPLE_RATE': 0.1,
+    'TRUST_SKIP_MESSAGES': 500,
 
     # Логирование
     'LOG_TO_TOPIC': False,
@@ -3,7 +3,7 @@
 Единый пул соединений, используемый ботом и панелью.
 """
 
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 import asyncpg
 
@@ -15,7 +15,8 @@ _pool: Optional[asyncpg.Pool] = None
 async def init_pool(
     dsn: str,
     min_size: int = 2,
-    max_size: int = 10
+    max_size: int = 10,
+    init: Optional[Callable[[asyncpg.Connection], Awaitable[None]]] = None
 ) -> asyncpg.Pool:
     """Создаёт и возвращает пул соединений PostgreSQL.
 
@@ -23,6 +24,7 @@ async def init_pool(
         dsn (str): Строка подключения к PostgreSQL.
         min_size (int): Минимальное количество соединений в пуле.
         max_size (int): Максимальное количество соединений в пуле.
+        init (Optional[Callable]): Корутина, вызываемая для каждого нового соединения.
 
     Возвращаемое значение:
         asyncpg.Pool: Пул соединений.
@@ -36,7 +38,8 @@ async def init_pool(
         dsn=dsn,
         min_size=min_size,
         max_size=max_size,
-        command_timeout=30
+        command_timeout=30,
+        init=init
     )
     logger.info("Пул соединений PostgreSQL создан.")
     return _pool
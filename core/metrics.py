@@ -0,0 +1,387 @@
+"""Лёгкий реестр метрик процесса в формате Prometheus.
+
+Без внешних зависимостей: счётчики, gauge и гистограммы с метками
+хранятся в памяти процесса и отдаются панелью по адресу /metrics.
+
+Метрики регистрируются через counter(), gauge() и histogram().
+Повторная регистрация с тем же именем возвращает существующий объект,
+поэтому модули можно безопасно импортировать несколько раз.
+"""
+
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Границы гистограмм задержек по умолчанию (секунды)
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label(value: str) -> str:
+    """Экранирует значение метки для текстового формата Prometheus.
+
+    Аргументы:
+        value (str): Значение метки.
+
+    Возвращаемое значение:
+        str: Экранированное значение.
+    """
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+    """Форматирует набор меток в виде {name="value",...}.
+
+    Аргументы:
+        names (Sequence[str]): Имена меток.
+        values (LabelValues): Значения меток.
+        extra (Optional[Dict[str, str]]): Дополнительные метки (например, le).
+
+    Возвращаемое значение:
+        str: Строка меток или пустая строка.
+    """
+    pairs = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.extend(f'{n}="{_escape_label(v)}"' for n, v in extra.items())
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    """Форматирует числовое значение метрики.
+
+    Аргументы:
+        value (float): Значение.
+
+    Возвращаемое значение:
+        str: Строковое представление.
+    """
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Базовый класс метрики с метками."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        """Строит ключ значений меток в порядке labelnames.
+
+        Аргументы:
+            labels (Dict[str, object]): Метки в виде именованных аргументов.
+
+        Возвращаемое значение:
+            LabelValues: Кортеж строковых значений меток.
+
+        Исключения:
+            ValueError: Если набор меток не совпадает с объявленным.
+        """
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Метрика {self.name}: ожидаются метки {self.labelnames}, получены {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Возвращает строки метрики в текстовом формате Prometheus."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Монотонно возрастающий счётчик."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        """Увеличивает счётчик.
+
+        Аргументы:
+            amount (float): Величина прироста.
+            **labels: Значения меток.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        """Возвращает текущее значение счётчика.
+
+        Аргументы:
+            **labels: Значения меток.
+
+        Возвращаемое значение:
+            float: Значение счётчика.
+        """
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}' for k, v in items]
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и убывать."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: object) -> None:
+        """Устанавливает значение.
+
+        Аргументы:
+            value (float): Новое значение.
+            **labels: Значения меток.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        """Увеличивает значение.
+
+        Аргументы:
+            amount (float): Величина прироста.
+            **labels: Значения меток.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        """Уменьшает значение.
+
+        Аргументы:
+            amount (float): Величина уменьшения.
+            **labels: Значения меток.
+        """
+        self.inc(-amount, **labels)
+
+    def remove(self, **labels: object) -> None:
+        """Удаляет серию с указанными метками.
+
+        Аргументы:
+            **labels: Значения меток.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def value(self, **labels: object) -> float:
+        """Возвращает текущее значение.
+
+        Аргументы:
+            **labels: Значения меток.
+
+        Возвращаемое значение:
+            float: Значение gauge.
+        """
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}' for k, v in items]
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами бакетов."""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # Для каждой серии: [счётчики бакетов..., +Inf], сумма
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        """Регистрирует наблюдение.
+
+        Аргументы:
+            value (float): Наблюдаемое значение.
+            **labels: Значения меток.
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+                self._counts[key] = counts
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: object) -> int:
+        """Возвращает число наблюдений серии.
+
+        Аргументы:
+            **labels: Значения меток.
+
+        Возвращаемое значение:
+            int: Количество наблюдений.
+        """
+        counts = self._counts.get(self._key(labels))
+        return sum(counts) if counts else 0
+
+    def quantile(self, q: float, **labels: object) -> Optional[float]:
+        """Оценивает квантиль по бакетам (верхняя граница бакета).
+
+        Аргументы:
+            q (float): Квантиль от 0 до 1.
+            **labels: Значения меток.
+
+        Возвращаемое значение:
+            Optional[float]: Оценка квантиля или None, если наблюдений нет.
+        """
+        counts = self._counts.get(self._key(labels))
+        if not counts:
+            return None
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for i, c in enumerate(counts):
+            cumulative += c
+            if cumulative >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        for key, counts, total_sum in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float('inf'),), counts):
+                cumulative += c
+                labels = _format_labels(self.labelnames, key, {'le': _format_value(bound)})
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            base = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{base} {_format_value(total_sum)}')
+            lines.append(f'{self.name}_count{base} {cumulative}')
+        return lines
+
+
+_registry: Dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+    """Регистрирует метрику или возвращает уже зарегистрированную.
+
+    Аргументы:
+        cls: Класс метрики.
+        name (str): Имя метрики.
+        documentation (str): Описание метрики.
+        labelnames (Iterable[str]): Имена меток.
+        **kwargs: Дополнительные параметры конструктора.
+
+    Возвращаемое значение:
+        _Metric: Экземпляр метрики.
+
+    Исключения:
+        ValueError: Если имя уже занято метрикой другого типа.
+    """
+    with _registry_lock:
+        existing = _registry.get(name)
+        if existing is not None:
+            if not isinstance(existing, cls):
+                raise ValueError(f"Метрика {name} уже зарегистрирована с типом {existing.kind}")
+            return existing
+        metric = cls(name, documentation, labelnames, **kwargs)
+        _registry[name] = metric
+        return metric
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    """Возвращает счётчик с указанным именем, создавая при первом вызове.
+
+    Аргументы:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики.
+        labelnames (Iterable[str]): Имена меток.
+
+    Возвращаемое значение:
+        Counter: Счётчик.
+    """
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+    """Возвращает gauge с указанным именем, создавая при первом вызове.
+
+    Аргументы:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики.
+        labelnames (Iterable[str]): Имена меток.
+
+    Возвращаемое значение:
+        Gauge: Gauge-метрика.
+    """
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Iterable[str] = (),
+    buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+) -> Histogram:
+    """Возвращает гистограмму с указанным именем, создавая при первом вызове.
+
+    Аргументы:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики.
+        labelnames (Iterable[str]): Имена меток.
+        buckets (Sequence[float]): Границы бакетов.
+
+    Возвращаемое значение:
+        Histogram: Гистограмма.
+    """
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def render_metrics() -> str:
+    """Формирует текстовое представление всех метрик для Prometheus.
+
+    Возвращаемое значение:
+        str: Метрики в текстовом формате exposition 0.0.4.
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+
+    lines: List[str] = []
+    for metric in sorted(metrics, key=lambda m: m.name):
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,174 @@
+"""Межпроцессные уведомления через PostgreSQL LISTEN/NOTIFY.
+
+Используются для точной инвалидации in-memory кешей: процесс, изменивший
+данные, отправляет NOTIFY в канал, и все процессы (бот, панель, реплики)
+сбрасывают соответствующие записи.
+
+Слушатель держит отдельное соединение вне пула. При потере соединения
+оно восстанавливается, а обработчики получают RESET_PAYLOAD: за время
+разрыва уведомления могли быть пропущены, поэтому кеш нужно сбросить целиком.
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional, Set
+
+import asyncpg
+
+from core.db import get_pool
+from core.logging import logger
+
+# Каналы уведомлений
+SETTINGS_CHANNEL = 'antispam_settings'
+REGISTRY_CHANNEL = 'antispam_registry'
+
+# Полезная нагрузка «сбросить всё», отправляемая обработчикам после переподключения
+RESET_PAYLOAD = '*'
+
+# Пауза перед повторным подключением слушателя (секунды)
+_RECONNECT_DELAY = 5
+
+_handlers: Dict[str, List[Callable[[str], None]]] = {}
+_connection: Optional[asyncpg.Connection] = None
+_listening: Set[str] = set()
+_supervisor_task: Optional[asyncio.Task] = None
+
+
+def subscribe(channel: str, handler: Callable[[str], None]) -> None:
+    """Регистрирует обработчик уведомлений канала.
+
+    Обработчик вызывается синхронно в event loop и не должен блокировать.
+    Каналы, зарегистрированные после запуска слушателя, подключаются
+    на следующей проверке соединения.
+
+    Аргументы:
+        channel (str): Имя канала.
+        handler (Callable[[str], None]): Функция, принимающая payload.
+    """
+    handlers = _handlers.setdefault(channel, [])
+    if handler not in handlers:
+        handlers.append(handler)
+
+
+def is_listening(channel: Optional[str] = None) -> bool:
+    """Проверяет, доставляются ли сейчас уведомления.
+
+    Аргументы:
+        channel (Optional[str]): Канал; если не указан, проверяется только соединение.
+
+    Возвращаемое значение:
+        bool: True если соединение активно (и канал прослушивается).
+    """
+    if _connection is None or _connection.is_closed():
+        return False
+    return channel is None or channel in _listening
+
+
+def dispatch(channel: str, payload: str) -> None:
+    """Передаёт уведомление всем обработчикам канала в этом процессе.
+
+    Используется и для входящих уведомлений, и для немедленного
+    применения собственных изменений до их возврата через NOTIFY.
+
+    Аргументы:
+        channel (str): Имя канала.
+        payload (str): Полезная нагрузка.
+    """
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception as e:
+            logger.error(f"Ошибка обработчика уведомления {channel}: {e}")
+
+
+def _on_notification(connection, pid, channel: str, payload: str) -> None:
+    """Callback asyncpg для входящего уведомления."""
+    logger.debug(f"NOTIFY {channel}: {payload}")
+    dispatch(channel, payload)
+
+
+async def _listen_new_channels() -> None:
+    """Подписывает соединение слушателя на ещё не прослушиваемые каналы."""
+    for channel in list(_handlers):
+        if channel not in _listening:
+            await _connection.add_listener(channel, _on_notification)
+            _listening.add(channel)
+
+
+async def _supervise(dsn: str) -> None:
+    """Следит за соединением слушателя и восстанавливает его при разрыве.
+
+    Аргументы:
+        dsn (str): Строка подключения к PostgreSQL.
+    """
+    global _connection
+
+    while True:
+        try:
+            if not is_listening():
+                _listening.clear()
+                _connection = await asyncpg.connect(dsn=dsn)
+                await _listen_new_channels()
+                logger.info(f"Слушатель уведомлений подключён: {', '.join(sorted(_listening)) or '—'}")
+                # Пока соединения не было, уведомления могли быть пропущены
+                for channel in _listening:
+                    dispatch(channel, RESET_PAYLOAD)
+            else:
+                await _listen_new_channels()
+            await asyncio.sleep(_RECONNECT_DELAY)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.warning(f"Слушатель уведомлений недоступен: {e}")
+            if _connection is not None and not _connection.is_closed():
+                _connection.terminate()
+            _connection = None
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+
+async def start_listener(dsn: str) -> None:
+    """Запускает слушатель уведомлений. Повторный вызов ничего не делает.
+
+    Аргументы:
+        dsn (str): Строка подключения к PostgreSQL.
+    """
+    global _supervisor_task
+    if _supervisor_task is not None:
+        return
+    _supervisor_task = asyncio.create_task(_supervise(dsn))
+
+
+async def stop_listener() -> None:
+    """Останавливает слушатель и закрывает его соединение."""
+    global _supervisor_task, _connection
+
+    if _supervisor_task is not None:
+        _supervisor_task.cancel()
+        try:
+            await _supervisor_task
+        except asyncio.CancelledError:
+            pass
+        _supervisor_task = None
+
+    if _connection is not None:
+        try:
+            await _connection.close()
+        except Exception:
+            pass
+        _connection = None
+        _listening.clear()
+        logger.info("Слушатель уведомлений остановлен.")
+
+
+async def notify(channel: str, payload: str, conn: Optional[asyncpg.Connection] = None) -> None:
+    """Отправляет уведомление в канал.
+
+    Если передано соединение внутри транзакции, уведомление будет
+    доставлено только после её фиксации.
+
+    Аргументы:
+        channel (str): Имя канала.
+        payload (str): Полезная нагрузка.
+        conn (Optional[asyncpg.Connection]): Соединение; по умолчанию — пул.
+    """
+    executor = conn if conn is not None else get_pool()
+    await executor.execute('SELECT pg_notify($1, $2)', channel, payload)
@@ -0,0 +1,89 @@
+"""Асинхронный token bucket для ограничения частоты операций."""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Token bucket: ёмкость capacity, пополнение rate токенов в секунду.
+
+    Аргументы:
+        rate (float): Скорость пополнения (токенов в секунду).
+        capacity (float): Максимальное количество накопленных токенов.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Пополняет токены пропорционально прошедшему времени."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    @property
+    def tokens(self) -> float:
+        """Текущее количество доступных токенов."""
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Пытается забрать токены без ожидания.
+
+        Аргументы:
+            amount (float): Количество токенов.
+
+        Возвращаемое значение:
+            bool: True если токены получены.
+        """
+        self._refill()
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return True
+        return False
+
+    def delay_for(self, amount: float = 1.0) -> float:
+        """Возвращает время ожидания до появления amount токенов.
+
+        Аргументы:
+            amount (float): Количество токенов.
+
+        Возвращаемое значение:
+            float: Время ожидания в секундах (0, если токены уже есть).
+        """
+        self._refill()
+        if self._tokens >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (amount - self._tokens) / self.rate
+
+    async def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Забирает токены, ожидая их пополнения при необходимости.
+
+        Запросы обслуживаются по порядку: пока один ожидает, следующие
+        ждут своей очереди.
+
+        Аргументы:
+            amount (float): Количество токенов (не больше capacity).
+            timeout (Optional[float]): Максимальное время ожидания в секундах.
+
+        Возвращаемое значение:
+            bool: True если токены получены, False при превышении timeout.
+        """
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        async with self._lock:
+            while True:
+                delay = self.delay_for(amount)
+                if delay == 0.0:
+                    self._tokens -= amount
+                    return True
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    return False
+                await asyncio.sleep(delay)
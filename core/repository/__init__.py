@@ -11,6 +11,12 @@ from core.repository.muted import MutedRepository
 from core.repository.whitelist import WhitelistRepository
 from core.repository.collected import CollectedRepository
 from core.repository.user import UserRepository
+from core.repository.context import ModerationContextRepository
+from core.repository.activity import ActivityRepository
+from core.repository.slow_trace import SlowTraceRepository
+from core.repository.media import MediaFingerprintRepository
+from core.repository.shadow import ShadowEvalRepository
+from core.repository.counter import ListCounterRepository
 
 __all__ = [
     'SettingsRepository',
@@ -20,4 +26,10 @@ __all__ = [
     'WhitelistRepository',
     'CollectedRepository',
     'UserRepository',
+    'ModerationContextRepository',
+    'ActivityRepository',
+    'SlowTraceRepository',
+    'MediaFingerprintRepository',
+    'ShadowEvalRepository',
+    'ListCounterRepository',
 ]
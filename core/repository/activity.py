@@ -0,0 +1,62 @@
+"""Репозиторий для работы со счётчиками активности пользователей."""
+
+from typing import List, Optional, Sequence, Tuple
+
+from core.db import get_pool
+
+
+class ActivityRepository:
+    """Репозиторий активности пользователей в чатах."""
+
+    @staticmethod
+    async def get_activity(chat_pk: int, user_id: int) -> Optional[dict]:
+        """Получает счётчики активности пользователя в чате.
+
+        Аргументы:
+            chat_pk (int): PK чата.
+            user_id (int): Telegram ID пользователя.
+
+        Возвращаемое значение:
+            Optional[dict]: Запись или None.
+        """
+        pool = get_pool()
+        row = await pool.fetchrow(
+            'SELECT * FROM user_activity WHERE chat_id = $1 AND user_id = $2',
+            chat_pk, user_id
+        )
+        return dict(row) if row else None
+
+    @staticmethod
+    async def apply_deltas(
+        deltas: Sequence[Tuple[int, int, int, int, float, float, Optional[bool]]]
+    ) -> None:
+        """Прибавляет накопленные изменения счётчиков одним запросом.
+
+        Изменения для чатов, которых уже нет в таблице chat (удалены из
+        панели), пропускаются, чтобы не нарушать внешний ключ.
+
+        Аргументы:
+            deltas (Sequence[Tuple]): Кортежи (chat_pk, user_id, messages, spam,
+                first_seen, last_seen, last_verdict); last_verdict None — без вердикта.
+        """
+        if not deltas:
+            return
+
+        columns: List[list] = [list(column) for column in zip(*deltas)]
+        pool = get_pool()
+        await pool.execute(
+            '''INSERT INTO user_activity
+               (chat_id, user_id, messages_seen, spam_count, first_seen, last_seen, last_verdict)
+               SELECT u.* FROM unnest(
+                   $1::bigint[], $2::bigint[], $3::integer[], $4::integer[],
+                   $5::double precision[], $6::double precision[], $7::boolean[]
+               ) AS u (chat_id, user_id, messages_seen, spam_count, first_seen, last_seen, last_verdict)
+               JOIN chat c ON c.id = u.chat_id
+               ON CONFLICT (chat_id, user_id) DO UPDATE SET
+                   messages_seen = user_activity.messages_seen + EXCLUDED.messages_seen,
+                   spam_count = user_activity.spam_count + EXCLUDED.spam_count,
+                   first_seen = LEAST(user_activity.first_seen, EXCLUDED.first_seen),
+                   last_seen = GREATEST(user_activity.last_seen, EXCLUDED.last_seen),
+                   last_verdict = COALESCE(EXCLUDED.last_verdict, user_activity.last_verdict)''',
+            *columns
+        )
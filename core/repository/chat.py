@@ -1,7 +1,13 @@
-"""Репозиторий для работы с чатами."""
+"""Репозиторий для работы с чатами.
+
+Изменения чатов публикуются в канал REGISTRY_CHANNEL для реестра чатов
+(core.chat_registry) в этом и других процессах.
+"""
 
 from typing import List, Optional
 
+from core import notify
+from core.chat_registry import chat_deleted_payload, chat_payload
 from core.db import get_pool
 
 
@@ -20,21 +26,26 @@ class ChatRepository:
             int: PK записи в таблице chat.
         """
         pool = get_pool()
-        existing = await pool.fetchval(
-            'SELECT id FROM chat WHERE chat_id = $1', chat_id
-        )
-        if existing:
-            await pool.execute(
-                'UPDATE chat SET is_active = TRUE, title = $2 WHERE id = $1',
-                existing, title
-            )
-            return existing
-
-        return await pool.fetchval(
-            '''INSERT INTO chat (chat_id, title, is_active) VALUES ($1, $2, TRUE)
-               RETURNING id''',
-            chat_id, title
-        )
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                pk = await conn.fetchval(
+                    'SELECT id FROM chat WHERE chat_id = $1', chat_id
+                )
+                if pk:
+                    await conn.execute(
+                        'UPDATE chat SET is_active = TRUE, title = $2 WHERE id = $1',
+                        pk, title
+                    )
+                else:
+                    pk = await conn.fetchval(
+                        '''INSERT INTO chat (chat_id, title, is_active) VALUES ($1, $2, TRUE)
+                           RETURNING id''',
+                        chat_id, title
+                    )
+                payload = chat_payload(pk, chat_id, title, True)
+                await notify.notify(notify.REGISTRY_CHANNEL, payload, conn)
+        notify.dispatch(notify.REGISTRY_CHANNEL, payload)
+        return pk
 
     @staticmethod
     async def deactivate_chat(chat_id: int) -> None:
@@ -44,9 +55,18 @@ class ChatRepository:
             chat_id (int): Telegram ID чата.
         """
         pool = get_pool()
-        await pool.execute(
-            'UPDATE chat SET is_active = FALSE WHERE chat_id = $1', chat_id
-        )
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    '''UPDATE chat SET is_active = FALSE WHERE chat_id = $1
+                       RETURNING id, title''',
+                    chat_id
+                )
+                if row is None:
+                    return
+                payload = chat_payload(row['id'], chat_id, row['title'], False)
+                await notify.notify(notify.REGISTRY_CHANNEL, payload, conn)
+        notify.dispatch(notify.REGISTRY_CHANNEL, payload)
 
     @staticmethod
     async def get_active_chats() -> List[dict]:
@@ -61,6 +81,17 @@ class ChatRepository:
         )
         return [dict(row) for row in rows]
 
+    @staticmethod
+    async def get_all_chats() -> List[dict]:
+        """Возвращает все чаты, включая неактивные.
+
+        Возвращаемое значение:
+            List[dict]: Список чатов с полями id, chat_id, title, is_active.
+        """
+        pool = get_pool()
+        rows = await pool.fetch('SELECT id, chat_id, title, is_active FROM chat')
+        return [dict(row) for row in rows]
+
     @staticmethod
     async def get_chat_by_telegram_id(chat_id: int) -> Optional[dict]:
         """Получает чат по Telegram ID.
@@ -116,7 +147,15 @@ class ChatRepository:
             bool: True если запись удалена.
         """
         pool = get_pool()
-        result = await pool.execute(
-            'DELETE FROM chat WHERE id = $1', pk
-        )
-        return result.endswith('1')
+        payload = chat_deleted_payload(pk)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                result = await conn.execute(
+                    'DELETE FROM chat WHERE id = $1', pk
+                )
+                deleted = result.endswith('1')
+                if deleted:
+                    await notify.notify(notify.REGISTRY_CHANNEL, payload, conn)
+        if deleted:
+            notify.dispatch(notify.REGISTRY_CHANNEL, payload)
+        return deleted
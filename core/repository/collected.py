@@ -1,7 +1,7 @@
 """Репозиторий для работы с собранными сообщениями."""
 
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 
 from core.db import get_pool
 
@@ -14,7 +14,8 @@ class CollectedRepository:
         chat_id: int,
         user_id: int,
         username: Optional[str],
-        message_text: str
+        message_text: str,
+        timestamp: Optional[float] = None
     ) -> None:
         """Добавляет собранное сообщение.
 
@@ -23,15 +24,33 @@ class CollectedRepository:
             user_id (int): Telegram ID пользователя.
             username (Optional[str]): Username.
             message_text (str): Текст сообщения.
+            timestamp (Optional[float]): Время сообщения (по умолчанию текущее).
         """
         pool = get_pool()
-        timestamp = datetime.now().timestamp()
+        if timestamp is None:
+            timestamp = datetime.now().timestamp()
         await pool.execute(
             '''INSERT INTO collected_message (chat_id, user_id, username, message_text, timestamp)
                VALUES ($1, $2, $3, $4, $5)''',
             chat_id, user_id, username, message_text, timestamp
         )
 
+    @staticmethod
+    async def add_collected_messages(
+        records: Iterable[Tuple[int, int, Optional[str], str, float]]
+    ) -> None:
+        """Добавляет пачку собранных сообщений одной командой COPY.
+
+        Аргументы:
+            records (Iterable[Tuple]): Кортежи (chat_id, user_id, username, message_text, timestamp).
+        """
+        pool = get_pool()
+        await pool.copy_records_to_table(
+            'collected_message',
+            records=records,
+            columns=('chat_id', 'user_id', 'username', 'message_text', 'timestamp'),
+        )
+
     @staticmethod
     async def get_collected_count(chat_pk: Optional[int] = None) -> int:
         """Возвращает количество собранных сообщений.
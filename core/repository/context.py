@@ -0,0 +1,98 @@
+"""Репозиторий контекста модерации.
+
+Загружает всё, что нужно для обработки сообщения, одним запросом:
+PK чата, глобальные и per-chat настройки, запись об ограничениях автора
+и признак белого списка. Используется, когда in-memory кеши холодные
+или отключены, вместо пяти последовательных запросов.
+
+asyncpg подготавливает запрос при первом выполнении на соединении
+и переиспользует его из кеша prepared statements.
+"""
+
+import json
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple, Optional
+
+from core.db import get_pool
+from core.repository.settings import _cast_value
+
+_CONTEXT_QUERY = '''
+WITH c AS (
+    SELECT id FROM chat WHERE chat_id = $1 AND is_active = TRUE
+),
+gs AS (
+    SELECT COALESCE(jsonb_object_agg(key, jsonb_build_array(value, value_type)), '{}'::jsonb) AS settings
+    FROM global_setting
+),
+cs AS (
+    SELECT COALESCE(jsonb_object_agg(key, jsonb_build_array(value, value_type)), '{}'::jsonb) AS settings
+    FROM chat_setting WHERE chat_id = (SELECT id FROM c)
+)
+SELECT
+    c.id AS chat_pk,
+    gs.settings AS global_settings,
+    cs.settings AS chat_settings,
+    CASE WHEN m.id IS NULL THEN NULL ELSE to_jsonb(m) END AS muted,
+    EXISTS (
+        SELECT 1 FROM whitelist_user w WHERE w.chat_id = c.id AND w.user_id = $2
+    ) AS is_whitelisted
+FROM c
+CROSS JOIN gs
+CROSS JOIN cs
+LEFT JOIN muted_user m ON m.chat_id = c.id AND m.user_id = $2
+'''
+
+
+class ModerationContext(NamedTuple):
+    """Контекст обработки сообщения."""
+
+    chat_pk: int
+    settings: Mapping[str, Any]
+    muted: Optional[dict]
+    is_whitelisted: bool
+
+
+def _decode_settings(raw: str) -> dict:
+    """Преобразует JSON {key: [value, value_type]} в словарь типизированных значений.
+
+    Аргументы:
+        raw (str): JSON-объект настроек из запроса.
+
+    Возвращаемое значение:
+        dict: Настройки с приведёнными типами.
+    """
+    return {
+        key: _cast_value(value, value_type)
+        for key, (value, value_type) in json.loads(raw).items()
+    }
+
+
+class ModerationContextRepository:
+    """Репозиторий контекста модерации."""
+
+    @staticmethod
+    async def get_context(chat_id: int, user_id: int) -> Optional[ModerationContext]:
+        """Загружает контекст модерации одним запросом.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            user_id (int): Telegram ID автора сообщения.
+
+        Возвращаемое значение:
+            Optional[ModerationContext]: Контекст или None, если чат не наблюдается.
+        """
+        pool = get_pool()
+        row = await pool.fetchrow(_CONTEXT_QUERY, chat_id, user_id)
+        if row is None:
+            return None
+
+        # per-chat настройки перекрывают глобальные
+        settings = _decode_settings(row['global_settings'])
+        settings.update(_decode_settings(row['chat_settings']))
+
+        return ModerationContext(
+            chat_pk=row['chat_pk'],
+            settings=MappingProxyType(settings),
+            muted=json.loads(row['muted']) if row['muted'] is not None else None,
+            is_whitelisted=row['is_whitelisted'],
+        )
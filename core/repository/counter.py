@@ -0,0 +1,36 @@
+"""Репозиторий счётчиков записей списков панели."""
+
+from typing import List, Optional
+
+from core.db import get_pool
+
+
+class ListCounterRepository:
+    """Количество записей spam_message и muted_user по чатам.
+
+    Счётчики поддерживаются триггерами БД (миграция m008_list_counters).
+    """
+
+    @staticmethod
+    async def get_total(table_name: str, chat_ids: Optional[List[int]] = None) -> int:
+        """Возвращает количество записей таблицы.
+
+        Аргументы:
+            table_name (str): Таблица (spam_message или muted_user).
+            chat_ids (Optional[List[int]]): Значения столбца chat_id таблицы
+                для фильтрации (None = все чаты).
+
+        Возвращаемое значение:
+            int: Количество записей.
+        """
+        pool = get_pool()
+        if chat_ids is not None:
+            return await pool.fetchval(
+                '''SELECT COALESCE(SUM(count), 0)::BIGINT FROM list_counter
+                   WHERE table_name = $1 AND chat_id = ANY($2)''',
+                table_name, chat_ids
+            )
+        return await pool.fetchval(
+            'SELECT COALESCE(SUM(count), 0)::BIGINT FROM list_counter WHERE table_name = $1',
+            table_name
+        )
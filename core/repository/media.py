@@ -0,0 +1,63 @@
+"""Репозиторий отпечатков медиа, подтверждённых как спам."""
+
+from typing import List, Optional
+
+from core.db import get_pool
+
+
+class MediaFingerprintRepository:
+    """Репозиторий отпечатков медиа."""
+
+    @staticmethod
+    async def add(
+        chat_id: int,
+        file_unique_id: str,
+        media_type: str,
+        phash: Optional[int],
+        created_at: float
+    ) -> None:
+        """Сохраняет отпечаток; существующая запись чата с тем же file_unique_id не меняется.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата, где медиа признано спамом.
+            file_unique_id (str): Уникальный ID файла Telegram.
+            media_type (str): Тип медиа: photo, sticker или animation.
+            phash (Optional[int]): Перцептивный хеш (знаковое 64-битное число) или None.
+            created_at (float): Unix timestamp.
+        """
+        pool = get_pool()
+        await pool.execute(
+            '''INSERT INTO media_fingerprint (chat_id, file_unique_id, media_type, phash, created_at)
+               VALUES ($1, $2, $3, $4, $5)
+               ON CONFLICT (chat_id, file_unique_id) DO NOTHING''',
+            chat_id, file_unique_id, media_type, phash, created_at
+        )
+
+    @staticmethod
+    async def remove(chat_id: int, file_unique_ids: List[str]) -> int:
+        """Удаляет отпечатки чата.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            file_unique_ids (List[str]): Уникальные ID файлов.
+
+        Возвращаемое значение:
+            int: Количество удалённых записей.
+        """
+        pool = get_pool()
+        result = await pool.execute(
+            'DELETE FROM media_fingerprint WHERE chat_id = $1 AND file_unique_id = ANY($2::text[])',
+            chat_id, file_unique_ids
+        )
+        return int(result.split()[-1])
+
+    @staticmethod
+    async def get_all() -> List[dict]:
+        """Возвращает все отпечатки.
+
+        Возвращаемое значение:
+            List[dict]: Записи с полями chat_id, file_unique_id, media_type, phash.
+        """
+        pool = get_pool()
+        rows = await pool.fetch('SELECT chat_id, file_unique_id, media_type, phash FROM media_fingerprint')
+        return [dict(row) for row in rows]
@@ -4,6 +4,8 @@ from datetime import datetime
 from typing import List, Optional
 
 from core.db import get_pool
+from core.repository.counter import ListCounterRepository
+from core.utils import decode_cursor, encode_cursor
 
 
 class MutedRepository:
@@ -38,6 +40,8 @@ class MutedRepository:
     ) -> int:
         """Создаёт запись об ограниченном пользователе.
 
+        Если запись уже создана параллельным запросом, она перезаписывается.
+
         Аргументы:
             chat_pk (int): PK чата.
             user_id (int): Telegram ID пользователя.
@@ -54,6 +58,10 @@ class MutedRepository:
             '''INSERT INTO muted_user
                (chat_id, user_id, username, timestamp, muted_till_timestamp, relapse_number)
                VALUES ($1, $2, $3, $4, $5, $6)
+               ON CONFLICT (chat_id, user_id) DO UPDATE SET
+                   timestamp = EXCLUDED.timestamp,
+                   muted_till_timestamp = EXCLUDED.muted_till_timestamp,
+                   relapse_number = EXCLUDED.relapse_number
                RETURNING id''',
             chat_pk, user_id, username, timestamp, muted_till_timestamp, relapse_number
         )
@@ -100,41 +108,59 @@ class MutedRepository:
     async def get_muted_users(
         chat_pks: Optional[List[int]] = None,
         page: int = 1,
-        per_page: int = 10
+        per_page: int = 10,
+        cursor: Optional[str] = None
     ) -> dict:
         """Получает список ограниченных с пагинацией.
 
+        Записи упорядочены по (timestamp, id) по убыванию. С курсором страница
+        начинается сразу после записи курсора (keyset-пагинация), без курсора —
+        со смещения по номеру страницы. Общее количество берётся из счётчиков
+        list_counter.
+
         Аргументы:
             chat_pks (Optional[List[int]]): Список PK чатов для фильтрации (None = все).
-            page (int): Номер страницы.
+            page (int): Номер страницы (с курсором — только для current_page).
             per_page (int): Записей на странице.
+            cursor (Optional[str]): next_cursor предыдущей страницы.
 
         Возвращаемое значение:
-            dict: items, total, total_pages, current_page.
+            dict: items, total, total_pages, current_page, next_cursor
+                (None на последней странице).
+
+        Исключения:
+            ValueError: Если курсор некорректен.
         """
         pool = get_pool()
-        offset = (page - 1) * per_page
 
+        conditions = []
+        args: list = []
         if chat_pks is not None:
-            total = await pool.fetchval(
-                'SELECT COUNT(*) FROM muted_user WHERE chat_id = ANY($1)', chat_pks
-            )
-            rows = await pool.fetch(
-                '''SELECT * FROM muted_user WHERE chat_id = ANY($1)
-                   ORDER BY timestamp DESC LIMIT $2 OFFSET $3''',
-                chat_pks, per_page, offset
-            )
+            args.append(chat_pks)
+            conditions.append(f'chat_id = ANY(${len(args)})')
+
+        offset = 0
+        if cursor is not None:
+            args.extend(decode_cursor(cursor))
+            conditions.append(f'(timestamp, id) < (${len(args) - 1}, ${len(args)})')
         else:
-            total = await pool.fetchval('SELECT COUNT(*) FROM muted_user')
-            rows = await pool.fetch(
-                '''SELECT * FROM muted_user
-                   ORDER BY timestamp DESC LIMIT $1 OFFSET $2''',
-                per_page, offset
-            )
+            offset = (page - 1) * per_page
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        args.extend((per_page + 1, offset))
+        rows = await pool.fetch(
+            f'''SELECT * FROM muted_user {where}
+                ORDER BY timestamp DESC, id DESC LIMIT ${len(args) - 1} OFFSET ${len(args)}''',
+            *args
+        )
+        total = await ListCounterRepository.get_total('muted_user', chat_pks)
 
+        items = [dict(row) for row in rows[:per_page]]
+        has_next = len(rows) > per_page
         return {
-            'items': [dict(row) for row in rows],
+            'items': items,
             'total': total,
             'total_pages': (total + per_page - 1) // per_page if per_page > 0 else 0,
             'current_page': page,
+            'next_cursor': encode_cursor(items[-1]['timestamp'], items[-1]['id']) if has_next else None,
         }
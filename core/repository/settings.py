@@ -1,7 +1,16 @@
-"""Репозиторий настроек: глобальные и per-chat."""
+"""Репозиторий настроек: глобальные и per-chat.
 
-from typing import Any, Dict, Optional
+Разрешённые настройки кешируются в памяти процесса как неизменяемые
+снимки (MappingProxyType). Кеш точно инвалидируется через NOTIFY,
+который отправляют update_global / update_chat_setting, поэтому изменения
+из панели или другой реплики видны сразу. Пока слушатель уведомлений
+не активен, кеш не используется и настройки читаются из БД.
+"""
 
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+from core import notify
 from core.db import get_pool
 from core.config import DEFAULT_SETTINGS
 
@@ -37,6 +46,21 @@ SETTING_DESCRIPTIONS = {
     'ENABLE_AUTOMUTING': 'Автоматически ограничивать спамеров',
     'CHECK_EDITED_MESSAGES': 'Проверять отредактированные сообщения на спам',
     'COLLECT_ALL_MESSAGES': 'Собирать все сообщения для анализа',
+    'RESTRICT_ON_JOIN': 'Ограничивать известных спамеров при вступлении в чат',
+    'REPUTATION_SPAM_THRESHOLD': 'Число спам-сообщений во всех чатах, после которого пользователь считается спамером (0 — не учитывать)',
+    'INFERENCE_SHARE': 'Доля чата в очереди анализа при нагрузке (по умолчанию 1; больше — выше приоритет)',
+    'FLOOD_ENABLED': 'Обнаруживать флуд и повторяющиеся сообщения до анализа',
+    'FLOOD_MAX_MESSAGES': 'Максимум сообщений пользователя за окно флуда (0 — не проверять)',
+    'FLOOD_WINDOW_SECONDS': 'Окно подсчёта сообщений для флуда в секундах',
+    'FLOOD_MAX_DUPLICATES': 'Максимум одинаковых сообщений пользователя за окно повторов (0 — не проверять)',
+    'FLOOD_DUPLICATE_SECONDS': 'Окно подсчёта одинаковых сообщений в секундах',
+    'CHECK_MEDIA': 'Проверять фото, стикеры и анимации по базе медиа, подтверждённых как спам',
+    'CHECK_MEDIA_SIMILAR': 'Искать похожие фото по перцептивному хешу (скачивает миниатюру каждого фото)',
+    'TRUST_ENABLED': 'Выборочно анализировать сообщения давних участников без нарушений',
+    'TRUST_MIN_MESSAGES': 'Сообщений в чате, после которых участник считается доверенным',
+    'TRUST_MIN_DAYS': 'Дней с первого сообщения, после которых участник может стать доверенным',
+    'TRUST_SAMPLE_RATE': 'Доля анализируемых сообщений доверенных участников (0-1)',
+    'TRUST_SKIP_MESSAGES': 'Сообщений, после которых анализ участника не выполняется (0 — всегда выборочно)',
     'LOG_TO_TOPIC': 'Логировать все сообщения в отдельный топик чата управления',
     'LOG_TOPIC_ID': 'ID топика для логирования (0 — отключено)',
     'PER_PAGE': 'Записей на странице в панели',
@@ -93,9 +117,56 @@ def _detect_type(value: Any) -> str:
     return 'str'
 
 
+# Кеш разрешённых настроек: глобальный снимок и снимки по PK чата
+_global_snapshot: Optional[Mapping[str, Any]] = None
+_chat_snapshots: Dict[int, Mapping[str, Any]] = {}
+# Счётчик инвалидаций: снимок, прочитанный до инвалидации, не сохраняется
+_generation = 0
+
+
+def _cache_enabled() -> bool:
+    """Проверяет, можно ли использовать кеш настроек.
+
+    Возвращаемое значение:
+        bool: True если уведомления об изменениях настроек доставляются.
+    """
+    return notify.is_listening(notify.SETTINGS_CHANNEL)
+
+
+def invalidate_settings_cache(payload: str = notify.RESET_PAYLOAD) -> None:
+    """Сбрасывает кеш настроек по полезной нагрузке уведомления.
+
+    Аргументы:
+        payload (str): 'chat:<pk>' — сбросить настройки чата;
+            'global' или '*' — сбросить всё (глобальные влияют на все чаты).
+    """
+    global _global_snapshot, _generation
+    _generation += 1
+    if payload.startswith('chat:'):
+        try:
+            _chat_snapshots.pop(int(payload[len('chat:'):]), None)
+            return
+        except ValueError:
+            pass
+    _global_snapshot = None
+    _chat_snapshots.clear()
+
+
+notify.subscribe(notify.SETTINGS_CHANNEL, invalidate_settings_cache)
+
+
 class SettingsRepository:
     """Репозиторий для работы с настройками системы."""
 
+    @staticmethod
+    def is_cache_enabled() -> bool:
+        """Проверяет, обслуживаются ли настройки из кеша процесса.
+
+        Возвращаемое значение:
+            bool: True если кеш настроек активен.
+        """
+        return _cache_enabled()
+
     # Глобальные настройки
 
     @staticmethod
@@ -109,27 +180,34 @@ class SettingsRepository:
         Возвращаемое значение:
             value (Any): Значение настройки с правильным типом.
         """
-        pool = get_pool()
-        row = await pool.fetchrow(
-            'SELECT value, value_type FROM global_setting WHERE key = $1', key
-        )
-        if row:
-            return _cast_value(row['value'], row['value_type'])
+        settings = await SettingsRepository.get_all_global()
+        if key in settings:
+            return settings[key]
         return DEFAULT_SETTINGS.get(key, default)
 
     @staticmethod
-    async def get_all_global() -> Dict[str, Any]:
+    async def get_all_global() -> Mapping[str, Any]:
         """Получает все глобальные настройки.
 
         Возвращаемое значение:
-            settings (Dict[str, Any]): Словарь всех настроек.
+            settings (Mapping[str, Any]): Неизменяемый снимок всех настроек.
         """
+        global _global_snapshot
+
+        if _cache_enabled() and _global_snapshot is not None:
+            return _global_snapshot
+
+        generation = _generation
         pool = get_pool()
         rows = await pool.fetch('SELECT key, value, value_type FROM global_setting')
         result = {}
         for row in rows:
             result[row['key']] = _cast_value(row['value'], row['value_type'])
-        return result
+
+        snapshot = MappingProxyType(result)
+        if _cache_enabled() and generation == _generation:
+            _global_snapshot = snapshot
+        return snapshot
 
     @staticmethod
     async def update_global(key: str, value: Any) -> None:
@@ -145,13 +223,17 @@ class SettingsRepository:
         if value_type == 'bool':
             str_value = 'true' if value else 'false'
 
-        await pool.execute(
-            '''INSERT INTO global_setting (key, value, value_type, description)
-               VALUES ($1, $2, $3, $4)
-               ON CONFLICT (key) DO UPDATE SET value = $2, value_type = $3''',
-            key, str_value, value_type,
-            SETTING_DESCRIPTIONS.get(key, '')
-        )
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    '''INSERT INTO global_setting (key, value, value_type, description)
+                       VALUES ($1, $2, $3, $4)
+                       ON CONFLICT (key) DO UPDATE SET value = $2, value_type = $3''',
+                    key, str_value, value_type,
+                    SETTING_DESCRIPTIONS.get(key, '')
+                )
+                await notify.notify(notify.SETTINGS_CHANNEL, 'global', conn)
+        invalidate_settings_cache('global')
 
     @staticmethod
     async def init_default_global_settings() -> None:
@@ -173,6 +255,8 @@ class SettingsRepository:
                 key, str_value, value_type,
                 SETTING_DESCRIPTIONS.get(key, '')
             )
+        await notify.notify(notify.SETTINGS_CHANNEL, 'global')
+        invalidate_settings_cache('global')
 
     # Per-chat настройки
 
@@ -188,25 +272,27 @@ class SettingsRepository:
         Возвращаемое значение:
             value (Any): Значение настройки.
         """
-        pool = get_pool()
-        row = await pool.fetchrow(
-            'SELECT value, value_type FROM chat_setting WHERE chat_id = $1 AND key = $2',
-            chat_pk, key
-        )
-        if row:
-            return _cast_value(row['value'], row['value_type'])
-        return await SettingsRepository.get_global(key, default)
+        settings = await SettingsRepository.get_all_chat_settings(chat_pk)
+        if key in settings:
+            return settings[key]
+        return DEFAULT_SETTINGS.get(key, default)
 
     @staticmethod
-    async def get_all_chat_settings(chat_pk: int) -> Dict[str, Any]:
+    async def get_all_chat_settings(chat_pk: int) -> Mapping[str, Any]:
         """Получает все настройки для чата (per-chat + fallback на глобальные).
 
         Аргументы:
             chat_pk (int): PK чата в таблице chat.
 
         Возвращаемое значение:
-            settings (Dict[str, Any]): Словарь настроек.
+            settings (Mapping[str, Any]): Неизменяемый снимок настроек.
         """
+        if _cache_enabled():
+            cached = _chat_snapshots.get(chat_pk)
+            if cached is not None:
+                return cached
+
+        generation = _generation
         pool = get_pool()
         rows = await pool.fetch(
             'SELECT key, value, value_type FROM chat_setting WHERE chat_id = $1', chat_pk
@@ -219,7 +305,11 @@ class SettingsRepository:
 
         result = dict(global_settings)
         result.update(chat_settings)
-        return result
+
+        snapshot = MappingProxyType(result)
+        if _cache_enabled() and generation == _generation:
+            _chat_snapshots[chat_pk] = snapshot
+        return snapshot
 
     @staticmethod
     async def update_chat_setting(chat_pk: int, key: str, value: Any) -> None:
@@ -234,10 +324,14 @@ class SettingsRepository:
         value_type = _detect_type(value)
         str_value = ('true' if value else 'false') if value_type == 'bool' else str(value)
 
-        await pool.execute(
-            '''INSERT INTO chat_setting (chat_id, key, value, value_type, description)
-               VALUES ($1, $2, $3, $4, $5)
-               ON CONFLICT (chat_id, key) DO UPDATE SET value = $3, value_type = $4''',
-            chat_pk, key, str_value, value_type,
-            SETTING_DESCRIPTIONS.get(key, '')
-        )
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    '''INSERT INTO chat_setting (chat_id, key, value, value_type, description)
+                       VALUES ($1, $2, $3, $4, $5)
+                       ON CONFLICT (chat_id, key) DO UPDATE SET value = $3, value_type = $4''',
+                    chat_pk, key, str_value, value_type,
+                    SETTING_DESCRIPTIONS.get(key, '')
+                )
+                await notify.notify(notify.SETTINGS_CHANNEL, f'chat:{chat_pk}', conn)
+        invalidate_settings_cache(f'chat:{chat_pk}')
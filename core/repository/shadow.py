@@ -0,0 +1,82 @@
+"""Репозиторий результатов теневой оценки модели-кандидата."""
+
+from typing import List
+
+from core.db import get_pool
+
+
+class ShadowEvalRepository:
+    """Репозиторий сравнения основной модели с моделью-кандидатом."""
+
+    @staticmethod
+    async def add_result(
+        timestamp: float,
+        chat_id: int,
+        primary_model: str,
+        shadow_model: str,
+        threshold: float,
+        primary_score: float,
+        shadow_score: float,
+        primary_seconds: float,
+        shadow_seconds: float
+    ) -> None:
+        """Сохраняет оценки сообщения обеими моделями.
+
+        Аргументы:
+            timestamp (float): Unix timestamp оценки.
+            chat_id (int): Telegram ID чата.
+            primary_model (str): Основная модель чата (BERT_MODEL).
+            shadow_model (str): Модель-кандидат (SHADOW_MODEL).
+            threshold (float): Порог BERT чата (BERT_THRESHOLD).
+            primary_score (float): Вероятность спама по основной модели.
+            shadow_score (float): Вероятность спама по модели-кандидату.
+            primary_seconds (float): Время инференса основной модели.
+            shadow_seconds (float): Время инференса модели-кандидата.
+        """
+        pool = get_pool()
+        await pool.execute(
+            '''INSERT INTO shadow_eval (
+                   timestamp, chat_id, primary_model, shadow_model, threshold,
+                   primary_score, shadow_score, primary_seconds, shadow_seconds
+               )
+               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)''',
+            timestamp, chat_id, primary_model, shadow_model, threshold,
+            primary_score, shadow_score, primary_seconds, shadow_seconds
+        )
+
+    @staticmethod
+    async def get_summary(since: float) -> List[dict]:
+        """Возвращает сводку сравнения по парам моделей.
+
+        Решения моделей сравниваются по порогу чата на момент оценки.
+
+        Аргументы:
+            since (float): Unix timestamp начала периода.
+
+        Возвращаемое значение:
+            List[dict]: Записи с полями primary_model, shadow_model, total,
+                agreement (доля совпавших решений), primary_only и shadow_only
+                (спам только по одной модели), mean_abs_diff, primary_mean,
+                shadow_mean, primary_p95, shadow_p95 (секунды), last_timestamp.
+        """
+        pool = get_pool()
+        rows = await pool.fetch(
+            '''SELECT primary_model, shadow_model,
+                      COUNT(*) AS total,
+                      AVG(CASE WHEN (primary_score >= threshold) = (shadow_score >= threshold)
+                               THEN 1.0 ELSE 0.0 END) AS agreement,
+                      COUNT(*) FILTER (WHERE primary_score >= threshold AND shadow_score < threshold) AS primary_only,
+                      COUNT(*) FILTER (WHERE shadow_score >= threshold AND primary_score < threshold) AS shadow_only,
+                      AVG(ABS(primary_score - shadow_score)) AS mean_abs_diff,
+                      AVG(primary_seconds) AS primary_mean,
+                      AVG(shadow_seconds) AS shadow_mean,
+                      percentile_cont(0.95) WITHIN GROUP (ORDER BY primary_seconds) AS primary_p95,
+                      percentile_cont(0.95) WITHIN GROUP (ORDER BY shadow_seconds) AS shadow_p95,
+                      MAX(timestamp) AS last_timestamp
+               FROM shadow_eval
+               WHERE timestamp >= $1
+               GROUP BY primary_model, shadow_model
+               ORDER BY last_timestamp DESC''',
+            since
+        )
+        return [dict(row) for row in rows]
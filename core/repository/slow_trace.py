@@ -0,0 +1,39 @@
+"""Репозиторий журнала медленной обработки сообщений."""
+
+import json
+from typing import Sequence, Tuple
+
+from core.db import get_pool
+
+
+class SlowTraceRepository:
+    """Репозиторий медленных трассировок."""
+
+    @staticmethod
+    async def add_trace(
+        chat_id: int,
+        message_id: int,
+        timestamp: float,
+        total_seconds: float,
+        spans: Sequence[Tuple[str, float, float]]
+    ) -> None:
+        """Сохраняет разбивку медленной обработки сообщения.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            message_id (int): ID сообщения.
+            timestamp (float): Unix timestamp записи.
+            total_seconds (float): Общее время обработки.
+            spans (Sequence[Tuple[str, float, float]]): Этапы (название, начало, длительность).
+        """
+        payload = json.dumps([
+            {'stage': stage, 'start': round(start, 6), 'seconds': round(seconds, 6)}
+            for stage, start, seconds in spans
+        ])
+        pool = get_pool()
+        await pool.execute(
+            '''INSERT INTO slow_trace (chat_id, message_id, timestamp, total_seconds, spans)
+               VALUES ($1, $2, $3, $4, $5::jsonb)''',
+            chat_id, message_id, timestamp, total_seconds, payload
+        )
+
@@ -1,8 +1,10 @@
 """Репозиторий для работы со спам-сообщениями."""
 
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from core.db import get_pool
+from core.repository.counter import ListCounterRepository
+from core.utils import decode_cursor, encode_cursor
 
 
 class SpamRepository:
@@ -52,52 +54,165 @@ class SpamRepository:
             chatgpt_prediction, bert_prediction
         )
 
+    @staticmethod
+    async def record_spam_verdict(
+        chat_id: int,
+        chat_pk: int,
+        message_id: Optional[int],
+        timestamp: float,
+        author_id: int,
+        author_username: Optional[str],
+        message_text: str,
+        has_reply_markup: Optional[bool] = None,
+        cas: Optional[bool] = None,
+        lols: Optional[bool] = None,
+        chatgpt_prediction: Optional[float] = None,
+        bert_prediction: Optional[float] = None,
+        first_until: Optional[float] = None,
+        second_until: Optional[float] = None,
+        repeat_until: Optional[float] = None
+    ) -> Tuple[int, Optional[float]]:
+        """Сохраняет спам-сообщение и увеличивает счётчик нарушений автора одним запросом.
+
+        Запись spam_message добавляется, а запись muted_user создаётся
+        с relapse_number = 1 или атомарно увеличивает relapse_number,
+        поэтому одновременные сообщения одного автора не теряют нарушения.
+
+        Запрос идемпотентен по (chat_id, message_id): если сообщение уже
+        сохранено (повтор после потерянного подтверждения записи), ничего
+        не изменяется и возвращается текущая запись muted_user.
+
+        Аргументы:
+            chat_id (int): Telegram ID чата.
+            chat_pk (int): PK чата.
+            message_id (Optional[int]): ID сообщения в Telegram.
+            timestamp (float): Unix timestamp.
+            author_id (int): Telegram ID автора.
+            author_username (Optional[str]): Username автора.
+            message_text (str): Текст сообщения.
+            has_reply_markup (Optional[bool]): Наличие inline-клавиатуры.
+            cas (Optional[bool]): Результат проверки CAS.
+            lols (Optional[bool]): Результат проверки LOLS.
+            chatgpt_prediction (Optional[float]): Результат ChatGPT.
+            bert_prediction (Optional[float]): Результат BERT.
+            first_until (Optional[float]): Срок ограничения за первое нарушение.
+            second_until (Optional[float]): Срок ограничения за второе нарушение.
+            repeat_until (Optional[float]): Срок ограничения за третье и последующие.
+
+        Если срок не указан (None), при повторном нарушении сохраняется
+        прежний muted_till_timestamp.
+
+        Возвращаемое значение:
+            Tuple[int, Optional[float]]: Номер нарушения и срок ограничения.
+        """
+        pool = get_pool()
+        row = await pool.fetchrow(
+            '''WITH spam AS (
+                   INSERT INTO spam_message
+                   (chat_id, message_id, timestamp, author_id, author_username,
+                    message_text, has_reply_markup, cas, lols, chatgpt_prediction, bert_prediction)
+                   VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                   ON CONFLICT (chat_id, message_id) DO NOTHING
+                   RETURNING id
+               ),
+               muted AS (
+                   INSERT INTO muted_user
+                   (chat_id, user_id, username, timestamp, muted_till_timestamp, relapse_number)
+                   SELECT $12::bigint, $13::bigint, $14::text, $15::double precision,
+                          $16::double precision, 1
+                   WHERE EXISTS (SELECT 1 FROM spam)
+                   ON CONFLICT (chat_id, user_id) DO UPDATE SET
+                       timestamp = EXCLUDED.timestamp,
+                       relapse_number = muted_user.relapse_number + 1,
+                       muted_till_timestamp = COALESCE(
+                           CASE WHEN muted_user.relapse_number = 1 THEN $17::double precision
+                                ELSE $18::double precision END,
+                           muted_user.muted_till_timestamp
+                       )
+                   RETURNING relapse_number, muted_till_timestamp
+               )
+               SELECT relapse_number, muted_till_timestamp FROM muted
+               UNION ALL
+               SELECT relapse_number, muted_till_timestamp FROM muted_user
+               WHERE chat_id = $12 AND user_id = $13 AND NOT EXISTS (SELECT 1 FROM spam)''',
+            chat_id, message_id, timestamp, author_id, author_username,
+            message_text, has_reply_markup, cas, lols,
+            chatgpt_prediction, bert_prediction,
+            chat_pk, author_id, author_username, timestamp,
+            first_until, second_until, repeat_until
+        )
+        if row is None:
+            # Сообщение уже сохранено, а запись muted_user удалена
+            return 0, None
+        return row['relapse_number'], row['muted_till_timestamp']
+
     @staticmethod
     async def get_spam_messages(
         chat_pks: Optional[List[int]] = None,
         page: int = 1,
-        per_page: int = 10
+        per_page: int = 10,
+        cursor: Optional[str] = None
     ) -> dict:
         """Получает список спам-сообщений с пагинацией.
 
+        Записи упорядочены по (timestamp, id) по убыванию. С курсором страница
+        начинается сразу после записи курсора (keyset-пагинация, время запроса
+        не зависит от номера страницы), без курсора — со смещения по номеру
+        страницы. Общее количество берётся из счётчиков list_counter.
+
         Аргументы:
             chat_pks (Optional[List[int]]): Список PK чатов для фильтрации (None = все).
-            page (int): Номер страницы.
+            page (int): Номер страницы (с курсором — только для current_page).
             per_page (int): Записей на странице.
+            cursor (Optional[str]): next_cursor предыдущей страницы.
 
         Возвращаемое значение:
-            dict: items, total, total_pages, current_page.
+            dict: items, total, total_pages, current_page, next_cursor
+                (None на последней странице).
+
+        Исключения:
+            ValueError: Если курсор некорректен.
         """
         pool = get_pool()
-        offset = (page - 1) * per_page
 
+        conditions = []
+        args: list = []
         if chat_pks is not None:
-            total = await pool.fetchval(
-                '''SELECT COUNT(*) FROM spam_message s
-                   JOIN chat c ON s.chat_id = c.chat_id
-                   WHERE c.id = ANY($1)''',
-                chat_pks
-            )
-            rows = await pool.fetch(
-                '''SELECT s.* FROM spam_message s
-                   JOIN chat c ON s.chat_id = c.chat_id
-                   WHERE c.id = ANY($1)
-                   ORDER BY s.timestamp DESC LIMIT $2 OFFSET $3''',
-                chat_pks, per_page, offset
-            )
+            # PK чатов -> Telegram ID, чтобы фильтровать spam_message без JOIN
+            chat_ids = [
+                row['chat_id'] for row in await pool.fetch(
+                    'SELECT chat_id FROM chat WHERE id = ANY($1)', chat_pks
+                )
+            ]
+            args.append(chat_ids)
+            conditions.append(f'chat_id = ANY(${len(args)})')
         else:
-            total = await pool.fetchval('SELECT COUNT(*) FROM spam_message')
-            rows = await pool.fetch(
-                '''SELECT * FROM spam_message
-                   ORDER BY timestamp DESC LIMIT $1 OFFSET $2''',
-                per_page, offset
-            )
+            chat_ids = None
+
+        offset = 0
+        if cursor is not None:
+            args.extend(decode_cursor(cursor))
+            conditions.append(f'(timestamp, id) < (${len(args) - 1}, ${len(args)})')
+        else:
+            offset = (page - 1) * per_page
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        args.extend((per_page + 1, offset))
+        rows = await pool.fetch(
+            f'''SELECT * FROM spam_message {where}
+                ORDER BY timestamp DESC, id DESC LIMIT ${len(args) - 1} OFFSET ${len(args)}''',
+            *args
+        )
+        total = await ListCounterRepository.get_total('spam_message', chat_ids)
 
+        items = [dict(row) for row in rows[:per_page]]
+        has_next = len(rows) > per_page
         return {
-            'items': [dict(row) for row in rows],
+            'items': items,
             'total': total,
             'total_pages': (total + per_page - 1) // per_page if per_page > 0 else 0,
             'current_page': page,
+            'next_cursor': encode_cursor(items[-1]['timestamp'], items[-1]['id']) if has_next else None,
         }
 
     @staticmethod
@@ -107,12 +222,24 @@ class SpamRepository:
         Аргументы:
             chat_pk (Optional[int]): PK чата для фильтрации.
 
+        Возвращаемое значение:
+            int: Количество записей.
+        """
+        return await ListCounterRepository.get_total(
+            'spam_message', [chat_pk] if chat_pk is not None else None
+        )
+
+    @staticmethod
+    async def get_author_spam_count(author_id: int) -> int:
+        """Возвращает количество спам-сообщений автора во всех чатах.
+
+        Аргументы:
+            author_id (int): Telegram ID автора.
+
         Возвращаемое значение:
             int: Количество записей.
         """
         pool = get_pool()
-        if chat_pk is not None:
-            return await pool.fetchval(
-                'SELECT COUNT(*) FROM spam_message WHERE chat_id = $1', chat_pk
-            )
-        return await pool.fetchval('SELECT COUNT(*) FROM spam_message')
+        return await pool.fetchval(
+            'SELECT COUNT(*) FROM spam_message WHERE author_id = $1', author_id
+        )
@@ -1,8 +1,14 @@
-"""Репозиторий для работы с белым списком."""
+"""Репозиторий для работы с белым списком.
+
+Изменения белого списка публикуются в канал REGISTRY_CHANNEL для реестра
+чатов (core.chat_registry) в этом и других процессах.
+"""
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
+from core import notify
+from core.chat_registry import whitelist_payload
 from core.db import get_pool
 
 
@@ -27,6 +33,17 @@ class WhitelistRepository:
         )
         return result is not None
 
+    @staticmethod
+    async def get_all_entries() -> List[dict]:
+        """Возвращает все записи белого списка всех чатов.
+
+        Возвращаемое значение:
+            List[dict]: Список записей с полями chat_id (PK чата) и user_id.
+        """
+        pool = get_pool()
+        rows = await pool.fetch('SELECT chat_id, user_id FROM whitelist_user')
+        return [dict(row) for row in rows]
+
     @staticmethod
     async def add_to_whitelist(
         chat_pk: int,
@@ -46,12 +63,17 @@ class WhitelistRepository:
         """
         pool = get_pool()
         timestamp = datetime.now().timestamp()
-        await pool.execute(
-            '''INSERT INTO whitelist_user (chat_id, user_id, username, added_at, added_by, reason)
-               VALUES ($1, $2, $3, $4, $5, $6)
-               ON CONFLICT (chat_id, user_id) DO NOTHING''',
-            chat_pk, user_id, username, timestamp, added_by, reason
-        )
+        payload = whitelist_payload(chat_pk, user_id, added=True)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    '''INSERT INTO whitelist_user (chat_id, user_id, username, added_at, added_by, reason)
+                       VALUES ($1, $2, $3, $4, $5, $6)
+                       ON CONFLICT (chat_id, user_id) DO NOTHING''',
+                    chat_pk, user_id, username, timestamp, added_by, reason
+                )
+                await notify.notify(notify.REGISTRY_CHANNEL, payload, conn)
+        notify.dispatch(notify.REGISTRY_CHANNEL, payload)
 
     @staticmethod
     async def remove_from_whitelist(chat_pk: int, user_id: int) -> None:
@@ -62,7 +84,12 @@ class WhitelistRepository:
             user_id (int): Telegram ID пользователя.
         """
         pool = get_pool()
-        await pool.execute(
-            'DELETE FROM whitelist_user WHERE chat_id = $1 AND user_id = $2',
-            chat_pk, user_id
-        )
+        payload = whitelist_payload(chat_pk, user_id, added=False)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    'DELETE FROM whitelist_user WHERE chat_id = $1 AND user_id = $2',
+                    chat_pk, user_id
+                )
+                await notify.notify(notify.REGISTRY_CHANNEL, payload, conn)
+        notify.dispatch(notify.REGISTRY_CHANNEL, payload)
@@ -0,0 +1,184 @@
+"""Трассировка этапов обработки сообщения.
+
+Для каждого сообщения записываются интервалы (spans) этапов: доставка
+(от message.date до входа в обработчик), загрузка контекста, нормализация,
+BERT, внешние проверки, удаление, ограничение, запись в БД. Длительности
+этапов публикуются в гистограмме antispam_stage_seconds{stage, chat_id},
+общее время обработки — в antispam_update_seconds{chat_id}. Если обработка
+заняла больше TRACE_SLOW_THRESHOLD секунд, полная разбивка по этапам
+записывается в таблицу slow_trace.
+
+Текущая трассировка хранится в contextvars и доступна во всех корутинах
+обработчика. При TRACING_ENABLED=false start_trace() возвращает None,
+а span() — общий пустой контекстный менеджер: накладные расходы сводятся
+к чтению contextvar.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Iterator, List, Optional, Set, Tuple
+
+from core.config import TRACE_SLOW_THRESHOLD, TRACING_ENABLED
+from core.logging import logger
+from core.metrics import histogram
+
+_stage_seconds = histogram(
+    'antispam_stage_seconds',
+    'Длительность этапа обработки сообщения по этапу и чату',
+    ('stage', 'chat_id'),
+)
+_update_seconds = histogram(
+    'antispam_update_seconds',
+    'Общее время обработки сообщения по чату',
+    ('chat_id',),
+)
+
+_current: ContextVar[Optional['Trace']] = ContextVar('antispam_trace', default=None)
+_NOOP: ContextManager[None] = nullcontext()
+
+# Задачи записи в slow_trace (ссылки, чтобы задачи не собрал GC)
+_pending_writes: Set[asyncio.Task] = set()
+
+
+class Trace:
+    """Интервалы этапов обработки одного сообщения."""
+
+    __slots__ = ('chat_id', 'message_id', 'started', 'spans', '_held', '_finished', '_ended')
+
+    def __init__(self, chat_id: int, message_id: int) -> None:
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.started = time.monotonic()
+        # (этап, начало относительно started, длительность)
+        self.spans: List[Tuple[str, float, float]] = []
+        self._held = 0
+        self._finished = False
+        self._ended = 0.0
+
+    def add(self, stage: str, start: float, seconds: float) -> None:
+        """Добавляет интервал этапа.
+
+        Аргументы:
+            stage (str): Название этапа.
+            start (float): Начало относительно входа в обработчик (секунды).
+            seconds (float): Длительность (секунды).
+        """
+        self.spans.append((stage, start, seconds))
+        _stage_seconds.observe(seconds, stage=stage, chat_id=self.chat_id)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Контекстный менеджер: измеряет длительность блока как этап.
+
+        Аргументы:
+            stage (str): Название этапа.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            ended = time.monotonic()
+            self.add(stage, started - self.started, ended - started)
+
+    def hold(self) -> None:
+        """Откладывает завершение до release() (этап выполняется в фоне)."""
+        self._held += 1
+
+    def release(self) -> None:
+        """Снимает hold(); завершает трассировку, если обработчик уже завершён."""
+        self._held -= 1
+        if self._finished and self._held == 0:
+            self._emit()
+
+    def finish(self) -> None:
+        """Отмечает завершение обработчика."""
+        self._finished = True
+        self._ended = time.monotonic() - self.started
+        if self._held == 0:
+            self._emit()
+
+    def _emit(self) -> None:
+        """Публикует общее время и записывает медленную обработку."""
+        # От входа в обработчик до конца последнего этапа (включая фоновые)
+        total = max((start + seconds for _, start, seconds in self.spans), default=0.0)
+        total = max(total, self._ended)
+        _update_seconds.observe(total, chat_id=self.chat_id)
+        if total >= TRACE_SLOW_THRESHOLD:
+            _write_slow(self, total)
+
+
+def _write_slow(trace: Trace, total: float) -> None:
+    """Записывает разбивку медленной обработки в slow_trace в фоне.
+
+    Аргументы:
+        trace (Trace): Трассировка.
+        total (float): Общее время обработки (секунды).
+    """
+    from core.repository.slow_trace import SlowTraceRepository
+
+    async def write() -> None:
+        try:
+            await SlowTraceRepository.add_trace(
+                trace.chat_id, trace.message_id, time.time(), total, trace.spans
+            )
+        except Exception as e:
+            logger.error(f"Ошибка записи медленной трассировки сообщения {trace.message_id}: {e}")
+
+    try:
+        task = asyncio.get_running_loop().create_task(write())
+    except RuntimeError:
+        return
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+def start_trace(chat_id: int, message_id: int, sent_at: Optional[float] = None) -> Optional[Trace]:
+    """Начинает трассировку сообщения в текущем контексте.
+
+    Аргументы:
+        chat_id (int): Telegram ID чата.
+        message_id (int): ID сообщения.
+        sent_at (Optional[float]): Unix timestamp отправки сообщения (message.date,
+            для отредактированного — message.edit_date).
+
+    Возвращаемое значение:
+        Optional[Trace]: Трассировка или None, если трассировка отключена.
+    """
+    if not TRACING_ENABLED:
+        return None
+
+    trace = Trace(chat_id, message_id)
+    _current.set(trace)
+    if sent_at is not None:
+        # Доставка предшествует входу в обработчик, поэтому начало отрицательное
+        delivery = max(time.time() - sent_at, 0.0)
+        trace.add('delivery', -delivery, delivery)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    """Возвращает трассировку текущего контекста.
+
+    Возвращаемое значение:
+        Optional[Trace]: Трассировка или None.
+    """
+    return _current.get()
+
+
+def span(stage: str, trace: Optional[Trace] = None) -> ContextManager[None]:
+    """Контекстный менеджер этапа текущей (или указанной) трассировки.
+
+    Аргументы:
+        stage (str): Название этапа.
+        trace (Optional[Trace]): Трассировка; по умолчанию текущая.
+
+    Возвращаемое значение:
+        ContextManager[None]: Измеряющий или пустой контекстный менеджер.
+    """
+    if trace is None:
+        trace = _current.get()
+        if trace is None:
+            return _NOOP
+    return trace.span(stage)
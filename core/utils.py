@@ -1,9 +1,10 @@
 """Вспомогательные функции общего назначения."""
 
+import base64
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
 
 from core.logging import logger
 
@@ -177,3 +178,37 @@ def get_visible_pages(current: int, total: int, visible: int = 5) -> list:
         start = max(1, end - visible + 1)
 
     return list(range(start, end + 1))
+
+
+def encode_cursor(timestamp: float, row_id: int) -> str:
+    """Кодирует позицию записи в курсор keyset-пагинации.
+
+    Аргументы:
+        timestamp (float): Время последней записи страницы.
+        row_id (int): ID последней записи страницы.
+
+    Возвращаемое значение:
+        str: Непрозрачный курсор, безопасный для URL.
+    """
+    raw = f"{timestamp!r}:{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Декодирует курсор keyset-пагинации.
+
+    Аргументы:
+        cursor (str): Курсор из encode_cursor.
+
+    Возвращаемое значение:
+        Tuple[float, int]: (timestamp, id) последней записи предыдущей страницы.
+
+    Исключения:
+        ValueError: Если курсор некорректен.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split(':')
+        return float(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Некорректный курсор: {cursor}") from e
@@ -0,0 +1,19 @@
+"""Миграция m002: индекс spam_message по автору.
+
+Межчатовая репутация пользователя считается по числу его спам-сообщений
+во всех чатах (SpamRepository.get_author_spam_count). Запрос выполняется
+при каждом вступлении пользователя в чат, поэтому нужен индекс по author_id.
+"""
+
+MIGRATION_ID = "m002_spam_author_index"
+
+
+async def upgrade(conn) -> None:
+    """Создаёт индекс spam_message(author_id).
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_spam_message_author_id ON spam_message (author_id)"
+    )
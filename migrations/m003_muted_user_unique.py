@@ -0,0 +1,34 @@
+"""Миграция m003: уникальность muted_user по (chat_id, user_id).
+
+Запись о нарушениях пользователя в чате обновляется одним запросом
+INSERT ... ON CONFLICT (SpamRepository.record_spam_verdict), для чего
+нужен уникальный индекс. Дубликаты, которые могли появиться из-за гонки
+одновременных сообщений, удаляются: остаётся запись с наибольшим
+номером нарушения, а при равенстве — самая поздняя.
+"""
+
+MIGRATION_ID = "m003_muted_user_unique"
+
+
+async def upgrade(conn) -> None:
+    """Удаляет дубликаты muted_user и создаёт уникальный индекс.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        """
+        DELETE FROM muted_user m
+        USING (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY chat_id, user_id
+                ORDER BY relapse_number DESC, timestamp DESC, id DESC
+            ) AS rn
+            FROM muted_user
+        ) d
+        WHERE m.id = d.id AND d.rn > 1
+        """
+    )
+    await conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_muted_user_chat_user ON muted_user (chat_id, user_id)"
+    )
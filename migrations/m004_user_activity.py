@@ -0,0 +1,31 @@
+"""Миграция m004: счётчики активности пользователей в чатах.
+
+Таблица user_activity хранит для каждой пары (чат, пользователь) число
+увиденных сообщений, время первого и последнего сообщения, число
+спам-вердиктов и последний вердикт. По ним TrustService определяет
+уровень доверия и пропускает анализ сообщений давних участников.
+"""
+
+MIGRATION_ID = "m004_user_activity"
+
+
+async def upgrade(conn) -> None:
+    """Создаёт таблицу user_activity.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_activity (
+            chat_id BIGINT NOT NULL REFERENCES chat (id) ON DELETE CASCADE,
+            user_id BIGINT NOT NULL,
+            messages_seen INTEGER NOT NULL DEFAULT 0,
+            spam_count INTEGER NOT NULL DEFAULT 0,
+            first_seen DOUBLE PRECISION NOT NULL,
+            last_seen DOUBLE PRECISION NOT NULL,
+            last_verdict BOOLEAN,
+            PRIMARY KEY (chat_id, user_id)
+        )
+        """
+    )
@@ -0,0 +1,31 @@
+"""Миграция m005: журнал медленной обработки сообщений.
+
+Таблица slow_trace хранит разбивку по этапам (доставка, контекст, BERT,
+внешние проверки, удаление, запись в БД) для сообщений, обработка которых
+заняла больше TRACE_SLOW_THRESHOLD секунд.
+"""
+
+MIGRATION_ID = "m005_slow_trace"
+
+
+async def upgrade(conn) -> None:
+    """Создаёт таблицу slow_trace и индекс по времени записи.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS slow_trace (
+            id BIGSERIAL PRIMARY KEY,
+            chat_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL,
+            timestamp DOUBLE PRECISION NOT NULL,
+            total_seconds DOUBLE PRECISION NOT NULL,
+            spans JSONB NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        'CREATE INDEX IF NOT EXISTS ix_slow_trace_timestamp ON slow_trace (timestamp DESC)'
+    )
@@ -0,0 +1,28 @@
+"""Миграция m006: отпечатки медиа, подтверждённых как спам.
+
+Таблица media_fingerprint хранит file_unique_id стикеров, анимаций и фото
+из спам-сообщений и перцептивный хеш фото (dHash, 64 бита). По ней при
+запуске бота строится индекс медиа (bot/services/media.py).
+"""
+
+MIGRATION_ID = "m006_media_fingerprint"
+
+
+async def upgrade(conn) -> None:
+    """Создаёт таблицу media_fingerprint.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_fingerprint (
+            id BIGSERIAL PRIMARY KEY,
+            file_unique_id TEXT NOT NULL UNIQUE,
+            media_type TEXT NOT NULL,
+            phash BIGINT,
+            chat_id BIGINT,
+            created_at DOUBLE PRECISION NOT NULL
+        )
+        """
+    )
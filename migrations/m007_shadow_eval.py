@@ -0,0 +1,36 @@
+"""Миграция m007: сравнение основной модели с моделью-кандидатом.
+
+Таблица shadow_eval хранит оценки одного сообщения основной моделью
+и моделью-кандидатом (SHADOW_MODEL), порог чата и время инференса обеих
+моделей. Тексты сообщений не сохраняются.
+"""
+
+MIGRATION_ID = "m007_shadow_eval"
+
+
+async def upgrade(conn) -> None:
+    """Создаёт таблицу shadow_eval и индекс по модели и времени.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS shadow_eval (
+            id BIGSERIAL PRIMARY KEY,
+            timestamp DOUBLE PRECISION NOT NULL,
+            chat_id BIGINT NOT NULL,
+            primary_model TEXT NOT NULL,
+            shadow_model TEXT NOT NULL,
+            threshold DOUBLE PRECISION NOT NULL,
+            primary_score DOUBLE PRECISION NOT NULL,
+            shadow_score DOUBLE PRECISION NOT NULL,
+            primary_seconds DOUBLE PRECISION NOT NULL,
+            shadow_seconds DOUBLE PRECISION NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        'CREATE INDEX IF NOT EXISTS ix_shadow_eval_model_timestamp '
+        'ON shadow_eval (shadow_model, timestamp DESC)'
+    )
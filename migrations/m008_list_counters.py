@@ -0,0 +1,71 @@
+"""Миграция m008: keyset-пагинация и счётчики записей списков панели.
+
+Списки спама и ограниченных пользователей выводятся по (timestamp, id)
+по убыванию, в том числе с фильтром по чатам; для них создаются
+составные индексы. Количество записей по чатам хранится в таблице
+list_counter и поддерживается триггерами на INSERT и DELETE, поэтому
+общее число записей не считается через COUNT(*) при каждом запросе.
+Таблицы блокируются от записи на время заполнения счётчиков.
+"""
+
+MIGRATION_ID = "m008_list_counters"
+
+# Таблицы списков панели (в обеих есть chat_id, timestamp и id)
+_TABLES = ('spam_message', 'muted_user')
+
+
+async def upgrade(conn) -> None:
+    """Создаёт индексы, таблицу list_counter, триггеры и заполняет счётчики.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS list_counter (
+            table_name TEXT NOT NULL,
+            chat_id BIGINT NOT NULL,
+            count BIGINT NOT NULL,
+            PRIMARY KEY (table_name, chat_id)
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE OR REPLACE FUNCTION list_counter_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO list_counter (table_name, chat_id, count)
+                VALUES (TG_TABLE_NAME, NEW.chat_id, 1)
+                ON CONFLICT (table_name, chat_id) DO UPDATE SET count = list_counter.count + 1;
+            ELSE
+                UPDATE list_counter SET count = count - 1
+                WHERE table_name = TG_TABLE_NAME AND chat_id = OLD.chat_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+    for table in _TABLES:
+        await conn.execute(
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_timestamp_id ON {table} (timestamp DESC, id DESC)'
+        )
+        await conn.execute(
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_chat_timestamp_id '
+            f'ON {table} (chat_id, timestamp DESC, id DESC)'
+        )
+
+        await conn.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+        await conn.execute(f'DROP TRIGGER IF EXISTS trg_{table}_list_counter ON {table}')
+        await conn.execute(
+            f'''CREATE TRIGGER trg_{table}_list_counter
+                AFTER INSERT OR DELETE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION list_counter_update()'''
+        )
+        await conn.execute('DELETE FROM list_counter WHERE table_name = $1', table)
+        await conn.execute(
+            f'''INSERT INTO list_counter (table_name, chat_id, count)
+                SELECT '{table}', chat_id, COUNT(*) FROM {table} GROUP BY chat_id'''
+        )
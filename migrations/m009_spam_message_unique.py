@@ -0,0 +1,37 @@
+"""Миграция m009: уникальность spam_message по (chat_id, message_id).
+
+Вердикт сохраняется в фоне с повторами (SideEffectService). Чтобы повтор
+после записи, подтверждение которой потерялось, не добавил второе
+спам-сообщение и не увеличил номер нарушения ещё раз, запись выполняется
+INSERT ... ON CONFLICT (chat_id, message_id) DO NOTHING
+(SpamRepository.record_spam_verdict), для чего нужен уникальный индекс.
+Дубликаты удаляются: остаётся самая ранняя запись.
+"""
+
+MIGRATION_ID = "m009_spam_message_unique"
+
+
+async def upgrade(conn) -> None:
+    """Удаляет дубликаты spam_message и создаёт уникальный индекс.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute(
+        """
+        DELETE FROM spam_message s
+        USING (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY chat_id, message_id
+                ORDER BY id
+            ) AS rn
+            FROM spam_message
+            WHERE message_id IS NOT NULL
+        ) d
+        WHERE s.id = d.id AND d.rn > 1
+        """
+    )
+    await conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_spam_message_chat_message "
+        "ON spam_message (chat_id, message_id)"
+    )
@@ -0,0 +1,31 @@
+"""Миграция m010: отпечатки медиа хранятся отдельно для каждого чата.
+
+Индекс медиа (bot/services/media.py) был общим для всех чатов, и медиа
+попадало в него при любом удалении сообщения кнопкой уведомления или
+автоматическом удалении спама. Теперь медиа добавляется только кнопкой
+«Медиа — спам» и проверяется только в том чате, где подтверждено.
+
+Накопленные отпечатки удаляются: среди них могут быть медиа обычных
+сообщений, удалённых из лог-топика. Уникальность file_unique_id заменяется
+уникальностью (chat_id, file_unique_id).
+"""
+
+MIGRATION_ID = "m010_media_fingerprint_per_chat"
+
+
+async def upgrade(conn) -> None:
+    """Очищает media_fingerprint и делает отпечатки уникальными в пределах чата.
+
+    Аргументы:
+        conn (asyncpg.Connection): Соединение с БД внутри транзакции.
+    """
+    await conn.execute("DELETE FROM media_fingerprint")
+    await conn.execute(
+        "ALTER TABLE media_fingerprint "
+        "DROP CONSTRAINT IF EXISTS media_fingerprint_file_unique_id_key"
+    )
+    await conn.execute("ALTER TABLE media_fingerprint ALTER COLUMN chat_id SET NOT NULL")
+    await conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_media_fingerprint_chat_file "
+        "ON media_fingerprint (chat_id, file_unique_id)"
+    )
@@ -39,13 +39,16 @@ async def lifespan(app: FastAPI):
     Алгоритм работы:
         1. Инициализировать пул PostgreSQL, если он ещё не инициализирован.
         2. Инициализировать настройки по умолчанию.
-        3. Передать управление приложению.
-        4. При завершении закрыть пул, если панель запущена отдельно от бота.
+        3. Запустить слушатель уведомлений об изменениях (LISTEN/NOTIFY).
+        4. Передать управление приложению.
+        5. При завершении остановить слушатель и закрыть пул,
+           если панель запущена отдельно от бота.
 
     Аргументы:
         app (FastAPI): Экземпляр приложения FastAPI.
     """
     from core.db import init_pool, close_pool, get_pool
+    from core.notify import start_listener, stop_listener
     from core.repository.settings import SettingsRepository
     from migrations.runner import run_migrations
 
@@ -59,8 +62,13 @@ async def lifespan(app: FastAPI):
         await run_migrations(get_pool())
         await SettingsRepository.init_default_global_settings()
 
+    # При совместном запуске слушатель уже запущен ботом — повторный вызов ничего не делает
+    await start_listener(DATABASE_URL)
+
     yield
 
+    await stop_listener()
+
     # Пул закрывается ботом при совместном запуске
     # При отдельном запуске панели — закрываем здесь
     from core.db import _pool
@@ -188,14 +196,20 @@ def create_app() -> FastAPI:
     from panel.routes.auth import router as auth_router
     from panel.routes.spam import router as spam_router
     from panel.routes.muted import router as muted_router
+    from panel.routes.shadow import router as shadow_router
     from panel.routes.settings import router as settings_router
     from panel.routes.api import router as api_router
+    from panel.routes.metrics import router as metrics_router
+    from panel.routes.webhook import router as webhook_router
 
     app.include_router(auth_router)
     app.include_router(spam_router)
     app.include_router(muted_router)
+    app.include_router(shadow_router)
     app.include_router(settings_router)
     app.include_router(api_router)
+    app.include_router(metrics_router)
+    app.include_router(webhook_router)
 
     # Обработчик 404
     from fastapi import HTTPException as _HTTPException
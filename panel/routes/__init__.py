@@ -7,6 +7,7 @@ from panel.routes.spam import router as spam_router
 from panel.routes.muted import router as muted_router
 from panel.routes.settings import router as settings_router
 from panel.routes.api import router as api_router
+from panel.routes.metrics import router as metrics_router
 
 __all__ = [
     'auth_router',
@@ -14,4 +15,5 @@ __all__ = [
     'muted_router',
     'settings_router',
     'api_router',
+    'metrics_router',
 ]
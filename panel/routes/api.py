@@ -194,6 +194,7 @@ async def logout(request: Request):
 async def get_spam(
     request: Request,
     page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None),
     user: dict = Depends(require_user_api),
 ):
     """# Получение списка обнаруженного спама
@@ -212,12 +213,18 @@ async def get_spam(
 
     Список возвращается постранично. Параметр `page` задаёт номер страницы, начиная с 1. Количество записей на странице определяется глобальной настройкой `PER_PAGE`.
 
+    Для последовательного перехода по страницам передайте в `cursor` значение `pagination.next_cursor` предыдущего ответа (и `page` следующей страницы для `current_page`). С курсором время ответа не зависит от номера страницы.
+
     ## Успешный ответ
 
-    Возвращает объект с массивом `items` и метаданными `pagination`.
+    Возвращает объект с массивом `items` и метаданными `pagination`. `pagination.next_cursor` равен `null` на последней странице.
 
     ## Возможные ошибки
 
+    ### 400 Некорректный курсор
+
+    Значение `cursor` не получено из `next_cursor`.
+
     ### 401 Не авторизован
 
     Сессия не содержит данных пользователя.
@@ -230,6 +237,7 @@ async def get_spam(
     Аргументы:
         request (Request): Запрос FastAPI.
         page (int): Номер страницы, начиная с 1.
+        cursor (Optional[str]): Курсор следующей страницы (next_cursor).
         user (dict): Данные текущего пользователя.
 
     Возвращаемое значение:
@@ -238,9 +246,12 @@ async def get_spam(
     per_page = await SettingsRepository.get_global('PER_PAGE', 10)
     chat_pks = await _get_accessible_chat_pks(user)
 
-    pagination = await SpamRepository.get_spam_messages(
-        chat_pks=chat_pks, page=page, per_page=per_page
-    )
+    try:
+        pagination = await SpamRepository.get_spam_messages(
+            chat_pks=chat_pks, page=page, per_page=per_page, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Некорректный курсор')
 
     items = [
         SpamMessageOut(
@@ -267,6 +278,7 @@ async def get_spam(
             total_pages=pagination['total_pages'],
             total=pagination['total'],
             per_page=per_page,
+            next_cursor=pagination['next_cursor'],
         ).model_dump(),
     }
 
@@ -275,6 +287,7 @@ async def get_spam(
 async def get_muted(
     request: Request,
     page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None),
     user: dict = Depends(require_user_api),
 ):
     """# Получение списка ограниченных пользователей
@@ -293,12 +306,18 @@ async def get_muted(
 
     Список возвращается постранично. Параметр `page` задаёт номер страницы, начиная с 1. Количество записей на странице определяется глобальной настройкой `PER_PAGE`.
 
+    Для последовательного перехода по страницам передайте в `cursor` значение `pagination.next_cursor` предыдущего ответа (и `page` следующей страницы для `current_page`). С курсором время ответа не зависит от номера страницы.
+
     ## Успешный ответ
 
-    Возвращает объект с массивом `items` и метаданными `pagination`.
+    Возвращает объект с массивом `items` и метаданными `pagination`. `pagination.next_cursor` равен `null` на последней странице.
 
     ## Возможные ошибки
 
+    ### 400 Некорректный курсор
+
+    Значение `cursor` не получено из `next_cursor`.
+
     ### 401 Не авторизован
 
     Сессия не содержит данных пользователя.
@@ -311,6 +330,7 @@ async def get_muted(
     Аргументы:
         request (Request): Запрос FastAPI.
         page (int): Номер страницы, начиная с 1.
+        cursor (Optional[str]): Курсор следующей страницы (next_cursor).
         user (dict): Данные текущего пользователя.
 
     Возвращаемое значение:
@@ -319,9 +339,12 @@ async def get_muted(
     per_page = await SettingsRepository.get_global('PER_PAGE', 10)
     chat_pks = await _get_accessible_chat_pks(user)
 
-    pagination = await MutedRepository.get_muted_users(
-        chat_pks=chat_pks, page=page, per_page=per_page
-    )
+    try:
+        pagination = await MutedRepository.get_muted_users(
+            chat_pks=chat_pks, page=page, per_page=per_page, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Некорректный курсор')
 
     items = [
         MutedUserOut(
@@ -343,6 +366,7 @@ async def get_muted(
             total_pages=pagination['total_pages'],
             total=pagination['total'],
             per_page=per_page,
+            next_cursor=pagination['next_cursor'],
         ).model_dump(),
     }
 
@@ -0,0 +1,39 @@
+"""Эндпоинт метрик процесса в формате Prometheus.
+
+Доступ по Bearer-токену METRICS_TOKEN. Если токен не задан,
+эндпоинт отключён и возвращает 404.
+"""
+
+import hmac
+
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from core.config import METRICS_TOKEN
+from core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get('/metrics', include_in_schema=False, response_class=PlainTextResponse)
+async def metrics(request: Request) -> PlainTextResponse:
+    """Возвращает метрики процесса в текстовом формате Prometheus.
+
+    Аргументы:
+        request (Request): Запрос FastAPI.
+
+    Возвращаемое значение:
+        response (PlainTextResponse): Метрики в формате exposition 0.0.4.
+
+    Исключения:
+        HTTPException: 404, если METRICS_TOKEN не задан; 401 при неверном токене.
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404)
+
+    auth = request.headers.get('Authorization', '')
+    token = auth[len('Bearer '):] if auth.startswith('Bearer ') else ''
+    if not hmac.compare_digest(token, METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail='Не авторизован')
+
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4; charset=utf-8')
@@ -47,6 +47,7 @@ def format_muted_row(item: dict) -> str:
 async def muted_page(
     request: Request,
     page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None),
     user: dict = Depends(require_user),
 ):
     """# Страница ограниченных пользователей
@@ -65,6 +66,8 @@ async def muted_page(
 
     Список возвращается постранично. Параметр `page` задаёт номер страницы, начиная с 1. Количество записей на странице определяется глобальной настройкой `PER_PAGE`.
 
+    Ссылка «Следующая» содержит курсор `cursor` последней записи страницы, поэтому последовательный переход по страницам не зависит от их номера. Некорректный курсор игнорируется.
+
     ## Успешный ответ
 
     Возвращает HTML-страницу с таблицей и навигацией по страницам.
@@ -77,6 +80,7 @@ async def muted_page(
     Аргументы:
         request (Request): Запрос FastAPI.
         page (int): Номер страницы, начиная с 1.
+        cursor (Optional[str]): Курсор страницы из ссылки «Следующая».
         user (dict): Данные текущего пользователя.
     """
     logger.info('Запрос страницы ограниченных пользователей.')
@@ -87,9 +91,14 @@ async def muted_page(
     if not user['is_superadmin']:
         chat_pks = await UserRepository.get_accessible_chat_pks(user['id'])
 
-    pagination = await MutedRepository.get_muted_users(
-        chat_pks=chat_pks, page=page, per_page=per_page
-    )
+    try:
+        pagination = await MutedRepository.get_muted_users(
+            chat_pks=chat_pks, page=page, per_page=per_page, cursor=cursor
+        )
+    except ValueError:
+        pagination = await MutedRepository.get_muted_users(
+            chat_pks=chat_pks, page=page, per_page=per_page
+        )
 
     count = pagination['total']
     rows = ''.join(format_muted_row(item) for item in pagination['items'])
@@ -111,7 +120,10 @@ async def muted_page(
             ),
             'rows': rows,
             'prev_url': f'/muted?page={pagination["current_page"] - 1}' if pagination['current_page'] > 1 else None,
-            'next_url': f'/muted?page={pagination["current_page"] + 1}' if pagination['current_page'] < pagination['total_pages'] else None,
+            'next_url': (
+                f'/muted?page={pagination["current_page"] + 1}&cursor={pagination["next_cursor"]}'
+                if pagination['next_cursor'] else None
+            ),
             'total_pages': pagination['total_pages'],
             'current_page': pagination['current_page'],
             'pages': get_visible_pages(pagination['current_page'], pagination['total_pages']),
@@ -0,0 +1,106 @@
+"""Маршруты для просмотра теневой оценки модели-кандидата."""
+
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, Request, Query, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse
+
+from core.config import SHADOW_MODEL, SHADOW_SAMPLE_RATE
+from core.repository.shadow import ShadowEvalRepository
+from panel.routes.auth import require_user
+from core.utils import escape_html
+from core.logging import logger
+
+router = APIRouter()
+
+
+def format_shadow_row(item: dict) -> str:
+    """Форматирует строку таблицы сравнения моделей.
+
+    Аргументы:
+        item (dict): Запись сводки ShadowEvalRepository.get_summary.
+
+    Возвращаемое значение:
+        html (str): HTML-строка таблицы.
+    """
+    last = datetime.fromtimestamp(item['last_timestamp']).strftime("%d.%m.%Y<br>%H:%M:%S")
+    delta = (item['shadow_mean'] - item['primary_mean']) * 1000
+
+    return f"""
+        <tr>
+            <td>{escape_html(item['primary_model'])}</td>
+            <td>{escape_html(item['shadow_model'])}</td>
+            <td>{item['total']}</td>
+            <td>{item['agreement'] * 100:.1f}%</td>
+            <td>{item['primary_only']} / {item['shadow_only']}</td>
+            <td>{item['mean_abs_diff']:.4f}</td>
+            <td>{item['primary_mean'] * 1000:.1f} / {item['primary_p95'] * 1000:.1f}</td>
+            <td>{item['shadow_mean'] * 1000:.1f} / {item['shadow_p95'] * 1000:.1f}</td>
+            <td>{delta:+.1f}</td>
+            <td class="date">{last}</td>
+        </tr>
+    """
+
+
+@router.get('/shadow', response_class=HTMLResponse)
+async def shadow_page(
+    request: Request,
+    hours: int = Query(24, ge=1, le=24 * 30),
+    user: dict = Depends(require_user),
+):
+    """# Страница теневой оценки модели
+
+    Отображает сравнение основной модели чатов с моделью-кандидатом `SHADOW_MODEL` на выборке реальных сообщений.
+
+    ## Когда использовать
+
+    Используйте этот эндпоинт перед заменой модели `BERT_MODEL`, чтобы оценить совпадение решений и время инференса.
+
+    ## Требуемые права
+
+    Запрос доступен только суперпользователю. Остальные пользователи перенаправляются на главную страницу.
+
+    ## Параметры
+
+    Параметр `hours` задаёт период сводки в часах (по умолчанию 24).
+
+    ## Успешный ответ
+
+    Возвращает HTML-страницу с таблицей по парам моделей: число оценок, доля совпавших решений
+    по порогу `BERT_THRESHOLD` чата, число сообщений, признанных спамом только одной моделью,
+    средняя разница оценок и время инференса (среднее и p95, мс).
+
+    Аргументы:
+        request (Request): Запрос FastAPI.
+        hours (int): Период сводки в часах.
+        user (dict): Данные текущего пользователя.
+    """
+    if not user['is_superadmin']:
+        return RedirectResponse(url='/', status_code=303)
+
+    logger.info('Запрос страницы теневой оценки модели.')
+
+    summary = await ShadowEvalRepository.get_summary(time.time() - hours * 3600)
+    rows = ''.join(format_shadow_row(item) for item in summary)
+
+    if SHADOW_MODEL:
+        status = f'Модель-кандидат: {SHADOW_MODEL} (доля сообщений {SHADOW_SAMPLE_RATE:g})'
+    else:
+        status = 'Теневая оценка отключена (SHADOW_MODEL не задан)'
+
+    templates = request.app.state.templates
+    return templates.TemplateResponse(
+        request,
+        'shadow.html',
+        {
+            'title': 'Теневая оценка модели',
+            'og_title': 'Теневая оценка модели',
+            'og_description': '',
+            'active_page': 'shadow',
+            'github_url': 'https://github.com/overklassniy/STANKIN_AntiSpam_Bot/',
+            'shadow_text_table': f'Теневая оценка модели за {hours} ч.',
+            'status': status,
+            'rows': rows,
+        }
+    )
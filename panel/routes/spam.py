@@ -81,6 +81,7 @@ def format_spam_row(item: dict) -> str:
 async def index(
     request: Request,
     page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None),
     user: dict = Depends(require_user),
 ):
     """# Главная страница — список спам-сообщений
@@ -99,6 +100,8 @@ async def index(
 
     Список возвращается постранично. Параметр `page` задаёт номер страницы, начиная с 1. Количество записей на странице определяется глобальной настройкой `PER_PAGE`.
 
+    Ссылка «Следующая» содержит курсор `cursor` последней записи страницы, поэтому последовательный переход по страницам не зависит от их номера. Некорректный курсор игнорируется.
+
     ## Успешный ответ
 
     Возвращает HTML-страницу с таблицей и навигацией по страницам.
@@ -111,6 +114,7 @@ async def index(
     Аргументы:
         request (Request): Запрос FastAPI.
         page (int): Номер страницы, начиная с 1.
+        cursor (Optional[str]): Курсор страницы из ссылки «Следующая».
         user (dict): Данные текущего пользователя.
     """
     logger.info('Запрос главной страницы.')
@@ -123,9 +127,14 @@ async def index(
     else:
         chat_pks = await UserRepository.get_accessible_chat_pks(user['id'])
 
-    pagination = await SpamRepository.get_spam_messages(
-        chat_pks=chat_pks, page=page, per_page=per_page
-    )
+    try:
+        pagination = await SpamRepository.get_spam_messages(
+            chat_pks=chat_pks, page=page, per_page=per_page, cursor=cursor
+        )
+    except ValueError:
+        pagination = await SpamRepository.get_spam_messages(
+            chat_pks=chat_pks, page=page, per_page=per_page
+        )
 
     count = pagination['total']
     rows = ''.join(format_spam_row(item) for item in pagination['items'])
@@ -147,7 +156,10 @@ async def index(
             ),
             'rows': rows,
             'prev_url': f'/?page={pagination["current_page"] - 1}' if pagination['current_page'] > 1 else None,
-            'next_url': f'/?page={pagination["current_page"] + 1}' if pagination['current_page'] < pagination['total_pages'] else None,
+            'next_url': (
+                f'/?page={pagination["current_page"] + 1}&cursor={pagination["next_cursor"]}'
+                if pagination['next_cursor'] else None
+            ),
             'total_pages': pagination['total_pages'],
             'current_page': pagination['current_page'],
             'pages': get_visible_pages(pagination['current_page'], pagination['total_pages']),
@@ -0,0 +1,29 @@
+"""Webhook-эндпоинт Telegram в веб-панели.
+
+Используется при BOT_MODE=webhook и WEBHOOK_PORT=0, когда бот и панель
+запущены в одном процессе. Запрос передаётся WebhookService и подтверждается
+без ожидания обработки обновления. Если бот в этом процессе не принимает
+обновления через webhook, эндпоинт возвращает 404.
+"""
+
+from fastapi import APIRouter, Request, Response
+
+from core.config import WEBHOOK_PATH
+
+router = APIRouter()
+
+
+@router.post(WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(request: Request) -> Response:
+    """Принимает обновление Telegram.
+
+    Аргументы:
+        request (Request): Запрос FastAPI.
+
+    Возвращаемое значение:
+        response (Response): Пустой ответ со статусом WebhookService.handle.
+    """
+    from bot.services.webhook import SECRET_HEADER, WebhookService
+
+    status = WebhookService.handle(request.headers.get(SECRET_HEADER), await request.body())
+    return Response(status_code=status)
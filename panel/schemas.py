@@ -11,6 +11,7 @@ class PaginationMeta(BaseModel):
     total_pages: int
     total: int
     per_page: int
+    next_cursor: Optional[str] = None
 
 
 class SpamMessageOut(BaseModel):
@@ -9,6 +9,7 @@ interface PaginationMeta {
   total_pages: number;
   total: number;
   per_page: number;
+  next_cursor: string | null;
 }
 
 interface ApiResponse<T> {
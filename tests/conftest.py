@@ -0,0 +1,8 @@
+"""Общие настройки тестов.
+
+core.config требует токен бота при импорте; запросы к Telegram в тестах не выполняются.
+"""
+
+import os
+
+os.environ.setdefault('BOT_TOKEN', '123456:test')
@@ -0,0 +1,82 @@
+"""Псевдонимизация захваченных обновлений (bot/services/capture.py)."""
+
+import json
+
+from bot.services.capture import pseudonymize, pseudonymize_id
+
+_KEY = b'test-key'
+
+_GROUP = {'id': -1001234567890, 'type': 'supergroup', 'title': 'Группа', 'username': 'public_group'}
+_SENDER = {'id': 111, 'is_bot': False, 'first_name': 'Иван', 'last_name': 'Петров', 'username': 'ivan'}
+
+
+def _personal_values(update: dict) -> list:
+    """Возвращает персональные значения, оставшиеся в сериализованном обновлении."""
+    dump = json.dumps(update, ensure_ascii=False)
+    return [
+        value for value in (
+            '+79991234567', 'Мария', 'Сидорова', 'Иван', 'Петров', 'ivan',
+            'Скрытый Отправитель', 'Редактор', 'TEL:', '222', '333',
+        )
+        if value in dump
+    ]
+
+
+def test_contact_message():
+    update = {
+        'update_id': 1,
+        'message': {
+            'message_id': 10,
+            'date': 1700000000,
+            'chat': _GROUP,
+            'from': _SENDER,
+            'contact': {
+                'phone_number': '+79991234567',
+                'first_name': 'Мария',
+                'last_name': 'Сидорова',
+                'user_id': 222,
+                'vcard': 'BEGIN:VCARD\nTEL:+79991234567\nEND:VCARD',
+            },
+        },
+    }
+
+    result = pseudonymize(update, _KEY, hash_texts=False)
+
+    assert _personal_values(result) == []
+    contact = result['message']['contact']
+    assert contact['first_name'] == 'User'
+    assert contact['user_id'] == pseudonymize_id(222, _KEY)
+    assert result['message']['from']['id'] == pseudonymize_id(111, _KEY)
+    assert result['message']['chat']['id'] == _GROUP['id']
+
+
+def test_forwarded_message():
+    update = {
+        'update_id': 2,
+        'message': {
+            'message_id': 11,
+            'date': 1700000000,
+            'chat': _GROUP,
+            'from': _SENDER,
+            'text': 'Пересланный текст',
+            'forward_sender_name': 'Скрытый Отправитель',
+            'forward_from': {'id': 333, 'is_bot': False, 'first_name': 'Мария'},
+            'forward_origin': {
+                'type': 'hidden_user',
+                'date': 1699990000,
+                'sender_user_name': 'Скрытый Отправитель',
+            },
+            'forward_from_chat': {'id': -1009876543210, 'type': 'channel', 'title': 'Канал'},
+            'forward_signature': 'Редактор',
+            'author_signature': 'Редактор',
+        },
+    }
+
+    result = pseudonymize(update, _KEY, hash_texts=True)
+
+    assert _personal_values(result) == []
+    message = result['message']
+    assert message['forward_from']['id'] == pseudonymize_id(333, _KEY)
+    assert message['forward_origin']['type'] == 'hidden_user'
+    assert message['text'] != 'Пересланный текст'
+    assert len(message['text']) == len('Пересланный текст')